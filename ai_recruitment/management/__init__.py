@@ -0,0 +1 @@
+# Intentionally empty to make this directory a Python package
@@ -0,0 +1,136 @@
+"""
+Django management command to parse many CVs at once with the Gemini API.
+Text is extracted in a process pool and API calls run concurrently (rate limited, with retries).
+
+Usage:
+    python manage.py parse_cvs cvs/ other/HuongHuynh.pdf --concurrency 8
+    python manage.py parse_cvs --pending --job-description 3
+"""
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_recruitment.models import JobDescription, Resume
+from ai_recruitment.services.config import (
+    CACHE_DIR, CV_EXTRACT_PROCESSES, CV_LLM_CONCURRENCY, CV_LLM_REQUESTS_PER_MINUTE, GEMINI_API_URL
+)
+from ai_recruitment.services.cv_parser import CVParser, CVProcessor, RateLimiter
+from ai_recruitment.services.resume_service import ResumeService
+
+CV_EXTENSIONS = ('.pdf', '.docx')
+
+
+class Command(BaseCommand):
+    help = 'Parse CV files (or pending Resume records) concurrently with the Gemini API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='CV files or directories containing .pdf / .docx files'
+        )
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Parse uploaded resumes that have no parsed data yet and save the result'
+        )
+        parser.add_argument(
+            '--job-description',
+            type=int,
+            help='Score parsed resumes against this job description id (with --pending)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=CV_LLM_CONCURRENCY,
+            help=f'Concurrent API requests (default: {CV_LLM_CONCURRENCY})'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=int,
+            default=CV_LLM_REQUESTS_PER_MINUTE,
+            help=f'Max API requests per minute, 0 = unlimited (default: {CV_LLM_REQUESTS_PER_MINUTE})'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=CV_EXTRACT_PROCESSES,
+            help='Text extraction processes (default: CPU count, 0 = in-process)'
+        )
+        parser.add_argument(
+            '--api-url',
+            default=GEMINI_API_URL,
+            help='Override the LLM endpoint (e.g. a local stub server)'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            default=CACHE_DIR,
+            help=f'Directory for cached parse results (default: {CACHE_DIR})'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the parsed results of file paths to this JSON file'
+        )
+
+    def handle(self, *args, **options):
+        if not options['paths'] and not options['pending']:
+            raise CommandError('Cần truyền đường dẫn CV hoặc --pending')
+
+        parser = CVParser(
+            api_url=options['api_url'],
+            rate_limiter=RateLimiter(options['rate_limit']),
+            pool_size=options['concurrency'],
+        )
+        processor = CVProcessor(parser=parser, cache_dir=options['cache_dir'])
+        run_options = {
+            'concurrency': options['concurrency'],
+            'processes': options['processes'],
+            'progress_callback': self._progress,
+        }
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('🤖 PHÂN TÍCH CV HÀNG LOẠT')
+        self.stdout.write('=' * 60)
+
+        if options['paths']:
+            files = self._collect_files(options['paths'])
+            results = processor.process_many(files, **run_options)
+            failed = [path for path, data in results.items() if 'error' in data]
+            for path in failed:
+                self.stdout.write(f"❌ {path}: {results[path]['error']}")
+            self.stdout.write(f"\n📊 File: {len(results) - len(failed)} thành công, {len(failed)} lỗi")
+            if options['output']:
+                with open(options['output'], 'w', encoding='utf-8') as f:
+                    json.dump(results, f, ensure_ascii=False, indent=2)
+                self.stdout.write(f"💾 Đã ghi kết quả vào {options['output']}")
+
+        if options['pending']:
+            job_description = None
+            if options['job_description']:
+                try:
+                    job_description = JobDescription.objects.get(id=options['job_description'])
+                except JobDescription.DoesNotExist:
+                    raise CommandError(f"Không tìm thấy job description {options['job_description']}")
+            resumes = Resume.objects.filter(parsed_data__isnull=True).exclude(file='')
+            succeeded, failed = ResumeService(processor).process_many(resumes, job_description, **run_options)
+            self.stdout.write(f"\n📊 Resume: {succeeded} thành công, {failed} lỗi")
+
+    def _collect_files(self, paths):
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(
+                        os.path.join(root, name) for name in sorted(names)
+                        if name.lower().endswith(CV_EXTENSIONS)
+                    )
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise CommandError(f'Không tìm thấy: {path}')
+        return files
+
+    def _progress(self, done, total):
+        if done == total or done % 10 == 0:
+            self.stdout.write(f"   ⏳ {done}/{total}")
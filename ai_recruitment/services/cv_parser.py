@@ -7,17 +7,118 @@ import requests
 import json
 import os
 import hashlib
-from pprint import pprint
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
 # Import cấu hình từ file config.py
-from .config import GEMINI_API_URL, CACHE_DIR
+from .config import (
+    GEMINI_API_URL, CACHE_DIR, CV_LLM_CONCURRENCY, CV_LLM_REQUESTS_PER_MINUTE,
+    CV_LLM_MAX_RETRIES, CV_LLM_TIMEOUT, CV_EXTRACT_PROCESSES
+)
+
+# Mã lỗi HTTP đáng để thử lại (quá tải / lỗi tạm thời phía server)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """Hash SHA256 của file, đọc theo từng khối 1MB để không nạp cả file vào bộ nhớ."""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def extract_text(file_path: str) -> str:
+    """Trích xuất text từ PDF hoặc DOCX (hàm cấp module để chạy được trong process pool)."""
+    text = ""
+    try:
+        if file_path.lower().endswith('.pdf'):
+            with fitz.open(file_path) as doc:
+                for page in doc:
+                    text += page.get_text("text", flags=fitz.TEXTFLAGS_SEARCH) + "\n"
+        elif file_path.lower().endswith('.docx'):
+            doc = docx.Document(file_path)
+            text = "\n".join([p.text for p in doc.paragraphs])
+
+        return re.sub(r'(\n\s*){2,}', '\n\n', text).strip()
+    except Exception as e:
+        print(f"Lỗi khi đọc file {file_path}: {e}")
+        return ""
+
+
+class RateLimiter:
+    """
+    Giới hạn số request mỗi phút, dùng chung giữa các thread:
+    mỗi request được xếp một "slot" cách nhau 60/rate giây.
+    """
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 
 class CVParser:
     """
     Class chỉ chịu trách nhiệm gọi Gemini API để phân tích nội dung text của CV.
     """
-    def __init__(self, api_url):
+    def __init__(self, api_url, session=None, timeout=CV_LLM_TIMEOUT, max_retries=CV_LLM_MAX_RETRIES,
+                 rate_limiter=None, pool_size=CV_LLM_CONCURRENCY):
         self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or RateLimiter(CV_LLM_REQUESTS_PER_MINUTE)
+        # Dùng chung một Session (giữ kết nối keep-alive) cho tất cả request
+        self.session = session or self._build_session(pool_size)
+
+    @staticmethod
+    def _build_session(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+
+    def _retry_delay(self, attempt, response=None):
+        """Thời gian chờ trước lần thử lại: theo Retry-After nếu có, nếu không thì 1, 2, 4... giây."""
+        if response is not None:
+            try:
+                return float(response.headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                pass
+        return 2 ** attempt
+
+    def _post(self, payload):
+        """POST tới API, thử lại khi lỗi kết nối hoặc mã lỗi tạm thời (429 / 5xx)."""
+        body = json.dumps(payload)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                response = self.session.post(self.api_url, data=body, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+            response.raise_for_status()
+            return response
 
     def _build_prompt(self, cv_text: str) -> str:
         """Xây dựng prompt chi tiết để hướng dẫn Gemini."""
@@ -51,12 +152,9 @@ class CVParser:
             "generationConfig": {"response_mime_type": "application/json"}
         }
         
-        headers = {"Content-Type": "application/json"}
-
         try:
             print("--> Đang gửi yêu cầu đến Gemini API (đây là bước có thể tốn phí)...")
-            response = requests.post(self.api_url, headers=headers, data=json.dumps(payload), timeout=90)
-            response.raise_for_status()
+            response = self._post(payload)
 
             api_response = response.json()
             
@@ -78,41 +176,38 @@ class CVProcessor:
     """
     Pipeline hoàn chỉnh: Đọc file -> Trích xuất text -> Quản lý Cache -> Parse.
     """
-    def __init__(self):
-        self.parser = CVParser(api_url=GEMINI_API_URL)
-        if not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR)
-            print(f"Đã tạo thư mục cache tại: {CACHE_DIR}")
+    def __init__(self, parser=None, cache_dir=CACHE_DIR):
+        self.parser = parser or CVParser(api_url=GEMINI_API_URL)
+        self.cache_dir = cache_dir
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+            print(f"Đã tạo thư mục cache tại: {self.cache_dir}")
 
     def _get_cache_path(self, file_path: str) -> str:
         """Tạo đường dẫn file cache dựa trên hash của file CV."""
-        file_hash = self._hash_file(file_path)
-        return os.path.join(CACHE_DIR, f"{file_hash}.json")
+        return self._cache_path_for_hash(self._hash_file(file_path))
+
+    def _cache_path_for_hash(self, file_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_hash}.json")
 
     def _hash_file(self, file_path: str) -> str:
         """Tạo một hash SHA256 duy nhất cho file để làm key cache."""
-        hasher = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            buf = f.read()
-            hasher.update(buf)
-        return hasher.hexdigest()
+        return hash_file(file_path)
 
     def _extract_text_from_file(self, file_path: str) -> str:
         """Trích xuất text từ PDF hoặc DOCX."""
-        text = ""
-        try:
-            if file_path.lower().endswith('.pdf'):
-                with fitz.open(file_path) as doc:
-                    for page in doc:
-                        text += page.get_text("text", flags=fitz.TEXTFLAGS_SEARCH) + "\n"
-            elif file_path.lower().endswith('.docx'):
-                doc = docx.Document(file_path)
-                text = "\n".join([p.text for p in doc.paragraphs])
-            
-            return re.sub(r'(\n\s*){2,}', '\n\n', text).strip()
-        except Exception as e:
-            print(f"Lỗi khi đọc file {file_path}: {e}")
-            return ""
+        return extract_text(file_path)
+
+    def _read_cache(self, cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_cache(self, cache_path, structured_data):
+        # Ghi ra file tạm rồi đổi tên để thread khác không đọc phải file ghi dở
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(structured_data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, cache_path)
 
     def process_cv(self, file_path: str) -> dict:
         """
@@ -122,8 +217,7 @@ class CVProcessor:
 
         if os.path.exists(cache_path):
             print(f"Đã tìm thấy kết quả parsing trong cache cho file: {os.path.basename(file_path)}")
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self._read_cache(cache_path)
 
         print(f"Không tìm thấy cache. Bắt đầu xử lý mới file: {os.path.basename(file_path)}")
         
@@ -134,8 +228,85 @@ class CVProcessor:
         structured_data = self.parser.parse_text(cv_text)
 
         if "error" not in structured_data:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(structured_data, f, ensure_ascii=False, indent=4)
+            self._write_cache(cache_path, structured_data)
             print(f"Đã lưu kết quả parsing vào cache: {cache_path}")
         
-        return structured_data
\ No newline at end of file
+        return structured_data
+
+    def process_many(self, paths, concurrency=CV_LLM_CONCURRENCY, processes=CV_EXTRACT_PROCESSES,
+                     progress_callback=None) -> dict:
+        """
+        Xử lý hàng loạt CV:
+        1. Hash từng file (đọc theo khối) và lấy kết quả có sẵn trong cache.
+        2. Trích xuất text các file còn lại trong process pool (PyMuPDF tốn CPU).
+        3. Gọi Gemini API song song tối đa `concurrency` request, có giới hạn tốc độ và thử lại.
+        File trùng nội dung chỉ được gửi lên API một lần.
+
+        Args:
+            processes: số process trích xuất text (None = số CPU, 0 = chạy trong process hiện tại)
+            progress_callback: hàm (done, total) gọi sau mỗi file xử lý xong
+
+        Returns:
+            dict: {đường dẫn file: dữ liệu đã parse hoặc {"error": ...}}
+        """
+        paths = list(dict.fromkeys(paths))
+        results = {}
+        pending = {}  # hash -> [các đường dẫn có cùng nội dung]
+        total = len(paths)
+
+        def report():
+            if progress_callback:
+                progress_callback(len(results), total)
+
+        for path in paths:
+            try:
+                file_hash = self._hash_file(path)
+            except OSError as e:
+                results[path] = {"error": f"Không thể đọc file {path}: {e}"}
+                continue
+            cache_path = self._cache_path_for_hash(file_hash)
+            if os.path.exists(cache_path):
+                results[path] = self._read_cache(cache_path)
+            else:
+                pending.setdefault(file_hash, []).append(path)
+        report()
+        print(f"📄 {total} CV: {len(results)} có sẵn trong cache / lỗi đọc, {len(pending)} cần xử lý")
+        if not pending:
+            return results
+
+        # Bước 2: trích xuất text (mỗi nội dung một lần)
+        hashes = list(pending)
+        first_paths = [pending[file_hash][0] for file_hash in hashes]
+        if processes == 0 or len(first_paths) == 1:
+            texts = [extract_text(path) for path in first_paths]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                texts = list(executor.map(extract_text, first_paths, chunksize=4))
+
+        def finish(file_hash, structured_data):
+            for path in pending[file_hash]:
+                results[path] = structured_data
+            report()
+
+        # Bước 3: gọi API song song
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            futures = {}
+            for file_hash, path, text in zip(hashes, first_paths, texts):
+                if not text:
+                    finish(file_hash, {"error": f"Không thể trích xuất văn bản từ file: {path}"})
+                    continue
+                futures[executor.submit(self.parser.parse_text, text)] = file_hash
+
+            for future in as_completed(futures):
+                file_hash = futures[future]
+                try:
+                    structured_data = future.result()
+                except Exception as e:
+                    structured_data = {"error": f"API request failed: {e}"}
+                if "error" not in structured_data:
+                    self._write_cache(self._cache_path_for_hash(file_hash), structured_data)
+                finish(file_hash, structured_data)
+
+        failed = sum(1 for path in paths if "error" in results[path])
+        print(f"✅ Đã xử lý {total} CV ({failed} lỗi)")
+        return results
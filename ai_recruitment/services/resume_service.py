@@ -3,8 +3,25 @@ from .cv_parser import CVProcessor
 from .cv_scorer import ScoringModule
 
 class ResumeService:
-    def __init__(self):
-        self.cv_processor = CVProcessor()
+    def __init__(self, cv_processor=None):
+        self.cv_processor = cv_processor or CVProcessor()
+
+    def _score(self, parsed_data, job_description):
+        jd_data = {
+            'required_skills': job_description.required_skills,
+            'nice_to_have_skills': job_description.nice_to_have_skills,
+            'required_years_experience': job_description.required_years_experience,
+            'required_degrees': job_description.required_degrees
+        }
+        
+        weights = {
+            'skills': 0.5,
+            'experience': 0.3,
+            'education': 0.2
+        }
+        
+        scorer = ScoringModule(jd_data, weights)
+        return scorer.calculate_total_score(parsed_data)
 
     def process_resume(self, resume, job_description=None):
         """Process a resume and optionally score it against a job description."""
@@ -15,26 +32,31 @@ class ResumeService:
             
             # If job description is provided, score the CV
             if job_description and "error" not in parsed_data:
-                jd_data = {
-                    'required_skills': job_description.required_skills,
-                    'nice_to_have_skills': job_description.nice_to_have_skills,
-                    'required_years_experience': job_description.required_years_experience,
-                    'required_degrees': job_description.required_degrees
-                }
-                
-                weights = {
-                    'skills': 0.5,
-                    'experience': 0.3,
-                    'education': 0.2
-                }
-                
-                scorer = ScoringModule(jd_data, weights)
-                scores = scorer.calculate_total_score(parsed_data)
-                resume.scores = scores
+                resume.scores = self._score(parsed_data, job_description)
             
             resume.save()
             return True
 
         except Exception as e:
             print(f"Error processing resume: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def process_many(self, resumes, job_description=None, **options):
+        """
+        Parse (và chấm điểm) nhiều CV cùng lúc qua CVProcessor.process_many.
+        Returns: (số CV thành công, số CV lỗi)
+        """
+        resumes = list(resumes)
+        results = self.cv_processor.process_many([resume.file.path for resume in resumes], **options)
+        succeeded = failed = 0
+        for resume in resumes:
+            parsed_data = results[resume.file.path]
+            resume.parsed_data = parsed_data
+            if "error" in parsed_data:
+                failed += 1
+            else:
+                succeeded += 1
+                if job_description:
+                    resume.scores = self._score(parsed_data, job_description)
+            resume.save(update_fields=['parsed_data', 'scores', 'updated_at'])
+        return succeeded, failed
@@ -1,3 +1,173 @@
-from django.test import TestCase
+"""
+Test cases for the batch CV parsing pipeline
+The LLM API is replaced by a local stub HTTP server
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 
-# Create your tests here.
+import fitz
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .models import Resume
+from .services.cv_parser import CVParser, CVProcessor, RateLimiter
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Trả về response dạng Gemini; tên ứng viên lấy từ dòng 'Name:' trong CV"""
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = payload['contents'][0]['parts'][0]['text']
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            fail = server.fail_next > 0
+            if fail:
+                server.fail_next -= 1
+        try:
+            time.sleep(server.delay)
+            if fail:
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            name = prompt.split('Name:')[1].split()[0]
+            text = json.dumps({'name': name, 'email': None, 'phone': None, 'skills': ['Python'],
+                               'experience': [], 'education': []})
+            body = json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubLLMHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_url = f'http://127.0.0.1:{cls.server.server_address[1]}/generate'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = self.server.active = self.server.peak = self.server.fail_next = 0
+        self.server.delay = 0
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+
+    def make_pdf(self, name, content=None):
+        path = os.path.join(self.tmp, f'{name}.pdf')
+        with fitz.open() as doc:
+            page = doc.new_page()
+            page.insert_text((72, 72), content or f'Name: {name}')
+            doc.save(path)
+        return path
+
+    def make_processor(self, concurrency=4, rate=0):
+        parser = CVParser(self.api_url, rate_limiter=RateLimiter(rate), pool_size=concurrency)
+        return CVProcessor(parser=parser, cache_dir=self.cache_dir)
+
+
+class ProcessManyTestCase(StubServerMixin, SimpleTestCase):
+    """Test CVProcessor.process_many"""
+
+    def test_parses_concurrently_with_limit(self):
+        self.server.delay = 0.2
+        paths = [self.make_pdf(f'Candidate{i}') for i in range(6)]
+        results = self.make_processor(concurrency=3).process_many(paths, concurrency=3, processes=2)
+        self.assertEqual([results[p]['name'] for p in paths], [f'Candidate{i}' for i in range(6)])
+        self.assertEqual(self.server.requests, 6)
+        self.assertGreater(self.server.peak, 1)
+        self.assertLessEqual(self.server.peak, 3)
+
+    def test_cache_and_duplicate_files(self):
+        first = self.make_pdf('Alice')
+        copy = os.path.join(self.tmp, 'copy.pdf')
+        shutil.copy(first, copy)
+        processor = self.make_processor()
+        results = processor.process_many([first, copy], processes=0)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(results[copy]['name'], 'Alice')
+
+        processor.process_many([first], processes=0)
+        self.assertEqual(processor.process_cv(copy)['name'], 'Alice')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_retries_rate_limited_requests(self):
+        self.server.fail_next = 2
+        path = self.make_pdf('Bob')
+        result = self.make_processor().process_many([path], processes=0)[path]
+        self.assertEqual(result['name'], 'Bob')
+        self.assertEqual(self.server.requests, 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.fail_next = 10
+        parser = CVParser(self.api_url, rate_limiter=RateLimiter(0), max_retries=1)
+        processor = CVProcessor(parser=parser, cache_dir=self.cache_dir)
+        path = self.make_pdf('Carol')
+        self.assertIn('error', processor.process_many([path], processes=0)[path])
+        self.assertEqual(self.server.requests, 2)
+        self.assertFalse(os.listdir(self.cache_dir))
+
+    def test_unreadable_files(self):
+        empty = self.make_pdf('Empty', content=' ')
+        results = self.make_processor().process_many([empty, os.path.join(self.tmp, 'missing.pdf')], processes=0)
+        self.assertTrue(all('error' in data for data in results.values()))
+        self.assertEqual(self.server.requests, 0)
+
+    def test_rate_limiter_spaces_requests(self):
+        limiter = RateLimiter(1200)  # 50ms / request
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+
+class ParseCvsCommandTestCase(StubServerMixin, TestCase):
+    """Test the parse_cvs management command"""
+
+    def test_parse_directory_and_pending_resumes(self):
+        self.make_pdf('Dave')
+        output = os.path.join(self.tmp, 'out.json')
+        with override_settings(MEDIA_ROOT=self.tmp):
+            resume = Resume(file=None)
+            with open(self.make_pdf('Erin'), 'rb') as f:
+                resume.file.save('erin.pdf', ContentFile(f.read()))
+
+            out = StringIO()
+            call_command(
+                'parse_cvs', self.tmp, '--pending', '--processes', '0', '--rate-limit', '0',
+                '--api-url', self.api_url, '--cache-dir', self.cache_dir, '--output', output, stdout=out
+            )
+        resume.refresh_from_db()
+        self.assertEqual(resume.parsed_data['name'], 'Erin')
+        with open(output, encoding='utf-8') as f:
+            names = sorted(data['name'] for data in json.load(f).values())
+        self.assertIn('Dave', names)
+        self.assertIn('Resume: 1 thành công', out.getvalue())
@@ -1,10 +1,11 @@
 from django.contrib import admin
 from .models import (
     JobTitle, Department, Employee, Attendance, Reward, Discipline, 
-    Payroll, Evaluation, LeaveType, LeaveRequest, LeaveBalance,
+    Payroll, Evaluation, LeaveType, LeaveRequest, LeaveBalance, LeaveBalanceTransaction, Holiday,
     ExpenseCategory, Expense, PermissionAuditLog,
     AppraisalPeriod, AppraisalCriteria, Appraisal, AppraisalScore, AppraisalComment,
-    DocumentCategory, Document, DocumentDownload, Announcement, AnnouncementRead
+    DocumentCategory, Document, DocumentDownload, Announcement, AnnouncementRead,
+    EmailOutbox, BackgroundJob
 )
 
 # Register your models here.
@@ -28,7 +29,8 @@ class EmployeeAdmin(admin.ModelAdmin):
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
-    list_display = ['employee', 'date', 'status', 'working_hours']
+    list_display = ['employee', 'date', 'check_in_at', 'check_out_at', 'status', 'working_hours',
+                    'late_minutes', 'early_minutes']
     list_filter = ['status', 'date']
     search_fields = ['employee__name']
     date_hierarchy = 'date'
@@ -80,6 +82,30 @@ class LeaveBalanceAdmin(admin.ModelAdmin):
     list_filter = ['year', 'leave_type']
     search_fields = ['employee__name']
     ordering = ['-year', 'employee__name']
+    # Số ngày đã dùng chỉ thay đổi qua sổ cái (LeaveBalanceTransaction)
+    readonly_fields = ['used_days', 'remaining_days']
+
+@admin.register(LeaveBalanceTransaction)
+class LeaveBalanceTransactionAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'balance', 'kind', 'days', 'leave_request', 'created_by']
+    list_filter = ['kind', 'balance__year', 'balance__leave_type']
+    search_fields = ['balance__employee__name', 'note']
+    list_select_related = ['balance__employee', 'balance__leave_type', 'leave_request', 'created_by']
+    readonly_fields = ['balance', 'leave_request', 'kind', 'days', 'note', 'created_by', 'created_at']
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ['date', 'name', 'kind', 'department']
+    list_filter = ['kind', 'department']
+    search_fields = ['name']
+    date_hierarchy = 'date'
+    ordering = ['-date']
 
 @admin.register(ExpenseCategory)
 class ExpenseCategoryAdmin(admin.ModelAdmin):
@@ -225,3 +251,19 @@ class AnnouncementReadAdmin(admin.ModelAdmin):
     date_hierarchy = 'read_at'
     readonly_fields = ['read_at']
     ordering = ['-read_at']
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'template_name', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'template_name']
+    search_fields = ['subject', 'dedup_key', 'last_error']
+    ordering = ['-id']
+    readonly_fields = ['created_at', 'sent_at', 'locked_at']
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'label', 'status', 'progress_done', 'progress_total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['label', 'message']
+    readonly_fields = ['created_at', 'started_at', 'heartbeat_at', 'finished_at', 'worker', 'attempts']
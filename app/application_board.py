@@ -0,0 +1,89 @@
+"""
+Application board
+Dữ liệu cho trang quản lý ứng tuyển (danh sách + Kanban):
+
+- Số lượng mỗi cột (trạng thái) lấy bằng MỘT truy vấn GROUP BY status thay vì tải
+  toàn bộ đơn ứng tuyển vào Python.
+- Mỗi cột được phân trang độc lập theo keyset (created_at, id) giảm dần: trang kế
+  tiếp chỉ đọc các đơn "cũ hơn" con trỏ nên chi phí không phụ thuộc vào số đơn đã
+  có; index (status, created_at, id) phục vụ truy vấn này.
+- Thẻ chỉ nạp các cột được hiển thị (only()).
+
+Usage:
+    applications = board_queryset(job_id, search)
+    counts = column_counts(applications)
+    cards, next_cursor = column_page(applications, 'new', cursor=request.GET.get('cursor'))
+"""
+import base64
+
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Application
+from .search_index import search_filter
+
+BOARD_PAGE_SIZE = 20
+# Các cột thẻ ứng tuyển hiển thị (danh sách + Kanban)
+CARD_FIELDS = (
+    'id', 'application_code', 'full_name', 'email', 'phone', 'years_of_experience', 'rating',
+    'status', 'created_at', 'job__title', 'assigned_to__name',
+)
+INTERVIEW_STATUSES = ('phone_interview', 'interview')
+
+
+def board_queryset(job_id=None, search=None):
+    """Đơn ứng tuyển theo bộ lọc của trang (tin tuyển dụng, từ khóa)"""
+    applications = Application.objects.all()
+    if job_id:
+        applications = applications.filter(job_id=job_id)
+    if search:
+        applications = search_filter(applications, 'application', search)
+    return applications
+
+
+def column_counts(queryset):
+    """{status: số đơn} cho mọi trạng thái (kể cả cột rỗng) - một truy vấn GROUP BY"""
+    counts = dict.fromkeys(dict(Application.STATUS_CHOICES), 0)
+    rows = queryset.order_by().values('status').annotate(total=Count('id')).values_list('status', 'total')
+    counts.update(rows)
+    return counts
+
+
+def encode_cursor(application):
+    value = f'{application.created_at.isoformat()}|{application.id}'
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, id) từ con trỏ; ValueError nếu con trỏ không hợp lệ"""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if created_at is None:
+        raise ValueError('Invalid cursor')
+    return created_at, pk
+
+
+def column_page(queryset, status=None, cursor=None, limit=BOARD_PAGE_SIZE):
+    """
+    Một trang thẻ của cột (status=None: mọi trạng thái - chế độ danh sách).
+
+    Returns:
+        tuple: ([Application, ...], con trỏ trang kế tiếp hoặc None)
+    """
+    if status:
+        queryset = queryset.filter(status=status)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    cards = list(
+        queryset.select_related('job', 'assigned_to').only(*CARD_FIELDS)
+        .order_by('-created_at', '-id')[:limit + 1]
+    )
+    if len(cards) > limit:
+        cards = cards[:limit]
+        return cards, encode_cursor(cards[-1])
+    return cards, None
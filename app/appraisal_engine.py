@@ -0,0 +1,143 @@
+"""
+Appraisal generation engine
+Tạo Appraisal + AppraisalScore cho cả kỳ đánh giá bằng một số truy vấn cố định
+(thay vì exists() + tìm quản lý + INSERT từng bản ghi cho mỗi nhân viên):
+
+- Nhân viên đã có appraisal trong kỳ được nạp một lần.
+- Bản đồ phòng ban -> quản lý được dựng một lần.
+- Appraisal và AppraisalScore được bulk_create theo lô trong một transaction.
+
+Usage:
+    summary = generate_appraisals(period, progress_callback=lambda done, total: ...)
+    # {'created': 120, 'skipped': 3, 'total': 123, 'scores': 1200}
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+
+from .dashboard_stats import invalidate_dashboard_stats
+from .inbox_counters import invalidate_inbox_counters
+from .models import Appraisal, AppraisalScore, Employee
+from .monthly_stats import mark_stats_changed
+
+logger = logging.getLogger(__name__)
+
+# Nhân viên được đánh giá: Thử việc và Chính thức
+APPRAISAL_EMPLOYEE_STATUSES = [1, 2]
+DEFAULT_BATCH_SIZE = 1000
+
+
+def applicable_employees(period):
+    """Queryset nhân viên thuộc phạm vi kỳ đánh giá (phòng ban / chức danh trống = tất cả)"""
+    employees = Employee.objects.filter(status__in=APPRAISAL_EMPLOYEE_STATUSES)
+    department_ids = list(period.applicable_departments.values_list('id', flat=True))
+    if department_ids:
+        employees = employees.filter(department_id__in=department_ids)
+    job_title_ids = list(period.applicable_job_titles.values_list('id', flat=True))
+    if job_title_ids:
+        employees = employees.filter(job_title_id__in=job_title_ids)
+    return employees
+
+
+def build_manager_map(department_ids):
+    """
+    {department_id: [id quản lý, ...]} theo thứ tự id.
+    Giữ tối đa hai quản lý mỗi phòng ban: người đầu tiên, và người thay thế khi
+    chính quản lý đó là nhân viên được đánh giá.
+    """
+    managers = {}
+    condition = Q(department_id__in=[dept_id for dept_id in department_ids if dept_id is not None])
+    if None in department_ids:
+        condition |= Q(department__isnull=True)
+    rows = (
+        Employee.objects.filter(condition, is_manager=True)
+        .order_by('department_id', 'id').values_list('department_id', 'id')
+    )
+    for department_id, manager_id in rows:
+        ids = managers.setdefault(department_id, [])
+        if len(ids) < 2:
+            ids.append(manager_id)
+    return managers
+
+
+def _pick_manager(manager_map, department_id, employee_id):
+    for manager_id in manager_map.get(department_id, ()):
+        if manager_id != employee_id:
+            return manager_id
+    return None
+
+
+def generate_appraisals(period, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None):
+    """
+    Tạo appraisal (status pending_self) và điểm theo từng tiêu chí cho mọi nhân viên
+    phù hợp chưa có appraisal trong kỳ.
+
+    Returns:
+        dict: {'created', 'skipped', 'total', 'scores'}
+    """
+    employees = list(applicable_employees(period).order_by('id').values_list('id', 'department_id'))
+    existing = set(Appraisal.objects.filter(period=period).values_list('employee_id', flat=True))
+    pending = [(emp_id, dept_id) for emp_id, dept_id in employees if emp_id not in existing]
+    criteria_ids = list(period.criteria.values_list('id', flat=True))
+    manager_map = build_manager_map({dept_id for _, dept_id in pending})
+
+    total = len(employees)
+    done = total - len(pending)
+    scores_created = 0
+    touched_ids = set()
+    if progress_callback:
+        progress_callback(done, total)
+
+    with transaction.atomic():
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            appraisals = Appraisal.objects.bulk_create([
+                Appraisal(
+                    period=period,
+                    employee_id=emp_id,
+                    manager_id=_pick_manager(manager_map, dept_id, emp_id),
+                    status='pending_self'
+                )
+                for emp_id, dept_id in chunk
+            ])
+            touched_ids.update(appraisal.employee_id for appraisal in appraisals)
+            touched_ids.update(appraisal.manager_id for appraisal in appraisals if appraisal.manager_id)
+            appraisal_ids = [appraisal.pk for appraisal in appraisals]
+            if None in appraisal_ids:
+                # Database không trả về id sau bulk_create (MySQL)
+                appraisal_ids = list(
+                    Appraisal.objects.filter(period=period, employee_id__in=[emp_id for emp_id, _ in chunk])
+                    .values_list('id', flat=True)
+                )
+
+            scores = AppraisalScore.objects.bulk_create(
+                [
+                    AppraisalScore(appraisal_id=appraisal_id, criteria_id=criteria_id)
+                    for appraisal_id in appraisal_ids
+                    for criteria_id in criteria_ids
+                ],
+                batch_size=batch_size
+            )
+            scores_created += len(scores)
+            done += len(chunk)
+            if progress_callback:
+                progress_callback(done, total)
+
+    if pending:
+        # bulk_create không gửi post_save - tự làm mới bộ đếm inbox, thống kê dashboard / số liệu tháng
+        invalidate_inbox_counters(touched_ids)
+        invalidate_dashboard_stats()
+        mark_stats_changed(
+            {(period.end_date.year, period.end_date.month)},
+            department_ids={dept_id for _, dept_id in pending if dept_id},
+        )
+
+    summary = {
+        'created': len(pending),
+        'skipped': total - len(pending),
+        'total': total,
+        'scores': scores_created,
+    }
+    logger.info(f"Generated appraisals for period {period.name}: {summary}")
+    return summary
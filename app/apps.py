@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        # Register identity cache invalidation signals
+        from . import identity  # noqa: F401
+        # Register dashboard statistics cache invalidation signals
+        from . import dashboard_stats  # noqa: F401
+        # Register inbox counter cache invalidation signals
+        from . import inbox_counters  # noqa: F401
+        # Register organization chart cache invalidation signals
+        from . import org_chart  # noqa: F401
+        # Register stored payslip cleanup signals
+        from . import payslips  # noqa: F401
+        # Register document / announcement audience index signals
+        from . import content_audience  # noqa: F401
+        # Register monthly statistics rollup change tracking signals
+        from . import monthly_stats  # noqa: F401
+        # Register search index update signals
+        from . import search_index  # noqa: F401
+        # Register background job handlers
+        from . import job_handlers  # noqa: F401
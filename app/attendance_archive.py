@@ -0,0 +1,406 @@
+"""
+Attendance archive
+Tầng lưu trữ chấm công cho các tháng đã đóng: bảng Attendance (mỗi nhân viên mỗi ngày
+một dòng) chỉ giữ các tháng gần đây, giúp bảng chính và các index của luồng check-in
+luôn nhỏ:
+
+- Lệnh `python manage.py archive_attendance` gom các tháng cũ hơn ATTENDANCE_HOT_MONTHS
+  thành AttendanceArchive: MỘT dòng cho mỗi (nhân viên, tháng), chứa các cột
+  (day, date, status, working_hours, ...) dạng JSON nén zlib và các cột tổng hợp
+  (số ngày, giờ làm, đi muộn, ...) để tính lương / thống kê bằng SQL không cần giải nén.
+  Mỗi lô nhân viên được ghi lưu trữ và xóa khỏi bảng chính trong cùng một transaction.
+- API đọc hợp bản ghi lưu trữ với bản ghi trong bảng chính (bảng chính thắng khi trùng
+  ngày - bản ghi HR thêm / sửa lại sau khi lưu trữ): employee_attendance() cho trang
+  chấm công cá nhân, attendance_month_totals() cho tính lương / thống kê tháng,
+  employee_year_totals() cho trang hồ sơ, iter_archived() cho export / trang quản lý.
+- Bản ghi giải nén là Attendance chưa lưu (pk=None), dùng được ở template như bản ghi thường.
+- Sửa dữ liệu một tháng đã lưu trữ: `archive_attendance --restore --year Y --month M`
+  đưa tháng đó về bảng chính.
+
+Usage:
+    records = employee_attendance(employee, year=2024, month=3)
+    totals = attendance_month_totals(2024, 3)   # {employee_id: {'present_hours': ..., ...}}
+    archive_month(2024, 3)
+"""
+import json
+import logging
+import zlib
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth
+from django.utils import timezone
+
+from .date_utils import month_bounds
+from .models import Attendance, AttendanceArchive, Employee
+
+logger = logging.getLogger(__name__)
+
+# Số tháng đã đóng vẫn giữ trong bảng chính (ngoài tháng hiện tại)
+HOT_MONTHS = getattr(settings, 'ATTENDANCE_HOT_MONTHS', 3)
+ARCHIVE_BATCH_SIZE = 500  # Số nhân viên mỗi transaction
+PAYLOAD_VERSION = 1
+
+PRESENT_STATUS = 'Có làm việc'
+LEAVE_STATUS = 'Nghỉ phép'
+ABSENT_STATUS = 'Nghỉ không phép'
+
+SUMMARY_FIELDS = [
+    'row_count', 'working_days', 'working_hours', 'present_hours',
+    'late_count', 'early_leave_count', 'leave_days', 'absent_days',
+]
+
+
+# ======================== ENCODING ========================
+
+def _timestamp(value):
+    return value.timestamp() if value else None
+
+
+def _datetime(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc) if value is not None else None
+
+
+def encode_rows(attendances):
+    """Nén các bản ghi (cùng nhân viên, cùng tháng) thành payload theo cột"""
+    columns = {
+        'day': [a.work_date.day for a in attendances],
+        'date': [_timestamp(a.date) for a in attendances],
+        'status': [a.status for a in attendances],
+        'working_hours': [a.working_hours for a in attendances],
+        'late_minutes': [a.late_minutes for a in attendances],
+        'early_minutes': [a.early_minutes for a in attendances],
+        'check_in_at': [_timestamp(a.check_in_at) for a in attendances],
+        'check_out_at': [_timestamp(a.check_out_at) for a in attendances],
+        'notes': [a.notes for a in attendances],
+    }
+    data = json.dumps({'v': PAYLOAD_VERSION, 'columns': columns}, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(data.encode('utf-8'), 9)
+
+
+def decode_archive(archive, employee=None):
+    """Giải nén một AttendanceArchive thành list Attendance chưa lưu (theo ngày tăng dần)"""
+    columns = json.loads(zlib.decompress(bytes(archive.payload)).decode('utf-8'))['columns']
+    employee_fields = {'employee': employee} if employee is not None else {'employee_id': archive.employee_id}
+    return [
+        Attendance(
+            **employee_fields,
+            date=_datetime(columns['date'][index]),
+            work_date=date(archive.year, archive.month, day),
+            status=columns['status'][index],
+            working_hours=columns['working_hours'][index],
+            late_minutes=columns['late_minutes'][index],
+            early_minutes=columns['early_minutes'][index],
+            check_in_at=_datetime(columns['check_in_at'][index]),
+            check_out_at=_datetime(columns['check_out_at'][index]),
+            notes=columns['notes'][index],
+        )
+        for index, day in enumerate(columns['day'])
+    ]
+
+
+def summarize(attendances):
+    """Các chỉ số tổng hợp (SUMMARY_FIELDS) của một danh sách bản ghi"""
+    stats = dict.fromkeys(SUMMARY_FIELDS, 0)
+    for attendance in attendances:
+        hours = attendance.working_hours or 0
+        stats['row_count'] += 1
+        stats['working_hours'] += hours
+        if attendance.status == PRESENT_STATUS:
+            stats['working_days'] += 1
+            stats['present_hours'] += hours
+        elif attendance.status == LEAVE_STATUS:
+            stats['leave_days'] += 1
+        elif attendance.status == ABSENT_STATUS:
+            stats['absent_days'] += 1
+        stats['late_count'] += attendance.late_minutes > 0
+        stats['early_leave_count'] += attendance.early_minutes > 0
+    return stats
+
+
+def _hot_aggregates():
+    """Biểu thức GROUP BY tính SUMMARY_FIELDS trên bảng chính (giờ làm đặt tên 'hours')"""
+    return {
+        'row_count': Count('id'),
+        'working_days': Count('id', filter=Q(status=PRESENT_STATUS)),
+        'hours': Sum('working_hours'),
+        'present_hours': Sum('working_hours', filter=Q(status=PRESENT_STATUS)),
+        'late_count': Count('id', filter=Q(late_minutes__gt=0)),
+        'early_leave_count': Count('id', filter=Q(early_minutes__gt=0)),
+        'leave_days': Count('id', filter=Q(status=LEAVE_STATUS)),
+        'absent_days': Count('id', filter=Q(status=ABSENT_STATUS)),
+    }
+
+
+def _hot_totals(row):
+    """Dòng GROUP BY của _hot_aggregates() -> {SUMMARY_FIELDS} (bỏ các khóa nhóm)"""
+    return {name: row.get('hours' if name == 'working_hours' else name) or 0 for name in SUMMARY_FIELDS}
+
+
+def _merge(archived, hot):
+    """Hợp bản ghi lưu trữ với bản ghi bảng chính - bảng chính thắng khi trùng (nhân viên, ngày)"""
+    hot = list(hot)
+    keys = {(a.employee_id, a.work_date) for a in hot}
+    return [a for a in archived if (a.employee_id, a.work_date) not in keys] + hot
+
+
+# ======================== ARCHIVING ========================
+
+def archive_cutoff(today=None):
+    """Ngày đầu tiên còn giữ trong bảng chính: các tháng trước ngày này được lưu trữ"""
+    today = today or timezone.localdate()
+    index = today.year * 12 + today.month - 1 - HOT_MONTHS
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archivable_months(today=None):
+    """Các tháng (year, month) đã đóng còn bản ghi trong bảng chính"""
+    days = Attendance.objects.filter(work_date__lt=archive_cutoff(today)).dates('work_date', 'month')
+    return [(day.year, day.month) for day in days]
+
+
+def archive_month(year, month, batch_size=ARCHIVE_BATCH_SIZE, progress=None, today=None):
+    """
+    Chuyển chấm công của một tháng đã đóng từ bảng chính sang AttendanceArchive.
+    Tháng đã có lưu trữ (bản ghi thêm sau) được gộp lại vào lưu trữ.
+
+    Returns:
+        dict: {'employees': số nhân viên, 'rows': số bản ghi đã chuyển}
+    """
+    start, end = month_bounds(year, month)
+    if end > archive_cutoff(today):
+        raise ValueError(f'Tháng {month}/{year} chưa đóng (giữ {HOT_MONTHS} tháng gần nhất trong bảng chính)')
+
+    hot = Attendance.objects.filter(work_date__gte=start, work_date__lt=end)
+    employee_ids = list(hot.values_list('employee_id', flat=True).distinct().order_by('employee_id'))
+    rows = 0
+    for offset in range(0, len(employee_ids), batch_size):
+        chunk = employee_ids[offset:offset + batch_size]
+        with transaction.atomic():
+            attendances = list(
+                hot.filter(employee_id__in=chunk).select_for_update().order_by('employee_id', 'work_date')
+            )
+            existing = {
+                archive.employee_id: archive
+                for archive in AttendanceArchive.objects.filter(year=year, month=month, employee_id__in=chunk)
+                .select_for_update()
+            }
+            by_employee = {}
+            for attendance in attendances:
+                by_employee.setdefault(attendance.employee_id, []).append(attendance)
+
+            archives = []
+            for employee_id, records in by_employee.items():
+                if employee_id in existing:
+                    records = sorted(_merge(decode_archive(existing[employee_id]), records),
+                                     key=lambda a: a.work_date)
+                archives.append(AttendanceArchive(
+                    employee_id=employee_id, year=year, month=month,
+                    payload=encode_rows(records), **summarize(records)
+                ))
+            AttendanceArchive.objects.bulk_create(
+                archives, batch_size=1000, update_conflicts=True,
+                unique_fields=['employee', 'year', 'month'],
+                update_fields=[*SUMMARY_FIELDS, 'payload', 'archived_at'],
+            )
+            Attendance.objects.filter(pk__in=[a.pk for a in attendances]).delete()
+        rows += len(attendances)
+        if progress:
+            progress(offset + len(chunk), len(employee_ids))
+
+    logger.info(f"Archived attendance {month}/{year}: {rows} rows of {len(employee_ids)} employees")
+    return {'employees': len(employee_ids), 'rows': rows}
+
+
+def restore_month(year, month, employee_ids=None):
+    """
+    Đưa một tháng đã lưu trữ về bảng chính (để sửa dữ liệu). Bản ghi đang có trong bảng
+    chính được giữ nguyên.
+
+    Returns:
+        int: số bản ghi được khôi phục
+    """
+    from .monthly_stats import mark_stats_changed  # monthly_stats đọc qua module này
+
+    start, end = month_bounds(year, month)
+    with transaction.atomic():
+        archives = AttendanceArchive.objects.filter(year=year, month=month).select_for_update()
+        if employee_ids is not None:
+            archives = archives.filter(employee_id__in=employee_ids)
+        archives = list(archives)
+        # Ngày đã có trong bảng chính (HR thêm lại sau khi lưu trữ) được giữ nguyên, không tính
+        hot_keys = set(
+            Attendance.objects.filter(
+                work_date__gte=start, work_date__lt=end,
+                employee_id__in=[archive.employee_id for archive in archives],
+            ).values_list('employee_id', 'work_date')
+        )
+        records = [
+            attendance
+            for archive in archives
+            for attendance in decode_archive(archive)
+            if (archive.employee_id, attendance.work_date) not in hot_keys
+        ]
+        Attendance.objects.bulk_create(records, batch_size=1000, ignore_conflicts=True)
+        AttendanceArchive.objects.filter(pk__in=[archive.pk for archive in archives]).delete()
+        # bulk_create không phát signal
+        mark_stats_changed({(year, month)}, employee_ids=employee_ids)
+    logger.info(f"Restored attendance {month}/{year}: {len(records)} rows")
+    return len(records)
+
+
+# ======================== READ ========================
+
+def employee_attendance(employee, year=None, month=None):
+    """
+    Chấm công của một nhân viên (bảng chính + lưu trữ), mới nhất trước.
+    Lọc theo tháng + năm, chỉ tháng (mọi năm), chỉ năm hoặc toàn bộ.
+    """
+    hot = Attendance.objects.filter(employee=employee)
+    archives = AttendanceArchive.objects.filter(employee=employee)
+    if year and month:
+        start, end = month_bounds(year, month)
+        hot = hot.filter(work_date__gte=start, work_date__lt=end)
+        archives = archives.filter(year=int(year), month=int(month))
+    elif month:
+        hot = hot.filter(work_date__month=int(month))
+        archives = archives.filter(month=int(month))
+    elif year:
+        hot = hot.filter(work_date__year=int(year))
+        archives = archives.filter(year=int(year))
+
+    archived = [attendance for archive in archives for attendance in decode_archive(archive, employee)]
+    records = _merge(archived, hot) if archived else list(hot)
+    return sorted(records, key=lambda a: a.date, reverse=True)
+
+
+def attendance_years(employee):
+    """Các năm có dữ liệu chấm công của nhân viên (mới nhất trước)"""
+    years = {day.year for day in Attendance.objects.filter(employee=employee).dates('work_date', 'year')}
+    years.update(AttendanceArchive.objects.filter(employee=employee).values_list('year', flat=True))
+    return sorted(years, reverse=True)
+
+
+def attendance_month_totals(year, month, employees=None):
+    """
+    Chỉ số chấm công theo nhân viên của một tháng (bảng chính + lưu trữ): một truy vấn
+    GROUP BY trên bảng chính, một truy vấn trên các cột tổng hợp của lưu trữ. Chỉ những
+    nhân viên có bản ghi ở cả hai nơi (hiếm) mới phải giải nén.
+
+    Args:
+        employees: danh sách / subquery id nhân viên (None = tất cả)
+
+    Returns:
+        dict: {employee_id: {SUMMARY_FIELDS}}
+    """
+    start, end = month_bounds(year, month)
+    hot = Attendance.objects.filter(work_date__gte=start, work_date__lt=end)
+    archives = AttendanceArchive.objects.filter(year=year, month=month)
+    if employees is not None:
+        hot = hot.filter(employee_id__in=employees)
+        archives = archives.filter(employee_id__in=employees)
+
+    totals = {
+        row['employee_id']: _hot_totals(row)
+        for row in hot.values('employee_id').annotate(**_hot_aggregates()).order_by()
+    }
+
+    overlap = []
+    for row in archives.values('employee_id', *SUMMARY_FIELDS):
+        employee_id = row.pop('employee_id')
+        if employee_id in totals:
+            overlap.append(employee_id)
+        else:
+            totals[employee_id] = row
+    if overlap:
+        hot_rows = {}
+        for attendance in hot.filter(employee_id__in=overlap):
+            hot_rows.setdefault(attendance.employee_id, []).append(attendance)
+        for archive in archives.filter(employee_id__in=overlap):
+            totals[archive.employee_id] = summarize(_merge(decode_archive(archive), hot_rows[archive.employee_id]))
+    return totals
+
+
+def employee_year_totals(employee, year):
+    """
+    Chỉ số chấm công cả năm của một nhân viên (bảng chính + lưu trữ) cho trang hồ sơ:
+    một truy vấn GROUP BY tháng trên bảng chính, một truy vấn trên các cột tổng hợp của
+    lưu trữ. Chỉ tháng có bản ghi ở cả hai nơi mới đi qua attendance_month_totals().
+
+    Returns:
+        dict: {SUMMARY_FIELDS}
+    """
+    months = {
+        row.pop('month'): row
+        for row in AttendanceArchive.objects.filter(employee=employee, year=year).values('month', *SUMMARY_FIELDS)
+    }
+    hot = Attendance.objects.filter(employee=employee, work_date__gte=date(year, 1, 1),
+                                    work_date__lt=date(year + 1, 1, 1))
+    rows = hot.annotate(month_number=ExtractMonth('work_date')).values('month_number').annotate(
+        **_hot_aggregates()
+    ).order_by()
+    for row in rows:
+        month = row['month_number']
+        if month in months:
+            months[month] = attendance_month_totals(year, month, [employee.id])[employee.id]
+        else:
+            months[month] = _hot_totals(row)
+
+    totals = dict.fromkeys(SUMMARY_FIELDS, 0)
+    for month_totals in months.values():
+        for name in SUMMARY_FIELDS:
+            totals[name] += month_totals[name]
+    return totals
+
+
+def _archives_in_range(date_from=None, date_to=None, department_id=None):
+    """Các AttendanceArchive có tháng giao với khoảng ngày"""
+    archives = AttendanceArchive.objects.all()
+    if date_from:
+        archives = archives.filter(Q(year__gt=date_from.year) | Q(year=date_from.year, month__gte=date_from.month))
+    if date_to:
+        archives = archives.filter(Q(year__lt=date_to.year) | Q(year=date_to.year, month__lte=date_to.month))
+    if department_id:
+        archives = archives.filter(employee__department_id=department_id)
+    return archives
+
+
+def iter_archived(date_from=None, date_to=None, department_id=None):
+    """
+    Bản ghi lưu trữ trong khoảng ngày (tính cả hai đầu), mới nhất trước - cho export.
+    Bản ghi trùng (nhân viên, ngày) với bảng chính được bỏ qua. Giải nén từng tháng một.
+
+    Yields:
+        Attendance (chưa lưu, đã gắn employee + department)
+    """
+    archives = _archives_in_range(date_from, date_to, department_id)
+    months = list(archives.order_by('-year', '-month').values_list('year', 'month').distinct())
+    for year, month in months:
+        month_archives = list(archives.filter(year=year, month=month))
+        employees = Employee.objects.select_related('department').in_bulk(
+            [archive.employee_id for archive in month_archives]
+        )
+        start, end = month_bounds(year, month)
+        hot_keys = set(
+            Attendance.objects.filter(
+                work_date__gte=start, work_date__lt=end, employee_id__in=list(employees)
+            ).values_list('employee_id', 'work_date')
+        )
+        records = [
+            attendance
+            for archive in month_archives
+            for attendance in decode_archive(archive, employees[archive.employee_id])
+            if (archive.employee_id, attendance.work_date) not in hot_keys
+            and (not date_from or attendance.work_date >= date_from)
+            and (not date_to or attendance.work_date <= date_to)
+        ]
+        records.sort(key=lambda a: a.date, reverse=True)
+        yield from records
+
+
+def archived_row_count(date_from=None, date_to=None, department_id=None):
+    """Số bản ghi lưu trữ trong các tháng giao với khoảng ngày (cận trên - dùng cho ngưỡng / tiến độ)"""
+    archives = _archives_in_range(date_from, date_to, department_id)
+    return archives.aggregate(total=Sum('row_count'))['total'] or 0
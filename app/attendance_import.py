@@ -0,0 +1,278 @@
+"""
+Attendance import
+Nhập log máy chấm công (CSV / TSV: employee_code, timestamp, device) thành bảng Attendance:
+
+- File được đọc theo dòng (stream); mã nhân viên được ánh xạ sang id bằng MỘT truy vấn nạp trước.
+- Các lần quẹt được gom theo (nhân viên, ngày), bỏ quẹt trùng trong DUPLICATE_PUNCH_SECONDS,
+  ghép cặp vào / ra để tính giờ làm (bỏ giờ nghỉ giữa các cặp) và cờ đi muộn / về sớm.
+- Log máy chấm công ghi theo thời gian: khi gặp ngày mới, các ngày cũ hơn FLUSH_LAG_DAYS được
+  ghi xuống và giải phóng nên bộ nhớ chỉ giữ vài ngày dữ liệu, không phụ thuộc kích thước file.
+  Quẹt đến muộn cho ngày đã ghi bị bỏ qua và báo lỗi.
+- Bản ghi được bulk_create theo lô; bản ghi đã có của (nhân viên, ngày) được giữ nguyên,
+  hoặc ghi đè với replace=True (INSERT ... ON CONFLICT DO UPDATE).
+
+Usage:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        result = import_punch_log(f, replace=False)
+    result.summary()
+"""
+import csv
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance_ingest import WORK_END, WORK_START
+from .models import Attendance, Employee
+from .monthly_stats import mark_stats_changed
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 5000
+# Hai lần quẹt cách nhau không quá khoảng này được coi là một
+DUPLICATE_PUNCH_SECONDS = 60
+# Số ngày giữ lại trong bộ nhớ trước khi ghi (cho phép log lệch thứ tự giữa các máy)
+FLUSH_LAG_DAYS = 1
+# Số lỗi chi tiết tối đa được giữ lại trong kết quả
+MAX_REPORTED_ERRORS = 50
+
+HEADER_NAMES = {'employee_code', 'code', 'ma_nv', 'mã nv', 'mã nhân viên'}
+TIMESTAMP_FORMATS = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M')
+
+
+class ImportResult:
+    """Thống kê một lần nhập log chấm công"""
+
+    def __init__(self):
+        self.lines = 0
+        self.punches = 0
+        self.duplicate_punches = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.unknown_codes = Counter()
+        self.devices = Counter()
+        self.errors = []
+        self.error_count = 0
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'Dòng {line_number}: {message}')
+
+    def summary(self):
+        text = (
+            f'{self.punches:,} lần quẹt từ {len(self.devices)} máy: tạo {self.created:,}, '
+            f'cập nhật {self.updated:,}, bỏ qua {self.skipped:,} bản ghi chấm công'
+        )
+        if self.unknown_codes:
+            text += f'; {sum(self.unknown_codes.values()):,} lần quẹt của {len(self.unknown_codes)} mã không tồn tại'
+        if self.error_count:
+            text += f'; {self.error_count:,} dòng lỗi'
+        return text
+
+    def as_dict(self):
+        return {
+            'punches': self.punches,
+            'duplicate_punches': self.duplicate_punches,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'unknown_codes': dict(self.unknown_codes.most_common(MAX_REPORTED_ERRORS)),
+            'errors': self.errors,
+            'error_count': self.error_count,
+            'summary': self.summary(),
+        }
+
+
+def parse_timestamp(value):
+    """Thời điểm quẹt theo giờ địa phương (naive); None nếu sai định dạng"""
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        for fmt in TIMESTAMP_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        return None
+    if timezone.is_aware(parsed):
+        parsed = timezone.make_naive(parsed)
+    return parsed
+
+
+def summarize_punches(punches):
+    """
+    Ghép cặp các lần quẹt trong ngày.
+
+    Returns:
+        tuple: (check_in, check_out hoặc None, working_hours, số lần quẹt trùng)
+    """
+    punches = sorted(punches)
+    distinct = [punches[0]]
+    for punch in punches[1:]:
+        if (punch - distinct[-1]).total_seconds() > DUPLICATE_PUNCH_SECONDS:
+            distinct.append(punch)
+
+    # (vào, ra), (vào, ra), ... - lần quẹt lẻ cuối cùng không có giờ ra
+    pairs = list(zip(distinct[0::2], distinct[1::2]))
+    worked = sum(((out - in_) for in_, out in pairs), timedelta())
+    check_out = pairs[-1][1] if pairs else None
+    return distinct[0], check_out, round(worked.total_seconds() / 3600, 2), len(punches) - len(distinct)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def build_attendance(employee_id, day, punches):
+    check_in, check_out, working_hours, duplicates = summarize_punches(punches)
+    late_minutes = max(0, _minutes(check_in) - _minutes(WORK_START))
+    early_minutes = max(0, _minutes(WORK_END) - _minutes(check_out)) if check_out else 0
+    notes = []
+    if late_minutes:
+        notes.append(f'Đi muộn {late_minutes} phút')
+    if early_minutes:
+        notes.append(f'Về sớm {early_minutes} phút')
+
+    check_in_at = timezone.make_aware(check_in)
+    attendance = Attendance(
+        employee_id=employee_id, date=check_in_at, work_date=day, status='Có làm việc',
+        check_in_at=check_in_at, check_out_at=timezone.make_aware(check_out) if check_out else None,
+        working_hours=working_hours, late_minutes=late_minutes, early_minutes=early_minutes,
+        notes=' | '.join(notes),
+    )
+    return attendance, duplicates
+
+
+def _write_chunk(attendances, replace, result):
+    """Ghi một lô Attendance, đếm bản ghi tạo mới / cập nhật / bỏ qua"""
+    existing = set(
+        Attendance.objects.filter(
+            employee_id__in={attendance.employee_id for attendance in attendances},
+            work_date__in={attendance.work_date for attendance in attendances},
+        ).values_list('employee_id', 'work_date')
+    )
+    if replace:
+        Attendance.objects.bulk_create(
+            attendances, batch_size=1000, update_conflicts=True, unique_fields=['employee', 'work_date'],
+            update_fields=[
+                'date', 'status', 'check_in_at', 'check_out_at', 'working_hours',
+                'late_minutes', 'early_minutes', 'notes',
+            ],
+        )
+        updated = sum(1 for a in attendances if (a.employee_id, a.work_date) in existing)
+        result.updated += updated
+        result.created += len(attendances) - updated
+    else:
+        new = [a for a in attendances if (a.employee_id, a.work_date) not in existing]
+        Attendance.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        result.created += len(new)
+        result.skipped += len(attendances) - len(new)
+    mark_stats_changed(
+        {(a.work_date.year, a.work_date.month) for a in attendances},
+        employee_ids={a.employee_id for a in attendances},
+    )
+
+
+def _chain(first_line, lines):
+    yield first_line
+    yield from lines
+
+
+def _sniff_delimiter(line):
+    for delimiter in ('\t', ';', ','):
+        if delimiter in line:
+            return delimiter
+    return ','
+
+
+@transaction.atomic
+def import_punch_log(lines, replace=False, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Nhập log chấm công.
+
+    Args:
+        lines: iterable các dòng text (file mở ở chế độ text, newline='')
+        replace: ghi đè bản ghi đã có của cùng (nhân viên, ngày)
+        chunk_size: số bản ghi Attendance mỗi lô ghi
+        progress: hàm progress(số dòng đã đọc) (optional)
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return result
+
+    employee_ids = dict(Employee.objects.values_list('employee_code', 'id'))
+    reader = csv.reader(_chain(first_line, lines), delimiter=_sniff_delimiter(first_line))
+
+    pending = {}           # {day: {employee_id: [punch, ...]}}
+    written_before = None  # các ngày < mốc này đã được ghi
+    buffer = []
+
+    def flush_days(days):
+        nonlocal buffer
+        for day in sorted(days):
+            for employee_id, punches in pending.pop(day).items():
+                attendance, duplicates = build_attendance(employee_id, day, punches)
+                result.duplicate_punches += duplicates
+                buffer.append(attendance)
+            if len(buffer) >= chunk_size:
+                _write_chunk(buffer, replace, result)
+                buffer = []
+
+    for line_number, row in enumerate(reader, start=1):
+        result.lines = line_number
+        if progress and line_number % chunk_size == 0:
+            progress(line_number)
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if len(row) < 2:
+            result.add_error(line_number, 'thiếu cột thời gian')
+            continue
+
+        code = row[0].strip()
+        punch = parse_timestamp(row[1])
+        if punch is None:
+            if line_number == 1 and code.lower() in HEADER_NAMES:
+                continue
+            result.add_error(line_number, f'thời gian không hợp lệ "{row[1].strip()}"')
+            continue
+        employee_id = employee_ids.get(code)
+        if employee_id is None:
+            result.unknown_codes[code] += 1
+            continue
+
+        day = punch.date()
+        if written_before is not None and day < written_before:
+            result.add_error(line_number, f'lần quẹt {punch:%d/%m/%Y %H:%M} đến sau khi ngày đã được ghi')
+            continue
+        result.punches += 1
+        result.devices[row[2].strip() if len(row) > 2 else ''] += 1
+
+        day_punches = pending.get(day)
+        if day_punches is None:
+            day_punches = pending[day] = {}
+            # Ngày mới: ghi các ngày đã đủ cũ để không còn quẹt nào tới nữa
+            cutoff = max(pending) - timedelta(days=FLUSH_LAG_DAYS)
+            done = [pending_day for pending_day in pending if pending_day < cutoff]
+            if done:
+                flush_days(done)
+                written_before = cutoff
+        day_punches.setdefault(employee_id, []).append(punch)
+
+    flush_days(list(pending))
+    if buffer:
+        _write_chunk(buffer, replace, result)
+    if progress:
+        progress(result.lines)
+
+    logger.info(f"Attendance import: {result.summary()}")
+    return result
@@ -0,0 +1,126 @@
+"""
+Attendance ingestion
+Đường ghi check-in / check-out của portal, chịu được đợt cao điểm buổi sáng
+(hàng nghìn nhân viên check-in trong 08:00 - 08:30):
+
+- Check-in là một INSERT ... ON CONFLICT DO NOTHING trên khóa duy nhất
+  (employee, work_date) (bulk_create(ignore_conflicts=True)): bấm đúp / gửi lại
+  đồng thời không tạo bản ghi trùng và không phát sinh IntegrityError.
+- Check-out là một UPDATE có điều kiện check_out_at IS NULL nên chỉ một request thắng.
+- Số phút đi muộn / về sớm được ghi vào late_minutes / early_minutes ngay khi chấm công
+  (ghi chú chỉ để hiển thị), thống kê chỉ cần COUNT / SUM trên các cột này.
+- Trạng thái "đã check-in / đã check-out" luôn được đọc từ database (một truy vấn
+  theo khóa duy nhất), không giữ sổ trong bộ nhớ process: HR sửa / xóa chấm công ở
+  bất kỳ process nào có hiệu lực ngay.
+
+Usage:
+    success, message, data = record_check_in(employee_id)
+    success, message, data = record_check_out(employee_id)
+"""
+import re
+from datetime import time
+
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from .models import Attendance
+from .monthly_stats import mark_stats_changed
+
+# Giờ vào / ra chuẩn (giờ địa phương)
+WORK_START = time(8, 30)
+WORK_END = time(17, 30)
+
+LATE_PATTERN = re.compile(r'muộn\s*(\d+)?', re.IGNORECASE)
+EARLY_PATTERN = re.compile(r'sớm\s*(\d+)?', re.IGNORECASE)
+
+def _minutes_between(earlier, later):
+    return (later.hour * 60 + later.minute) - (earlier.hour * 60 + earlier.minute)
+
+
+def minutes_from_notes(notes):
+    """
+    (late_minutes, early_minutes) đọc từ ghi chú dạng "Đi muộn 15 phút | Về sớm 30 phút".
+    Ghi chú chỉ có "muộn" / "sớm" mà không có số phút được tính là 1 phút.
+    """
+    def minutes(pattern):
+        match = pattern.search(notes or '')
+        if not match:
+            return 0
+        return int(match.group(1)) if match.group(1) else 1
+    return minutes(LATE_PATTERN), minutes(EARLY_PATTERN)
+
+
+def record_check_in(employee_id, now=None):
+    """
+    Check-in cho nhân viên (idempotent trong ngày).
+
+    Returns:
+        tuple: (success, message, data) - data có check_in_at (aware) và is_late
+    """
+    now = now or timezone.now()
+    local_now = timezone.localtime(now)
+    day = local_now.date()
+
+    late_minutes = max(0, _minutes_between(WORK_START, local_now.time()))
+    is_late = late_minutes > 0
+    Attendance.objects.bulk_create([
+        Attendance(
+            employee_id=employee_id, date=now, work_date=day, check_in_at=now,
+            status='Có làm việc', working_hours=0, late_minutes=late_minutes,
+            notes=f'Đi muộn {late_minutes} phút' if is_late else '',
+        )
+    ], ignore_conflicts=True)
+
+    row = (
+        Attendance.objects.filter(employee_id=employee_id, work_date=day)
+        .values('date', 'check_in_at').first()
+    )
+    if row is None:
+        # Bản ghi vừa bị xóa ngay sau khi tạo
+        return False, 'Không thể check-in, vui lòng thử lại', {}
+    if row['check_in_at'] != now:
+        # Request khác (hoặc HR) đã tạo bản ghi của ngày hôm nay
+        return False, 'Bạn đã check-in rồi!', {'check_in_at': row['check_in_at'] or row['date']}
+
+    mark_stats_changed({(day.year, day.month)}, employee_ids={employee_id})
+    return True, 'Check-in thành công!' + (' (Đi muộn)' if is_late else ''), {
+        'check_in_at': now, 'is_late': is_late,
+    }
+
+
+def record_check_out(employee_id, now=None):
+    """
+    Check-out cho nhân viên (chỉ một lần trong ngày).
+
+    Returns:
+        tuple: (success, message, data) - data có check_out_at, working_hours và is_early
+    """
+    now = now or timezone.now()
+    local_now = timezone.localtime(now)
+    day = local_now.date()
+
+    row = (
+        Attendance.objects.filter(employee_id=employee_id, work_date=day)
+        .values('id', 'date', 'check_in_at', 'check_out_at', 'working_hours').first()
+    )
+    if not row:
+        return False, 'Bạn chưa check-in!', {}
+    check_in_at = row['check_in_at'] or row['date']
+    if row['check_out_at'] is not None or row['working_hours'] > 0:
+        return False, 'Bạn đã check-out rồi!', {}
+
+    working_hours = round((now - check_in_at).total_seconds() / 3600, 2)
+    early_minutes = max(0, _minutes_between(local_now.time(), WORK_END))
+    is_early = early_minutes > 0
+    updates = {'check_out_at': now, 'working_hours': working_hours, 'early_minutes': early_minutes}
+    if is_early:
+        updates['notes'] = Concat(F('notes'), Value(f' | Về sớm {early_minutes} phút'))
+    updated = Attendance.objects.filter(pk=row['id'], check_out_at__isnull=True).update(**updates)
+    if not updated:
+        return False, 'Bạn đã check-out rồi!', {}
+
+    mark_stats_changed({(day.year, day.month)}, employee_ids={employee_id})
+    return True, 'Check-out thành công!' + (' (Về sớm)' if is_early else ''), {
+        'check_out_at': now, 'working_hours': working_hours, 'is_early': is_early,
+    }
@@ -0,0 +1,256 @@
+"""
+Bulk approvals
+Duyệt / từ chối hàng loạt đơn nghỉ phép và chi phí của team (portal quản lý) với
+số truy vấn cố định thay vì kiểm tra số dư + save() + gửi email cho từng đơn:
+
+- Các đơn được khóa (select_for_update, theo thứ tự id) và kiểm tra hết trước khi
+  ghi: đơn không thuộc phòng ban / đã được xử lý / không đủ phép được ghi nhận là
+  thất bại, các đơn còn lại vẫn được xử lý.
+- Duyệt đơn nghỉ phép: số ngày được đếm lại theo lịch làm việc; phần tăng thêm được
+  kiểm tra với số dư của mọi đơn nạp bằng MỘT truy vấn (cộng dồn khi nhiều đơn dùng
+  chung một số dư).
+- Trạng thái của mọi đơn hợp lệ được cập nhật bằng MỘT câu UPDATE ... WHERE id IN (...);
+  chênh lệch số dư ghi qua settle_leave_requests() (gộp theo số dư, một UPDATE).
+- Tất cả nằm trong một transaction: lỗi bất ngờ không để lại trạng thái dở dang.
+- Email thông báo được ghi vào outbox bằng một INSERT (EmailService.batched()) và
+  gửi theo lô sau khi commit.
+- update() không phát signal: tự làm mới bộ đếm inbox, thống kê dashboard, số liệu
+  tháng và chỉ mục tìm kiếm của các đơn đổi số ngày.
+
+Usage:
+    outcome = bulk_review_leaves(manager, leave_ids, 'approve', user=request.user)
+    outcome['processed']  # [LeaveRequest, ...] đã xử lý
+    outcome['results']    # [{'id', 'employee_name', 'status', 'message'}, ...] theo thứ tự gửi lên
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from .dashboard_stats import invalidate_dashboard_stats
+from .email_service import EmailService
+from .inbox_counters import invalidate_inbox_counters
+from .leave_helpers import refresh_leave_days
+from .leave_ledger import LEDGER_TOLERANCE, balance_key, ensure_balances, settle_leave_requests
+from .models import Expense, LeaveBalance, LeaveRequest
+from .monthly_stats import mark_stats_changed
+from .search_index import reindex_queryset
+
+logger = logging.getLogger(__name__)
+
+BULK_ACTIONS = ('approve', 'reject')
+# Trạng thái chờ duyệt của chi phí (dữ liệu cũ có 'Pending')
+EXPENSE_PENDING_STATUSES = ('pending', 'Pending')
+
+
+def parse_ids(values):
+    """Danh sách id (bỏ trùng, giữ thứ tự) từ JSON; ValueError nếu có giá trị không hợp lệ"""
+    ids = []
+    for value in values:
+        pk = int(value)
+        if pk not in ids:
+            ids.append(pk)
+    return ids
+
+
+def _result(pk, item=None, status='failed', message=''):
+    return {
+        'id': pk,
+        'employee_name': item.employee.name if item else None,
+        'status': status,
+        'message': message,
+    }
+
+
+def _lock_team_items(queryset, ids, manager):
+    """{id: đơn} thuộc phòng ban của quản lý, khóa đến hết transaction"""
+    items = (
+        queryset.filter(id__in=ids, employee__department_id=manager.department_id)
+        .select_for_update(of=('self',)).order_by('id')
+    )
+    return {item.id: item for item in items}
+
+
+def _check_leave_balances(leaves, results):
+    """
+    Đếm lại số ngày các đơn sắp duyệt và kiểm tra phần tăng thêm với số dư
+    (nạp trong một truy vấn). Đơn không đủ phép được ghi vào results.
+
+    Returns:
+        tuple: (các đơn hợp lệ, {leave_id: total_days mới} của các đơn đổi số ngày)
+    """
+    deltas = {leave.id: refresh_leave_days(leave) for leave in leaves}
+    balance_ids = ensure_balances(balance_key(leave) for leave in leaves if deltas[leave.id] > 0)
+    remaining = dict(
+        LeaveBalance.objects.filter(pk__in=balance_ids.values()).select_for_update()
+        .values_list('id', 'remaining_days')
+    )
+
+    accepted = []
+    recounted = {}
+    for leave in leaves:
+        delta = deltas[leave.id]
+        if delta > 0:
+            balance_id = balance_ids[balance_key(leave)]
+            if remaining[balance_id] + LEDGER_TOLERANCE < delta:
+                results[leave.id] = _result(
+                    leave.id, leave, message=(
+                        f'Số ngày nghỉ phép không đủ! Còn lại: {remaining[balance_id]:g} ngày, '
+                        f'cần thêm: {delta:g} ngày'
+                    )
+                )
+                leave.total_days -= delta
+                continue
+            remaining[balance_id] -= delta
+        if delta:
+            recounted[leave.id] = leave.total_days
+        accepted.append(leave)
+    return accepted, recounted
+
+
+def _refresh_caches(items, date_field):
+    """update() không phát post_save: làm mới những gì signal vẫn làm"""
+    department_ids = {item.employee.department_id for item in items}
+    invalidate_inbox_counters({item.employee_id for item in items}, department_ids)
+    invalidate_dashboard_stats()
+    mark_stats_changed(
+        {(getattr(item, date_field).year, getattr(item, date_field).month) for item in items},
+        department_ids=department_ids - {None},
+    )
+
+
+def bulk_review_leaves(manager, leave_ids, action, reason='', user=None):
+    """
+    Duyệt / từ chối các đơn nghỉ phép chờ duyệt của team.
+
+    Args:
+        manager: Employee quản lý (chỉ xử lý đơn trong phòng ban của mình)
+        leave_ids: list id đơn
+        action: 'approve' hoặc 'reject'
+        reason: lý do từ chối
+        user: User thực hiện (ghi vào sổ cái phép)
+
+    Returns:
+        dict: processed ([LeaveRequest]), results ([{id, employee_name, status, message}])
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f'Invalid action: {action}')
+
+    with transaction.atomic():
+        leaves = _lock_team_items(
+            LeaveRequest.objects.select_related('employee', 'leave_type'), leave_ids, manager
+        )
+        results = {}
+        pending = []
+        for pk in leave_ids:
+            leave = leaves.get(pk)
+            if leave is None:
+                results[pk] = _result(pk, message='Không tìm thấy đơn')
+            elif leave.status != 'pending':
+                results[pk] = _result(
+                    pk, leave, message=f'Đơn đã được xử lý (trạng thái: {leave.get_status_display()})'
+                )
+            else:
+                pending.append(leave)
+
+        recounted = {}
+        if action == 'approve':
+            pending, recounted = _check_leave_balances(pending, results)
+
+        if pending:
+            now = timezone.now()
+            changes = {
+                'status': 'approved' if action == 'approve' else 'rejected',
+                'approved_by': manager,
+                'approved_at': now,
+                'updated_at': now,
+            }
+            if action == 'reject':
+                changes['rejection_reason'] = reason
+            if recounted:
+                changes['total_days'] = Case(
+                    *[When(pk=pk, then=Value(days)) for pk, days in recounted.items()],
+                    default=F('total_days'), output_field=FloatField()
+                )
+            LeaveRequest.objects.filter(pk__in=[leave.id for leave in pending]).update(**changes)
+            for leave in pending:
+                for field, value in changes.items():
+                    if field != 'total_days':
+                        setattr(leave, field, value)
+
+            # Hoàn phép khi từ chối / chênh lệch khi đếm lại: gộp theo số dư
+            settle_leave_requests(pending, user=user)
+            _refresh_caches(pending, 'start_date')
+            if recounted:
+                reindex_queryset('leave', LeaveRequest.objects.filter(pk__in=recounted))
+
+            with EmailService.batched():
+                for leave in pending:
+                    if action == 'approve':
+                        EmailService.send_leave_approved(leave)
+                    else:
+                        EmailService.send_leave_rejected(leave, reason)
+
+            for leave in pending:
+                results[leave.id] = _result(leave.id, leave, status=leave.status)
+
+    logger.info(f"Bulk {action} of {len(pending)}/{len(leave_ids)} leave requests by {manager}")
+    return {'processed': pending, 'results': [results[pk] for pk in leave_ids]}
+
+
+def bulk_review_expenses(manager, expense_ids, action, reason=''):
+    """
+    Duyệt / từ chối các đơn chi phí chờ duyệt của team.
+
+    Returns:
+        dict: processed ([Expense]), results ([{id, employee_name, status, message}])
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f'Invalid action: {action}')
+
+    with transaction.atomic():
+        expenses = _lock_team_items(
+            Expense.objects.select_related('employee', 'category'), expense_ids, manager
+        )
+        results = {}
+        pending = []
+        for pk in expense_ids:
+            expense = expenses.get(pk)
+            if expense is None:
+                results[pk] = _result(pk, message='Không tìm thấy đơn')
+            elif expense.status not in EXPENSE_PENDING_STATUSES:
+                results[pk] = _result(
+                    pk, expense, message=f'Đơn đã được xử lý (trạng thái: {expense.get_status_display()})'
+                )
+            else:
+                pending.append(expense)
+
+        if pending:
+            now = timezone.now()
+            changes = {
+                'status': 'approved' if action == 'approve' else 'rejected',
+                'approved_by': manager,
+                'approved_at': now,
+                'updated_at': now,
+            }
+            if action == 'reject':
+                changes['rejection_reason'] = reason
+            Expense.objects.filter(pk__in=[expense.id for expense in pending]).update(**changes)
+            for expense in pending:
+                for field, value in changes.items():
+                    setattr(expense, field, value)
+            _refresh_caches(pending, 'date')
+
+            with EmailService.batched():
+                for expense in pending:
+                    if action == 'approve':
+                        EmailService.send_expense_approved(expense)
+                    else:
+                        EmailService.send_expense_rejected(expense, reason)
+
+            for expense in pending:
+                results[expense.id] = _result(expense.id, expense, status=expense.status)
+
+    logger.info(f"Bulk {action} of {len(pending)}/{len(expense_ids)} expenses by {manager}")
+    return {'processed': pending, 'results': [results[pk] for pk in expense_ids]}
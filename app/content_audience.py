@@ -0,0 +1,198 @@
+"""
+Content audience
+Chỉ mục đối tượng xem (audience) của tài liệu và thông báo trên portal:
+
+- Mỗi tài liệu / thông báo được phân giải trước thành các "khóa đối tượng" lưu trong
+  ContentAudience: 'all', 'manager', 'department:<id>', 'employee:<id>'. Nhân viên có
+  tập khóa của mình (all + employee:<id> + department:<id> + manager nếu là quản lý),
+  nên danh sách được xem là MỘT truy vấn trên index (entity_type, audience_key) thay
+  vì OR nhiều queryset qua bảng M2M rồi distinct().
+- Signal trên Document / Announcement (visibility, target_all) và các bảng M2M
+  (departments, specific_employees, target_departments, target_employees) đồng bộ
+  chỉ mục theo kiểu diff: chỉ thêm / xóa các khóa thay đổi.
+- Kiểm tra quyền một đối tượng: một truy vấn exists() trên index (entity_type, object_id)
+  với tập khóa của nhân viên - không nạp M2M, không cache nên thu hồi quyền có hiệu lực
+  ngay ở mọi process.
+- Đổi phòng ban / vai trò quản lý của nhân viên không cần cập nhật chỉ mục (tập khóa
+  của nhân viên tính lúc truy vấn).
+
+Usage:
+    documents = visible_documents(employee)
+    announcements = visible_announcements(employee)
+    if not has_access(employee, document): ...
+"""
+import logging
+
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Announcement, ContentAudience, Document
+
+logger = logging.getLogger(__name__)
+
+AUDIENCE_ALL = 'all'
+AUDIENCE_MANAGER = 'manager'
+
+
+def department_key(department_id):
+    return f'department:{department_id}'
+
+
+def employee_key(employee_id):
+    return f'employee:{employee_id}'
+
+
+def employee_audience_keys(employee):
+    """Các khóa đối tượng mà nhân viên thuộc về"""
+    keys = [AUDIENCE_ALL, employee_key(employee.id)]
+    if employee.department_id:
+        keys.append(department_key(employee.department_id))
+    if employee.is_manager:
+        keys.append(AUDIENCE_MANAGER)
+    return keys
+
+
+def document_audience_keys(document):
+    if document.visibility == 'all':
+        return {AUDIENCE_ALL}
+    if document.visibility == 'manager':
+        return {AUDIENCE_MANAGER}
+    if document.visibility == 'department':
+        return {department_key(pk) for pk in document.departments.values_list('id', flat=True)}
+    if document.visibility == 'specific':
+        return {employee_key(pk) for pk in document.specific_employees.values_list('id', flat=True)}
+    return set()
+
+
+def announcement_audience_keys(announcement):
+    keys = {AUDIENCE_ALL} if announcement.target_all else set()
+    keys.update(department_key(pk) for pk in announcement.target_departments.values_list('id', flat=True))
+    keys.update(employee_key(pk) for pk in announcement.target_employees.values_list('id', flat=True))
+    return keys
+
+
+_RESOLVERS = {
+    Document: ('document', document_audience_keys),
+    Announcement: ('announcement', announcement_audience_keys),
+}
+
+
+def sync_audience(instance):
+    """
+    Đồng bộ chỉ mục của một tài liệu / thông báo với visibility / target hiện tại.
+
+    Returns:
+        set: các khóa đối tượng hiện tại
+    """
+    entity_type, resolve = _RESOLVERS[type(instance)]
+    keys = resolve(instance)
+    rows = ContentAudience.objects.filter(entity_type=entity_type, object_id=instance.pk)
+    existing = set(rows.values_list('audience_key', flat=True))
+    if existing - keys:
+        rows.filter(audience_key__in=existing - keys).delete()
+    if keys - existing:
+        ContentAudience.objects.bulk_create(
+            [ContentAudience(entity_type=entity_type, object_id=instance.pk, audience_key=key)
+             for key in keys - existing],
+            ignore_conflicts=True,
+        )
+    return keys
+
+
+def rebuild_audiences(progress=None):
+    """Dựng lại toàn bộ chỉ mục (sau bulk_create / loaddata - không phát signal)"""
+    counts = {}
+    for model, (entity_type, _resolve) in _RESOLVERS.items():
+        instances = model.objects.all()
+        ContentAudience.objects.filter(entity_type=entity_type).exclude(
+            object_id__in=instances.values('id')
+        ).delete()
+        counts[entity_type] = 0
+        for instance in instances.iterator():
+            sync_audience(instance)
+            counts[entity_type] += 1
+        if progress:
+            progress(entity_type, counts[entity_type])
+    return counts
+
+
+def visible_ids(entity_type, employee):
+    """Subquery id các đối tượng nhân viên được xem (một lookup trên index)"""
+    return ContentAudience.objects.filter(
+        entity_type=entity_type, audience_key__in=employee_audience_keys(employee)
+    ).values('object_id')
+
+
+def visible_documents(employee):
+    """Tài liệu đang bật mà nhân viên được xem"""
+    return Document.objects.filter(is_active=True, id__in=visible_ids('document', employee))
+
+
+def visible_announcements(employee, now=None):
+    """Thông báo đang hiển thị cho nhân viên (đang bật, đã xuất bản, chưa hết hạn, đúng đối tượng)"""
+    now = now or timezone.now()
+    return Announcement.objects.filter(
+        Q(expire_at__isnull=True) | Q(expire_at__gte=now),
+        is_active=True, publish_at__lte=now, id__in=visible_ids('announcement', employee),
+    )
+
+
+def has_access(employee, instance):
+    """Nhân viên có thuộc đối tượng xem của tài liệu / thông báo không (một truy vấn trên index)"""
+    entity_type, _resolve = _RESOLVERS[type(instance)]
+    return ContentAudience.objects.filter(
+        entity_type=entity_type, object_id=instance.pk, audience_key__in=employee_audience_keys(employee)
+    ).exists()
+
+
+# ======================== SIGNALS ========================
+
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Announcement)
+def _sync_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not {'visibility', 'target_all'} & set(update_fields):
+        return
+    sync_audience(instance)
+
+
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Announcement)
+def _remove_on_delete(sender, instance, **kwargs):
+    entity_type, _resolve = _RESOLVERS[sender]
+    ContentAudience.objects.filter(entity_type=entity_type, object_id=instance.pk).delete()
+
+
+_TARGET_FIELDS = {
+    Document.departments.through: Document,
+    Document.specific_employees.through: Document,
+    Announcement.target_departments.through: Announcement,
+    Announcement.target_employees.through: Announcement,
+}
+
+
+@receiver(m2m_changed, sender=Document.departments.through)
+@receiver(m2m_changed, sender=Document.specific_employees.through)
+@receiver(m2m_changed, sender=Announcement.target_departments.through)
+@receiver(m2m_changed, sender=Announcement.target_employees.through)
+def _sync_on_targets(sender, instance, action, reverse, pk_set, **kwargs):
+    model = _TARGET_FIELDS[sender]
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sync_audience(instance)
+        return
+    # Thay đổi từ phía phòng ban / nhân viên (employee.accessible_documents.add(...)):
+    # pk_set là id tài liệu / thông báo; với clear thì lấy danh sách trước khi xóa
+    if action == 'pre_clear':
+        related = sender.objects.filter(**{f'{type(instance)._meta.model_name}_id': instance.pk})
+        instance._audience_cleared = set(related.values_list(f'{model._meta.model_name}_id', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_audience_cleared', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+    for target in model.objects.filter(pk__in=pk_set):
+        sync_audience(target)
@@ -0,0 +1,189 @@
+"""
+Dashboard statistics service
+Tính toàn bộ số liệu cho trang tổng quan quản lý (admin_home) bằng các truy vấn
+gom nhóm (values().annotate()) - số truy vấn cố định,
+không tăng theo số phòng ban / số tháng.
+
+Kết quả (dict thuần, JSON-serializable) được cache với TTL cấu hình qua
+settings.DASHBOARD_CACHE_TIMEOUT và bị xóa ngay khi Employee, Payroll,
+LeaveRequest, Expense, Contract (và các bảng đếm khác trên dashboard) thay đổi.
+Các thao tác bulk (bulk_create, update()) không phát signal nên phải tự gọi
+invalidate_dashboard_stats().
+
+Usage:
+    stats = get_dashboard_stats()
+    stats['active_employees'], stats['dept_employee_data'], ...
+"""
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .date_utils import year_filter
+from .models import (
+    Appraisal, Contract, Department, Discipline, Employee, Expense, LeaveRequest,
+    Payroll, Reward
+)
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+DASHBOARD_CACHE_KEY = 'dashboard:stats'
+
+# Nhân viên đang làm việc: 1=Thử việc, 2=Nhân viên chính thức
+ACTIVE_STATUSES = [1, 2]
+
+STATUS_LABELS = {
+    0: 'Onboarding',
+    1: 'Thử việc',
+    2: 'Chính thức',
+    3: 'Đã nghỉ việc',
+    4: 'Bị sa thải'
+}
+
+HIRING_TREND_MONTHS = 6
+EXPIRING_CONTRACT_DAYS = 30
+
+
+def _month_start(year, month, offset):
+    """Ngày đầu tháng sau khi dịch `offset` tháng (offset âm = lùi lại)"""
+    index = year * 12 + (month - 1) + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def compute_dashboard_stats(today=None):
+    """
+    Tính số liệu dashboard trực tiếp từ database (không qua cache).
+
+    Returns:
+        dict: các số liệu tổng hợp và dữ liệu biểu đồ dạng {'labels': [...], 'values': [...]}
+    """
+    today = today or timezone.localtime(timezone.now()).date()
+    current_month, current_year = today.month, today.year
+
+    # 1. Phân bố trạng thái nhân viên (tổng số và số đang làm việc suy ra từ đây)
+    status_counts = dict(
+        Employee.objects.order_by().values_list('status').annotate(count=Count('id'))
+    )
+    status_data = {'labels': [], 'values': []}
+    for status_val, status_label in STATUS_LABELS.items():
+        if status_counts.get(status_val):
+            status_data['labels'].append(status_label)
+            status_data['values'].append(status_counts[status_val])
+
+    # 2. Số nhân viên và lương trung bình theo phòng ban trong một truy vấn
+    dept_rows = (
+        Employee.objects.filter(status__in=ACTIVE_STATUSES, department__isnull=False)
+        .values('department_id', 'department__name')
+        .annotate(count=Count('id'), avg_salary=Avg('salary'))
+        .order_by('department_id')
+    )
+    dept_employee_data = {'labels': [], 'values': []}
+    dept_salary_data = {'labels': [], 'values': []}
+    for row in dept_rows:
+        dept_employee_data['labels'].append(row['department__name'])
+        dept_employee_data['values'].append(row['count'])
+        if row['avg_salary']:
+            dept_salary_data['labels'].append(row['department__name'])
+            dept_salary_data['values'].append(round(row['avg_salary']))
+
+    # 3. Xu hướng tuyển dụng N tháng gần nhất - gom theo tháng
+    trend_start = _month_start(current_year, current_month, -(HIRING_TREND_MONTHS - 1))
+    trend_end = _month_start(current_year, current_month, 1)
+    hired = {
+        (row['month'].year, row['month'].month): row['count']
+        for row in Employee.objects.filter(
+            contract_start_date__gte=trend_start, contract_start_date__lt=trend_end
+        ).annotate(month=TruncMonth('contract_start_date'))
+        .values('month').annotate(count=Count('id')).order_by()
+    }
+    hiring_trend = {'labels': [], 'values': []}
+    for offset in range(HIRING_TREND_MONTHS):
+        month_start = _month_start(trend_start.year, trend_start.month, offset)
+        hiring_trend['labels'].append(f'T{month_start.month}')
+        hiring_trend['values'].append(hired.get((month_start.year, month_start.month), 0))
+
+    # 4. Các bộ đếm - mỗi bảng một truy vấn
+    total_salary = Payroll.objects.filter(
+        month=current_month, year=current_year
+    ).aggregate(total=Sum('total_salary'))['total'] or 0
+
+    pending_leaves = LeaveRequest.objects.filter(status='pending').count()
+    pending_expenses = Expense.objects.filter(status='pending').count()
+    expiring_contracts = Contract.objects.filter(
+        end_date__gte=today,
+        end_date__lte=today + timedelta(days=EXPIRING_CONTRACT_DAYS),
+        status='active'
+    ).count()
+    hr_pending_appraisals = Appraisal.objects.filter(status='pending_hr').count()
+
+    this_year = year_filter('date', current_year, datetime_field=True)
+    total_rewards_year = Reward.objects.filter(**this_year).count()
+    total_disciplines_year = Discipline.objects.filter(**this_year).count()
+
+    return {
+        'date': today.isoformat(),
+        'total_employees': sum(status_counts.values()),
+        'active_employees': sum(status_counts.get(status, 0) for status in ACTIVE_STATUSES),
+        'total_departments': Department.objects.count(),
+        'total_salary': total_salary,
+        'dept_employee_data': dept_employee_data,
+        'status_data': status_data,
+        'dept_salary_data': dept_salary_data,
+        'hiring_trend': hiring_trend,
+        'pending_leaves': pending_leaves,
+        'pending_expenses': pending_expenses,
+        'expiring_contracts': expiring_contracts,
+        'hr_pending_appraisals': hr_pending_appraisals,
+        'total_rewards_year': total_rewards_year,
+        'total_disciplines_year': total_disciplines_year,
+    }
+
+
+def get_dashboard_stats(today=None):
+    """
+    Lấy số liệu dashboard từ cache, tính lại nếu chưa có, đã hết hạn hoặc đã sang ngày mới.
+    """
+    today = today or timezone.localtime(timezone.now()).date()
+    stats = cache.get(DASHBOARD_CACHE_KEY)
+    if stats is None or stats.get('date') != today.isoformat():
+        stats = compute_dashboard_stats(today)
+        cache.set(DASHBOARD_CACHE_KEY, stats, DASHBOARD_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    cache.delete(DASHBOARD_CACHE_KEY)
+    # Xóa lại sau commit: request khác có thể đã cache số liệu cũ trong lúc chờ commit
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_CACHE_KEY))
+
+
+# ======================== CACHE INVALIDATION ========================
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+@receiver(post_save, sender=Appraisal)
+@receiver(post_delete, sender=Appraisal)
+@receiver(post_save, sender=Reward)
+@receiver(post_delete, sender=Reward)
+@receiver(post_save, sender=Discipline)
+@receiver(post_delete, sender=Discipline)
+def _invalidate_on_change(sender, **kwargs):
+    invalidate_dashboard_stats()
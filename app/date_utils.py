@@ -0,0 +1,52 @@
+"""
+Date range helpers
+Thay cho lookup `__year` / `__month` (bọc cột trong hàm EXTRACT nên database
+không dùng được index) bằng điều kiện khoảng `>= đầu kỳ AND < đầu kỳ sau`.
+
+Usage:
+    start, end = month_bounds(2025, 10)
+    Attendance.objects.filter(work_date__gte=start, work_date__lt=end)
+
+    Reward.objects.filter(**month_filter('date', 2025, 10, datetime_field=True))
+"""
+from datetime import date, datetime
+
+from django.utils import timezone
+
+
+def month_bounds(year, month):
+    """(ngày đầu tháng, ngày đầu tháng kế tiếp)"""
+    year, month = int(year), int(month)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def year_bounds(year):
+    """(ngày đầu năm, ngày đầu năm kế tiếp)"""
+    year = int(year)
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def aware_bounds(start, end):
+    """Chuyển khoảng ngày thành khoảng datetime có timezone (theo TIME_ZONE hiện tại)"""
+    return (
+        timezone.make_aware(datetime.combine(start, datetime.min.time())),
+        timezone.make_aware(datetime.combine(end, datetime.min.time())),
+    )
+
+
+def _range_filter(field, start, end, datetime_field):
+    if datetime_field:
+        start, end = aware_bounds(start, end)
+    return {f'{field}__gte': start, f'{field}__lt': end}
+
+
+def month_filter(field, year, month, datetime_field=False):
+    """kwargs filter cho một tháng trên `field` (DateField hoặc DateTimeField)"""
+    return _range_filter(field, *month_bounds(year, month), datetime_field)
+
+
+def year_filter(field, year, datetime_field=False):
+    """kwargs filter cho một năm trên `field` (DateField hoặc DateTimeField)"""
+    return _range_filter(field, *year_bounds(year), datetime_field)
@@ -9,6 +9,7 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.contrib import messages
 from app.models import Employee
+from app.identity import get_identity, is_hr_department_name
 
 
 def group_required(*group_names):
@@ -23,8 +24,7 @@ def group_required(*group_names):
             if request.user.is_superuser:
                 return view_func(request, *args, **kwargs)
             
-            user_groups = request.user.groups.values_list('name', flat=True)
-            if any(group in user_groups for group in group_names):
+            if get_identity(request.user).in_any_group(group_names):
                 return view_func(request, *args, **kwargs)
             
             messages.error(request, 'Bạn không có quyền truy cập trang này.')
@@ -68,28 +68,27 @@ def check_employee_access(view_func):
         
         if not employee_id:
             # If no specific employee, check if user is HR or Manager
-            if request.user.groups.filter(name__in=['HR', 'Manager']).exists():
+            if get_identity(request.user).in_any_group(['HR', 'Manager']):
                 return view_func(request, *args, **kwargs)
             else:
                 messages.error(request, 'Bạn không có quyền truy cập.')
                 raise PermissionDenied
         
         # Check access level
-        user_groups = request.user.groups.values_list('name', flat=True)
+        identity = get_identity(request.user)
         
         # HR can access all
-        if 'HR' in user_groups:
+        if identity.in_group('HR'):
             return view_func(request, *args, **kwargs)
         
         # Get current user's employee record
-        try:
-            current_employee = Employee.objects.get(email=request.user.email)
-        except Employee.DoesNotExist:
+        current_employee = identity.employee
+        if current_employee is None:
             messages.error(request, 'Không tìm thấy thông tin nhân viên.')
             raise PermissionDenied
         
         # Manager can access team members
-        if 'Manager' in user_groups and current_employee.is_manager:
+        if identity.in_group('Manager') and current_employee.is_manager:
             target_employee = Employee.objects.filter(
                 id=employee_id,
                 department=current_employee.department
@@ -119,19 +118,16 @@ def check_salary_access(view_func):
         if request.user.is_superuser:
             return view_func(request, *args, **kwargs)
         
+        identity = get_identity(request.user)
+        
         # HR can access all salary info
-        if request.user.groups.filter(name='HR').exists():
+        if identity.in_group('HR'):
             return view_func(request, *args, **kwargs)
         
         # Employee can view own salary only
         employee_id = kwargs.get('employee_id') or kwargs.get('pk')
-        if employee_id:
-            try:
-                employee = Employee.objects.get(email=request.user.email)
-                if str(employee.id) == str(employee_id):
-                    return view_func(request, *args, **kwargs)
-            except Employee.DoesNotExist:
-                pass
+        if employee_id and str(identity.employee_id) == str(employee_id):
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, 'Bạn không có quyền xem thông tin lương.')
         raise PermissionDenied
@@ -159,9 +155,8 @@ def check_appraisal_access(view_func):
         # Get appraisal_id if provided
         appraisal_id = kwargs.get('appraisal_id') or kwargs.get('pk')
         
-        try:
-            current_employee = Employee.objects.get(email=request.user.email)
-        except Employee.DoesNotExist:
+        current_employee = get_identity(request.user).employee
+        if current_employee is None:
             messages.error(request, 'Không tìm thấy thông tin nhân viên.')
             raise PermissionDenied
         
@@ -192,10 +187,7 @@ def check_appraisal_access(view_func):
 
 def _get_employee_from_user(user):
     """Helper to get Employee object from User"""
-    try:
-        return Employee.objects.get(email=user.email)
-    except Employee.DoesNotExist:
-        return None
+    return get_identity(user).employee
 
 
 def _is_hr_department(employee):
@@ -205,8 +197,7 @@ def _is_hr_department(employee):
     if not employee or not employee.department:
         return False
     
-    hr_department_names = ['hr', 'nhân sự', 'human resources', 'phòng nhân sự', 'bộ phận nhân sự']
-    return employee.department.name.lower().strip() in hr_department_names
+    return is_hr_department_name(employee.department.name)
 
 
 def is_hr_staff(user):
@@ -218,33 +209,14 @@ def is_hr_staff(user):
     2. Thuộc group 'HR'
     3. Thuộc phòng ban HR
     """
-    if not user.is_authenticated:
-        return False
-        
-    if user.is_superuser:
-        return True
-    
-    # Check group HR
-    if user.groups.filter(name='HR').exists():
-        return True
-    
-    # Check HR department
-    employee = _get_employee_from_user(user)
-    if employee and _is_hr_department(employee):
-        return True
-    
-    return False
+    return get_identity(user).is_hr
 
 
 def is_manager(user):
     """Helper function to check if user is a manager"""
     if user.is_superuser:
         return True
-    try:
-        employee = Employee.objects.get(email=user.email)
-        return employee.is_manager
-    except Employee.DoesNotExist:
-        return False
+    return get_identity(user).is_manager
 
 
 def is_manager_or_hr(user):
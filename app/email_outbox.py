@@ -0,0 +1,316 @@
+"""
+Email outbox
+Thay vì mở kết nối SMTP ngay trong request, EmailService ghi "ý định gửi email"
+vào bảng EmailOutbox trong cùng transaction với thao tác nghiệp vụ. Sau khi
+transaction commit, một thread nền (hoặc lệnh `send_queued_emails` chạy theo
+cron) gửi email theo lô:
+
+- Mỗi lô dùng một kết nối SMTP (get_connection().send_messages()).
+- Lỗi gửi được thử lại với backoff lũy thừa, tối đa EMAIL_OUTBOX_MAX_ATTEMPTS lần.
+- dedup_key chống gửi trùng cùng một thông báo (VD: chạy lại cron trong ngày).
+- Template được compile một lần mỗi lô cho tất cả email dùng chung template.
+- Thao tác hàng loạt (duyệt nhiều đơn) ghi cả lô email bằng một INSERT
+  (enqueue_emails / EmailService.batched()).
+
+Settings:
+    EMAIL_OUTBOX_BATCH_SIZE (50), EMAIL_OUTBOX_MAX_ATTEMPTS (5),
+    EMAIL_OUTBOX_RETRY_DELAY (60 giây, nhân đôi sau mỗi lần lỗi),
+    EMAIL_OUTBOX_AUTO_DRAIN (True - tự gửi bằng thread nền sau commit)
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, connection as db_connection, transaction
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+EMAIL_OUTBOX_RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+EMAIL_OUTBOX_AUTO_DRAIN = getattr(settings, 'EMAIL_OUTBOX_AUTO_DRAIN', True)
+
+# Bản ghi 'sending' quá thời gian này coi như worker đã chết, được nhận lại
+STALE_LOCK_SECONDS = 10 * 60
+
+
+# ======================== CONTEXT SERIALIZATION ========================
+
+def encode_context(value):
+    """Chuyển context template thành JSON, giữ kiểu date/datetime/Decimal để filter |date vẫn chạy"""
+    if isinstance(value, dict):
+        return {key: encode_context(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_context(item) for item in value]
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def decode_context(value):
+    if isinstance(value, dict):
+        if len(value) == 1:
+            (key, item), = value.items()
+            if key == '__datetime__':
+                return datetime.fromisoformat(item)
+            if key == '__date__':
+                return date.fromisoformat(item)
+            if key == '__decimal__':
+                return Decimal(item)
+        return {key: decode_context(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_context(item) for item in value]
+    return value
+
+
+# ======================== ENQUEUE ========================
+
+def enqueue_email(subject, template_name, context, recipient_list, dedup_key=None):
+    """
+    Ghi email vào outbox (trong transaction hiện tại nếu có).
+
+    Returns:
+        EmailOutbox hoặc None nếu không có người nhận / trùng dedup_key
+    """
+    recipient_list = [email for email in recipient_list if email]
+    if not recipient_list:
+        logger.warning(f"No valid recipients for email: {subject}")
+        return None
+
+    if dedup_key and EmailOutbox.objects.filter(dedup_key=dedup_key).exists():
+        logger.info(f"Email skipped (duplicate {dedup_key}): {subject}")
+        return None
+
+    try:
+        with transaction.atomic():
+            email = EmailOutbox.objects.create(
+                subject=subject[:255],
+                template_name=template_name,
+                context=encode_context(context),
+                recipients=recipient_list,
+                dedup_key=dedup_key or None,
+            )
+    except IntegrityError:
+        logger.info(f"Email skipped (duplicate {dedup_key}): {subject}")
+        return None
+
+    if EMAIL_OUTBOX_AUTO_DRAIN:
+        transaction.on_commit(schedule_drain)
+    return email
+
+
+def enqueue_emails(emails):
+    """
+    Ghi nhiều email vào outbox bằng một câu INSERT (thao tác hàng loạt).
+
+    Args:
+        emails: list dict với các khóa subject, template_name, context, recipient_list
+            và (tùy chọn) dedup_key
+
+    Returns:
+        int: số email đã ghi (bỏ qua email không có người nhận / trùng dedup_key)
+    """
+    dedup_keys = {email['dedup_key'] for email in emails if email.get('dedup_key')}
+    queued_keys = set(
+        EmailOutbox.objects.filter(dedup_key__in=dedup_keys).values_list('dedup_key', flat=True)
+    ) if dedup_keys else set()
+
+    rows = []
+    for email in emails:
+        recipient_list = [address for address in email['recipient_list'] if address]
+        dedup_key = email.get('dedup_key') or None
+        if not recipient_list or dedup_key in queued_keys:
+            logger.info(f"Email skipped (no recipient / duplicate {dedup_key}): {email['subject']}")
+            continue
+        if dedup_key:
+            queued_keys.add(dedup_key)
+        rows.append(EmailOutbox(
+            subject=email['subject'][:255],
+            template_name=email['template_name'],
+            context=encode_context(email['context']),
+            recipients=recipient_list,
+            dedup_key=dedup_key,
+        ))
+    if not rows:
+        return 0
+
+    EmailOutbox.objects.bulk_create(rows, batch_size=500, ignore_conflicts=bool(dedup_keys))
+    if EMAIL_OUTBOX_AUTO_DRAIN:
+        transaction.on_commit(schedule_drain)
+    return len(rows)
+
+
+# ======================== DELIVERY ========================
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+_drain_pending = threading.Event()
+
+
+def schedule_drain():
+    """Gửi outbox ở thread nền; gộp nhiều lần gọi liên tiếp thành một lượt gửi"""
+    if _drain_pending.is_set():
+        return
+    _drain_pending.set()
+    _executor.submit(_drain_in_thread)
+
+
+def _drain_in_thread():
+    # Xóa cờ trước khi đọc hàng đợi: email commit sau thời điểm này sẽ lên lịch lượt mới
+    _drain_pending.clear()
+    try:
+        drain_outbox()
+    except Exception as e:
+        logger.error(f"Email outbox drain failed: {e}")
+    finally:
+        db_connection.close()
+
+
+def claim_batch(batch_size=None):
+    """Nhận một lô email đến hạn gửi và đánh dấu 'sending' để worker khác không gửi trùng"""
+    now = timezone.now()
+    due = (
+        Q(status='pending', next_attempt_at__lte=now)
+        | Q(status='sending', locked_at__lt=now - timedelta(seconds=STALE_LOCK_SECONDS))
+    )
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(due).order_by('id').values_list('id', flat=True)[:batch_size or EMAIL_OUTBOX_BATCH_SIZE]
+        )
+        if not ids:
+            return []
+        # Điều kiện `due` lặp lại trong UPDATE: trên database không có row lock (SQLite)
+        # worker khác có thể đã nhận các bản ghi này giữa SELECT và UPDATE
+        EmailOutbox.objects.filter(due, id__in=ids).update(status='sending', locked_at=now)
+    return list(EmailOutbox.objects.filter(id__in=ids, status='sending', locked_at=now).order_by('id'))
+
+
+def build_message(email, template_cache):
+    """Render email từ outbox; template được cache theo tên trong một lô"""
+    template = template_cache.get(email.template_name)
+    if template is None:
+        template = get_template(f'emails/{email.template_name}.html')
+        template_cache[email.template_name] = template
+    html_content = template.render(decode_context(email.context))
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=strip_tags(html_content),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=email.recipients,
+    )
+    message.attach_alternative(html_content, "text/html")
+    return message
+
+
+def _mark_sent(email):
+    email.status = 'sent'
+    email.sent_at = timezone.now()
+    email.attempts += 1
+    email.locked_at = None
+    email.last_error = ''
+    # Không giữ lại context (có thể chứa mật khẩu tạm) sau khi đã gửi
+    email.context = {}
+    email.save(update_fields=['status', 'sent_at', 'attempts', 'locked_at', 'last_error', 'context'])
+
+
+def _mark_failed(email, error, retry=True):
+    email.attempts += 1
+    email.locked_at = None
+    email.last_error = str(error)[:2000]
+    if retry and email.attempts < EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'pending'
+        delay = EMAIL_OUTBOX_RETRY_DELAY * (2 ** (email.attempts - 1))
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    else:
+        email.status = 'failed'
+    email.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'next_attempt_at'])
+
+
+def send_batch(emails, template_cache=None):
+    """
+    Gửi một lô email qua một kết nối SMTP.
+
+    Returns:
+        dict: {'sent', 'retry', 'failed'}
+    """
+    template_cache = {} if template_cache is None else template_cache
+    result = {'sent': 0, 'retry': 0, 'failed': 0}
+
+    prepared = []
+    for email in emails:
+        try:
+            prepared.append((email, build_message(email, template_cache)))
+        except Exception as e:
+            # Lỗi template không tự khỏi khi thử lại
+            logger.error(f"Failed to render email {email.id} ({email.template_name}): {e}")
+            _mark_failed(email, e, retry=False)
+            result['failed'] += 1
+
+    if not prepared:
+        return result
+
+    mail_connection = get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+    except Exception as e:
+        logger.error(f"Cannot open email connection: {e}")
+        for email, _ in prepared:
+            _mark_failed(email, e)
+            result['retry' if email.status == 'pending' else 'failed'] += 1
+        return result
+
+    try:
+        for email, message in prepared:
+            try:
+                mail_connection.send_messages([message])
+            except Exception as e:
+                logger.error(f"Failed to send email {email.id}: {email.subject}. Error: {e}")
+                _mark_failed(email, e)
+                result['retry' if email.status == 'pending' else 'failed'] += 1
+            else:
+                _mark_sent(email)
+                result['sent'] += 1
+    finally:
+        try:
+            mail_connection.close()
+        except Exception:
+            pass
+
+    logger.info(f"Email outbox batch: {result}")
+    return result
+
+
+def drain_outbox(batch_size=None, max_batches=None):
+    """
+    Gửi toàn bộ email đến hạn trong outbox.
+
+    Returns:
+        dict: tổng {'sent', 'retry', 'failed', 'batches'}
+    """
+    totals = {'sent': 0, 'retry': 0, 'failed': 0, 'batches': 0}
+    template_cache = {}
+    while max_batches is None or totals['batches'] < max_batches:
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        result = send_batch(emails, template_cache)
+        for key, value in result.items():
+            totals[key] += value
+        totals['batches'] += 1
+    return totals
@@ -4,13 +4,17 @@ Handles all email notifications for leave requests, expenses, appraisals, contra
 """
 
 import logging
-from django.core.mail import send_mail, EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+import threading
+from contextlib import contextmanager
 from django.conf import settings
 
+from .email_outbox import enqueue_email, enqueue_emails
+
 logger = logging.getLogger(__name__)
 
+# Email đang được gom trong EmailService.batched() của thread hiện tại
+_batch = threading.local()
+
 
 class EmailService:
     """
@@ -18,9 +22,12 @@ class EmailService:
     """
     
     @staticmethod
-    def _send_email(subject, template_name, context, recipient_list, fail_silently=True):
+    def _send_email(subject, template_name, context, recipient_list, fail_silently=True, dedup_key=None):
         """
-        Internal method to send HTML emails
+        Internal method to queue HTML emails
+        
+        Email được ghi vào outbox (cùng transaction với request) và gửi theo lô
+        sau khi commit - xem app/email_outbox.py.
         
         Args:
             subject: Email subject
@@ -28,42 +35,58 @@ class EmailService:
             context: Context dictionary for template
             recipient_list: List of recipient email addresses
             fail_silently: Whether to suppress exceptions
+            dedup_key: Optional key; emails with an already-queued key are skipped
         
         Returns:
-            bool: True if email sent successfully
+            bool: True if email queued successfully
         """
-        try:
-            # Filter out empty emails
-            recipient_list = [email for email in recipient_list if email]
-            
-            if not recipient_list:
-                logger.warning(f"No valid recipients for email: {subject}")
-                return False
-            
-            # Render HTML content
-            html_content = render_to_string(f'emails/{template_name}.html', context)
-            text_content = strip_tags(html_content)
-            
-            # Create email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=recipient_list
-            )
-            email.attach_alternative(html_content, "text/html")
-            
-            # Send
-            email.send(fail_silently=fail_silently)
-            logger.info(f"Email sent successfully: {subject} to {recipient_list}")
+        pending = getattr(_batch, 'emails', None)
+        if pending is not None:
+            pending.append({
+                'subject': subject, 'template_name': template_name, 'context': context,
+                'recipient_list': recipient_list, 'dedup_key': dedup_key,
+            })
             return True
+        
+        try:
+            queued = enqueue_email(subject, template_name, context, recipient_list, dedup_key=dedup_key)
+            if queued:
+                logger.info(f"Email queued: {subject} to {queued.recipients}")
+            return queued is not None
             
         except Exception as e:
-            logger.error(f"Failed to send email: {subject}. Error: {str(e)}")
+            logger.error(f"Failed to queue email: {subject}. Error: {str(e)}")
             if not fail_silently:
                 raise
             return False
 
+    @staticmethod
+    @contextmanager
+    def batched():
+        """
+        Gom các email gửi trong khối with và ghi vào outbox bằng một INSERT khi thoát
+        
+        Usage:
+            with EmailService.batched():
+                for leave in leaves:
+                    EmailService.send_leave_approved(leave)
+        """
+        if getattr(_batch, 'emails', None) is not None:
+            # Lồng nhau: khối ngoài cùng ghi cả lô
+            yield
+            return
+        _batch.emails = []
+        try:
+            yield
+            emails = _batch.emails
+        finally:
+            _batch.emails = None
+        try:
+            queued = enqueue_emails(emails)
+            logger.info(f"Email batch queued: {queued} of {len(emails)}")
+        except Exception as e:
+            logger.error(f"Failed to queue email batch ({len(emails)} emails): {e}")
+
     # ==================== LEAVE REQUEST EMAILS ====================
     
     @classmethod
@@ -303,7 +326,9 @@ class EmailService:
             subject=f'[HRM] Hợp đồng sắp hết hạn - Còn {days_remaining} ngày',
             template_name='contract_expiring_employee',
             context=context,
-            recipient_list=[employee.email]
+            recipient_list=[employee.email],
+            # Chạy lại cron trong cùng ngày không gửi trùng
+            dedup_key=f'contract-expiring:{employee.pk}:{today.isoformat()}'
         )
     
     @classmethod
@@ -403,6 +428,24 @@ class EmailService:
             recipient_list=[discipline.employee.email]
         )
 
+    # ==================== EXPORT EMAILS ====================
+    
+    @classmethod
+    def send_export_ready(cls, recipient_email, filename, download_url):
+        """Notify user that a background export file is ready"""
+        context = {
+            'filename': filename,
+            'download_url': download_url,
+            'company_name': 'HRM System',
+        }
+        
+        return cls._send_email(
+            subject='[HRM] File xuất dữ liệu đã sẵn sàng',
+            template_name='export_ready',
+            context=context,
+            recipient_list=[recipient_email]
+        )
+
 
 # Convenience functions for direct import
 send_leave_approved = EmailService.send_leave_approved
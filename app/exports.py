@@ -0,0 +1,284 @@
+"""
+Streaming export pipeline
+Xuất chấm công / bảng lương ra CSV hoặc XLSX mà không nạp toàn bộ bảng vào bộ nhớ:
+- Queryset được duyệt bằng .iterator(chunk_size=EXPORT_CHUNK_SIZE).
+- CSV được stream trực tiếp qua StreamingHttpResponse.
+- XLSX được ghi bằng openpyxl ở chế độ write-only (bộ nhớ không đổi) vào file tạm
+  rồi trả về bằng FileResponse.
+- Export rất lớn được đưa vào hàng đợi tác vụ nền (app.jobs), ghi file vào
+  media/exports/ và gửi email khi xong; giao diện polling trạng thái job.
+
+Usage:
+    columns, queryset, iter_rows = attendance_export(date_from=..., department_id=...)
+    return export_response('ChamCong', columns, iter_rows(queryset), 'csv')
+
+Chấm công các tháng đã lưu trữ (app.attendance_archive) được trộn vào theo thứ tự ngày.
+"""
+import csv
+import heapq
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .attendance_archive import archived_row_count, iter_archived
+from .models import Attendance, Payroll
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('xlsx', 'csv')
+EXPORT_CHUNK_SIZE = 2000
+# Số dòng vượt ngưỡng này sẽ được xuất ở nền thay vì trả về trực tiếp
+EXPORT_BACKGROUND_THRESHOLD = getattr(settings, 'EXPORT_BACKGROUND_THRESHOLD', 100000)
+EXPORT_DIR = 'exports'
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+ATTENDANCE_COLUMNS = ['STT', 'Ngày', 'Mã NV', 'Tên NV', 'Phòng Ban', 'Trạng Thái', 'Số Giờ', 'Ghi Chú']
+PAYROLL_COLUMNS = [
+    'STT', 'Tháng/Năm', 'Mã NV', 'Tên NV', 'Phòng Ban', 'Lương CB', 'Hệ Số', 'Lương/Giờ',
+    'Tổng Giờ', 'Thưởng', 'Phạt', 'Tổng Lương', 'Trạng Thái'
+]
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+# ======================== DATA SOURCES ========================
+
+def attendance_queryset(date_from=None, date_to=None, department_id=None):
+    """Chấm công đã lọc theo khoảng ngày (YYYY-MM-DD, tính cả hai đầu) và phòng ban"""
+    qs = Attendance.objects.all()
+    date_from, date_to = _parse_date(date_from), _parse_date(date_to)
+    if date_from:
+        qs = qs.filter(date__gte=timezone.make_aware(datetime.combine(date_from, datetime.min.time())))
+    if date_to:
+        end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        qs = qs.filter(date__lt=timezone.make_aware(end))
+    if department_id:
+        qs = qs.filter(employee__department_id=department_id)
+    return qs
+
+
+class AttendanceSource:
+    """
+    Nguồn export chấm công: bảng chính (queryset) + các tháng đã lưu trữ
+    (app.attendance_archive). count() cộng số dòng của các tháng lưu trữ giao với
+    khoảng ngày (cận trên) - chỉ dùng cho ngưỡng xuất nền / tiến độ.
+    """
+
+    def __init__(self, queryset, date_from=None, date_to=None, department_id=None):
+        self.queryset = queryset
+        self.date_from = date_from
+        self.date_to = date_to
+        self.department_id = department_id
+
+    def count(self):
+        return self.queryset.count() + archived_row_count(self.date_from, self.date_to, self.department_id)
+
+    def archived_rows(self):
+        for attendance in iter_archived(self.date_from, self.date_to, self.department_id):
+            department = attendance.employee.department
+            yield (
+                attendance.date, attendance.employee.employee_code, attendance.employee.name,
+                department.name if department else None, attendance.status, attendance.working_hours,
+                attendance.notes,
+            )
+
+
+def iter_attendance_rows(source):
+    rows = source.queryset.values_list(
+        'date', 'employee__employee_code', 'employee__name',
+        'employee__department__name', 'status', 'working_hours', 'notes'
+    ).order_by('-date').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    # Cả hai nguồn đã sắp xếp mới nhất trước: trộn mà không nạp hết vào bộ nhớ
+    rows = heapq.merge(rows, source.archived_rows(), key=lambda row: row[0], reverse=True)
+    for index, row in enumerate(rows, start=1):
+        yield [index, timezone.localtime(row[0]).strftime('%d/%m/%Y'), *row[1:]]
+
+
+def attendance_export(date_from=None, date_to=None, department_id=None):
+    """Returns (columns, nguồn dữ liệu, row iterator factory) cho export chấm công"""
+    qs = attendance_queryset(date_from, date_to, department_id)
+    source = AttendanceSource(qs, _parse_date(date_from), _parse_date(date_to), department_id)
+    return ATTENDANCE_COLUMNS, source, iter_attendance_rows
+
+
+def payroll_queryset(month=None, year=None, department=None, status=None):
+    """Bảng lương đã lọc; department là TÊN phòng ban (giữ nguyên tham số của trang bảng lương)"""
+    qs = Payroll.objects.all()
+    if month:
+        qs = qs.filter(month=month)
+    if year:
+        qs = qs.filter(year=year)
+    if department:
+        qs = qs.filter(employee__department__name=department)
+    if status:
+        qs = qs.filter(status=status)
+    return qs
+
+
+def iter_payroll_rows(queryset):
+    rows = queryset.values_list(
+        'month', 'year', 'employee__employee_code', 'employee__name',
+        'employee__department__name', 'base_salary', 'salary_coefficient',
+        'hourly_rate', 'total_working_hours', 'bonus', 'penalty',
+        'total_salary', 'status'
+    ).order_by('-year', '-month').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for index, row in enumerate(rows, start=1):
+        yield [
+            index, f"{row[0]}/{row[1]}", *row[2:12],
+            "Đã xác nhận" if row[12] == 'confirmed' else "Chưa xác nhận"
+        ]
+
+
+def payroll_export(month=None, year=None, department=None, status=None):
+    qs = payroll_queryset(month, year, department, status)
+    return PAYROLL_COLUMNS, qs, iter_payroll_rows
+
+
+EXPORTS = {
+    'attendance': attendance_export,
+    'payroll': payroll_export,
+}
+
+
+# ======================== WRITERS ========================
+
+class _Echo:
+    """File-like object chỉ trả lại giá trị được ghi - cho csv.writer khi stream"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, rows):
+    """Sinh từng dòng CSV đã encode (có BOM để Excel nhận đúng UTF-8)"""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'.encode('utf-8') + writer.writerow(columns).encode('utf-8')
+    for row in rows:
+        yield writer.writerow(row).encode('utf-8')
+
+
+def write_csv(columns, rows, fileobj):
+    for chunk in iter_csv(columns, rows):
+        fileobj.write(chunk)
+
+
+def write_xlsx(columns, rows, fileobj, sheet_title='Sheet1'):
+    """Ghi XLSX ở chế độ write-only của openpyxl (dòng được flush ra đĩa, không giữ trong RAM)"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title[:31])
+    header = []
+    for title in columns:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(fileobj)
+
+
+def write_export(columns, rows, fileobj, fmt, sheet_title='Sheet1'):
+    if fmt == 'csv':
+        write_csv(columns, rows, fileobj)
+    else:
+        write_xlsx(columns, rows, fileobj, sheet_title)
+
+
+def export_response(filename_base, columns, rows, fmt, sheet_title='Sheet1'):
+    """
+    Tạo response tải file: CSV stream trực tiếp, XLSX ghi ra file tạm rồi stream từ đĩa.
+    """
+    filename = f'{filename_base}.{fmt}'
+    if fmt == 'csv':
+        response = StreamingHttpResponse(iter_csv(columns, rows), content_type=CONTENT_TYPES['csv'])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(columns, rows, tmp, sheet_title)
+    tmp.seek(0)
+    return FileResponse(
+        tmp, as_attachment=True, filename=filename, content_type=CONTENT_TYPES['xlsx']
+    )
+
+
+# ======================== BACKGROUND EXPORT ========================
+
+def _track_progress(rows, job, total):
+    job.progress(0, total)
+    for index, row in enumerate(rows, start=1):
+        if index % EXPORT_CHUNK_SIZE == 0:
+            job.progress(index)
+        yield row
+    job.progress(total, force=True)
+
+
+def run_export_job(job, kind, filters, fmt, filename_base, sheet_title='Sheet1', notify_email=None,
+                   download_url=None):
+    """Handler job 'export': ghi file vào media/exports/ và gửi email khi xong"""
+    columns, queryset, iter_rows = EXPORTS[kind](**filters)
+    rows = _track_progress(iter_rows(queryset), job, queryset.count())
+    with tempfile.TemporaryFile() as tmp:
+        write_export(columns, rows, tmp, fmt, sheet_title)
+        tmp.seek(0)
+        path = default_storage.save(
+            os.path.join(EXPORT_DIR, f'{job.id}_{filename_base}.{fmt}'), File(tmp)
+        )
+    logger.info(f"Background export {job.id} ({kind}) written to {path}")
+
+    if notify_email:
+        from .email_service import EmailService
+        EmailService.send_export_ready(notify_email, f'{filename_base}.{fmt}', download_url)
+    return {'path': path, 'filename': f'{filename_base}.{fmt}'}
+
+
+def start_background_export(user, kind, filters, fmt, filename_base, sheet_title='Sheet1',
+                            download_url_builder=None):
+    """
+    Đưa export vào hàng đợi tác vụ nền (lệnh run_jobs).
+
+    Args:
+        download_url_builder: hàm job_id -> URL tuyệt đối để gửi trong email
+
+    Returns:
+        BackgroundJob
+    """
+    from .jobs import enqueue_job
+
+    params = {
+        'kind': kind, 'filters': filters, 'fmt': fmt, 'filename_base': filename_base,
+        'sheet_title': sheet_title, 'notify_email': user.email or None,
+    }
+    with transaction.atomic():
+        job = enqueue_job('export', params, user=user, label=f'Xuất {filename_base}.{fmt}')
+        if download_url_builder:
+            job.params['download_url'] = download_url_builder(job.id)
+            job.save(update_fields=['params'])
+    return job
+
+
+def should_run_in_background(queryset, requested=False):
+    return requested or queryset.count() > EXPORT_BACKGROUND_THRESHOLD
@@ -0,0 +1,207 @@
+"""
+Request-scoped identity context
+Gộp thông tin nhận dạng của user (Employee, phòng ban, group, vai trò) để các
+permission helper, middleware và template tag dùng chung thay vì mỗi nơi tự
+truy vấn Employee / user.groups.
+
+- Trong một request: UserIdentity được gắn vào user (và request.identity) nên
+  chỉ được tính một lần.
+- Giữa các request: snapshot nhẹ (id, tên group, cờ vai trò) được cache ngắn hạn
+  theo user id, bị vô hiệu khi Employee / Department / Group / group membership thay đổi.
+  Bản thân Employee không được cache để tránh ghi đè dữ liệu cũ khi view gọi save().
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Department, Employee
+
+logger = logging.getLogger(__name__)
+
+HR_GROUP_NAME = 'HR'
+HR_DEPARTMENT_NAMES = ['hr', 'nhân sự', 'human resources', 'phòng nhân sự', 'bộ phận nhân sự']
+
+IDENTITY_CACHE_TIMEOUT = getattr(settings, 'IDENTITY_CACHE_TIMEOUT', 60)
+_GENERATION_KEY = 'identity:generation'
+
+# Attribute name used to memoize the identity on the (per-request) user object
+_USER_ATTR = '_hrm_identity'
+
+
+def is_hr_department_name(name):
+    """Kiểm tra tên phòng ban có phải phòng HR không"""
+    return bool(name) and name.lower().strip() in HR_DEPARTMENT_NAMES
+
+
+class UserIdentity:
+    """
+    Thông tin nhận dạng của một user trong request hiện tại.
+
+    Attributes:
+        user_id: id của User (None nếu anonymous)
+        employee_id: id Employee ứng với user (theo email) hoặc None
+        department_name: tên phòng ban của Employee hoặc None
+        group_names: frozenset tên group của user
+        is_superuser: bool
+    """
+
+    def __init__(self, user_id=None, employee_id=None, department_name=None,
+                 employee_is_manager=False, group_names=(), is_superuser=False):
+        self.user_id = user_id
+        self.employee_id = employee_id
+        self.department_name = department_name
+        self.employee_is_manager = employee_is_manager
+        self.group_names = frozenset(group_names)
+        self.is_superuser = is_superuser
+        self._employee = None
+
+    @classmethod
+    def for_user(cls, user):
+        """Tính identity từ database (2 truy vấn)"""
+        employee = (
+            Employee.objects.select_related('department').filter(email=user.email).first()
+            if user.email else None
+        )
+        identity = cls(
+            user_id=user.pk,
+            employee_id=employee.pk if employee else None,
+            department_name=employee.department.name if employee and employee.department else None,
+            employee_is_manager=bool(employee and employee.is_manager),
+            group_names=user.groups.values_list('name', flat=True),
+            is_superuser=user.is_superuser,
+        )
+        identity._employee = employee
+        return identity
+
+    def to_cache(self):
+        return {
+            'user_id': self.user_id,
+            'employee_id': self.employee_id,
+            'department_name': self.department_name,
+            'employee_is_manager': self.employee_is_manager,
+            'group_names': sorted(self.group_names),
+            'is_superuser': self.is_superuser,
+        }
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def employee(self):
+        """Employee của user, tải theo khóa chính tối đa một lần mỗi request"""
+        if self._employee is None and self.employee_id is not None:
+            self._employee = (
+                Employee.objects.select_related('department').filter(pk=self.employee_id).first()
+            )
+        return self._employee
+
+    @property
+    def department(self):
+        employee = self.employee
+        return employee.department if employee else None
+
+    def in_group(self, group_name):
+        return group_name in self.group_names
+
+    def in_any_group(self, group_names):
+        return any(name in self.group_names for name in group_names)
+
+    def in_all_groups(self, group_names):
+        return all(name in self.group_names for name in group_names)
+
+    @property
+    def is_hr(self):
+        """HR = superuser, thuộc group 'HR' hoặc thuộc phòng ban HR"""
+        if not self.is_authenticated:
+            return False
+        return (
+            self.is_superuser
+            or self.in_group(HR_GROUP_NAME)
+            or is_hr_department_name(self.department_name)
+        )
+
+    @property
+    def is_manager(self):
+        return self.is_authenticated and self.employee_is_manager
+
+    @property
+    def can_access_management(self):
+        return self.is_hr
+
+
+ANONYMOUS_IDENTITY = UserIdentity()
+
+
+def _generation():
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        cache.add(_GENERATION_KEY, generation, None)
+    return generation
+
+
+def _cache_key(user_id):
+    return f"identity:{_generation()}:{user_id}"
+
+
+def get_identity(user):
+    """
+    Lấy UserIdentity cho user: memo trên user object, sau đó cache, cuối cùng database.
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS_IDENTITY
+
+    identity = getattr(user, _USER_ATTR, None)
+    if identity is not None and identity.user_id == user.pk:
+        return identity
+
+    key = _cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        identity = UserIdentity(**cached)
+    else:
+        identity = UserIdentity.for_user(user)
+        cache.set(key, identity.to_cache(), IDENTITY_CACHE_TIMEOUT)
+
+    setattr(user, _USER_ATTR, identity)
+    return identity
+
+
+def invalidate_identities():
+    """Vô hiệu toàn bộ identity đã cache (đổi generation, key cũ tự hết hạn)"""
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.set(_GENERATION_KEY, 2, None)
+
+
+# ======================== CACHE INVALIDATION ========================
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def _invalidate_on_change(sender, **kwargs):
+    invalidate_identities()
+
+
+@receiver(post_save, sender=User)
+def _invalidate_on_user_save(sender, update_fields=None, **kwargs):
+    # Đăng nhập chỉ cập nhật last_login - không ảnh hưởng identity
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate_identities()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _invalidate_on_group_membership(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_identities()
@@ -0,0 +1,226 @@
+"""
+Inbox counters
+Bộ đếm "việc cần xử lý" của từng nhân viên cho dashboard portal và badge trên
+thanh điều hướng (API polling): đơn nghỉ phép / chi phí đang chờ, đánh giá cần tự
+đánh giá, thông báo chưa đọc, và với quản lý: đơn chờ duyệt của team, đánh giá
+chờ quản lý.
+
+- Bộ đếm cá nhân được tính bằng MỘT truy vấn (các subquery COUNT) và cache theo
+  nhân viên; bộ đếm của team được cache theo phòng ban.
+- Signal trên LeaveRequest / Expense / Appraisal / AnnouncementRead chỉ xóa đúng
+  các key bị ảnh hưởng (nhân viên, quản lý, phòng ban) - ngay lập tức và sau khi
+  transaction commit; thay đổi Announcement đổi generation cho mọi nhân viên.
+- Thay đổi Employee (phòng ban, vai trò quản lý) cũng đổi generation.
+- Cache lỗi / không có dữ liệu thì tính trực tiếp từ database.
+
+Usage:
+    counters = get_inbox_counters(employee)
+    counters['pending_leaves'], counters.get('team_pending_leaves'), ...
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .content_audience import visible_announcements
+from .models import (
+    Announcement, AnnouncementRead, Appraisal, Employee, Expense, LeaveRequest
+)
+
+logger = logging.getLogger(__name__)
+
+INBOX_CACHE_TIMEOUT = getattr(settings, 'INBOX_CACHE_TIMEOUT', 300)
+_GENERATION_KEY = 'inbox:generation'
+
+EMPLOYEE_COUNTERS = ['pending_leaves', 'pending_expenses', 'pending_appraisals', 'unread_announcements']
+MANAGER_COUNTERS = ['team_pending_leaves', 'team_pending_expenses', 'team_pending_appraisals']
+
+
+def _count(queryset):
+    """Subquery COUNT(*) của queryset (0 nếu rỗng)"""
+    counted = queryset.order_by().annotate(_count=Func(F('pk'), function='COUNT')).values('_count')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def compute_employee_counters(employee):
+    """Bộ đếm cá nhân (và đánh giá chờ quản lý) trong một truy vấn"""
+    unread = visible_announcements(employee).exclude(
+        Exists(AnnouncementRead.objects.filter(announcement_id=OuterRef('pk'), employee_id=employee.id))
+    )
+    counters = Employee.objects.filter(pk=employee.pk).values(
+        pending_leaves=_count(LeaveRequest.objects.filter(employee_id=employee.id, status='pending')),
+        pending_expenses=_count(Expense.objects.filter(employee_id=employee.id, status='pending')),
+        pending_appraisals=_count(Appraisal.objects.filter(employee_id=employee.id, status='pending_self')),
+        unread_announcements=_count(unread),
+        manager_pending_appraisals=_count(
+            Appraisal.objects.filter(manager_id=employee.id, status='pending_manager')
+        ),
+    ).first()
+    return counters or {name: 0 for name in EMPLOYEE_COUNTERS + ['manager_pending_appraisals']}
+
+
+def compute_department_counters(department_id):
+    """Số đơn đang chờ duyệt của cả phòng ban: {'pending_leaves': {employee_id: n}, ...}"""
+    def per_employee(model):
+        rows = (
+            model.objects.filter(employee__department_id=department_id, status='pending')
+            .values_list('employee_id').annotate(count=Count('pk')).order_by()
+        )
+        return {employee_id: count for employee_id, count in rows}
+
+    return {
+        'pending_leaves': per_employee(LeaveRequest),
+        'pending_expenses': per_employee(Expense),
+    }
+
+
+def _generation():
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        cache.add(_GENERATION_KEY, generation, None)
+    return generation
+
+
+def _employee_key(employee_id, generation):
+    return f'inbox:{generation}:employee:{employee_id}'
+
+
+def _department_key(department_id, generation):
+    return f'inbox:{generation}:department:{department_id}'
+
+
+def get_inbox_counters(employee):
+    """
+    Bộ đếm của nhân viên: từ cache, tính lại các phần còn thiếu từ database.
+
+    Returns:
+        dict: EMPLOYEE_COUNTERS (+ MANAGER_COUNTERS nếu là quản lý)
+    """
+    is_team_manager = employee.is_manager and employee.department_id
+    try:
+        generation = _generation()
+        employee_key = _employee_key(employee.id, generation)
+        department_key = _department_key(employee.department_id, generation)
+        cached = cache.get_many([employee_key, department_key] if is_team_manager else [employee_key])
+    except Exception as e:
+        logger.warning(f"Inbox counter cache unavailable, using database: {e}")
+        employee_key = department_key = None
+        cached = {}
+
+    missing = {}
+    own = cached.get(employee_key)
+    if own is None:
+        own = compute_employee_counters(employee)
+        if employee_key:
+            missing[employee_key] = own
+
+    department = None
+    if is_team_manager:
+        department = cached.get(department_key)
+        if department is None:
+            department = compute_department_counters(employee.department_id)
+            if department_key:
+                missing[department_key] = department
+
+    if missing:
+        try:
+            cache.set_many(missing, INBOX_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Could not cache inbox counters: {e}")
+
+    counters = {name: own[name] for name in EMPLOYEE_COUNTERS}
+    if employee.is_manager:
+        counters['team_pending_appraisals'] = own['manager_pending_appraisals']
+        # Đơn của chính quản lý không tính vào việc cần duyệt của team
+        for name in ('pending_leaves', 'pending_expenses'):
+            team = department[name] if department else {}
+            counters[f'team_{name}'] = sum(team.values()) - team.get(employee.id, 0)
+    return counters
+
+
+def _delete_keys(employee_ids=(), department_ids=()):
+    try:
+        generation = _generation()
+        cache.delete_many(
+            [_employee_key(employee_id, generation) for employee_id in employee_ids if employee_id]
+            + [_department_key(department_id, generation) for department_id in department_ids if department_id]
+        )
+    except Exception as e:
+        logger.warning(f"Could not invalidate inbox counters: {e}")
+
+
+def invalidate_inbox_counters(employee_ids=(), department_ids=()):
+    """
+    Xóa bộ đếm của các nhân viên / phòng ban. Gọi thủ công sau các thao tác bulk
+    (update(), bulk_create) vì chúng không phát signal.
+    """
+    employee_ids, department_ids = set(employee_ids), set(department_ids)
+    _delete_keys(employee_ids, department_ids)
+    # Xóa lại sau commit: request khác có thể đã cache giá trị cũ trong lúc chờ commit
+    transaction.on_commit(lambda: _delete_keys(employee_ids, department_ids))
+
+
+def invalidate_all_inbox_counters():
+    """Vô hiệu bộ đếm của mọi nhân viên và phòng ban (đổi generation)"""
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.set(_GENERATION_KEY, 2, None)
+    except Exception as e:
+        logger.warning(f"Could not invalidate inbox counters: {e}")
+
+
+# ======================== CACHE INVALIDATION ========================
+
+def _department_of(instance):
+    """department_id của nhân viên sở hữu bản ghi (không truy vấn nếu employee đã được nạp)"""
+    if type(instance).employee.is_cached(instance):
+        return instance.employee.department_id
+    return Employee.objects.filter(pk=instance.employee_id).values_list('department_id', flat=True).first()
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def _invalidate_on_request_change(sender, instance, **kwargs):
+    invalidate_inbox_counters([instance.employee_id], [_department_of(instance)])
+
+
+@receiver(post_save, sender=Appraisal)
+@receiver(post_delete, sender=Appraisal)
+def _invalidate_on_appraisal_change(sender, instance, **kwargs):
+    invalidate_inbox_counters([instance.employee_id, instance.manager_id])
+
+
+@receiver(post_save, sender=AnnouncementRead)
+@receiver(post_delete, sender=AnnouncementRead)
+def _invalidate_on_announcement_read(sender, instance, **kwargs):
+    invalidate_inbox_counters([instance.employee_id])
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def _invalidate_on_announcement_change(sender, **kwargs):
+    invalidate_all_inbox_counters()
+
+
+@receiver(m2m_changed, sender=Announcement.target_departments.through)
+@receiver(m2m_changed, sender=Announcement.target_employees.through)
+def _invalidate_on_announcement_targets(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_all_inbox_counters()
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def _invalidate_on_employee_change(sender, **kwargs):
+    # Đổi phòng ban / vai trò quản lý làm thay đổi đơn của team (cả phòng ban cũ)
+    # và thông báo theo phòng ban
+    invalidate_all_inbox_counters()
@@ -0,0 +1,125 @@
+"""
+Background job handlers
+Các thao tác nặng được chạy ngoài request bởi worker `run_jobs`.
+Mỗi handler nhận JobContext (báo tiến độ / kiểm tra hủy) và params của job,
+trả về dict kết quả hiển thị trên trang tiến độ.
+"""
+import io
+import logging
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+
+from .appraisal_engine import generate_appraisals
+from .attendance_import import import_punch_log
+from .exports import EXPORT_DIR, run_export_job
+from .jobs import JobCancelled, register_job
+from .models import AppraisalPeriod, Employee, EmployeeSalaryRule, SalaryComponent
+from .payslips import render_month_payslips, write_payslip_bundle
+
+logger = logging.getLogger(__name__)
+
+
+register_job('export')(run_export_job)
+
+
+@register_job('generate_appraisals')
+def generate_appraisals_job(job, period_id):
+    """Tạo appraisal cho tất cả nhân viên phù hợp của một kỳ đánh giá"""
+    period = AppraisalPeriod.objects.get(id=period_id)
+    job.progress(message=f'Kỳ đánh giá {period.name}')
+    # Hủy giữa chừng sẽ rollback toàn bộ, không để lại kỳ đánh giá tạo dở
+    summary = generate_appraisals(period, progress_callback=lambda done, total: job.progress(done, total))
+    return {
+        **summary,
+        'summary': f"Đã tạo {summary['created']} đánh giá cho nhân viên "
+                   f"(bỏ qua {summary['skipped']} nhân viên đã có đánh giá)",
+    }
+
+
+@register_job('bulk_assign_salary_rules')
+def bulk_assign_salary_rules_job(job, employee_ids, component_id, effective_from, created_by_id=None,
+                                 custom_amount=None, custom_percentage=None, custom_formula='',
+                                 effective_to=None, notes=''):
+    """Gán một thành phần lương cho nhiều nhân viên"""
+    component = SalaryComponent.objects.get(id=component_id)
+    employees = Employee.objects.in_bulk([int(emp_id) for emp_id in employee_ids])
+    job.progress(0, len(employees), message=component.name)
+
+    # Một truy vấn cho tất cả nhân viên đã có quy tắc (đang hiệu lực, hoặc trùng ngày hiệu lực)
+    existing = set(
+        EmployeeSalaryRule.objects.filter(component=component, employee_id__in=employees)
+        .filter(Q(is_active=True) | Q(effective_from=effective_from))
+        .values_list('employee_id', flat=True)
+    )
+
+    rules = [
+        EmployeeSalaryRule(
+            employee=employee,
+            component=component,
+            custom_amount=custom_amount,
+            custom_percentage=custom_percentage,
+            custom_formula=custom_formula,
+            effective_from=effective_from,
+            effective_to=effective_to,
+            notes=notes,
+            created_by_id=created_by_id
+        )
+        for employee_id, employee in employees.items()
+        if employee_id not in existing
+    ]
+    job.check_cancelled()
+    with transaction.atomic():
+        EmployeeSalaryRule.objects.bulk_create(rules, batch_size=500)
+    job.progress(len(employees), force=True)
+
+    created_count, skipped_count = len(rules), len(employees) - len(rules)
+    return {
+        'created': created_count,
+        'skipped': skipped_count,
+        'summary': f'Đã gán quy tắc cho {created_count} nhân viên. '
+                   f'Bỏ qua {skipped_count} nhân viên (đã có quy tắc).',
+    }
+
+
+@register_job('import_attendance')
+def import_attendance_job(job, path, replace=False):
+    """Nhập file log máy chấm công đã upload (file được giữ lại để chạy lại nếu job lỗi)"""
+    try:
+        with default_storage.open(path, 'rb') as f:
+            total = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+        job.progress(0, total, message='Đang nhập log chấm công')
+        with default_storage.open(path, 'rb') as f:
+            lines = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+            result = import_punch_log(lines, replace=replace, progress=lambda done: job.progress(done))
+    except JobCancelled:
+        default_storage.delete(path)
+        raise
+    default_storage.delete(path)
+    job.progress(total, force=True)
+    return result.as_dict()
+
+
+@register_job('render_payslips')
+def render_payslips_job(job, year, month, department=None, bundle=''):
+    """Dựng sẵn phiếu lương đã xác nhận của tháng; bundle='zip'/'pdf' để HR tải một file gộp"""
+    result = render_month_payslips(
+        year, month, department,
+        progress=lambda done, total: job.progress(done, total, message='Đang dựng phiếu lương')
+    )
+    summary = (f"{len(result['payrolls'])} phiếu lương tháng {month}/{year}: "
+               f"dựng mới {result['rendered']}, đã có sẵn {result['cached']}.")
+    if not bundle or not result['payrolls']:
+        return {'summary': summary}
+
+    job.progress(message='Đang đóng gói phiếu lương', force=True)
+    filename = f'Phieu_luong_{month:02d}_{year}.{bundle}'
+    with tempfile.TemporaryFile() as tmp:
+        write_payslip_bundle(result['payrolls'], bundle, tmp)
+        tmp.seek(0)
+        path = default_storage.save(os.path.join(EXPORT_DIR, f'{job.id}_{filename}'), File(tmp))
+    return {'path': path, 'filename': filename, 'summary': summary}
@@ -0,0 +1,294 @@
+"""
+Background jobs
+Hàng đợi tác vụ nền lưu trong database (bảng BackgroundJob), không cần broker:
+
+- View gọi enqueue_job() rồi trả về ngay; giao diện polling API tiến độ.
+- Lệnh `python manage.py run_jobs` nhận job (select_for_update skip_locked) và
+  chạy trong process pool; mỗi job có thread heartbeat ghi tiến độ và heartbeat_at.
+- Job có heartbeat quá JOB_STALE_SECONDS (worker chết / bị kill) được đưa lại
+  hàng đợi, tối đa JOB_MAX_ATTEMPTS lần.
+- Hủy job: job đang chờ bị hủy ngay; job đang chạy được đánh dấu
+  cancel_requested và dừng ở lần báo tiến độ kế tiếp (JobCancelled).
+
+Usage:
+    @register_job('generate_appraisals')
+    def generate_appraisals_job(job, period_id):
+        job.progress(0, total)
+        ...
+        return {'created': created}
+
+    job = enqueue_job('generate_appraisals', {'period_id': 1}, user=request.user)
+
+Settings:
+    JOB_WORKER_PROCESSES (số CPU), JOB_HEARTBEAT_INTERVAL (2 giây),
+    JOB_STALE_SECONDS (120 giây), JOB_MAX_ATTEMPTS (3)
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER_PROCESSES = getattr(settings, 'JOB_WORKER_PROCESSES', os.cpu_count() or 2)
+JOB_HEARTBEAT_INTERVAL = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 2)
+JOB_STALE_SECONDS = getattr(settings, 'JOB_STALE_SECONDS', 120)
+JOB_MAX_ATTEMPTS = getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+JOB_HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    """Job bị hủy bởi người dùng trong khi đang chạy"""
+
+
+def register_job(kind):
+    """Đăng ký handler(job, **params) -> dict kết quả cho loại job `kind`"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# ======================== ENQUEUE / CANCEL ========================
+
+def enqueue_job(kind, params=None, user=None, label=''):
+    """
+    Ghi job vào hàng đợi (trong transaction hiện tại nếu có).
+
+    Returns:
+        BackgroundJob
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    job = BackgroundJob.objects.create(
+        kind=kind, label=label[:255], params=params or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    logger.info(f"Job {job.id} ({kind}) queued by {getattr(user, 'username', None)}")
+    return job
+
+
+def cancel_job(job):
+    """
+    Hủy job: job đang chờ bị hủy ngay, job đang chạy được yêu cầu dừng.
+
+    Returns:
+        bool: False nếu job đã kết thúc
+    """
+    now = timezone.now()
+    if BackgroundJob.objects.filter(pk=job.pk, status='queued').update(
+        status='cancelled', cancel_requested=True, finished_at=now, message='Đã hủy'
+    ):
+        return True
+    return bool(
+        BackgroundJob.objects.filter(pk=job.pk, status='running').update(cancel_requested=True)
+    )
+
+
+# ======================== PROGRESS ========================
+
+class JobContext:
+    """
+    Đối tượng truyền vào handler để báo tiến độ và kiểm tra yêu cầu hủy.
+
+    Khi chạy trong worker, tiến độ chỉ được ghi vào bộ nhớ và thread heartbeat
+    (kết nối database riêng) đẩy xuống định kỳ - nhờ vậy giao diện vẫn thấy
+    tiến độ khi handler đang ở giữa một transaction dài.
+    """
+
+    def __init__(self, job, flush_inline=True):
+        self.job = job
+        self.done = job.progress_done
+        self.total = job.progress_total
+        self.message = job.message
+        self.flush_inline = flush_inline
+        self._cancelled = threading.Event()
+        self._last_flush = 0.0
+
+    @property
+    def id(self):
+        return self.job.id
+
+    def progress(self, done=None, total=None, message=None, force=False):
+        """Cập nhật tiến độ và dừng job (JobCancelled) nếu người dùng đã yêu cầu hủy"""
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message[:255]
+
+        if self.flush_inline:
+            now = time.monotonic()
+            if force or now - self._last_flush >= JOB_HEARTBEAT_INTERVAL:
+                self._last_flush = now
+                self.flush()
+        self.check_cancelled()
+
+    def advance(self, step=1, message=None):
+        self.progress(self.done + step, message=message)
+
+    def flush(self):
+        """Ghi tiến độ + heartbeat xuống database và đọc cờ hủy"""
+        BackgroundJob.objects.filter(pk=self.job.pk).update(
+            progress_done=self.done, progress_total=self.total, message=self.message,
+            heartbeat_at=timezone.now()
+        )
+        if BackgroundJob.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            self._cancelled.set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+
+class _Heartbeat(threading.Thread):
+    """Định kỳ ghi tiến độ / heartbeat_at và đọc cờ hủy cho job đang chạy"""
+
+    def __init__(self, context):
+        super().__init__(daemon=True, name=f'job-heartbeat-{context.id}')
+        self.context = context
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(JOB_HEARTBEAT_INTERVAL):
+                try:
+                    self.context.flush()
+                except Exception as e:
+                    logger.warning(f"Heartbeat for job {self.context.id} failed: {e}")
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(JOB_HEARTBEAT_INTERVAL)
+
+
+# ======================== EXECUTION ========================
+
+def claim_next_job(worker=None):
+    """Nhận job chờ lâu nhất và đánh dấu 'running' để worker khác không chạy trùng"""
+    now = timezone.now()
+    fields = dict(
+        status='running', started_at=now, heartbeat_at=now, worker=worker or worker_name(),
+        attempts=F('attempts') + 1
+    )
+    queued = BackgroundJob.objects.filter(status='queued').order_by('id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_id = queued.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if job_id is None:
+                return None
+            queued.filter(id=job_id).update(**fields)
+        return BackgroundJob.objects.get(id=job_id)
+
+    # SQLite: SELECT rồi UPDATE trong cùng transaction dễ bị "database is locked" khi
+    # nâng cấp khóa, nên dùng UPDATE có điều kiện (nguyên tử) và thử job kế tiếp nếu bị tranh
+    for job_id in queued.values_list('id', flat=True)[:10]:
+        if BackgroundJob.objects.filter(id=job_id, status='queued').update(**fields):
+            return BackgroundJob.objects.get(id=job_id)
+    return None
+
+
+def _finish(job_id, status, **fields):
+    BackgroundJob.objects.filter(pk=job_id, status='running').update(
+        status=status, finished_at=timezone.now(), **fields
+    )
+
+
+def run_job(job_id, heartbeat=True):
+    """Chạy handler của một job đã được nhận (status='running') và lưu kết quả"""
+    job = BackgroundJob.objects.get(pk=job_id)
+    context = JobContext(job, flush_inline=not heartbeat)
+    beat = _Heartbeat(context) if heartbeat else None
+    if beat:
+        beat.start()
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        result = handler(context, **job.params)
+    except JobCancelled:
+        logger.info(f"Job {job_id} ({job.kind}) cancelled")
+        _finish(job_id, 'cancelled', progress_done=context.done, message='Đã hủy')
+    except Exception as e:
+        logger.error(f"Job {job_id} ({job.kind}) failed: {e}", exc_info=True)
+        _finish(job_id, 'failed', progress_done=context.done, message=str(e)[:255],
+                error=traceback.format_exc())
+    else:
+        _finish(
+            job_id, 'succeeded', progress_done=max(context.done, context.total),
+            progress_total=context.total, message=context.message, result=result or {}
+        )
+        logger.info(f"Job {job_id} ({job.kind}) succeeded")
+    finally:
+        if beat:
+            beat.stop()
+
+
+def execute_job(job_id):
+    """Entry point chạy trong process con của worker"""
+    try:
+        run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def fail_or_retry_job(job_id, error):
+    """Job bị gián đoạn (process con chết): đưa lại hàng đợi hoặc đánh dấu thất bại"""
+    job = BackgroundJob.objects.filter(pk=job_id, status='running').first()
+    if job is None:
+        return None
+    if job.attempts < JOB_MAX_ATTEMPTS and not job.cancel_requested:
+        BackgroundJob.objects.filter(pk=job_id, status='running').update(
+            status='queued', worker='', message=f'Thử lại sau lỗi: {error}'[:255]
+        )
+        return 'queued'
+    _finish(job_id, 'cancelled' if job.cancel_requested else 'failed',
+            message=str(error)[:255], error=str(error))
+    return 'failed'
+
+
+def requeue_stale_jobs():
+    """Xử lý các job 'running' không còn heartbeat (worker bị kill / mất điện)"""
+    cutoff = timezone.now() - timedelta(seconds=JOB_STALE_SECONDS)
+    stale_ids = list(
+        BackgroundJob.objects.filter(status='running', heartbeat_at__lt=cutoff).values_list('id', flat=True)
+    )
+    for job_id in stale_ids:
+        outcome = fail_or_retry_job(job_id, 'Worker ngừng phản hồi')
+        logger.warning(f"Stale job {job_id}: {outcome}")
+    return len(stale_ids)
+
+
+def job_status_data(job):
+    """Dữ liệu JSON cho API tiến độ"""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "label": job.label,
+        "job_status": job.status,
+        "job_status_display": job.get_status_display(),
+        "done": job.progress_done,
+        "total": job.progress_total,
+        "percent": job.percent,
+        "message": job.message,
+        "result": job.result if job.status == 'succeeded' else {},
+        "finished": job.is_finished,
+        "cancel_requested": job.cancel_requested,
+    }
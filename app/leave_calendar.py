@@ -0,0 +1,153 @@
+"""
+Leave calendar feed
+Dữ liệu cho lịch nghỉ phép nhóm (FullCalendar) trên portal:
+
+- Chỉ lấy đơn giao với khung đang xem (start / end do FullCalendar gửi lên):
+  start_date < end AND end_date >= start, có index (end_date, start_date) nên đơn
+  của các năm trước không bị quét; chỉ chọn các cột cần hiển thị bằng values().
+- calendar_version() trả về (số đơn, updated_at lớn nhất) của khung - dùng làm
+  ETag / Last-Modified để trình duyệt nhận 304 khi tháng đang xem không đổi.
+- absence_heatmap() đếm số người nghỉ (đã duyệt / chờ duyệt) của từng ngày bằng
+  MỘT truy vấn tổng hợp (mỗi ngày một COUNT DISTINCT có điều kiện).
+
+Usage:
+    window = parse_window(request.GET)
+    events = leave_events(employee, *window)
+    days = absence_heatmap(employee.department_id, *window)
+"""
+import hashlib
+from datetime import timedelta
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .date_utils import month_bounds
+from .models import Employee, LeaveRequest
+
+# Khung tối đa của một request (danh sách / heatmap)
+MAX_WINDOW_DAYS = 366
+MAX_HEATMAP_DAYS = 62
+
+STATUS_COLORS = {
+    'approved': '#28a745',
+    'pending': '#ffc107',
+    'rejected': '#dc3545',
+    'cancelled': '#6c757d',
+}
+# Trạng thái được tính là vắng mặt trên heatmap
+ABSENCE_STATUSES = ('approved', 'pending')
+
+
+def _parse_day(value):
+    """Ngày từ tham số FullCalendar ("2025-03-31T00:00:00+07:00" hoặc "2025-03-31")"""
+    if not value:
+        return None
+    if 'T' in value:
+        # '+' của múi giờ không được mã hóa trong query string bị giải mã thành khoảng trắng
+        value = value.replace(' ', '+')
+    try:
+        parsed = parse_datetime(value)
+        if parsed is not None:
+            return timezone.localtime(parsed).date() if timezone.is_aware(parsed) else parsed.date()
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def parse_window(params, max_days=MAX_WINDOW_DAYS):
+    """
+    Khung [start, end) từ tham số start / end; mặc định là tháng hiện tại.
+
+    Returns:
+        tuple (start, end) hoặc None nếu tham số không hợp lệ / khung quá lớn
+    """
+    if 'start' not in params and 'end' not in params:
+        today = timezone.localdate()
+        return month_bounds(today.year, today.month)
+    start, end = _parse_day(params.get('start')), _parse_day(params.get('end'))
+    if start is None or end is None or end <= start or (end - start).days > max_days:
+        return None
+    return start, end
+
+
+def _window_leaves(department_id, start, end):
+    return LeaveRequest.objects.filter(
+        employee__department_id=department_id, start_date__lt=end, end_date__gte=start
+    )
+
+
+def calendar_version(department_id, start, end):
+    """(số đơn, updated_at lớn nhất) của các đơn giao với khung - đổi khi có đơn thêm / sửa / xóa"""
+    state = _window_leaves(department_id, start, end).order_by().aggregate(
+        count=Count('id'), last_modified=Max('updated_at')
+    )
+    return state['count'], state['last_modified']
+
+
+def calendar_etag(employee_id, mode, start, end, version):
+    count, last_modified = version
+    raw = f'{employee_id}:{mode}:{start}:{end}:{count}:{last_modified.isoformat() if last_modified else ""}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def leave_events(employee, start, end):
+    """Sự kiện FullCalendar cho các đơn nghỉ của phòng ban trong khung"""
+    rows = _window_leaves(employee.department_id, start, end).order_by('start_date', 'id').values(
+        'id', 'employee_id', 'employee__name', 'employee__employee_code', 'leave_type__name',
+        'start_date', 'end_date', 'total_days', 'status', 'reason',
+    )
+    events = []
+    for row in rows:
+        color = STATUS_COLORS.get(row['status'], STATUS_COLORS['cancelled'])
+        is_mine = row['employee_id'] == employee.id
+        events.append({
+            'id': row['id'],
+            'title': f"{row['employee__name']} - {row['leave_type__name']}",
+            'start': row['start_date'].isoformat(),
+            'end': (row['end_date'] + timedelta(days=1)).isoformat(),  # FullCalendar: end không bao gồm
+            'backgroundColor': color,
+            'borderColor': color,
+            'borderWidth': '3px' if is_mine else '1px',
+            'extendedProps': {
+                'employee': row['employee__name'],
+                'employee_code': row['employee__employee_code'],
+                'leave_type': row['leave_type__name'],
+                'total_days': row['total_days'],
+                'status': row['status'],
+                'reason': row['reason'],
+                'is_mine': is_mine,
+            },
+        })
+    return events
+
+
+def absence_heatmap(department_id, start, end):
+    """
+    Số người nghỉ theo ngày trong khung [start, end).
+
+    Returns:
+        dict: {'team_size': n, 'days': [{'date', 'absent', 'pending'}, ...]}
+    """
+    days = [start + timedelta(days=offset) for offset in range((end - start).days)]
+    aggregates = {}
+    for index, day in enumerate(days):
+        covers = Q(start_date__lte=day, end_date__gte=day)
+        aggregates[f'absent_{index}'] = Count('employee', distinct=True, filter=covers & Q(status='approved'))
+        aggregates[f'pending_{index}'] = Count('employee', distinct=True, filter=covers & Q(status='pending'))
+    counts = (
+        _window_leaves(department_id, start, end)
+        .filter(status__in=ABSENCE_STATUSES).order_by().aggregate(**aggregates)
+    )
+
+    return {
+        'team_size': Employee.objects.filter(department_id=department_id).count(),
+        'days': [
+            {
+                'date': day.isoformat(),
+                'absent': counts[f'absent_{index}'],
+                'pending': counts[f'pending_{index}'],
+            }
+            for index, day in enumerate(days)
+        ],
+    }
@@ -2,34 +2,46 @@
 Helper functions for leave management
 Handle leave balance calculation and payroll integration
 """
-from datetime import timedelta
 from django.utils import timezone
 from django.db import transaction
 
 from .models import LeaveRequest, LeaveBalance
+from .leave_ledger import ensure_balances, post_entries, settle_leave_requests
+from .working_calendar import working_days_between
 
 
-def calculate_working_days(start_date, end_date):
+def calculate_working_days(start_date, end_date, department_id=None):
     """
-    Calculate number of working days (Monday-Friday) between two dates
+    Calculate number of working days between two dates (inclusive)
+    Weekends and holidays of the working calendar are excluded
     
     Args:
         start_date: datetime.date - Start date
         end_date: datetime.date - End date
+        department_id: int - Use the department's own calendar overrides (optional)
         
     Returns:
         int: Number of working days
     """
-    total_days = 0
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # 0 = Monday, 6 = Sunday
-        if current_date.weekday() < 5:  # Monday to Friday
-            total_days += 1
-        current_date += timedelta(days=1)
+    return working_days_between(start_date, end_date, department_id)
+
+
+def refresh_leave_days(leave_request):
+    """
+    Recount total_days of a full-day leave request against the current working calendar
+    Half-day requests (total_days < 1) are kept as entered
     
-    return total_days
+    Args:
+        leave_request: LeaveRequest object (not saved here)
+        
+    Returns:
+        float: New total_days minus the previous value (0 if unchanged)
+    """
+    if not leave_request.total_days or leave_request.total_days < 1:
+        return 0
+    previous = leave_request.total_days
+    leave_request.total_days = leave_request.calculate_working_days()
+    return leave_request.total_days - previous
 
 
 def check_leave_balance(employee, leave_type, requested_days, year=None):
@@ -51,21 +63,13 @@ def check_leave_balance(employee, leave_type, requested_days, year=None):
     if year is None:
         year = timezone.now().year
     
-    leave_balance = LeaveBalance.objects.filter(
-        employee=employee,
-        leave_type=leave_type,
-        year=year
-    ).first()
-    
-    if not leave_balance:
-        # Create new leave balance if not exists
-        leave_balance = LeaveBalance.objects.create(
-            employee=employee,
-            leave_type=leave_type,
-            year=year,
-            total_days=leave_type.max_days_per_year,
-            used_days=0
-        )
+    key = (employee.id, leave_type.id, year)
+    balances = LeaveBalance.objects.filter(pk=ensure_balances([key])[key])
+    if transaction.get_connection().in_atomic_block:
+        # Lock the balance until the reservation is posted, so two concurrent
+        # requests cannot both pass the check
+        balances = balances.select_for_update()
+    leave_balance = balances.get()
     
     if leave_balance.remaining_days < requested_days:
         return (
@@ -78,9 +82,10 @@ def check_leave_balance(employee, leave_type, requested_days, year=None):
 
 
 @transaction.atomic
-def update_leave_balance(employee, leave_type, days, operation='add', year=None):
+def update_leave_balance(employee, leave_type, days, operation='add', year=None, user=None, note=''):
     """
-    Update leave balance when leave is approved/rejected/cancelled
+    Manually adjust used days of a leave balance through the ledger
+    Leave requests should use settle_leave_requests() instead
     
     Args:
         employee: Employee object
@@ -88,6 +93,8 @@ def update_leave_balance(employee, leave_type, days, operation='add', year=None)
         days: float - Number of days to add/subtract
         operation: str - 'add' to add used_days, 'subtract' to remove used_days
         year: int - Year (default: current year)
+        user: User making the adjustment (optional)
+        note: str - Ledger note (optional)
         
     Returns:
         LeaveBalance: Updated balance object
@@ -95,24 +102,16 @@ def update_leave_balance(employee, leave_type, days, operation='add', year=None)
     if year is None:
         year = timezone.now().year
     
-    leave_balance, created = LeaveBalance.objects.get_or_create(
-        employee=employee,
-        leave_type=leave_type,
-        year=year,
-        defaults={
-            'total_days': leave_type.max_days_per_year,
-            'used_days': 0
-        }
-    )
-    
-    if operation == 'add':
-        leave_balance.used_days += days
-    elif operation == 'subtract':
-        leave_balance.used_days = max(0, leave_balance.used_days - days)
-    
-    leave_balance.save()  # Auto-calculate remaining_days in model
+    post_entries([{
+        'employee_id': employee.id,
+        'leave_type_id': leave_type.id,
+        'year': year,
+        'days': days if operation == 'add' else -days,
+        'kind': 'adjust',
+        'note': note,
+    }], user=user)
     
-    return leave_balance
+    return LeaveBalance.objects.get(employee=employee, leave_type=leave_type, year=year)
 
 
 def approve_leave_request(leave_request, approved_by):
@@ -131,8 +130,9 @@ def approve_leave_request(leave_request, approved_by):
     
     try:
         with transaction.atomic():
-            # Check if balance was already updated (in case of duplicate approval)
-            year = leave_request.start_date.year
+            # Holidays may have been added to the calendar since the request was
+            # submitted: recount the days
+            refresh_leave_days(leave_request)
             
             # Update leave request status
             leave_request.status = 'approved'
@@ -140,8 +140,9 @@ def approve_leave_request(leave_request, approved_by):
             leave_request.approved_at = timezone.now()
             leave_request.save()
             
-            # Note: Leave balance was already updated when request was created
-            # No need to update again here
+            # Days were reserved when the request was created: only a recount
+            # difference is posted to the ledger here
+            settle_leave_requests([leave_request])
             
             return (True, 'Đã duyệt đơn nghỉ phép thành công!')
     except Exception as e:
@@ -165,17 +166,6 @@ def reject_leave_request(leave_request, rejected_by, reason=''):
     
     try:
         with transaction.atomic():
-            year = leave_request.start_date.year
-            
-            # Restore leave balance (subtract used_days)
-            update_leave_balance(
-                employee=leave_request.employee,
-                leave_type=leave_request.leave_type,
-                days=leave_request.total_days,
-                operation='subtract',
-                year=year
-            )
-            
             # Update leave request status
             leave_request.status = 'rejected'
             leave_request.approved_by = rejected_by
@@ -183,6 +173,9 @@ def reject_leave_request(leave_request, rejected_by, reason=''):
             leave_request.rejection_reason = reason
             leave_request.save()
             
+            # Release the days reserved for this request
+            settle_leave_requests([leave_request])
+            
             return (True, 'Đã từ chối đơn nghỉ phép và hoàn lại số ngày phép!')
     except Exception as e:
         return (False, f'Lỗi khi từ chối đơn: {str(e)}')
@@ -208,21 +201,13 @@ def cancel_leave_request(leave_request):
     
     try:
         with transaction.atomic():
-            year = leave_request.start_date.year
-            
-            # Restore leave balance (subtract used_days)
-            update_leave_balance(
-                employee=leave_request.employee,
-                leave_type=leave_request.leave_type,
-                days=leave_request.total_days,
-                operation='subtract',
-                year=year
-            )
-            
             # Update leave request status
             leave_request.status = 'cancelled'
             leave_request.save()
             
+            # Release the days reserved for this request
+            settle_leave_requests([leave_request])
+            
             return (True, 'Đã hủy đơn nghỉ phép và hoàn lại số ngày phép!')
     except Exception as e:
         return (False, f'Lỗi khi hủy đơn: {str(e)}')
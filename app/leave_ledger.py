@@ -0,0 +1,209 @@
+"""
+Leave balance ledger
+Mọi thay đổi số ngày phép đã dùng đi qua sổ cái LeaveBalanceTransaction (chỉ ghi thêm):
+
+- Bút toán được bulk_create, rồi chênh lệch được cộng dồn theo số dư
+  (employee, leave_type, year) và áp dụng bằng MỘT câu UPDATE với F() + CASE,
+  nên không có read-modify-write trong Python và không mất cập nhật khi
+  quản lý (portal) và HR (management) duyệt cùng lúc.
+- Đơn nghỉ phép giữ phép khi gửi, hoàn phép khi bị từ chối / hủy:
+  settle_leave_requests() so số ngày mục tiêu của từng đơn với số đã ghi sổ
+  và chỉ ghi phần chênh lệch (gọi lại nhiều lần không ghi trùng).
+- rebuild_balances() dựng lại used_days / remaining_days từ sổ cái bằng một
+  truy vấn gộp (lệnh `python manage.py reconcile_leave_balances`).
+
+Usage:
+    leave_request.status = 'rejected'
+    leave_request.save()
+    settle_leave_requests([leave_request], user=request.user)
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+
+from .models import LeaveBalance, LeaveBalanceTransaction, LeaveType
+
+logger = logging.getLogger(__name__)
+
+# Trạng thái đơn đang chiếm số ngày phép
+HOLDING_STATUSES = ('pending', 'approved')
+# Sai số cho phép khi so sánh số ngày (FloatField, có nửa ngày)
+LEDGER_TOLERANCE = 1e-6
+
+
+def balance_key(leave_request):
+    return (leave_request.employee_id, leave_request.leave_type_id, leave_request.start_date.year)
+
+
+def ensure_balances(keys):
+    """
+    Lấy (tạo nếu chưa có) LeaveBalance cho các khóa (employee_id, leave_type_id, year).
+
+    Returns:
+        dict: {key: balance_id}
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    def fetch():
+        rows = LeaveBalance.objects.filter(
+            employee_id__in={key[0] for key in keys},
+            leave_type_id__in={key[1] for key in keys},
+            year__in={key[2] for key in keys},
+        ).values_list('employee_id', 'leave_type_id', 'year', 'id')
+        return {row[:3]: row[3] for row in rows if row[:3] in keys}
+
+    balance_ids = fetch()
+    missing = keys - balance_ids.keys()
+    if missing:
+        leave_types = LeaveType.objects.in_bulk({key[1] for key in missing})
+        LeaveBalance.objects.bulk_create([
+            LeaveBalance(
+                employee_id=employee_id, leave_type_id=leave_type_id, year=year,
+                total_days=leave_types[leave_type_id].max_days_per_year, used_days=0,
+                remaining_days=leave_types[leave_type_id].max_days_per_year,
+            )
+            for employee_id, leave_type_id, year in missing
+        ], ignore_conflicts=True)
+        balance_ids = fetch()
+    return balance_ids
+
+
+def _apply_deltas(deltas):
+    """Cộng {balance_id: days} vào used_days (trừ remaining_days) trong một câu UPDATE"""
+    deltas = {balance_id: days for balance_id, days in deltas.items() if days}
+    if not deltas:
+        return
+    delta = Case(
+        *[When(pk=balance_id, then=Value(days)) for balance_id, days in deltas.items()],
+        default=Value(0.0), output_field=FloatField()
+    )
+    LeaveBalance.objects.filter(pk__in=deltas).update(
+        used_days=F('used_days') + delta,
+        remaining_days=F('remaining_days') - delta,
+    )
+
+
+@transaction.atomic
+def post_entries(entries, user=None):
+    """
+    Ghi các bút toán và cập nhật số dư tương ứng.
+
+    Args:
+        entries: list dict với các khóa employee_id, leave_type_id, year, days, kind
+            và (tùy chọn) leave_request_id, note
+        user: User thực hiện (optional)
+
+    Returns:
+        list: LeaveBalanceTransaction đã tạo
+    """
+    entries = [entry for entry in entries if entry['days']]
+    if not entries:
+        return []
+
+    balance_ids = ensure_balances(
+        (entry['employee_id'], entry['leave_type_id'], entry['year']) for entry in entries
+    )
+    created_by = user if user is not None and user.is_authenticated else None
+    transactions = []
+    deltas = {}
+    for entry in entries:
+        balance_id = balance_ids[(entry['employee_id'], entry['leave_type_id'], entry['year'])]
+        transactions.append(LeaveBalanceTransaction(
+            balance_id=balance_id,
+            leave_request_id=entry.get('leave_request_id'),
+            kind=entry['kind'],
+            days=entry['days'],
+            note=entry.get('note', '')[:255],
+            created_by=created_by,
+        ))
+        deltas[balance_id] = deltas.get(balance_id, 0) + entry['days']
+
+    LeaveBalanceTransaction.objects.bulk_create(transactions, batch_size=1000)
+    _apply_deltas(deltas)
+    return transactions
+
+
+def posted_days(leave_request_ids):
+    """Số ngày đã ghi sổ cho từng đơn: {leave_request_id: days}"""
+    rows = (
+        LeaveBalanceTransaction.objects.filter(leave_request_id__in=leave_request_ids)
+        .values('leave_request_id').annotate(total=Sum('days')).order_by()
+    )
+    return {row['leave_request_id']: row['total'] for row in rows}
+
+
+@transaction.atomic
+def settle_leave_requests(leave_requests, user=None, note=''):
+    """
+    Đưa sổ cái về đúng trạng thái hiện tại của các đơn: đơn chờ duyệt / đã duyệt giữ
+    total_days ngày, đơn bị từ chối / đã hủy không giữ ngày nào.
+
+    Returns:
+        list: LeaveBalanceTransaction đã tạo (rỗng nếu sổ đã khớp)
+    """
+    leave_requests = list(leave_requests)
+    posted = posted_days([leave.id for leave in leave_requests])
+    entries = []
+    for leave in leave_requests:
+        target = (leave.total_days or 0) if leave.status in HOLDING_STATUSES else 0
+        days = target - posted.get(leave.id, 0)
+        if not days:
+            continue
+        employee_id, leave_type_id, year = balance_key(leave)
+        entries.append({
+            'employee_id': employee_id,
+            'leave_type_id': leave_type_id,
+            'year': year,
+            'days': days,
+            'kind': 'reserve' if days > 0 else 'release',
+            'leave_request_id': leave.id,
+            'note': note or f'Đơn #{leave.id} - {leave.get_status_display()}',
+        })
+    return post_entries(entries, user=user)
+
+
+@transaction.atomic
+def rebuild_balances(balances=None, dry_run=False):
+    """
+    Dựng lại used_days / remaining_days từ tổng sổ cái (một truy vấn gộp).
+
+    Args:
+        balances: queryset LeaveBalance cần kiểm tra (mặc định: tất cả)
+        dry_run: chỉ báo cáo, không ghi
+
+    Returns:
+        list: [(LeaveBalance, used_days trước đó, used_days theo sổ cái), ...] các số dư bị lệch
+    """
+    if balances is None:
+        balances = LeaveBalance.objects.all()
+    scope = balances.values('id')
+    balances = balances.select_related('employee', 'leave_type').order_by('id')
+    if not dry_run:
+        # Khóa số dư trước khi cộng sổ: bút toán đang ghi dở sẽ chờ và cộng sau
+        balances = balances.select_for_update(of=('self',))
+    balances = list(balances)
+
+    ledger = dict(
+        LeaveBalanceTransaction.objects.filter(balance__in=scope)
+        .values('balance').annotate(total=Sum('days')).values_list('balance', 'total').order_by()
+    )
+    mismatched = []
+    for balance in balances:
+        ledger_days = ledger.get(balance.id) or 0
+        expected_remaining = balance.total_days - ledger_days
+        if (abs(balance.used_days - ledger_days) > LEDGER_TOLERANCE
+                or abs(balance.remaining_days - expected_remaining) > LEDGER_TOLERANCE):
+            mismatched.append((balance, balance.used_days, ledger_days))
+
+    if mismatched and not dry_run:
+        for balance, _, ledger_days in mismatched:
+            balance.used_days = ledger_days
+            balance.remaining_days = balance.total_days - ledger_days
+        LeaveBalance.objects.bulk_update(
+            [balance for balance, _, _ in mismatched], ['used_days', 'remaining_days'], batch_size=500
+        )
+        logger.warning(f"Rebuilt {len(mismatched)} leave balances from the ledger")
+    return mismatched
@@ -0,0 +1,61 @@
+"""
+Django management command to move closed attendance months into the compact archive
+Chạy hằng tháng (cron): chuyển các tháng cũ hơn ATTENDANCE_HOT_MONTHS từ bảng Attendance
+sang AttendanceArchive (một dòng nén cho mỗi nhân viên / tháng).
+Usage:
+    python manage.py archive_attendance                          # mọi tháng đã đóng
+    python manage.py archive_attendance --year 2024 --month 3
+    python manage.py archive_attendance --restore --year 2024 --month 3   # đưa về bảng chính để sửa
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.attendance_archive import HOT_MONTHS, archivable_months, archive_month, restore_month
+
+
+class Command(BaseCommand):
+    help = 'Archive closed attendance months into compressed per-employee monthly rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Năm cần lưu trữ (đi cùng --month)')
+        parser.add_argument('--month', type=int, help='Tháng cần lưu trữ (1-12)')
+        parser.add_argument('--restore', action='store_true',
+                            help='Đưa tháng đã lưu trữ về bảng chính (cần --year và --month)')
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if (year or month) and not (year and month and 1 <= month <= 12):
+            raise CommandError('Cần cả --year và --month (1-12)')
+
+        if options['restore']:
+            if not year:
+                raise CommandError('--restore cần --year và --month')
+            restored = restore_month(year, month)
+            self.stdout.write(self.style.SUCCESS(f'✅ Đã khôi phục {restored} bản ghi {month:02d}/{year}'))
+            return
+
+        months = [(year, month)] if year else archivable_months()
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('🗄️  LƯU TRỮ CHẤM CÔNG CÁC THÁNG ĐÃ ĐÓNG')
+        self.stdout.write(f'   Giữ lại {HOT_MONTHS} tháng gần nhất trong bảng chính')
+        self.stdout.write('=' * 60)
+
+        start = time.perf_counter()
+        total = 0
+        for archive_year, archive_month_number in months:
+            try:
+                counts = archive_month(archive_year, archive_month_number)
+            except ValueError as e:
+                raise CommandError(str(e))
+            total += counts['rows']
+            self.stdout.write(
+                f'   📅 {archive_month_number:02d}/{archive_year}: {counts["rows"]} bản ghi, '
+                f'{counts["employees"]} nhân viên'
+            )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✅ Đã lưu trữ {total} bản ghi của {len(months)} tháng'))
+        self.stdout.write(f'⏱️  {elapsed:.1f}s')
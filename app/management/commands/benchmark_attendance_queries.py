@@ -0,0 +1,153 @@
+"""
+Django management command to benchmark attendance lookups before/after the work_date index.
+Seeds a synthetic attendance table inside a transaction (rolled back by default), then prints
+the query plan and timing of the legacy date__year/__month/__date lookups versus the
+range / equality lookups on the indexed work_date column.
+
+Usage: python manage.py benchmark_attendance_queries --rows 5000000 --employees 2000
+"""
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.date_utils import month_filter
+from app.models import Attendance, Department, Employee, JobTitle
+
+
+class Command(BaseCommand):
+    help = 'Seed a large attendance table and compare query plans of date__* vs work_date lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=5_000_000,
+            help='Number of attendance rows to seed (default: 5,000,000)'
+        )
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=2000,
+            help='Number of synthetic employees the rows are spread over (default: 2000)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Rows per bulk insert (default: 10000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Executions per query when timing (default: 20)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of rolling back'
+        )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['employees'] < 1:
+            raise CommandError('--rows và --employees phải lớn hơn 0')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('⏱️  BENCHMARK TRUY VẤN CHẤM CÔNG')
+        self.stdout.write(f"🗄️  Database: {connection.vendor}")
+        self.stdout.write('=' * 60)
+
+        with transaction.atomic():
+            employees = self._seed_employees(options['employees'])
+            last_day = self._seed_attendance(employees, options['rows'], options['batch_size'])
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE app_attendance')
+
+            self._compare(employees[len(employees) // 2], last_day, options['repeat'])
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+                self.stdout.write('\n↩️  Đã rollback dữ liệu benchmark')
+
+    def _seed_employees(self, count):
+        department = Department.objects.create(name='Benchmark', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Benchmark', salary_coefficient=1.0)
+        employees = [
+            Employee(
+                employee_code=f'BM{i:06d}', name=f'Benchmark {i}', gender=0,
+                birthday=date(1990, 1, 1), place_of_birth='-', place_of_origin='-',
+                place_of_residence='-', identification=f'BM{i:010d}', date_of_issue=date(2010, 1, 1),
+                place_of_issue='-', nationality='-', nation='-', religion='-',
+                email=f'bm{i}@benchmark.local', phone=f'BM{i:08d}', address='-', marital_status=0,
+                job_title=job_title, job_position='-', department=department, salary=10000000,
+                contract_start_date=date(2020, 1, 1), contract_duration=12, status=2,
+                education_level=0, major='-', school='-'
+            )
+            for i in range(count)
+        ]
+        return Employee.objects.bulk_create(employees)
+
+    def _seed_attendance(self, employees, rows, batch_size):
+        """Mỗi nhân viên một bản ghi mỗi ngày, lùi dần từ hôm nay"""
+        days = -(-rows // len(employees))
+        today = timezone.localtime(timezone.now()).date()
+        start = time.perf_counter()
+        batch = []
+        created = 0
+        for offset in range(days):
+            work_date = today - timedelta(days=offset)
+            check_in = timezone.make_aware(datetime.combine(work_date, dt_time(8, 0)))
+            for employee in employees:
+                if created + len(batch) >= rows:
+                    break
+                batch.append(Attendance(
+                    employee_id=employee.id, date=check_in, work_date=work_date,
+                    status='Có làm việc', working_hours=8
+                ))
+                if len(batch) >= batch_size:
+                    Attendance.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+        if batch:
+            Attendance.objects.bulk_create(batch)
+            created += len(batch)
+        self.stdout.write(
+            f'🌱 Đã tạo {created:,} bản ghi ({days} ngày) trong {time.perf_counter() - start:.1f}s'
+        )
+        return today
+
+    def _compare(self, employee, day, repeat):
+        cases = [
+            (
+                'Chấm công trong ngày (check-in/out)',
+                Attendance.objects.filter(employee=employee, date__date=day),
+                Attendance.objects.filter(employee=employee, work_date=day),
+            ),
+            (
+                'Chấm công theo tháng của nhân viên',
+                Attendance.objects.filter(employee=employee, date__year=day.year, date__month=day.month),
+                Attendance.objects.filter(employee=employee, **month_filter('work_date', day.year, day.month)),
+            ),
+            (
+                'Chấm công toàn công ty trong tháng',
+                Attendance.objects.filter(date__year=day.year, date__month=day.month),
+                Attendance.objects.filter(**month_filter('work_date', day.year, day.month)),
+            ),
+        ]
+        for title, legacy, indexed in cases:
+            self.stdout.write(f'\n📌 {title}')
+            for label, queryset in (('date__*', legacy), ('work_date', indexed)):
+                elapsed = self._time(queryset, repeat)
+                self.stdout.write(f'   {label:<10} {elapsed * 1000:8.2f} ms/query')
+                for line in queryset.explain().splitlines():
+                    self.stdout.write(f'      {line}')
+
+    def _time(self, queryset, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            queryset.count()
+        return (time.perf_counter() - start) / repeat
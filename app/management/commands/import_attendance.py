@@ -0,0 +1,63 @@
+"""
+Django management command to import time-clock punch logs into Attendance
+File: CSV / TSV with columns employee_code, timestamp, device (header row optional)
+Usage: python manage.py import_attendance punches.csv [--replace] [--chunk-size 5000]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.attendance_import import IMPORT_CHUNK_SIZE, import_punch_log
+
+
+class Command(BaseCommand):
+    help = 'Import fingerprint / time-clock punch logs (CSV or TSV) into attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Punch log file (employee_code, timestamp, device)')
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Overwrite existing attendance of the same employee and day'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help=f'Attendance rows per bulk insert (default: {IMPORT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size phải lớn hơn 0')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('🕒 NHẬP LOG MÁY CHẤM CÔNG')
+        self.stdout.write(f"📄 {options['path']}")
+        self.stdout.write('=' * 60)
+
+        self._reported = 0
+        start = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                result = import_punch_log(
+                    f, replace=options['replace'], chunk_size=options['chunk_size'],
+                    progress=self._progress
+                )
+        except OSError as e:
+            raise CommandError(f'Không đọc được file: {e}')
+        elapsed = time.perf_counter() - start
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(f'⚠️  {error}'))
+        for code, count in result.unknown_codes.most_common(10):
+            self.stdout.write(self.style.WARNING(f'❓ Mã nhân viên không tồn tại: {code} ({count} lần quẹt)'))
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✅ {result.summary()}'))
+        self.stdout.write(f'⏱️  {elapsed:.1f}s ({result.lines / elapsed if elapsed else 0:,.0f} dòng/s)')
+
+    def _progress(self, done):
+        if done - self._reported >= 100_000:
+            self._reported = done
+            self.stdout.write(f'   ... {done:,} dòng')
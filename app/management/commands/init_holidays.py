@@ -0,0 +1,57 @@
+"""
+Management command to load Vietnamese public holidays into the working calendar
+Usage: python manage.py init_holidays --year 2026 [--year 2027]
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.models import Holiday
+from app.working_calendar import LUNAR_HOLIDAYS, vietnam_public_holidays
+
+
+class Command(BaseCommand):
+    help = 'Load Vietnamese public holidays (company-wide) for the given years'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            action='append',
+            dest='years',
+            help='Year to load (repeatable, default: current year)'
+        )
+
+    def handle(self, *args, **options):
+        years = options['years'] or [timezone.localdate().year]
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('📅 NẠP NGÀY NGHỈ LỄ, TẾT')
+        self.stdout.write('=' * 60)
+
+        created_count = 0
+        skipped_count = 0
+        for year in years:
+            existing = set(
+                Holiday.objects.filter(date__year=year, department__isnull=True)
+                .values_list('date', flat=True)
+            )
+            holidays = [
+                Holiday(date=day, name=name, kind='public')
+                for day, name in vietnam_public_holidays(year)
+                if day not in existing
+            ]
+            Holiday.objects.bulk_create(holidays)
+            created_count += len(holidays)
+            skipped_count += len(existing)
+
+            self.stdout.write(f"\n📆 Năm {year}: thêm {len(holidays)} ngày")
+            for holiday in holidays:
+                self.stdout.write(f"   ✅ {holiday.date:%d/%m/%Y} - {holiday.name}")
+            if year not in LUNAR_HOLIDAYS:
+                self.stdout.write(
+                    f"   ⚠️  Chưa có lịch âm cho năm {year}: hãy thêm Tết Nguyên đán và "
+                    f"Giỗ Tổ Hùng Vương trong trang admin"
+                )
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(f"📊 Đã thêm {created_count} ngày, bỏ qua {skipped_count} ngày đã có")
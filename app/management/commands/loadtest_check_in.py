@@ -0,0 +1,193 @@
+"""
+Django management command to simulate the morning check-in burst against a running server.
+Seeds synthetic employees with ready-made login sessions, then fires concurrent POSTs at the
+portal check-in endpoint (optionally double-clicking) and reports latency percentiles and
+the number of attendance rows created.
+
+Usage:
+    python manage.py runserver            # in another terminal
+    python manage.py loadtest_check_in --users 5000 --concurrency 200 --repeat 2
+    python manage.py loadtest_check_in --cleanup
+
+Chạy trên PostgreSQL để có số liệu thực tế (SQLite chỉ cho một transaction ghi tại một thời
+điểm).
+"""
+import secrets
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Attendance, Department, Employee, JobTitle
+
+EMAIL_DOMAIN = 'loadtest.local'
+DEPARTMENT_NAME = 'Load test'
+
+
+class Command(BaseCommand):
+    help = 'Simulate a burst of portal check-ins from many employees against a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=5000,
+            help='Number of employees checking in (default: 5000)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Concurrent HTTP clients (default: 200)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Check-in requests per employee, >1 simulates double clicks (default: 1)'
+        )
+        parser.add_argument(
+            '--base-url',
+            default='http://127.0.0.1:8000',
+            help='Server to test (default: http://127.0.0.1:8000)'
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete the load test employees, users and attendance, then exit'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('=' * 60)
+        self.stdout.write('🚀 LOAD TEST CHECK-IN BUỔI SÁNG')
+        self.stdout.write('=' * 60)
+
+        if options['cleanup']:
+            self._cleanup()
+            return
+        if options['users'] < 1 or options['concurrency'] < 1 or options['repeat'] < 1:
+            raise CommandError('--users, --concurrency và --repeat phải lớn hơn 0')
+
+        employees = self._seed_employees(options['users'])
+        sessions = self._create_sessions(employees)
+        today = timezone.localtime(timezone.now()).date()
+        Attendance.objects.filter(employee__in=employees, work_date=today).delete()
+
+        url = options['base_url'].rstrip('/') + reverse('portal_check_in')
+        requests = [key for key in sessions for _ in range(options['repeat'])]
+        self.stdout.write(
+            f"🎯 {url}: {len(requests):,} request từ {len(sessions):,} nhân viên, "
+            f"{options['concurrency']} luồng"
+        )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(lambda session_key: self._post(url, session_key), requests))
+        elapsed = time.perf_counter() - start
+
+        self._report(results, elapsed)
+        rows = Attendance.objects.filter(employee__in=employees, work_date=today).count()
+        style = self.style.SUCCESS if rows == len(employees) else self.style.ERROR
+        self.stdout.write(style(f"🗄️  Bản ghi chấm công hôm nay: {rows:,} / {len(employees):,} nhân viên"))
+
+    def _seed_employees(self, count):
+        department, _ = Department.objects.get_or_create(
+            name=DEPARTMENT_NAME, defaults={'date_establishment': date(2020, 1, 1)}
+        )
+        job_title, _ = JobTitle.objects.get_or_create(name=DEPARTMENT_NAME, defaults={'salary_coefficient': 1.0})
+        Employee.objects.bulk_create([
+            Employee(
+                employee_code=f'LT{i:06d}', name=f'Load test {i}', gender=0,
+                birthday=date(1990, 1, 1), place_of_birth='-', place_of_origin='-',
+                place_of_residence='-', identification=f'LT{i:010d}', date_of_issue=date(2010, 1, 1),
+                place_of_issue='-', nationality='-', nation='-', religion='-',
+                email=f'lt{i}@{EMAIL_DOMAIN}', phone=f'LT{i:08d}', address='-', marital_status=0,
+                job_title=job_title, job_position='-', department=department, salary=10000000,
+                contract_start_date=date(2020, 1, 1), contract_duration=12, status=2,
+                education_level=0, major='-', school='-'
+            )
+            for i in range(count)
+        ], ignore_conflicts=True)
+        # Không cần mật khẩu: đăng nhập bằng session tạo sẵn
+        User.objects.bulk_create([
+            User(username=f'loadtest{i}', email=f'lt{i}@{EMAIL_DOMAIN}', password='!')
+            for i in range(count)
+        ], ignore_conflicts=True)
+        employees = list(Employee.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').order_by('id')[:count])
+        self.stdout.write(f'🌱 {len(employees):,} nhân viên load test')
+        return employees
+
+    def _create_sessions(self, employees):
+        """Session đã đăng nhập cho từng user (như force_login, không băm mật khẩu)"""
+        store_class = import_module(settings.SESSION_ENGINE).SessionStore
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+        users = User.objects.filter(email__in=[employee.email for employee in employees])
+        sessions = []
+        for user in users:
+            session = store_class()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = backend
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            sessions.append(session.session_key)
+        self.stdout.write(f'🔑 Đã tạo {len(sessions):,} session')
+        return sessions
+
+    def _post(self, url, session_key):
+        csrf_token = secrets.token_hex(16)
+        request = urllib.request.Request(url, data=b'', method='POST', headers={
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={csrf_token}',
+            'X-CSRFToken': csrf_token,
+            'X-Requested-With': 'XMLHttpRequest',
+        })
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, b''
+        except OSError:
+            status, body = None, b''
+        return status, b'"success"' in body, time.perf_counter() - start
+
+    def _report(self, results, elapsed):
+        latencies = sorted(latency for _, _, latency in results)
+        statuses = {}
+        for status, _, _ in results:
+            statuses[status] = statuses.get(status, 0) + 1
+        checked_in = sum(1 for status, success, _ in results if status == 200 and success)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+        self.stdout.write('\n📊 Kết quả')
+        self.stdout.write(f'   Thời gian:        {elapsed:.1f}s ({len(results) / elapsed:,.0f} req/s)')
+        self.stdout.write(f"   HTTP status:      {', '.join(f'{k}: {v:,}' for k, v in sorted(statuses.items(), key=str))}")
+        self.stdout.write(f'   Check-in mới:     {checked_in:,}')
+        self.stdout.write(f'   Đã check-in rồi:  {statuses.get(200, 0) - checked_in:,}')
+        self.stdout.write(
+            f'   Độ trễ (ms):      p50 {percentile(50):.0f} | p95 {percentile(95):.0f} | '
+            f'p99 {percentile(99):.0f} | max {latencies[-1] * 1000:.0f} | '
+            f'TB {statistics.mean(latencies) * 1000:.0f}'
+        )
+
+    def _cleanup(self):
+        employees = Employee.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+        attendance, _ = Attendance.objects.filter(employee__in=employees).delete()
+        count, _ = employees.delete()
+        users, _ = User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        Department.objects.filter(name=DEPARTMENT_NAME).delete()
+        JobTitle.objects.filter(name=DEPARTMENT_NAME).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'🧹 Đã xóa {count:,} bản ghi nhân viên (kèm liên quan), {users:,} user, {attendance:,} chấm công'
+        ))
@@ -0,0 +1,30 @@
+"""
+Django management command to rebuild the document / announcement audience index
+Chạy sau khi nạp tài liệu / thông báo bằng bulk_create / loaddata (không phát signal).
+Usage: python manage.py rebuild_content_audience
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.content_audience import rebuild_audiences
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed audience keys used by the portal document / announcement lists'
+
+    def handle(self, *args, **options):
+        self.stdout.write('=' * 60)
+        self.stdout.write('👥 DỰNG LẠI CHỈ MỤC ĐỐI TƯỢNG XEM')
+        self.stdout.write('=' * 60)
+
+        start = time.perf_counter()
+        counts = rebuild_audiences(progress=self._progress)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✅ Đã đồng bộ {sum(counts.values())} tài liệu / thông báo'))
+        self.stdout.write(f'⏱️  {elapsed:.1f}s')
+
+    def _progress(self, entity_type, count):
+        self.stdout.write(f'   📄 {entity_type}: {count}')
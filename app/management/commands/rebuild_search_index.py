@@ -0,0 +1,40 @@
+"""
+Django management command to rebuild the full-text search index
+Chạy sau khi migrate lần đầu (0013) hoặc sau khi nạp dữ liệu bằng bulk_create / loaddata
+(không phát signal).
+Usage: python manage.py rebuild_search_index [--type employee --type job]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.search_index import ENTITIES, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the accent-folded search documents used by /search/ and the list pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            action='append',
+            choices=list(ENTITIES),
+            dest='types',
+            help='Only rebuild this entity type (repeatable, default: all)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('=' * 60)
+        self.stdout.write('🔎 DỰNG LẠI CHỈ MỤC TÌM KIẾM')
+        self.stdout.write('=' * 60)
+
+        start = time.perf_counter()
+        counts = rebuild_index(options['types'], progress=self._progress)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✅ Đã lập chỉ mục {sum(counts.values())} tài liệu'))
+        self.stdout.write(f'⏱️  {elapsed:.1f}s')
+
+    def _progress(self, entity_type, count):
+        self.stdout.write(f'   📄 {entity_type}: {count}')
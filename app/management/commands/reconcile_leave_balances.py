@@ -0,0 +1,48 @@
+"""
+Django management command to rebuild leave balances from the leave ledger
+Usage: python manage.py reconcile_leave_balances [--year 2025] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from app.leave_ledger import rebuild_balances
+from app.models import LeaveBalance
+
+
+class Command(BaseCommand):
+    help = 'Recompute used/remaining leave days from the LeaveBalanceTransaction ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            help='Only reconcile balances of this year'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report mismatched balances without fixing them'
+        )
+
+    def handle(self, *args, **options):
+        balances = LeaveBalance.objects.all()
+        if options['year']:
+            balances = balances.filter(year=options['year'])
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('📒 ĐỐI SOÁT SỐ DƯ PHÉP VỚI SỔ CÁI')
+        self.stdout.write('=' * 60)
+
+        mismatched = rebuild_balances(balances, dry_run=options['dry_run'])
+        for balance, used_days, ledger_days in mismatched:
+            self.stdout.write(
+                f"⚠️  {balance.employee.name} - {balance.leave_type.name} {balance.year}: "
+                f"đã dùng {used_days:g} ➜ sổ cái {ledger_days:g}"
+            )
+
+        self.stdout.write('\n' + '=' * 60)
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f"✅ {balances.count()} số dư khớp sổ cái"))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"🔍 {len(mismatched)} số dư lệch (chưa sửa, --dry-run)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Đã dựng lại {len(mismatched)} số dư từ sổ cái"))
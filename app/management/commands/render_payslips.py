@@ -0,0 +1,70 @@
+"""
+Django management command to pre-render confirmed payslip PDFs of a month
+Chạy sau khi xác nhận bảng lương để ngày trả lương nhân viên chỉ tải file có sẵn.
+Usage: python manage.py render_payslips --month 10 --year 2025 [--department IT] [--workers 4]
+       [--bundle zip|pdf --output phieu_luong.zip]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.payslips import BUNDLE_FORMATS, PAYSLIP_WORKERS, render_month_payslips, write_payslip_bundle
+
+
+class Command(BaseCommand):
+    help = 'Render and store confirmed payslip PDFs of a month (optionally write a ZIP / merged PDF)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=int, required=True, help='Month (1-12)')
+        parser.add_argument('--year', type=int, required=True, help='Year')
+        parser.add_argument('--department', help='Department name (default: all departments)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=PAYSLIP_WORKERS,
+            help=f'Rendering processes (default: {PAYSLIP_WORKERS})'
+        )
+        parser.add_argument('--bundle', choices=BUNDLE_FORMATS, help='Also write all payslips as one file')
+        parser.add_argument('--output', help='Bundle file path (default: Phieu_luong_<MM>_<YYYY>.<bundle>)')
+
+    def handle(self, *args, **options):
+        month, year = options['month'], options['year']
+        if not 1 <= month <= 12:
+            raise CommandError('--month phải trong khoảng 1-12')
+        if options['workers'] < 1:
+            raise CommandError('--workers phải lớn hơn 0')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'🧾 DỰNG PHIẾU LƯƠNG THÁNG {month}/{year}')
+        if options['department']:
+            self.stdout.write(f"🏢 Phòng ban: {options['department']}")
+        self.stdout.write('=' * 60)
+
+        start = time.perf_counter()
+        result = render_month_payslips(
+            year, month, options['department'], workers=options['workers'], progress=self._progress
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(result['payrolls'])} phiếu lương: dựng mới {result['rendered']}, "
+            f"đã có sẵn {result['cached']}"
+        ))
+        self.stdout.write(f'⏱️  {elapsed:.1f}s')
+
+        if options['bundle']:
+            if not result['payrolls']:
+                self.stdout.write(self.style.WARNING('⚠️  Không có bảng lương đã xác nhận để đóng gói'))
+                return
+            output = options['output'] or f"Phieu_luong_{month:02d}_{year}.{options['bundle']}"
+            try:
+                with open(output, 'wb') as f:
+                    write_payslip_bundle(result['payrolls'], options['bundle'], f)
+            except OSError as e:
+                raise CommandError(f'Không ghi được file: {e}')
+            self.stdout.write(self.style.SUCCESS(f'📦 {output}'))
+
+    def _progress(self, done, total):
+        if total and (done == total or done % 100 == 0):
+            self.stdout.write(f'   ... {done}/{total}')
@@ -0,0 +1,52 @@
+"""
+Django management command to roll up the monthly employee / department statistics
+Chạy hằng đêm (cron): mặc định tính lại tháng này và tháng trước; --all dựng lại toàn bộ
+lịch sử (sau khi nạp dữ liệu cũ hoặc đổi phòng ban hàng loạt).
+Usage: python manage.py rollup_monthly_stats [--year 2025 --month 10] [--months 3] [--all]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.monthly_stats import data_months, recent_months, refresh_month
+
+
+class Command(BaseCommand):
+    help = 'Refresh the EmployeeMonthlyStats / DepartmentMonthlyStats rollup tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Năm cần tổng hợp (đi cùng --month)')
+        parser.add_argument('--month', type=int, help='Tháng cần tổng hợp (1-12)')
+        parser.add_argument('--months', type=int, default=2,
+                            help='Số tháng gần nhất cần tổng hợp (mặc định: 2)')
+        parser.add_argument('--all', action='store_true', help='Dựng lại toàn bộ lịch sử')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            months = data_months()
+        elif options['year'] or options['month']:
+            if not (options['year'] and options['month']) or not 1 <= options['month'] <= 12:
+                raise CommandError('Cần cả --year và --month (1-12)')
+            months = [(options['year'], options['month'])]
+        else:
+            if options['months'] < 1:
+                raise CommandError('--months phải lớn hơn 0')
+            months = recent_months(options['months'])
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('📊 TỔNG HỢP SỐ LIỆU THÁNG')
+        self.stdout.write('=' * 60)
+
+        start = time.perf_counter()
+        total = 0
+        for year, month in months:
+            counts = refresh_month(year, month)
+            total += counts['employees']
+            self.stdout.write(
+                f'   📅 {month:02d}/{year}: {counts["employees"]} nhân viên, {counts["departments"]} phòng ban'
+            )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✅ Đã tổng hợp {len(months)} tháng ({total} dòng nhân viên)'))
+        self.stdout.write(f'⏱️  {elapsed:.1f}s')
@@ -0,0 +1,139 @@
+"""
+Django management command to run queued background jobs (app.jobs).
+Run as a long-running worker (systemd / supervisor):  python manage.py run_jobs --processes 4
+Process the current queue and exit (cron / debugging):  python manage.py run_jobs --once
+"""
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app.jobs import (
+    JOB_WORKER_PROCESSES, claim_next_job, execute_job, fail_or_retry_job, requeue_stale_jobs,
+    run_job, worker_name
+)
+from app.models import BackgroundJob
+
+
+def _init_worker_process():
+    # Ctrl+C / SIGTERM do process cha xử lý: job đang chạy được chạy nốt
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a process pool (no external broker required)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=JOB_WORKER_PROCESSES,
+            help='Number of worker processes (default: JOB_WORKER_PROCESSES / CPU count)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2,
+            help='Seconds between queue polls when idle (default: 2)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for new jobs'
+        )
+        parser.add_argument(
+            '--inline',
+            action='store_true',
+            help='Run jobs one by one in this process (no pool, no heartbeat thread)'
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError('--processes phải lớn hơn 0')
+
+        self.worker = worker_name()
+        self.stdout.write('=' * 60)
+        self.stdout.write(f"⚙️  BACKGROUND JOB WORKER {self.worker}")
+        self.stdout.write('=' * 60)
+
+        if options['inline']:
+            self._run_inline()
+        else:
+            self._run_pool(options['processes'], options['poll_interval'], options['once'])
+
+    def _report(self, job_id):
+        job = BackgroundJob.objects.get(pk=job_id)
+        icon = {'succeeded': '✅', 'cancelled': '🚫'}.get(job.status, '❌')
+        self.stdout.write(f"{icon} Job #{job.id} {job.label or job.kind}: {job.get_status_display()}")
+        if job.status == 'failed':
+            self.stdout.write(f"   {job.message}")
+
+    def _run_inline(self):
+        requeue_stale_jobs()
+        count = 0
+        while True:
+            job = claim_next_job(self.worker)
+            if job is None:
+                break
+            self.stdout.write(f"▶️  Job #{job.id} {job.label or job.kind}")
+            run_job(job.id, heartbeat=False)
+            self._report(job.id)
+            count += 1
+        self.stdout.write(f"\n📊 Đã xử lý {count} job")
+
+    def _run_pool(self, processes, poll_interval, once):
+        # Tiến trình con được fork từ process đã setup Django; SIGTERM dừng worker như Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        context = multiprocessing.get_context('fork')
+
+        def new_executor():
+            return ProcessPoolExecutor(
+                max_workers=processes, mp_context=context, initializer=_init_worker_process
+            )
+
+        executor = new_executor()
+        running = {}
+        count = 0
+        self.stdout.write(f"🚀 {processes} process, chờ job...")
+        try:
+            while True:
+                requeue_stale_jobs()
+                while len(running) < processes:
+                    job = claim_next_job(self.worker)
+                    if job is None:
+                        break
+                    self.stdout.write(f"▶️  Job #{job.id} {job.label or job.kind}")
+                    # Không để process con thừa hưởng kết nối database của process cha
+                    connections.close_all()
+                    running[executor.submit(execute_job, job.id)] = (job.id, executor)
+
+                if not running:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id, submitted_to = running.pop(future)
+                    count += 1
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # Process con chết (OOM, bị kill...) - job chưa kịp ghi kết quả
+                        outcome = fail_or_retry_job(job_id, e)
+                        self.stdout.write(f"⚠️  Job #{job_id} bị gián đoạn ({e!r}): {outcome}")
+                        if isinstance(e, BrokenProcessPool) and submitted_to is executor:
+                            executor = new_executor()
+                        continue
+                    self._report(job_id)
+        except KeyboardInterrupt:
+            self.stdout.write('\n⏹️  Đang dừng, chờ các job đang chạy hoàn tất...')
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.stdout.write(f"\n📊 Đã xử lý {count} job")
@@ -0,0 +1,88 @@
+"""
+Django management command to calculate payroll for a whole month.
+Run monthly via cron job: python manage.py run_payroll --month 11 --year 2025
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from app.models import Department
+from app.payroll_engine import compute_payroll_run
+
+
+class Command(BaseCommand):
+    help = 'Calculate and save payroll for all active employees (or one department) in a month'
+
+    def add_arguments(self, parser):
+        today = timezone.localtime(timezone.now()).date()
+        parser.add_argument(
+            '--month',
+            type=int,
+            default=today.month,
+            help='Payroll month 1-12 (default: current month)'
+        )
+        parser.add_argument(
+            '--year',
+            type=int,
+            default=today.year,
+            help='Payroll year (default: current year)'
+        )
+        parser.add_argument(
+            '--department',
+            type=int,
+            help='Only calculate payroll for this department ID'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of payroll rows written per query (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Calculate without saving payroll rows'
+        )
+
+    def handle(self, *args, **options):
+        month = options['month']
+        year = options['year']
+        department_id = options['department']
+        dry_run = options['dry_run']
+
+        if month < 1 or month > 12:
+            raise CommandError('Tháng không hợp lệ (1-12)')
+        if department_id and not Department.objects.filter(id=department_id).exists():
+            raise CommandError(f'Không tìm thấy phòng ban ID={department_id}')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'💰 TÍNH LƯƠNG THÁNG {month}/{year}')
+        if department_id:
+            self.stdout.write(f'🏢 Phòng ban ID: {department_id}')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🔍 CHẾ ĐỘ DRY-RUN: Không lưu bảng lương'))
+        self.stdout.write('=' * 60)
+
+        run = compute_payroll_run(month, year, department_id=department_id)
+        self.stdout.write(f'📊 Đã tính {len(run)} bảng lương, bỏ qua {len(run.skipped)} nhân viên')
+
+        for item in run.skipped:
+            employee = item['employee']
+            self.stdout.write(self.style.WARNING(
+                f'   ⚠️ {employee.name} ({employee.employee_code}): {item["reason"]}'
+            ))
+
+        if dry_run:
+            self.stdout.write(f'   • Tổng quỹ lương: {run.total_amount:,.0f} VNĐ')
+            return
+
+        def report_progress(done, total):
+            self.stdout.write(f'   ⏳ {done}/{total}')
+
+        summary = run.save(progress_callback=report_progress, batch_size=options['batch_size'])
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('📊 TỔNG KẾT:')
+        self.stdout.write(f'   • Tạo mới: {summary["created"]}')
+        self.stdout.write(f'   • Cập nhật: {summary["updated"]}')
+        self.stdout.write(f'   • Bỏ qua: {summary["skipped"]}')
+        self.stdout.write(f'   • Tổng quỹ lương: {run.total_amount:,.0f} VNĐ')
+        self.stdout.write(self.style.SUCCESS('✅ Hoàn thành'))
@@ -7,6 +7,7 @@ from django.utils import timezone
 from datetime import timedelta
 from app.models import Contract, Employee
 from app.email_service import EmailService
+from app.email_outbox import drain_outbox
 import logging
 
 logger = logging.getLogger(__name__)
@@ -95,9 +96,12 @@ class Command(BaseCommand):
                     skip_count += 1
                 else:
                     try:
-                        EmailService.send_contract_expiring_alert(employee, days_remaining)
-                        self.stdout.write(self.style.SUCCESS(f'     ✅ Đã gửi email thành công'))
-                        success_count += 1
+                        if EmailService.send_contract_expiring_alert(employee, days_remaining):
+                            self.stdout.write(self.style.SUCCESS(f'     ✅ Đã đưa email vào hàng đợi'))
+                            success_count += 1
+                        else:
+                            self.stdout.write(self.style.WARNING(f'     ⚠️ Đã gửi hôm nay - bỏ qua'))
+                            skip_count += 1
                     except Exception as e:
                         self.stdout.write(self.style.ERROR(f'     ❌ Lỗi gửi email: {str(e)}'))
                         error_count += 1
@@ -105,14 +109,22 @@ class Command(BaseCommand):
             
             self.stdout.write('')  # Dòng trống
         
+        # Gửi toàn bộ email trong hàng đợi qua một kết nối SMTP
+        if not dry_run and success_count:
+            result = drain_outbox()
+            self.stdout.write(
+                f'📤 Đã gửi {result["sent"]} email '
+                f'({result["retry"]} chờ thử lại, {result["failed"]} thất bại)'
+            )
+        
         # Tổng kết
         self.stdout.write('=' * 60)
         self.stdout.write('📊 TỔNG KẾT:')
         self.stdout.write(f'   • Tổng số hợp đồng sắp hết hạn: {expiring_contracts.count()}')
         if not dry_run:
-            self.stdout.write(f'   • Gửi email thành công: {success_count}')
-            self.stdout.write(f'   • Gửi email thất bại: {error_count}')
-            self.stdout.write(f'   • Bỏ qua (không có email): {skip_count}')
+            self.stdout.write(f'   • Email đưa vào hàng đợi: {success_count}')
+            self.stdout.write(f'   • Lỗi: {error_count}')
+            self.stdout.write(f'   • Bỏ qua (không có email / đã gửi): {skip_count}')
         else:
             self.stdout.write(self.style.WARNING(f'   • CHẾ ĐỘ DRY-RUN - Không gửi email'))
         self.stdout.write('=' * 60)
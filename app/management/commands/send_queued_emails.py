@@ -0,0 +1,59 @@
+"""
+Django management command to deliver queued emails from the outbox.
+Run every minute via cron job: python manage.py send_queued_emails
+or as a long-running worker:   python manage.py send_queued_emails --loop --interval 10
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from app.email_outbox import drain_outbox
+from app.models import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = 'Send pending emails from the email outbox in batches over one SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of emails sent per SMTP connection (default: EMAIL_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Stop after this many batches'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll the outbox'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=10,
+            help='Seconds between polls in --loop mode (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = drain_outbox(options['batch_size'], options['max_batches'])
+            if result['batches'] or not options['loop']:
+                self.stdout.write(
+                    f"📤 Đã gửi {result['sent']} email trong {result['batches']} lô "
+                    f"({result['retry']} chờ thử lại, {result['failed']} thất bại)"
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        counts = dict(
+            EmailOutbox.objects.values_list('status').annotate(count=Count('id')).order_by()
+        )
+        self.stdout.write(
+            f"📊 Hàng đợi: {counts.get('pending', 0)} chờ gửi, "
+            f"{counts.get('failed', 0)} thất bại"
+        )
@@ -1,12 +1,19 @@
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, FileResponse, Http404
 from django.db import transaction
 from django.core.files.storage import FileSystemStorage, default_storage
 from django.utils.text import get_valid_filename
+from django.utils.http import url_has_allowed_host_and_scheme
+from urllib.parse import quote, urlencode
+import heapq
 import uuid
+from itertools import islice
+from operator import attrgetter
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User, Group
@@ -18,7 +25,7 @@ from .models import (
     LeaveType, LeaveRequest, LeaveBalance, ExpenseCategory, Expense, 
     SalaryComponent, EmployeeSalaryRule, PayrollCalculationLog, SalaryRuleTemplate, 
     SalaryRuleTemplateItem, Contract, ContractHistory,
-    AppraisalPeriod, AppraisalCriteria, Appraisal, AppraisalScore, AppraisalComment
+    AppraisalPeriod, AppraisalCriteria, Appraisal, AppraisalScore, AppraisalComment, BackgroundJob
 )
 from .forms import (
     EmployeeForm, LeaveTypeForm, LeaveRequestForm, ExpenseCategoryForm, ExpenseForm, ContractForm,
@@ -26,9 +33,27 @@ from .forms import (
     RewardForm, DisciplineForm
 )
 from .permissions import require_hr, require_hr_or_manager, can_manage_contract
+from .payroll_engine import compute_payroll_run
+from .working_calendar import month_working_days
+from .leave_helpers import check_leave_balance, refresh_leave_days
+from .leave_ledger import settle_leave_requests
+from .dashboard_stats import get_dashboard_stats, EXPIRING_CONTRACT_DAYS
+from .identity import get_identity
+from .org_chart import department_members_json, get_org_summary
+from .monthly_stats import MAX_TREND_MONTHS, TREND_MONTHS, trend_rows
+from .application_board import INTERVIEW_STATUSES, board_queryset, column_counts, column_page
+from .search_index import search_filter
+from .attendance_archive import archive_cutoff, attendance_years, employee_attendance, iter_archived, summarize
+from .attendance_ingest import minutes_from_notes
+from .date_utils import month_bounds
+from .exports import EXPORTS, EXPORT_FORMATS, attendance_queryset, export_response, should_run_in_background, start_background_export
+from .jobs import cancel_job, enqueue_job, job_status_data
+from .payslips import BUNDLE_FORMATS as PAYSLIP_BUNDLE_FORMATS
+from .salary_formula import validate_formula
 from .validators import (
     validate_image_file, 
     validate_document_file, 
+    validate_punch_log_file,
     validate_salary,
     validate_phone_number,
     validate_email
@@ -41,10 +66,9 @@ from .decorators import (
 )
 
 from django.http import JsonResponse
+from django.core.cache import cache
 from datetime import datetime, timedelta
 import json
-import xlwt
-import calendar
 import re
 import logging
 from django.db.models import Sum, Avg, Count
@@ -59,114 +83,37 @@ def admin_home(request):
     employees = Employee.objects.all()
     departments = Department.objects.all()
     payrolls = Payroll.objects.all()
-    
-    # ========== STATISTICS ==========
-    # Active employees (status 1=Thử việc, 2=Nhân viên chính thức)
-    active_employees = employees.filter(status__in=[1, 2]).count()
-    
-    # Total salary this month
-    current_month = timezone.localtime(timezone.now()).month
-    current_year = timezone.localtime(timezone.now()).year
-    total_salary = Payroll.objects.filter(
-        month=current_month, 
-        year=current_year
-    ).aggregate(total=Sum('total_salary'))['total'] or 0
-    
-    # ========== CHART DATA ==========
-    # 1. Employees by Department (Pie Chart)
-    dept_labels = []
-    dept_values = []
-    for dept in departments:
-        count = employees.filter(department=dept, status__in=[1, 2]).count()
-        if count > 0:
-            dept_labels.append(dept.name)
-            dept_values.append(count)
-    dept_employee_data = {'labels': dept_labels, 'values': dept_values}
-    
-    # 2. Employee Status Distribution (Doughnut Chart)
-    STATUS_LABELS = {
-        0: 'Onboarding',
-        1: 'Thử việc', 
-        2: 'Chính thức',
-        3: 'Đã nghỉ việc',
-        4: 'Bị sa thải'
-    }
-    status_labels = []
-    status_values = []
-    for status_val, status_label in STATUS_LABELS.items():
-        count = employees.filter(status=status_val).count()
-        if count > 0:
-            status_labels.append(status_label)
-            status_values.append(count)
-    status_data = {'labels': status_labels, 'values': status_values}
-    
-    # 3. Average Salary by Department (Bar Chart)
-    salary_labels = []
-    salary_values = []
-    for dept in departments:
-        avg_salary = employees.filter(
-            department=dept, 
-            status__in=[1, 2]
-        ).aggregate(avg=Avg('salary'))['avg']
-        if avg_salary:
-            salary_labels.append(dept.name)
-            salary_values.append(round(avg_salary))
-    dept_salary_data = {'labels': salary_labels, 'values': salary_values}
-    
-    # 4. Monthly Hiring Trend (Line Chart) - Last 6 months
-    trend_labels = []
-    trend_values = []
-    for i in range(5, -1, -1):
-        month = current_month - i
-        year = current_year
-        if month <= 0:
-            month += 12
-            year -= 1
-        
-        count = employees.filter(
-            contract_start_date__month=month,
-            contract_start_date__year=year
-        ).count()
-        
-        trend_labels.append(f'T{month}')
-        trend_values.append(count)
-    hiring_trend = {'labels': trend_labels, 'values': trend_values}
+
+    # ========== STATISTICS & CHART DATA ==========
+    # Số liệu tổng hợp dùng chung cho mọi user - lấy từ cache (xem dashboard_stats)
+    stats = get_dashboard_stats()
+    today = timezone.localtime(timezone.now()).date()
     
     # ========== RECENT ACTIVITIES ==========
     # New employees (last 5)
-    new_employees = employees.order_by('-created_at')[:5]
-    
-    # Pending leave requests
-    pending_leaves = LeaveRequest.objects.filter(status='pending').count()
-    
-    # Pending expenses
-    pending_expenses = Expense.objects.filter(status='pending').count()
+    new_employees = employees.select_related('department').order_by('-created_at')[:5]
     
     # Expiring contracts (next 30 days)
-    from datetime import timedelta
-    today = timezone.localtime(timezone.now()).date()
-    expiring_contracts_count = Contract.objects.filter(
-        end_date__lte=today + timedelta(days=30),
-        end_date__gte=today,
-        status='active'
-    ).count()
     expiring_contracts_list = Contract.objects.filter(
-        end_date__lte=today + timedelta(days=30),
+        end_date__lte=today + timedelta(days=EXPIRING_CONTRACT_DAYS),
         end_date__gte=today,
         status='active'
     ).select_related('employee').order_by('end_date')[:5]
     
     # ========== APPRAISAL STATISTICS ==========
     appraisal_notifications = []
-    try:
-        user_employee = Employee.objects.get(email=request.user.email)
-        
+    identity = get_identity(request.user)
+    user_employee = identity.employee
+    hr_pending_appraisals = stats['hr_pending_appraisals']
+    recent_appraisals = []
+    my_pending_appraisals = 0
+    team_pending_appraisals = 0
+    if user_employee:
         my_pending_appraisals = Appraisal.objects.filter(
             employee=user_employee,
             status='pending_self'
         ).count()
         
-        team_pending_appraisals = 0
         if user_employee.is_manager:
             team_pending_appraisals = Appraisal.objects.filter(
                 manager=user_employee,
@@ -177,7 +124,7 @@ def admin_home(request):
             pending_appraisals = Appraisal.objects.filter(
                 manager=user_employee,
                 status='pending_manager'
-            ).select_related('employee', 'period')[:5]
+            ).select_related('employee__department', 'period')[:5]
             
             for appraisal in pending_appraisals:
                 appraisal_notifications.append({
@@ -185,16 +132,11 @@ def admin_home(request):
                     'message': f'Cần đánh giá - {appraisal.period.name}'
                 })
         
-        hr_pending_appraisals = Appraisal.objects.filter(
-            status='pending_hr'
-        ).count()
-        
         # HR gets all pending HR reviews
-        if request.user.groups.filter(name='HR').exists():
+        if hr_pending_appraisals and identity.in_group('HR'):
             hr_pending = Appraisal.objects.filter(
                 status='pending_hr'
-            ).select_related('employee', 'period')[:5]
-            
+            ).select_related('employee__department', 'period')[:5]
             for appraisal in hr_pending:
                 appraisal_notifications.append({
                     'employee': appraisal.employee,
@@ -204,39 +146,31 @@ def admin_home(request):
         recent_appraisals = Appraisal.objects.filter(
             status='completed'
         ).order_by('-final_review_date')[:5]
-        
-    except Employee.DoesNotExist:
-        my_pending_appraisals = 0
-        team_pending_appraisals = 0
+    else:
         hr_pending_appraisals = 0
-        recent_appraisals = []
-    
-    # ========== REWARDS & DISCIPLINES ==========
-    total_rewards_year = Reward.objects.filter(date__year=current_year).count()
-    total_disciplines_year = Discipline.objects.filter(date__year=current_year).count()
     
     context = {
         "employees": employees,
         "departments": departments,
         "payrolls": payrolls,
-        "total_employees": employees.count(),
-        "total_departments": departments.count(),
-        "active_employees": active_employees,
-        "total_salary": total_salary,
-        "current_month": current_month,
-        "current_year": current_year,
+        "total_employees": stats['total_employees'],
+        "total_departments": stats['total_departments'],
+        "active_employees": stats['active_employees'],
+        "total_salary": stats['total_salary'],
+        "current_month": today.month,
+        "current_year": today.year,
         
         # Chart data (JSON)
-        "dept_employee_data": json.dumps(dept_employee_data),
-        "status_data": json.dumps(status_data),
-        "dept_salary_data": json.dumps(dept_salary_data),
-        "hiring_trend": json.dumps(hiring_trend),
+        "dept_employee_data": json.dumps(stats['dept_employee_data']),
+        "status_data": json.dumps(stats['status_data']),
+        "dept_salary_data": json.dumps(stats['dept_salary_data']),
+        "hiring_trend": json.dumps(stats['hiring_trend']),
         
         # Recent activities
         "new_employees": new_employees,
-        "pending_leaves": pending_leaves,
-        "pending_expenses": pending_expenses,
-        "expiring_contracts": expiring_contracts_count,
+        "pending_leaves": stats['pending_leaves'],
+        "pending_expenses": stats['pending_expenses'],
+        "expiring_contracts": stats['expiring_contracts'],
         "expiring_contracts_list": expiring_contracts_list,
         
         # Appraisals
@@ -247,8 +181,8 @@ def admin_home(request):
         "recent_appraisals": recent_appraisals,
         
         # Rewards/Disciplines
-        "total_rewards_year": total_rewards_year,
-        "total_disciplines_year": total_disciplines_year,
+        "total_rewards_year": stats['total_rewards_year'],
+        "total_disciplines_year": stats['total_disciplines_year'],
     }
     logger.info(f"Admin home accessed by {request.user.username}")
     return render(request, "hod_template/home_content.html", context)
@@ -668,7 +602,7 @@ def employee_list(request):
 
     # Áp dụng các bộ lọc
     if search_query:
-        employees = employees.filter(name__icontains=search_query)
+        employees = search_filter(employees, 'employee', search_query)
     if department_id:
         employees = employees.filter(department_id=department_id)
     if status:
@@ -806,14 +740,55 @@ def delete_employee(request, employee_id):
         employee.delete()
         return redirect('employee_list')
 
+# Trang quản lý chấm công: khoảng ngày mặc định và số bản ghi mỗi trang
+MANAGE_ATTENDANCE_DAYS = 30
+MANAGE_ATTENDANCE_PAGE_SIZE = 200
+
+
+def _date_param(request, name):
+    try:
+        return datetime.strptime(request.GET.get(name, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
 @login_required
 def manage_attendance(request):
+    # Lọc theo khoảng ngày (mặc định 30 ngày gần nhất) và phân trang trên server
+    today = timezone.localdate()
+    date_to = _date_param(request, 'to_date') or today
+    date_from = _date_param(request, 'from_date') or date_to - timedelta(days=MANAGE_ATTENDANCE_DAYS)
+    department_id = request.GET.get('department', '')
+    department_id = int(department_id) if department_id.isdigit() else None
+    page = request.GET.get('page', '')
+    page = max(int(page), 1) if page.isdigit() else 1
+
     # Optimize query with select_related to avoid N+1 problem
-    attendances = Attendance.objects.select_related('employee', 'employee__department').all().order_by('-date')
-    departments = Department.objects.all()
+    hot = (
+        attendance_queryset(date_from.isoformat(), date_to.isoformat(), department_id)
+        .select_related('employee', 'employee__department').order_by('-date')
+    )
+    start = (page - 1) * MANAGE_ATTENDANCE_PAGE_SIZE
+    stop = start + MANAGE_ATTENDANCE_PAGE_SIZE + 1  # thêm một dòng để biết còn trang sau
+    if date_from < archive_cutoff():
+        # Khoảng ngày chạm tới các tháng đã lưu trữ (chỉ xem, pk=None); cả hai nguồn đều mới nhất trước
+        merged = heapq.merge(hot.iterator(chunk_size=2000), iter_archived(date_from, date_to, department_id),
+                             key=attrgetter('date'), reverse=True)
+        attendances = list(islice(merged, start, stop))
+    else:
+        attendances = list(hot[start:stop])
+
+    filters = {'from_date': date_from.isoformat(), 'to_date': date_to.isoformat()}
+    if department_id:
+        filters['department'] = department_id
     return render(request, "hod_template/manage_attendance.html", {
-        "attendances": attendances,
-        "departments": departments
+        "attendances": attendances[:MANAGE_ATTENDANCE_PAGE_SIZE],
+        "departments": Department.objects.all(),
+        "filters": filters,
+        "filter_query": urlencode(filters),
+        "page": page,
+        "page_offset": start,
+        "has_next": len(attendances) > MANAGE_ATTENDANCE_PAGE_SIZE,
     })
 
 @login_required
@@ -833,7 +808,7 @@ def add_attendance_save(request):
         employees = Employee.objects.all()
         
         # Xóa dữ liệu cũ nếu có
-        Attendance.objects.filter(date=attendance_date).delete()
+        Attendance.objects.filter(work_date=attendance_date).delete()
         
         for employee in employees:
             status = request.POST.get(f"status_{employee.id}")
@@ -841,11 +816,14 @@ def add_attendance_save(request):
             notes = request.POST.get(f"notes_{employee.id}")
             
             if status and working_hours:  # Kiểm tra dữ liệu trước khi lưu
+                late_minutes, early_minutes = minutes_from_notes(notes)
                 attendance = Attendance(
                     employee=employee,
                     date=attendance_date,
                     status=status,
                     working_hours=float(working_hours),
+                    late_minutes=late_minutes,
+                    early_minutes=early_minutes,
                     notes=notes
                 )
                 attendance.save()
@@ -855,12 +833,39 @@ def add_attendance_save(request):
     else:
         return redirect("add_attendance")
 
+@login_required
+@require_hr
+def import_attendance(request):
+    """Upload file log máy chấm công (CSV / TSV) và nhập ở nền"""
+    if request.method == 'POST':
+        punch_file = request.FILES.get('punch_file')
+        try:
+            if not punch_file:
+                raise ValidationError('Chưa chọn file log chấm công')
+            validate_punch_log_file(punch_file)
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.messages))
+            return redirect('management_import_attendance')
+
+        path = default_storage.save(
+            f'imports/attendance/{uuid.uuid4().hex}_{get_valid_filename(punch_file.name)}', punch_file
+        )
+        job = enqueue_job('import_attendance', {
+            'path': path,
+            'replace': request.POST.get('replace') == 'on',
+        }, user=request.user, label=f'Nhập chấm công {punch_file.name}')
+        logger.info(f"Attendance import {job.id} ({punch_file.name}) started by {request.user.username}")
+        messages.info(request, 'Đang nhập log chấm công ở nền.')
+        return _redirect_to_job(job, reverse('manage_attendance'))
+
+    return render(request, 'hod_template/import_attendance.html')
+
 @login_required
 @require_POST
 def check_attendance_date(request):
     if request.method == "POST":
         date = request.POST.get("date")
-        exists = Attendance.objects.filter(date=date).exists()
+        exists = Attendance.objects.filter(work_date=date).exists()
         return JsonResponse({"status": "exists" if exists else "new"})
 
 @login_required
@@ -868,7 +873,7 @@ def check_attendance_date(request):
 def get_attendance_data(request):
     if request.method == "POST":
         date = request.POST.get("date")
-        attendances = Attendance.objects.filter(date=date)
+        attendances = Attendance.objects.filter(work_date=date)
         data = []
         for attendance in attendances:
             data.append({
@@ -905,46 +910,114 @@ def delete_attendance(request, attendance_id):
         logger.error(f"Error deleting attendance: {e}")
         return JsonResponse({"status": "error", "message": str(e)})
 
+def _redirect_to_job(job, back_url):
+    """Chuyển tới trang theo dõi tiến độ của tác vụ nền vừa tạo"""
+    return redirect(f"{reverse('management_job_detail', args=[job.id])}?next={quote(back_url)}")
+
+
+def _export_format(request):
+    fmt = request.GET.get('format', 'xlsx')
+    return fmt if fmt in EXPORT_FORMATS else 'xlsx'
+
+
+def _run_export(request, kind, filters, filename_base, sheet_title, fallback_url):
+    """
+    Trả file export trực tiếp (stream), hoặc chuyển sang luồng nền khi dữ liệu quá lớn
+    hay người dùng chọn ?background=1.
+    """
+    fmt = _export_format(request)
+    columns, queryset, iter_rows = EXPORTS[kind](**filters)
+
+    if should_run_in_background(queryset, request.GET.get('background') == '1'):
+        job = start_background_export(
+            request.user, kind, filters, fmt, filename_base, sheet_title,
+            download_url_builder=lambda job_id: request.build_absolute_uri(
+                reverse('management_export_download', args=[job_id])
+            )
+        )
+        logger.info(f"Background {kind} export {job.id} started by {request.user.username}")
+        messages.info(
+            request,
+            'Dữ liệu lớn, file đang được tạo ở nền. Link tải sẽ được gửi qua email khi hoàn tất.'
+        )
+        return _redirect_to_job(job, request.META.get('HTTP_REFERER') or fallback_url)
+
+    return export_response(filename_base, columns, iter_rows(queryset), fmt, sheet_title)
+
+
 @login_required
 def export_attendance(request):
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = 'attachment; filename="attendance_report.xls"'
     logger.info(f"Attendance report exported by {request.user.username}")
-    
-    wb = xlwt.Workbook(encoding='utf-8')
-    ws = wb.add_sheet('Bảng Chấm Công')
-    
-    # Sheet header, first row
-    row_num = 0
-    font_style = xlwt.XFStyle()
-    font_style.font.bold = True
-    
-    columns = ['STT', 'Ngày', 'Mã NV', 'Tên NV', 'Phòng Ban', 'Trạng Thái', 'Số Giờ', 'Ghi Chú']
-    
-    for col_num, column_title in enumerate(columns):
-        ws.write(row_num, col_num, column_title, font_style)
-    
-    # Sheet body, remaining rows
-    font_style = xlwt.XFStyle()
-    
-    rows = Attendance.objects.all().values_list(
-        'date', 'employee__employee_code', 'employee__name',
-        'employee__department__name', 'status', 'working_hours', 'notes'
-    ).order_by('-date')
-    
-    for row in rows:
-        row_num += 1
-        ws.write(row_num, 0, row_num, font_style)
-        ws.write(row_num, 1, row[0].strftime('%d/%m/%Y'), font_style)
-        ws.write(row_num, 2, row[1], font_style)
-        ws.write(row_num, 3, row[2], font_style)
-        ws.write(row_num, 4, row[3], font_style)
-        ws.write(row_num, 5, row[4], font_style)
-        ws.write(row_num, 6, row[5], font_style)
-        ws.write(row_num, 7, row[6], font_style)
-    
-    wb.save(response)
-    return response
+    filters = {
+        'date_from': request.GET.get('from_date'),
+        'date_to': request.GET.get('to_date'),
+        'department_id': request.GET.get('department') or None,
+    }
+    return _run_export(
+        request, 'attendance', filters, 'attendance_report', 'Bảng Chấm Công',
+        reverse('manage_attendance')
+    )
+
+
+def _get_user_job(request, job_id):
+    """Job nền do người dùng hiện tại tạo (superuser xem được mọi job)"""
+    job = get_object_or_404(BackgroundJob, pk=job_id)
+    if job.created_by_id != request.user.pk and not request.user.is_superuser:
+        raise Http404("Không tìm thấy tác vụ")
+    return job
+
+
+@login_required
+def job_detail(request, job_id):
+    """Trang theo dõi tiến độ một tác vụ nền"""
+    job = _get_user_job(request, job_id)
+    back_url = request.GET.get('next')
+    if not url_has_allowed_host_and_scheme(back_url, allowed_hosts={request.get_host()}):
+        back_url = reverse('admin_home')
+    return render(request, 'hod_template/job_detail.html', {'job': job, 'back_url': back_url})
+
+
+@login_required
+def job_status(request, job_id):
+    """Tiến độ tác vụ nền (AJAX polling)"""
+    job = _get_user_job(request, job_id)
+    return JsonResponse({"status": "success", **job_status_data(job)})
+
+
+@login_required
+@require_POST
+def cancel_background_job(request, job_id):
+    """Hủy tác vụ nền đang chờ / đang chạy"""
+    job = _get_user_job(request, job_id)
+    if not cancel_job(job):
+        return JsonResponse({"status": "error", "message": "Tác vụ đã kết thúc, không thể hủy"})
+    logger.info(f"Job {job.id} ({job.kind}) cancelled by {request.user.username}")
+    return JsonResponse({"status": "success", "message": "Đã gửi yêu cầu hủy tác vụ"})
+
+
+@login_required
+def export_job_status(request, job_id):
+    """Trạng thái của một job export nền (JSON)"""
+    job = BackgroundJob.objects.filter(pk=job_id, kind__in=('export', 'render_payslips'), created_by=request.user).first()
+    if job is None:
+        return JsonResponse({"status": "error", "message": "Không tìm thấy yêu cầu xuất dữ liệu"}, status=404)
+    data = {"status": "success", **job_status_data(job), "filename": job.result.get('filename')}
+    if job.status == 'succeeded':
+        data["download_url"] = reverse('management_export_download', args=[job.id])
+    return JsonResponse(data)
+
+
+@login_required
+def export_job_download(request, job_id):
+    """Tải file đã được export nền (chỉ người tạo yêu cầu)"""
+    job = BackgroundJob.objects.filter(
+        pk=job_id, kind__in=('export', 'render_payslips'), created_by=request.user, status='succeeded'
+    ).first()
+    if job is None:
+        raise Http404("Không tìm thấy file xuất dữ liệu")
+    return FileResponse(
+        default_storage.open(job.result['path'], 'rb'), as_attachment=True, filename=job.result['filename']
+    )
 
 @login_required
 def calculate_payroll(request):
@@ -966,92 +1039,16 @@ def get_payroll_data(request):
 
         try:
             employee = Employee.objects.get(id=employee_id)
-            
-            # Kiểm tra bảng lương đã tồn tại
-            existing_payroll = Payroll.objects.filter(
-                employee=employee,
-                month=month,
-                year=year
-            ).first()
 
-            if existing_payroll and existing_payroll.status == 'confirmed':
+            # Dùng chung engine với đợt tính lương hàng loạt
+            run = compute_payroll_run(month, year, employee_ids=[employee.id])
+            data = run.get(employee.id)
+            if data is None:
                 return JsonResponse({
                     "status": "error",
-                    "message": "Bảng lương này đã được xác nhận. Không thể tính lại."
+                    "message": run.skip_reason(employee.id)
                 })
 
-            # Tính số ngày làm việc chuẩn
-            cal = calendar.monthcalendar(year, month)
-            standard_working_days = sum(1 for week in cal for day in week[0:5] if day != 0)
-
-            # Tính tổng số giờ làm việc
-            total_hours = Attendance.objects.filter(
-                employee=employee,
-                date__year=year,
-                date__month=month,
-                status="Có làm việc"
-            ).aggregate(total=Sum('working_hours'))['total'] or 0
-
-            # Tính số ngày nghỉ phép có lương (approved paid leave)
-            paid_leave_days = LeaveRequest.objects.filter(
-                employee=employee,
-                status='approved',
-                leave_type__is_paid=True,
-                start_date__year=year,
-                start_date__month=month
-            ).aggregate(total=Sum('total_days'))['total'] or 0
-            
-            # Tính số ngày nghỉ phép không lương
-            unpaid_leave_days = LeaveRequest.objects.filter(
-                employee=employee,
-                status='approved',
-                leave_type__is_paid=False,
-                start_date__year=year,
-                start_date__month=month
-            ).aggregate(total=Sum('total_days'))['total'] or 0
-
-            # Tính lương theo giờ
-            try:
-                if standard_working_days > 0:
-                    hourly_rate = float(employee.salary * employee.job_title.salary_coefficient) / float(standard_working_days * 8)
-                else:
-                    hourly_rate = 0
-            except (ValueError, ZeroDivisionError):
-                hourly_rate = 0
-
-            # Tính lương cho ngày nghỉ phép có lương (8 giờ/ngày)
-            paid_leave_salary = paid_leave_days * 8 * hourly_rate
-
-            # Tính thưởng/phạt
-            bonus = Reward.objects.filter(
-                employee=employee,
-                date__year=year,
-                date__month=month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            penalty = Discipline.objects.filter(
-                employee=employee,
-                date__year=year,
-                date__month=month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            # Tính tổng lương: lương làm việc + lương nghỉ phép có lương + thưởng - phạt
-            total_salary = (hourly_rate * total_hours) + paid_leave_salary + bonus - penalty
-
-            data = {
-                "base_salary": employee.salary,
-                "salary_coefficient": employee.job_title.salary_coefficient,
-                "hourly_rate": hourly_rate,
-                "total_working_hours": total_hours,
-                "paid_leave_days": paid_leave_days,
-                "unpaid_leave_days": unpaid_leave_days,
-                "paid_leave_salary": paid_leave_salary,
-                "bonus": bonus,
-                "penalty": penalty,
-                "total_salary": total_salary,
-                "notes": existing_payroll.notes if existing_payroll else ""
-            }
-
             return JsonResponse({"status": "success", "data": data})
         except Employee.DoesNotExist:
             return JsonResponse({
@@ -1095,9 +1092,8 @@ def save_payroll(request):
                 messages.error(request, "Bảng lương này đã được xác nhận. Không thể lưu lại.")
                 return redirect("manage_payroll")
 
-            # Tính số ngày làm việc chuẩn
-            cal = calendar.monthcalendar(year, month)
-            standard_working_days = sum(1 for week in cal for day in week[0:5] if day != 0)
+            # Tính số ngày làm việc chuẩn (theo lịch làm việc của phòng ban)
+            standard_working_days = month_working_days(year, month, employee.department_id)
 
             # Lấy dữ liệu từ form
             base_salary = float(request.POST.get("base_salary").replace(",", "").replace(".", ""))
@@ -1146,6 +1142,69 @@ def save_payroll(request):
             messages.error(request, f"Có lỗi xảy ra: {str(e)}")
             return redirect("calculate_payroll")
 
+def _payroll_run_progress_key(user):
+    return f"payroll_run_progress:{user.id}"
+
+
+@login_required
+@require_hr
+def payroll_run(request):
+    """Tính lương hàng loạt cho cả tháng / một phòng ban (HR only)"""
+    if request.method == "POST":
+        try:
+            month = int(request.POST.get("month"))
+            year = int(request.POST.get("year"))
+            if month < 1 or month > 12:
+                raise ValueError("Invalid month")
+        except (TypeError, ValueError):
+            return JsonResponse({"status": "error", "message": "Dữ liệu tháng/năm không hợp lệ."})
+        department_id = request.POST.get("department_id") or None
+
+        progress_key = _payroll_run_progress_key(request.user)
+
+        def report_progress(done, total):
+            cache.set(progress_key, {"done": done, "total": total, "finished": False}, 3600)
+
+        try:
+            run = compute_payroll_run(month, year, department_id=department_id)
+            report_progress(0, len(run))
+            summary = run.save(progress_callback=report_progress)
+        except Exception as e:
+            cache.delete(progress_key)
+            logger.error(f"Error running payroll {month}/{year}: {e}", exc_info=True)
+            return JsonResponse({"status": "error", "message": str(e)})
+
+        cache.set(progress_key, {"done": summary["total"], "total": summary["total"], "finished": True}, 3600)
+        logger.info(f"Payroll run {month}/{year} (department={department_id}) by {request.user.username}")
+        return JsonResponse({
+            "status": "success",
+            "summary": summary,
+            "total_amount": run.total_amount,
+            "skipped": [
+                {"employee": item["employee"].name, "employee_code": item["employee"].employee_code,
+                 "reason": item["reason"]}
+                for item in run.skipped
+            ],
+        })
+
+    current_year = datetime.now().year
+    return render(request, "hod_template/payroll_run.html", {
+        "departments": Department.objects.all(),
+        "months": range(1, 13),
+        "years": range(current_year, current_year - 5, -1),
+        "current_month": datetime.now().month,
+    })
+
+
+@login_required
+@require_hr
+def payroll_run_progress(request):
+    """Tiến độ đợt tính lương hàng loạt đang chạy của user (AJAX polling)"""
+    progress = cache.get(_payroll_run_progress_key(request.user))
+    if not progress:
+        return JsonResponse({"status": "idle"})
+    return JsonResponse({"status": "success", **progress})
+
 @login_required
 @login_required
 @require_hr_or_manager
@@ -1292,64 +1351,35 @@ def export_payroll(request):
         status_map = {'pending': 'ChuaXacNhan', 'confirmed': 'DaXacNhan'}
         filename_parts.append(status_map.get(status, status.replace(' ', '_')))
     
-    filename = '_'.join(filename_parts) + '.xls'
-    
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb = xlwt.Workbook(encoding='utf-8')
-    ws = wb.add_sheet('Bảng Lương')
-    
-    # Sheet header, first row
-    row_num = 0
-    font_style = xlwt.XFStyle()
-    font_style.font.bold = True
-    
-    columns = ['STT', 'Tháng/Năm', 'Mã NV', 'Tên NV', 'Phòng Ban', 'Lương CB', 'Hệ Số', 'Lương/Giờ', 'Tổng Giờ', 'Thưởng', 'Phạt', 'Tổng Lương', 'Trạng Thái']
-    
-    for col_num, column_title in enumerate(columns):
-        ws.write(row_num, col_num, column_title, font_style)
-    
-    # Sheet body, remaining rows - Apply filters
-    font_style = xlwt.XFStyle()
-    
-    payrolls = Payroll.objects.all()
-    
-    # Apply filters
-    if month:
-        payrolls = payrolls.filter(month=month)
-    if year:
-        payrolls = payrolls.filter(year=year)
-    if department:
-        payrolls = payrolls.filter(employee__department__name=department)  # Filter by NAME
-    if status:
-        payrolls = payrolls.filter(status=status)
-    
-    rows = payrolls.values_list(
-        'month', 'year', 'employee__employee_code', 'employee__name',
-        'employee__department__name', 'base_salary', 'salary_coefficient',
-        'hourly_rate', 'total_working_hours', 'bonus', 'penalty',
-        'total_salary', 'status'
-    ).order_by('-year', '-month')
-    
-    for row in rows:
-        row_num += 1
-        ws.write(row_num, 0, row_num, font_style)
-        ws.write(row_num, 1, f"{row[0]}/{row[1]}", font_style)
-        ws.write(row_num, 2, row[2], font_style)
-        ws.write(row_num, 3, row[3], font_style)
-        ws.write(row_num, 4, row[4], font_style)
-        ws.write(row_num, 5, row[5], font_style)
-        ws.write(row_num, 6, row[6], font_style)
-        ws.write(row_num, 7, row[7], font_style)
-        ws.write(row_num, 8, row[8], font_style)
-        ws.write(row_num, 9, row[9], font_style)
-        ws.write(row_num, 10, row[10], font_style)
-        ws.write(row_num, 11, row[11], font_style)
-        ws.write(row_num, 12, "Đã xác nhận" if row[12] == 'confirmed' else "Chưa xác nhận", font_style)
-    
-    wb.save(response)
-    return response
+    filters = {'month': month, 'year': year, 'department': department, 'status': status}
+    return _run_export(
+        request, 'payroll', filters, '_'.join(filename_parts), 'Bảng Lương',
+        reverse('manage_payroll')
+    )
+
+@login_required
+@require_hr
+@require_POST
+def render_payslips(request):
+    """Dựng sẵn phiếu lương PDF đã xác nhận của một tháng ở nền (tùy chọn file ZIP / PDF gộp)"""
+    try:
+        month = int(request.POST.get("month"))
+        year = int(request.POST.get("year"))
+        if month < 1 or month > 12:
+            raise ValueError("Invalid month")
+    except (TypeError, ValueError):
+        messages.error(request, "Vui lòng chọn tháng và năm hợp lệ để xuất phiếu lương.")
+        return redirect("manage_payroll")
+    department = request.POST.get("department") or None
+    bundle = request.POST.get("bundle", "")
+    if bundle not in PAYSLIP_BUNDLE_FORMATS:
+        bundle = ""
+
+    job = enqueue_job('render_payslips', {
+        'year': year, 'month': month, 'department': department, 'bundle': bundle,
+    }, user=request.user, label=f'Phiếu lương tháng {month}/{year}')
+    logger.info(f"Payslip rendering {job.id} ({month}/{year}) started by {request.user.username}")
+    return _redirect_to_job(job, reverse('manage_payroll'))
 
 
 # ============================================================================
@@ -1428,30 +1458,17 @@ def request_leave(request):
             # Tính số ngày nghỉ
             leave_request.total_days = leave_request.calculate_working_days()
             
-            # Kiểm tra số ngày phép còn lại
-            try:
-                leave_balance = LeaveBalance.objects.get(
-                    employee=employee,
-                    leave_type=leave_request.leave_type,
-                    year=leave_request.start_date.year
-                )
-                
-                if leave_balance.remaining_days < leave_request.total_days:
-                    messages.error(request, f"Bạn chỉ còn {leave_balance.remaining_days} ngày phép, không đủ để xin nghỉ {leave_request.total_days} ngày")
-                    return redirect("request_leave")
-                    
-            except LeaveBalance.DoesNotExist:
-                # Tạo leave balance mới nếu chưa có
-                LeaveBalance.objects.create(
-                    employee=employee,
-                    leave_type=leave_request.leave_type,
-                    year=leave_request.start_date.year,
-                    total_days=leave_request.leave_type.max_days_per_year,
-                    used_days=0,
-                    remaining_days=leave_request.leave_type.max_days_per_year
-                )
+            # Kiểm tra số ngày phép còn lại (khóa số dư tới khi giữ phép xong)
+            has_balance, _, leave_balance = check_leave_balance(
+                employee, leave_request.leave_type, leave_request.total_days, leave_request.start_date.year
+            )
+            if not has_balance:
+                messages.error(request, f"Bạn chỉ còn {leave_balance.remaining_days} ngày phép, không đủ để xin nghỉ {leave_request.total_days} ngày")
+                return redirect("request_leave")
             
             leave_request.save()
+            # Giữ số ngày phép trong sổ cái ngay khi gửi đơn
+            settle_leave_requests([leave_request], user=request.user)
             logger.info(f"Leave request created by {employee.name}: {leave_request.total_days} days")
             messages.success(request, "Đơn xin nghỉ phép đã được gửi thành công")
             return redirect("leave_history")
@@ -1596,26 +1613,17 @@ def approve_leave_request(request, request_id):
             messages.error(request, "Không tìm thấy hồ sơ nhân viên của bạn")
             return redirect("manage_leave_requests")
         
+        # Tính lại số ngày theo lịch làm việc hiện tại (có thể đã thêm ngày lễ sau khi gửi đơn)
+        refresh_leave_days(leave_request)
+
         # Update status
         leave_request.status = 'approved'
         leave_request.approved_by = approver
         leave_request.approved_at = timezone.now()
         leave_request.save()
         
-        # Update leave balance
-        leave_balance, created = LeaveBalance.objects.get_or_create(
-            employee=leave_request.employee,
-            leave_type=leave_request.leave_type,
-            year=leave_request.start_date.year,
-            defaults={
-                'total_days': leave_request.leave_type.max_days_per_year,
-                'used_days': 0,
-                'remaining_days': leave_request.leave_type.max_days_per_year
-            }
-        )
-        
-        leave_balance.used_days += leave_request.total_days
-        leave_balance.save()  # Auto-calculate remaining_days
+        # Số ngày phép đã được giữ khi gửi đơn - chỉ ghi sổ phần chênh lệch (nếu có)
+        settle_leave_requests([leave_request], user=request.user)
         
         # Send email notification
         try:
@@ -1669,6 +1677,9 @@ def reject_leave_request(request, request_id):
         leave_request.rejection_reason = request.POST.get('rejection_reason', '')
         leave_request.save()
         
+        # Hoàn lại số ngày phép đã giữ cho đơn
+        settle_leave_requests([leave_request], user=request.user)
+        
         # Send email notification
         try:
             from .email_service import EmailService
@@ -1701,6 +1712,8 @@ def cancel_leave_request(request, request_id):
         
         leave_request.status = 'cancelled'
         leave_request.save()
+        # Hoàn lại số ngày phép đã giữ khi gửi đơn
+        settle_leave_requests([leave_request], user=request.user)
         
         logger.info(f"Leave request {request_id} cancelled by {employee.name}")
         messages.success(request, "Đã hủy đơn xin nghỉ phép")
@@ -2135,15 +2148,16 @@ def employee_dashboard(request):
         return redirect("admin_home")
     
     # Lấy tháng/năm hiện tại
-    now = timezone.now()
+    now = timezone.localtime(timezone.now())
     current_month = now.month
     current_year = now.year
     
     # Thống kê chấm công tháng này
+    month_start, next_month_start = month_bounds(current_year, current_month)
     attendance_this_month = Attendance.objects.filter(
         employee=employee,
-        date__year=current_year,
-        date__month=current_month
+        work_date__gte=month_start,
+        work_date__lt=next_month_start
     )
     total_working_days = attendance_this_month.filter(status="Có làm việc").count()
     total_working_hours = attendance_this_month.filter(status="Có làm việc").aggregate(Sum('working_hours'))['working_hours__sum'] or 0
@@ -2174,8 +2188,8 @@ def employee_dashboard(request):
     
     total_expenses_this_month = Expense.objects.filter(
         employee=employee,
-        date__year=current_year,
-        date__month=current_month
+        date__gte=month_start,
+        date__lt=next_month_start
     ).aggregate(Sum('amount'))['amount__sum'] or 0
     
     # Hoạt động gần đây
@@ -2348,15 +2362,11 @@ def my_attendance(request):
     month_filter = request.GET.get('month', '')
     year_filter = request.GET.get('year', '')
     
-    attendances = Attendance.objects.filter(employee=employee).order_by('-date')
-    
-    if month_filter:
-        attendances = attendances.filter(date__month=int(month_filter))
-    if year_filter:
-        attendances = attendances.filter(date__year=int(year_filter))
+    # Bảng chính + lưu trữ (tháng đã đóng)
+    records = employee_attendance(employee, year_filter, month_filter)
     
     # Phân trang
-    paginator = Paginator(attendances, 31)  # 1 tháng per page
+    paginator = Paginator(records, 31)  # 1 tháng per page
     page = request.GET.get('page')
     try:
         attendances = paginator.page(page)
@@ -2367,27 +2377,19 @@ def my_attendance(request):
     
     # Thống kê
     if month_filter and year_filter:
-        month_attendances = Attendance.objects.filter(
-            employee=employee,
-            date__month=int(month_filter),
-            date__year=int(year_filter)
-        )
+        month_stats = summarize(records)
     else:
         # Tháng hiện tại
-        now = timezone.now()
-        month_attendances = Attendance.objects.filter(
-            employee=employee,
-            date__month=now.month,
-            date__year=now.year
-        )
+        now = timezone.localtime(timezone.now())
+        month_stats = summarize(employee_attendance(employee, now.year, now.month))
     
-    total_days = month_attendances.filter(status="Có làm việc").count()
-    total_hours = month_attendances.filter(status="Có làm việc").aggregate(Sum('working_hours'))['working_hours__sum'] or 0
-    leave_days = month_attendances.filter(status="Nghỉ phép").count()
-    absent_days = month_attendances.filter(status="Nghỉ không phép").count()
+    total_days = month_stats['working_days']
+    total_hours = month_stats['present_hours']
+    leave_days = month_stats['leave_days']
+    absent_days = month_stats['absent_days']
     
     # Danh sách tháng/năm để filter
-    years = Attendance.objects.filter(employee=employee).values_list('date__year', flat=True).distinct().order_by('-date__year')
+    years = attendance_years(employee)
     months = range(1, 13)
     
     context = {
@@ -2587,62 +2589,83 @@ def delete_job(request, job_id):
     return redirect('job_detail_admin', job_id=job_id)
 
 
+def _application_board_filters(request):
+    """(job_id, search) của trang quản lý ứng tuyển - job không hợp lệ thì bỏ qua"""
+    job_filter = request.GET.get('job') or None
+    if job_filter and not job_filter.isdigit():
+        job_filter = None
+    return job_filter, request.GET.get('search') or None
+
+
 @login_required
 def applications_kanban(request):
-    """Admin - Quản lý applications với chế độ xem List và Kanban"""
+    """Admin - Quản lý applications với chế độ xem List và Kanban (mỗi cột tải theo trang)"""
     from app.models import Application, JobPosting
-    from django.db.models import Q
-    from collections import defaultdict
-    
-    # Get view mode (list or kanban)
-    view_mode = request.GET.get('view', 'list')
-    
-    # Filter by job
-    job_filter = request.GET.get('job')
-    if job_filter:
-        applications = Application.objects.filter(job_id=job_filter)
+
+    view_mode = 'kanban' if request.GET.get('view') == 'kanban' else 'list'
+    job_filter, search_query = _application_board_filters(request)
+    applications = board_queryset(job_filter, search_query)
+
+    # Statistics (toàn bộ đơn) + số đơn mỗi cột theo bộ lọc: mỗi loại một truy vấn GROUP BY
+    status_totals = column_counts(Application.objects.all())
+    counts = column_counts(applications) if job_filter or search_query else status_totals
+
+    kanban_columns = []
+    list_page = list_cursor = None
+    if view_mode == 'kanban':
+        for status_code, status_name in Application.STATUS_CHOICES:
+            cards, next_cursor = column_page(applications, status_code)
+            kanban_columns.append({
+                'status': status_code,
+                'name': status_name,
+                'count': counts[status_code],
+                'applications': cards,
+                'next_cursor': next_cursor,
+            })
     else:
-        applications = Application.objects.all()
-    
-    # Search
-    search_query = request.GET.get('search')
-    if search_query:
-        applications = applications.filter(
-            Q(full_name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(application_code__icontains=search_query)
-        )
-    
-    applications = applications.select_related('job', 'assigned_to', 'interviewer').order_by('-created_at')
-    
-    # Group applications by status for kanban view
-    kanban_columns = defaultdict(list)
-    for app in applications:
-        kanban_columns[app.status].append(app)
-    
-    # Get all jobs for filter
-    jobs = JobPosting.objects.filter(status='open').order_by('-created_at')
-    
-    # Statistics
-    total_applications = Application.objects.count()
-    new_applications = Application.objects.filter(status='new').count()
-    interview_scheduled = Application.objects.filter(status__in=['phone_interview', 'interview']).count()
-    
+        list_page, list_cursor = column_page(applications)
+
+    jobs = JobPosting.objects.filter(status='open').only('id', 'code', 'title').order_by('-created_at')
+
     context = {
-        'applications': applications,
-        'kanban_columns': dict(kanban_columns),
-        'STATUS_CHOICES': Application.STATUS_CHOICES,
+        'applications': list_page,
+        'list_cursor': list_cursor,
+        'kanban_columns': kanban_columns,
+        'total_count': sum(counts.values()),
         'jobs': jobs,
         'job_filter': job_filter,
         'search_query': search_query,
-        'total_applications': total_applications,
-        'new_applications': new_applications,
-        'interview_scheduled': interview_scheduled,
+        'total_applications': sum(status_totals.values()),
+        'new_applications': status_totals['new'],
+        'interview_scheduled': sum(status_totals[status] for status in INTERVIEW_STATUSES),
         'view_mode': view_mode,
     }
     return render(request, 'hod_template/manage_applications.html', context)
 
 
+@login_required
+def applications_board_page(request):
+    """Admin - AJAX: trang kế tiếp của một cột Kanban (status) hoặc của danh sách (không có status)"""
+    from app.models import Application
+
+    status = request.GET.get('status') or None
+    if status and status not in dict(Application.STATUS_CHOICES):
+        return JsonResponse({'status': 'error', 'message': 'Trạng thái không hợp lệ'}, status=400)
+    job_filter, search_query = _application_board_filters(request)
+    try:
+        cards, next_cursor = column_page(
+            board_queryset(job_filter, search_query), status, cursor=request.GET.get('cursor') or None
+        )
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Con trỏ phân trang không hợp lệ'}, status=400)
+
+    html = render_to_string('hod_template/application_cards.html', {
+        'applications': cards,
+        'layout': 'kanban' if status else 'list',
+    }, request=request)
+    return JsonResponse({'status': 'success', 'html': html, 'next_cursor': next_cursor})
+
+
 @login_required
 @require_POST
 def update_application_status(request, application_id):
@@ -2866,116 +2889,50 @@ def convert_to_employee(request, application_id):
 
 @login_required
 def org_chart(request):
-    """Admin - Biểu đồ cơ cấu tổ chức"""
-    from app.models import Employee, Department
-    import json
-    
-    # Get all departments with employee counts
-    departments = Department.objects.prefetch_related('employee_set').all().order_by('name')
-    
-    # Get all employees with their relationships
-    employees = Employee.objects.select_related('department', 'job_title').filter(
-        status__in=[0, 1, 2]  # Only active employees
-    ).order_by('department', '-is_manager', 'name')
-    
-    # Build org chart data structure
-    org_data = []
-    
-    # Add CEO/Directors (managers without department or top-level managers)
-    top_managers = employees.filter(is_manager=True, department__isnull=True)
-    for manager in top_managers:
-        org_data.append({
-            'id': f'emp_{manager.id}',
-            'name': manager.name,
-            'title': manager.job_position or 'N/A',
-            'department': 'Ban Giám Đốc',
-            'employee_code': manager.employee_code,
-            'email': manager.email,
-            'phone': manager.phone,
-            'is_manager': True,
-            'avatar': manager.avatar.url if manager.avatar else None,
-            'parent': None,
-        })
-    
-    # Add departments and their employees
-    for dept in departments:
-        dept_employees = employees.filter(department=dept)
-        
-        # Add department node
-        dept_manager = dept_employees.filter(is_manager=True).first()
-        dept_id = f'dept_{dept.id}'
-        
-        org_data.append({
-            'id': dept_id,
-            'name': dept.name,
-            'title': f'{dept_employees.count()} nhân viên',
-            'department': dept.name,
-            'is_department': True,
-            'parent': 'emp_1' if top_managers.exists() else None,  # Link to CEO if exists
-        })
-        
-        # Add department manager
-        if dept_manager:
-            org_data.append({
-                'id': f'emp_{dept_manager.id}',
-                'name': dept_manager.name,
-                'title': dept_manager.job_position or 'Trưởng phòng',
-                'department': dept.name,
-                'employee_code': dept_manager.employee_code,
-                'email': dept_manager.email,
-                'phone': dept_manager.phone,
-                'is_manager': True,
-                'avatar': dept_manager.avatar.url if dept_manager.avatar else None,
-                'parent': dept_id,
-            })
-            
-            # Add department staff (non-managers)
-            staff = dept_employees.filter(is_manager=False)
-            for emp in staff:
-                org_data.append({
-                    'id': f'emp_{emp.id}',
-                    'name': emp.name,
-                    'title': emp.job_position or 'N/A',
-                    'department': dept.name,
-                    'employee_code': emp.employee_code,
-                    'email': emp.email,
-                    'phone': emp.phone,
-                    'is_manager': False,
-                    'avatar': emp.avatar.url if emp.avatar else None,
-                    'parent': f'emp_{dept_manager.id}',
-                })
-        else:
-            # No manager, add all staff directly under department
-            for emp in dept_employees:
-                org_data.append({
-                    'id': f'emp_{emp.id}',
-                    'name': emp.name,
-                    'title': emp.job_position or 'N/A',
-                    'department': dept.name,
-                    'employee_code': emp.employee_code,
-                    'email': emp.email,
-                    'phone': emp.phone,
-                    'is_manager': False,
-                    'avatar': emp.avatar.url if emp.avatar else None,
-                    'parent': dept_id,
-                })
-    
-    # Statistics
-    total_employees = employees.count()
-    total_departments = departments.count()
-    total_managers = employees.filter(is_manager=True).count()
-    
+    """Admin - Biểu đồ cơ cấu tổ chức (thành viên phòng ban được tải khi mở rộng)"""
+    org = get_org_summary()
     context = {
-        'org_data_json': json.dumps(org_data),
-        'total_employees': total_employees,
-        'total_departments': total_departments,
-        'total_managers': total_managers,
-        'departments': departments,
+        'org': org,
+        'org_data_json': org['nodes_json'],
+        'total_employees': org['total_employees'],
+        'total_departments': org['total_departments'],
+        'total_managers': org['total_managers'],
     }
-    
     return render(request, 'hod_template/org_chart.html', context)
 
 
+@login_required
+def org_chart_department(request, department_id):
+    """API: thành viên của một phòng ban trên sơ đồ tổ chức (JSON đã cache)"""
+    members_json = department_members_json(department_id)
+    if members_json is None:
+        return JsonResponse({'status': 'error', 'message': 'Không tìm thấy phòng ban'}, status=404)
+    return HttpResponse(members_json, content_type='application/json')
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+@login_required
+@require_hr
+def monthly_stats_report(request):
+    """API: xu hướng số liệu tháng theo phòng ban (đọc từ bảng tổng hợp, HR only)"""
+    today = timezone.localdate()
+    try:
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
+        months = min(max(int(request.GET.get('months', TREND_MONTHS)), 1), MAX_TREND_MONTHS)
+        department_ids = [int(pk) for pk in request.GET.getlist('department')] or None
+        if not 1 <= month <= 12:
+            raise ValueError(month)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Tham số không hợp lệ"}, status=400)
+
+    rows = trend_rows(year, month, months, department_ids)
+    return JsonResponse({"status": "success", "year": year, "month": month, "months": months, "rows": rows})
+
+
 # ============================================================================
 # SALARY RULES ENGINE
 # ============================================================================
@@ -3014,6 +2971,7 @@ def create_salary_component(request):
                 is_active=request.POST.get('is_active') == 'on',
                 description=request.POST.get('description', ''),
             )
+            validate_formula(component.formula)
             component.save()
             messages.success(request, f'Đã tạo thành phần lương: {component.name}')
             return redirect('salary_components')
@@ -3047,6 +3005,7 @@ def edit_salary_component(request, component_id):
             component.is_mandatory = request.POST.get('is_mandatory') == 'on'
             component.is_active = request.POST.get('is_active') == 'on'
             component.description = request.POST.get('description', '')
+            validate_formula(component.formula)
             component.save()
             
             messages.success(request, f'Đã cập nhật: {component.name}')
@@ -3150,6 +3109,7 @@ def assign_salary_rule(request, employee_id):
                     notes=request.POST.get('notes', ''),
                     created_by=Employee.objects.get(admin=request.user)
                 )
+                validate_formula(rule.custom_formula)
                 rule.save()
                 messages.success(request, f'Đã gán {component.name} cho {employee.name}')
         except Exception as e:
@@ -3280,43 +3240,28 @@ def bulk_assign_salary_rules(request):
             effective_from = request.POST.get('effective_from')
             effective_to = request.POST.get('effective_to') or None
             notes = request.POST.get('notes', '')
+            validate_formula(custom_formula)
             
             component = get_object_or_404(SalaryComponent, id=component_id)
-            created_by = Employee.objects.get(admin=request.user)
-            
-            created_count = 0
-            skipped_count = 0
-            
-            for emp_id in employee_ids:
-                employee = Employee.objects.get(id=emp_id)
-                
-                # Check if rule already exists
-                existing = EmployeeSalaryRule.objects.filter(
-                    employee=employee,
-                    component=component,
-                    is_active=True
-                ).first()
-                
-                if existing:
-                    skipped_count += 1
-                    continue
-                
-                # Create new rule
-                EmployeeSalaryRule.objects.create(
-                    employee=employee,
-                    component=component,
-                    custom_amount=custom_amount,
-                    custom_percentage=custom_percentage,
-                    custom_formula=custom_formula,
-                    effective_from=effective_from,
-                    effective_to=effective_to,
-                    notes=notes,
-                    created_by=created_by
-                )
-                created_count += 1
-            
-            messages.success(request, f'Đã gán quy tắc cho {created_count} nhân viên. Bỏ qua {skipped_count} nhân viên (đã có quy tắc).')
-            return redirect('bulk_assign_salary_rules')
+            created_by = get_identity(request.user).employee
+            if not employee_ids:
+                raise ValueError('Chưa chọn nhân viên')
+            if not effective_from:
+                raise ValueError('Chưa nhập ngày hiệu lực')
+
+            job = enqueue_job('bulk_assign_salary_rules', {
+                'employee_ids': employee_ids,
+                'component_id': component.id,
+                'custom_amount': custom_amount,
+                'custom_percentage': custom_percentage,
+                'custom_formula': custom_formula,
+                'effective_from': effective_from,
+                'effective_to': effective_to,
+                'notes': notes,
+                'created_by_id': created_by.id if created_by else None,
+            }, user=request.user, label=f'Gán {component.name} cho {len(employee_ids)} nhân viên')
+            messages.info(request, 'Đang gán quy tắc lương ở nền.')
+            return _redirect_to_job(job, reverse('bulk_assign_salary_rules'))
             
         except Exception as e:
             messages.error(request, f'Lỗi: {str(e)}')
@@ -3419,6 +3364,7 @@ def edit_salary_rule_template(request, template_id):
                         custom_formula=request.POST.get('custom_formula', ''),
                         order=template.template_items.count()
                     )
+                    validate_formula(item.custom_formula)
                     item.save()
                     messages.success(request, f'Đã thêm {component.name}')
             except Exception as e:
@@ -4106,58 +4052,21 @@ def delete_appraisal_criteria(request, criteria_id):
 
 @login_required
 @hr_required
-@transaction.atomic
 def generate_appraisals(request, period_id):
-    """Tạo appraisal records cho tất cả nhân viên phù hợp"""
+    """Tạo appraisal records cho tất cả nhân viên phù hợp (chạy nền)"""
     period = get_object_or_404(AppraisalPeriod, id=period_id)
+    back_url = reverse('appraisal_period_detail', args=[period.id])
     
     if request.method == 'POST':
-        try:
-            # Get applicable employees
-            employees = Employee.objects.filter(status__in=[1, 2])  # Thử việc và chính thức
-            
-            # Filter by department if specified
-            if period.applicable_departments.exists():
-                employees = employees.filter(department__in=period.applicable_departments.all())
-            
-            # Filter by job title if specified
-            if period.applicable_job_titles.exists():
-                employees = employees.filter(job_title__in=period.applicable_job_titles.all())
-            
-            created_count = 0
-            for employee in employees:
-                # Check if appraisal already exists
-                if not Appraisal.objects.filter(period=period, employee=employee).exists():
-                    # Find manager (employee with is_manager=True in same department)
-                    manager = Employee.objects.filter(
-                        department=employee.department,
-                        is_manager=True
-                    ).exclude(id=employee.id).first()
-                    
-                    appraisal = Appraisal.objects.create(
-                        period=period,
-                        employee=employee,
-                        manager=manager,
-                        status='pending_self'
-                    )
-                    
-                    # Create AppraisalScore for each criteria
-                    for criteria in period.criteria.all():
-                        AppraisalScore.objects.create(
-                            appraisal=appraisal,
-                            criteria=criteria
-                        )
-                    
-                    created_count += 1
-            
-            messages.success(request, f'Đã tạo {created_count} đánh giá cho nhân viên')
-            logger.info(f"Generated {created_count} appraisals for period {period.name}")
-            
-        except Exception as e:
-            logger.error(f"Error generating appraisals: {e}")
-            messages.error(request, f'Lỗi: {str(e)}')
+        job = enqueue_job(
+            'generate_appraisals', {'period_id': period.id}, user=request.user,
+            label=f'Tạo đánh giá - {period.name}'
+        )
+        logger.info(f"Appraisal generation for period {period.name} queued as job {job.id}")
+        messages.info(request, 'Đang tạo đánh giá cho nhân viên ở nền.')
+        return _redirect_to_job(job, back_url)
     
-    return redirect('appraisal_period_detail', period_id=period.id)
+    return redirect(back_url)
 
 
 @login_required
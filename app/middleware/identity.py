@@ -0,0 +1,21 @@
+"""
+Identity Middleware
+Gắn request.identity (UserIdentity) một lần cho mỗi request để permission
+helper, middleware khác và template dùng chung.
+"""
+from django.utils.functional import SimpleLazyObject
+from app.identity import get_identity
+
+
+class IdentityMiddleware:
+    """
+    Must run after AuthenticationMiddleware.
+    Identity chỉ được tính khi có nơi truy cập request.identity lần đầu.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.identity = SimpleLazyObject(lambda: get_identity(request.user))
+        return self.get_response(request)
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:58
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+
+logger = logging.getLogger(__name__)
+
+
+def populate_work_date(apps, schema_editor):
+    """Điền work_date từ date (theo TIME_ZONE) và gộp bản ghi trùng ngày trước khi thêm unique"""
+    Attendance = apps.get_model('app', 'Attendance')
+    Attendance.objects.update(work_date=TruncDate('date'))
+
+    duplicates = (
+        Attendance.objects.values('employee_id', 'work_date')
+        .annotate(count=Count('id'), keep_id=Max('id'))
+        .filter(count__gt=1)
+    )
+    removed = 0
+    for row in duplicates.iterator():
+        removed += Attendance.objects.filter(
+            employee_id=row['employee_id'], work_date=row['work_date']
+        ).exclude(id=row['keep_id']).delete()[0]
+    if removed:
+        logger.warning("Removed %s duplicate attendance rows (kept latest per employee/day)", removed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_appraisal_company_feedback_systemsettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='work_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_work_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attendance',
+            name='work_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['work_date'], name='attendance_work_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discipline',
+            index=models.Index(fields=['employee', 'date'], name='discipline_employee_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discipline',
+            index=models.Index(fields=['date'], name='discipline_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['employee', 'status', 'date'], name='expense_emp_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['status', 'employee'], name='expense_status_employee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', 'status', 'start_date'], name='leave_emp_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['status', 'employee'], name='leave_status_employee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(fields=['employee', 'date'], name='reward_employee_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(fields=['date'], name='reward_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('employee', 'work_date'), name='unique_attendance_employee_work_date'),
+        ),
+    ]
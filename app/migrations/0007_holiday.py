@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_background_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('name', models.CharField(max_length=200)),
+                ('kind', models.CharField(choices=[('public', 'Nghỉ lễ, Tết'), ('company', 'Công ty nghỉ'), ('working', 'Ngày làm việc (làm bù)')], default='public', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('department', models.ForeignKey(blank=True, help_text='Để trống nếu áp dụng cho toàn công ty', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='app.department')),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='holiday',
+            constraint=models.UniqueConstraint(fields=('date', 'department'), name='holiday_date_department_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='holiday',
+            constraint=models.UniqueConstraint(condition=models.Q(('department__isnull', True)), fields=('date',), name='holiday_company_date_uniq'),
+        ),
+    ]
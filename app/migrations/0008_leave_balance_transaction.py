@@ -0,0 +1,71 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_ledger(apps, schema_editor):
+    """
+    Ghi bút toán mở sổ để tổng sổ cái bằng used_days hiện tại: một bút toán giữ phép cho
+    mỗi đơn đang chờ/đã duyệt, phần chênh lệch còn lại ghi vào số dư đầu kỳ.
+    """
+    LeaveBalance = apps.get_model('app', 'LeaveBalance')
+    LeaveRequest = apps.get_model('app', 'LeaveRequest')
+    LeaveBalanceTransaction = apps.get_model('app', 'LeaveBalanceTransaction')
+
+    balances = {
+        (balance.employee_id, balance.leave_type_id, balance.year): balance
+        for balance in LeaveBalance.objects.all()
+    }
+    reserved = {}
+    transactions = []
+    requests = LeaveRequest.objects.filter(status__in=['pending', 'approved']).only(
+        'id', 'employee_id', 'leave_type_id', 'start_date', 'total_days'
+    )
+    for leave in requests.iterator():
+        balance = balances.get((leave.employee_id, leave.leave_type_id, leave.start_date.year))
+        if balance is None or not leave.total_days:
+            continue
+        transactions.append(LeaveBalanceTransaction(
+            balance=balance, leave_request=leave, kind='reserve', days=leave.total_days,
+            note='Mở sổ cái'
+        ))
+        reserved[balance.id] = reserved.get(balance.id, 0) + leave.total_days
+
+    for balance in balances.values():
+        opening = balance.used_days - reserved.get(balance.id, 0)
+        if opening:
+            transactions.append(LeaveBalanceTransaction(
+                balance=balance, kind='opening', days=opening, note='Mở sổ cái'
+            ))
+    LeaveBalanceTransaction.objects.bulk_create(transactions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0007_holiday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalanceTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('opening', 'Số dư đầu kỳ'), ('reserve', 'Giữ phép theo đơn'), ('release', 'Hoàn phép'), ('adjust', 'Điều chỉnh')], max_length=20)),
+                ('days', models.FloatField(help_text='Số ngày phép sử dụng (âm nếu hoàn lại)')),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('balance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='app.leavebalance')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('leave_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='balance_transactions', to='app.leaverequest')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['leave_request', 'balance'], name='leave_txn_request_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
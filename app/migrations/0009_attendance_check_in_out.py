@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_leave_balance_transaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='check_in_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='check_out_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
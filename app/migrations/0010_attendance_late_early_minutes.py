@@ -0,0 +1,84 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:31
+
+import re
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Bản sao của attendance_ingest.LATE_PATTERN / EARLY_PATTERN (migration không import code ứng dụng)
+LATE_PATTERN = re.compile(r'muộn\s*(\d+)?', re.IGNORECASE)
+EARLY_PATTERN = re.compile(r'sớm\s*(\d+)?', re.IGNORECASE)
+
+
+def _minutes(pattern, notes):
+    match = pattern.search(notes or '')
+    if not match:
+        return 0
+    return int(match.group(1)) if match.group(1) else 1
+
+
+def backfill_flags(apps, schema_editor):
+    """
+    Điền late_minutes / early_minutes từ ghi chú ("Đi muộn 12 phút", "Về sớm 5 phút") và
+    check_in_at / check_out_at cho bản ghi check-in qua portal (date có giờ, không phải 00:00).
+    """
+    Attendance = apps.get_model('app', 'Attendance')
+    fields = ['late_minutes', 'early_minutes', 'check_in_at', 'check_out_at']
+    rows = Attendance.objects.only('id', 'date', 'status', 'working_hours', 'notes', *fields).order_by('pk')
+    last_pk = 0
+    while True:
+        # Đọc theo lô khóa chính (không ghi vào bảng đang được duyệt bằng cursor)
+        chunk = list(rows.filter(pk__gt=last_pk)[:2000])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        Attendance.objects.bulk_update([row for row in chunk if _fill(row)], fields)
+
+
+def _fill(attendance):
+    """Điền các cột mới cho một bản ghi; True nếu có thay đổi"""
+    late = _minutes(LATE_PATTERN, attendance.notes)
+    early = _minutes(EARLY_PATTERN, attendance.notes)
+    check_in_at, check_out_at = attendance.check_in_at, attendance.check_out_at
+    local = timezone.localtime(attendance.date) if timezone.is_aware(attendance.date) else attendance.date
+    if check_in_at is None and attendance.status == 'Có làm việc' and (local.hour, local.minute) != (0, 0):
+        check_in_at = attendance.date
+        if attendance.working_hours > 0:
+            check_out_at = attendance.date + timedelta(hours=attendance.working_hours)
+
+    current = (attendance.late_minutes, attendance.early_minutes, attendance.check_in_at, attendance.check_out_at)
+    if (late, early, check_in_at, check_out_at) == current:
+        return False
+    attendance.late_minutes, attendance.early_minutes = late, early
+    attendance.check_in_at, attendance.check_out_at = check_in_at, check_out_at
+    return True
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_attendance_check_in_out'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='early_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='late_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('late_minutes__gt', 0)), fields=['work_date', 'employee'], name='attendance_late_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('early_minutes__gt', 0)), fields=['work_date', 'employee'], name='attendance_early_idx'),
+        ),
+        migrations.RunPython(backfill_flags, migrations.RunPython.noop),
+    ]
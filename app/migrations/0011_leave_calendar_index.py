@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_attendance_late_early_minutes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['end_date', 'start_date'], name='leave_end_start_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_leave_calendar_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='application_board_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['job', 'status', '-created_at', '-id'], name='application_job_board_idx'),
+        ),
+    ]
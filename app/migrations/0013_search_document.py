@@ -0,0 +1,108 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:46
+
+from django.db import migrations, models
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE app_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(keywords, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX search_document_vector_idx ON app_searchdocument USING gin (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS search_document_vector_idx",
+    "ALTER TABLE app_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+# Bảng FTS5 external-content: chỉ lưu chỉ mục, nội dung đọc từ app_searchdocument
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE app_searchdocument_fts USING fts5(
+        keywords, content, content='app_searchdocument', content_rowid='id', tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER app_searchdocument_fts_ai AFTER INSERT ON app_searchdocument BEGIN
+        INSERT INTO app_searchdocument_fts(rowid, keywords, content) VALUES (new.id, new.keywords, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER app_searchdocument_fts_ad AFTER DELETE ON app_searchdocument BEGIN
+        INSERT INTO app_searchdocument_fts(app_searchdocument_fts, rowid, keywords, content)
+        VALUES ('delete', old.id, old.keywords, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER app_searchdocument_fts_au AFTER UPDATE ON app_searchdocument BEGIN
+        INSERT INTO app_searchdocument_fts(app_searchdocument_fts, rowid, keywords, content)
+        VALUES ('delete', old.id, old.keywords, old.content);
+        INSERT INTO app_searchdocument_fts(rowid, keywords, content) VALUES (new.id, new.keywords, new.content);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS app_searchdocument_fts_au",
+    "DROP TRIGGER IF EXISTS app_searchdocument_fts_ad",
+    "DROP TRIGGER IF EXISTS app_searchdocument_fts_ai",
+    "DROP TABLE IF EXISTS app_searchdocument_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                # SQLite không có FTS5: app.search_index dùng LIKE trên cột đã bỏ dấu
+                return
+        _run(schema_editor, SQLITE_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARD)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_application_board_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('employee', 'Nhân viên'), ('application', 'Ứng tuyển'), ('job', 'Tin tuyển dụng'), ('document', 'Tài liệu'), ('announcement', 'Thông báo'), ('leave', 'Đơn nghỉ phép')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(help_text='Tiêu đề hiển thị', max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('keywords', models.TextField(blank=True, help_text='Tiêu đề đã bỏ dấu (trọng số cao)')),
+                ('content', models.TextField(blank=True, help_text='Nội dung đã bỏ dấu')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Search document',
+                'verbose_name_plural': 'Search documents',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('entity_type', 'object_id'), name='search_document_unique'),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
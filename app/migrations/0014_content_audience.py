@@ -0,0 +1,63 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:51
+
+from django.db import migrations, models
+
+
+def backfill_audiences(apps, schema_editor):
+    """Phân giải đối tượng xem của tài liệu / thông báo hiện có (giống app.content_audience)"""
+    ContentAudience = apps.get_model('app', 'ContentAudience')
+    Document = apps.get_model('app', 'Document')
+    Announcement = apps.get_model('app', 'Announcement')
+
+    rows = []
+    for document in Document.objects.prefetch_related('departments', 'specific_employees'):
+        if document.visibility == 'all':
+            keys = {'all'}
+        elif document.visibility == 'manager':
+            keys = {'manager'}
+        elif document.visibility == 'department':
+            keys = {f'department:{department.id}' for department in document.departments.all()}
+        elif document.visibility == 'specific':
+            keys = {f'employee:{employee.id}' for employee in document.specific_employees.all()}
+        else:
+            keys = set()
+        rows += [ContentAudience(entity_type='document', object_id=document.id, audience_key=key) for key in keys]
+
+    for announcement in Announcement.objects.prefetch_related('target_departments', 'target_employees'):
+        keys = {'all'} if announcement.target_all else set()
+        keys.update(f'department:{department.id}' for department in announcement.target_departments.all())
+        keys.update(f'employee:{employee.id}' for employee in announcement.target_employees.all())
+        rows += [
+            ContentAudience(entity_type='announcement', object_id=announcement.id, audience_key=key) for key in keys
+        ]
+
+    ContentAudience.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentAudience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('document', 'Tài liệu'), ('announcement', 'Thông báo')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('audience_key', models.CharField(max_length=40)),
+            ],
+            options={
+                'verbose_name': 'Content audience',
+                'verbose_name_plural': 'Content audiences',
+                'indexes': [models.Index(fields=['entity_type', 'object_id'], name='content_audience_object_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contentaudience',
+            constraint=models.UniqueConstraint(fields=('entity_type', 'audience_key', 'object_id'), name='content_audience_unique'),
+        ),
+        migrations.RunPython(backfill_audiences, migrations.RunPython.noop),
+    ]
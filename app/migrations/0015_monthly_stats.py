@@ -0,0 +1,91 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_content_audience'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('attendance_records', models.IntegerField(default=0)),
+                ('working_hours', models.FloatField(default=0)),
+                ('late_count', models.IntegerField(default=0)),
+                ('early_leave_count', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0, help_text='Số ngày nghỉ không phép')),
+                ('leave_requests', models.IntegerField(default=0)),
+                ('leave_pending', models.IntegerField(default=0)),
+                ('leave_approved', models.IntegerField(default=0)),
+                ('leave_rejected', models.IntegerField(default=0)),
+                ('leave_days', models.FloatField(default=0, help_text='Số ngày nghỉ đã duyệt')),
+                ('expense_count', models.IntegerField(default=0)),
+                ('expense_pending', models.IntegerField(default=0)),
+                ('expense_approved', models.IntegerField(default=0, help_text='Đã duyệt hoặc đã thanh toán')),
+                ('expense_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('payroll_count', models.IntegerField(default=0)),
+                ('payroll_total', models.FloatField(default=0)),
+                ('appraisal_count', models.IntegerField(default=0)),
+                ('appraisal_completed', models.IntegerField(default=0)),
+                ('appraisal_score', models.DecimalField(blank=True, decimal_places=2, help_text='Điểm cuối cùng (trung bình các đánh giá hoàn thành)', max_digits=5, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('headcount', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='app.department')),
+            ],
+            options={
+                'verbose_name': 'Department monthly stats',
+                'verbose_name_plural': 'Department monthly stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('attendance_records', models.IntegerField(default=0)),
+                ('working_hours', models.FloatField(default=0)),
+                ('late_count', models.IntegerField(default=0)),
+                ('early_leave_count', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0, help_text='Số ngày nghỉ không phép')),
+                ('leave_requests', models.IntegerField(default=0)),
+                ('leave_pending', models.IntegerField(default=0)),
+                ('leave_approved', models.IntegerField(default=0)),
+                ('leave_rejected', models.IntegerField(default=0)),
+                ('leave_days', models.FloatField(default=0, help_text='Số ngày nghỉ đã duyệt')),
+                ('expense_count', models.IntegerField(default=0)),
+                ('expense_pending', models.IntegerField(default=0)),
+                ('expense_approved', models.IntegerField(default=0, help_text='Đã duyệt hoặc đã thanh toán')),
+                ('expense_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('payroll_count', models.IntegerField(default=0)),
+                ('payroll_total', models.FloatField(default=0)),
+                ('appraisal_count', models.IntegerField(default=0)),
+                ('appraisal_completed', models.IntegerField(default=0)),
+                ('appraisal_score', models.DecimalField(blank=True, decimal_places=2, help_text='Điểm cuối cùng (trung bình các đánh giá hoàn thành)', max_digits=5, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='employee_monthly_stats', to='app.department')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='app.employee')),
+            ],
+            options={
+                'verbose_name': 'Employee monthly stats',
+                'verbose_name_plural': 'Employee monthly stats',
+                'indexes': [models.Index(fields=['department', 'year', 'month'], name='employee_stats_dept_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='employeemonthlystats',
+            constraint=models.UniqueConstraint(fields=('employee', 'year', 'month'), name='employee_monthly_stats_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='departmentmonthlystats',
+            constraint=models.UniqueConstraint(fields=('department', 'year', 'month'), name='department_monthly_stats_unique'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_monthly_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('row_count', models.IntegerField(default=0)),
+                ('working_days', models.IntegerField(default=0, help_text='Số ngày có làm việc')),
+                ('working_hours', models.FloatField(default=0, help_text='Tổng giờ của mọi bản ghi')),
+                ('present_hours', models.FloatField(default=0, help_text='Tổng giờ của các ngày có làm việc (tính lương)')),
+                ('late_count', models.IntegerField(default=0)),
+                ('early_leave_count', models.IntegerField(default=0)),
+                ('leave_days', models.IntegerField(default=0, help_text='Số ngày nghỉ phép')),
+                ('absent_days', models.IntegerField(default=0, help_text='Số ngày nghỉ không phép')),
+                ('payload', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archives', to='app.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='attendance_archive_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancearchive',
+            constraint=models.UniqueConstraint(fields=('employee', 'year', 'month'), name='attendance_archive_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_attendance_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='holiday',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
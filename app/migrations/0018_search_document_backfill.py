@@ -0,0 +1,116 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:40
+
+import unicodedata
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+
+# Bản sao của app.search_index.fold_text và các builder (migration không import code ứng dụng)
+def fold_text(value):
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFD', str(value).replace('đ', 'd').replace('Đ', 'D'))
+    return ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+
+
+def _fold_join(*values):
+    return ' '.join(fold_text(value) for value in values if value)
+
+
+def _employee_document(employee):
+    department = employee.department.name if employee.department else ''
+    return (
+        employee.name,
+        ' · '.join(part for part in (employee.employee_code, employee.job_position, department) if part),
+        _fold_join(employee.name, employee.employee_code),
+        _fold_join(employee.email, employee.phone, employee.job_position, department),
+    )
+
+
+def _application_document(application):
+    return (
+        application.full_name,
+        f'{application.application_code} · {application.job.title}',
+        _fold_join(application.full_name, application.application_code),
+        _fold_join(application.email, application.phone, application.job.title, application.current_position,
+                   application.current_company),
+    )
+
+
+def _job_document(job):
+    return (
+        job.title,
+        ' · '.join(part for part in (job.code, job.location) if part),
+        _fold_join(job.title, job.code),
+        _fold_join(job.description, job.requirements, job.responsibilities, job.location),
+    )
+
+
+def _document_document(document):
+    return (
+        document.title,
+        document.category.name if document.category else '',
+        _fold_join(document.title),
+        _fold_join(document.description, document.category.name if document.category else ''),
+    )
+
+
+def _announcement_document(announcement):
+    return (
+        announcement.title,
+        announcement.get_category_display(),
+        _fold_join(announcement.title),
+        _fold_join(strip_tags(announcement.content)),
+    )
+
+
+def _leave_document(leave):
+    return (
+        f'{leave.leave_type.name} {leave.start_date:%d/%m/%Y} - {leave.end_date:%d/%m/%Y}',
+        f'{leave.employee.name} · {leave.total_days:g} ngày',
+        _fold_join(leave.leave_type.name),
+        _fold_join(leave.reason, leave.employee.name),
+    )
+
+
+ENTITIES = [
+    ('employee', 'Employee', ('department',), _employee_document),
+    ('application', 'Application', ('job',), _application_document),
+    ('job', 'JobPosting', (), _job_document),
+    ('document', 'Document', ('category',), _document_document),
+    ('announcement', 'Announcement', (), _announcement_document),
+    ('leave', 'LeaveRequest', ('employee', 'leave_type'), _leave_document),
+]
+
+
+def backfill_search_documents(apps, schema_editor):
+    """
+    Dựng chỉ mục tìm kiếm cho dữ liệu có sẵn (0013 chỉ tạo bảng rỗng, các trang danh sách
+    đã chuyển sang search_filter). Tài liệu đã có (rebuild_search_index) được giữ nguyên.
+    """
+    SearchDocument = apps.get_model('app', 'SearchDocument')
+    for entity_type, model_name, select_related, build in ENTITIES:
+        model = apps.get_model('app', model_name)
+        batch = []
+        for instance in model.objects.select_related(*select_related).order_by('pk').iterator(chunk_size=500):
+            title, subtitle, keywords, content = build(instance)
+            batch.append(SearchDocument(
+                entity_type=entity_type, object_id=instance.pk, title=title[:255], subtitle=subtitle[:255],
+                keywords=keywords, content=content,
+            ))
+            if len(batch) >= 500:
+                SearchDocument.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        SearchDocument.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_holiday_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_search_document_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyStatsVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('version', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='departmentmonthlystats',
+            name='source_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlystatsversion',
+            constraint=models.UniqueConstraint(fields=('year', 'month'), name='monthly_stats_version_unique'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_monthly_stats_version'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='monthlystatsversion',
+            name='monthly_stats_version_unique',
+        ),
+        migrations.AddField(
+            model_name='monthlystatsversion',
+            name='scope',
+            field=models.PositiveIntegerField(default=0, help_text='ID phòng ban, 0 = mọi phòng ban'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlystatsversion',
+            constraint=models.UniqueConstraint(fields=('year', 'month', 'scope'), name='monthly_stats_version_unique'),
+        ),
+    ]
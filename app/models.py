@@ -79,6 +79,12 @@ class Reward(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'date'], name='reward_employee_date_idx'),
+            models.Index(fields=['date'], name='reward_date_idx'),
+        ]
+
     def __str__(self):
         return f"Reward {self.number} - {self.employee.name}"
 
@@ -91,6 +97,12 @@ class Discipline(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'date'], name='discipline_employee_date_idx'),
+            models.Index(fields=['date'], name='discipline_date_idx'),
+        ]
+
     def __str__(self):
         return f"Discipline {self.number} - {self.employee.name}"
 
@@ -115,13 +127,61 @@ class Attendance(models.Model):
 
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     date = models.DateTimeField()
+    # Ngày làm việc (theo giờ địa phương) suy ra từ `date` - dùng cho lọc theo ngày/tháng
+    work_date = models.DateField(editable=False)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES)
     working_hours = models.FloatField(default=0)
     notes = models.CharField(max_length=300, blank=True)
+    # Thời điểm check-in / check-out qua portal (bản ghi do HR nhập tay để trống)
+    check_in_at = models.DateTimeField(null=True, blank=True)
+    check_out_at = models.DateTimeField(null=True, blank=True)
+    # Số phút đi muộn / về sớm so với giờ chuẩn (0 = đúng giờ), ghi khi chấm công
+    late_minutes = models.PositiveIntegerField(default=0)
+    early_minutes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'work_date'], name='unique_attendance_employee_work_date'),
+        ]
+        indexes = [
+            models.Index(fields=['work_date'], name='attendance_work_date_idx'),
+            # Partial index: chỉ các bản ghi đi muộn / về sớm (thống kê theo tháng)
+            models.Index(fields=['work_date', 'employee'], condition=models.Q(late_minutes__gt=0),
+                         name='attendance_late_idx'),
+            models.Index(fields=['work_date', 'employee'], condition=models.Q(early_minutes__gt=0),
+                         name='attendance_early_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date.date()} - {self.employee.name}"
 
+    @property
+    def check_in_time(self):
+        """Giờ check-in (bản ghi cũ / nhập tay: dùng date)"""
+        return self.check_in_at or self.date
+
+    @property
+    def has_checked_out(self):
+        return self.check_out_at is not None or self.working_hours > 0
+
+    @property
+    def is_late(self):
+        return self.late_minutes > 0
+
+    @property
+    def is_early_leave(self):
+        return self.early_minutes > 0
+
+    def save(self, *args, **kwargs):
+        """Đồng bộ work_date từ date (date có thể là chuỗi từ form)"""
+        from django.utils import timezone
+        if self.date:
+            value = self._meta.get_field('date').to_python(self.date)
+            if timezone.is_aware(value):
+                value = timezone.localtime(value)
+            self.work_date = value.date()
+        super().save(*args, **kwargs)
+
 
 class Payroll(models.Model):
     STATUS_CHOICES = [
@@ -231,23 +291,22 @@ class LeaveRequest(models.Model):
             ('approve_leave_request', 'Can approve leave requests'),
             ('view_team_leave_requests', 'Can view team leave requests'),
         ]
+        indexes = [
+            # Đơn của một nhân viên theo trạng thái/khoảng ngày (portal, số dư phép, tính lương)
+            models.Index(fields=['employee', 'status', 'start_date'], name='leave_emp_status_start_idx'),
+            # Danh sách chờ duyệt theo phòng ban: lọc status rồi join employee
+            models.Index(fields=['status', 'employee'], name='leave_status_employee_idx'),
+            # Lịch nghỉ: đơn giao với khung đang xem (end_date >= đầu khung loại bỏ đơn cũ)
+            models.Index(fields=['end_date', 'start_date'], name='leave_end_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.name} - {self.leave_type.name} ({self.start_date} to {self.end_date})"
 
     def calculate_working_days(self):
-        """Tính số ngày làm việc (không tính thứ 7, CN)"""
-        from datetime import timedelta
-        current_date = self.start_date
-        working_days = 0
-        
-        while current_date <= self.end_date:
-            # 0 = Monday, 6 = Sunday
-            if current_date.weekday() < 5:  # Monday to Friday
-                working_days += 1
-            current_date += timedelta(days=1)
-        
-        return working_days
+        """Tính số ngày làm việc (không tính thứ 7, CN và ngày nghỉ lễ theo lịch của phòng ban)"""
+        from .working_calendar import working_days_between
+        return working_days_between(self.start_date, self.end_date, self.employee.department_id)
 
     def save(self, *args, **kwargs):
         """Auto-calculate total_days if not set"""
@@ -256,6 +315,94 @@ class LeaveRequest(models.Model):
         super().save(*args, **kwargs)
 
 
+class LeaveBalanceTransaction(models.Model):
+    """
+    Sổ cái số dư phép (chỉ ghi thêm, không sửa/xóa). used_days của LeaveBalance luôn bằng
+    tổng days của các bút toán; days > 0 là trừ phép, days < 0 là hoàn lại.
+    """
+    KIND_CHOICES = [
+        ('opening', 'Số dư đầu kỳ'),
+        ('reserve', 'Giữ phép theo đơn'),
+        ('release', 'Hoàn phép'),
+        ('adjust', 'Điều chỉnh'),
+    ]
+
+    balance = models.ForeignKey(LeaveBalance, on_delete=models.CASCADE, related_name='transactions')
+    leave_request = models.ForeignKey(
+        LeaveRequest,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='balance_transactions'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    days = models.FloatField(help_text="Số ngày phép sử dụng (âm nếu hoàn lại)")
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['leave_request', 'balance'], name='leave_txn_request_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.balance} {self.days:+g} ({self.get_kind_display()})"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("LeaveBalanceTransaction is append-only")
+        super().save(*args, **kwargs)
+
+
+class Holiday(models.Model):
+    """
+    Ngày đặc biệt trong lịch làm việc: nghỉ lễ/Tết, công ty nghỉ, hoặc ngày làm việc
+    (làm bù thứ 7/CN). department trống = áp dụng toàn công ty; có phòng ban = ghi đè
+    lịch chung cho riêng phòng ban đó (vd. phòng vận hành vẫn làm việc ngày lễ).
+    """
+    KIND_CHOICES = [
+        ('public', 'Nghỉ lễ, Tết'),
+        ('company', 'Công ty nghỉ'),
+        ('working', 'Ngày làm việc (làm bù)'),
+    ]
+
+    date = models.DateField()
+    name = models.CharField(max_length=200)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='public')
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='holidays',
+        help_text="Để trống nếu áp dụng cho toàn công ty"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'department'], name='holiday_date_department_uniq'),
+            models.UniqueConstraint(
+                fields=['date'], condition=models.Q(department__isnull=True),
+                name='holiday_company_date_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.department.name if self.department_id else 'Toàn công ty'
+        return f"{self.date:%d/%m/%Y} - {self.name} ({scope})"
+
+    @property
+    def is_day_off(self):
+        return self.kind != 'working'
+
+
 class ExpenseCategory(models.Model):
     """Danh mục chi phí: Đi lại, Ăn uống, Khách sạn, v.v."""
     name = models.CharField(max_length=100, unique=True)
@@ -336,6 +483,10 @@ class Expense(models.Model):
             ('approve_expense', 'Can approve expense claims'),
             ('pay_expense', 'Can pay approved expenses'),
         ]
+        indexes = [
+            models.Index(fields=['employee', 'status', 'date'], name='expense_emp_status_date_idx'),
+            models.Index(fields=['status', 'employee'], name='expense_status_employee_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.name} - {self.category.name} - {self.amount:,.0f} VNĐ ({self.get_status_display()})"
@@ -550,6 +701,11 @@ class Application(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Application'
         verbose_name_plural = 'Applications'
+        indexes = [
+            # Phân trang keyset của từng cột Kanban (status, created_at, id)
+            models.Index(fields=['status', '-created_at', '-id'], name='application_board_idx'),
+            models.Index(fields=['job', 'status', '-created_at', '-id'], name='application_job_board_idx'),
+        ]
     
     def __str__(self):
         return f"{self.application_code} - {self.full_name} ({self.job.title})"
@@ -646,6 +802,12 @@ class SalaryComponent(models.Model):
     def __str__(self):
         return f"{self.get_component_type_display()} - {self.name}"
     
+    def save(self, *args, **kwargs):
+        """Drop compiled formulas of this component so edits take effect immediately"""
+        super().save(*args, **kwargs)
+        from .salary_formula import invalidate_component
+        invalidate_component(self.pk)
+    
     def calculate(self, base_salary=0, **kwargs):
         """Calculate component value based on method"""
         if self.calculation_method == 'fixed':
@@ -653,17 +815,9 @@ class SalaryComponent(models.Model):
         elif self.calculation_method == 'percentage':
             return base_salary * (self.percentage / 100)
         elif self.calculation_method == 'formula':
-            if self.formula:
-                try:
-                    # Create safe evaluation context
-                    context = {
-                        'base_salary': base_salary,
-                        **kwargs
-                    }
-                    return eval(self.formula, {"__builtins__": {}}, context)
-                except:
-                    return 0
-            return 0
+            from .salary_formula import evaluate_formula
+            context = {'base_salary': base_salary, **kwargs}
+            return evaluate_formula(self.formula, context, component_id=self.pk)
         elif self.calculation_method == 'hourly':
             hours = kwargs.get('hours', 0)
             return self.default_amount * hours
@@ -705,6 +859,12 @@ class EmployeeSalaryRule(models.Model):
     def __str__(self):
         return f"{self.employee.name} - {self.component.name}"
     
+    def save(self, *args, **kwargs):
+        """Drop compiled formulas cached for this rule's component"""
+        super().save(*args, **kwargs)
+        from .salary_formula import invalidate_component
+        invalidate_component(self.component_id)
+    
     def get_amount(self):
         """Get the custom amount or default from component"""
         if self.custom_amount is not None:
@@ -724,14 +884,10 @@ class EmployeeSalaryRule(models.Model):
         elif self.component.calculation_method == 'percentage':
             return base_salary * (self.get_percentage() / 100)
         elif self.component.calculation_method == 'formula':
+            from .salary_formula import evaluate_formula
             formula = self.custom_formula or self.component.formula
-            if formula:
-                try:
-                    context = {'base_salary': base_salary, **kwargs}
-                    return eval(formula, {"__builtins__": {}}, context)
-                except:
-                    return 0
-            return 0
+            context = {'base_salary': base_salary, **kwargs}
+            return evaluate_formula(formula, context, component_id=self.component_id)
         elif self.component.calculation_method == 'hourly':
             hours = kwargs.get('hours', 0)
             return self.get_amount() * hours
@@ -1785,3 +1941,314 @@ class SystemSettings(models.Model):
     
     def __str__(self):
         return "Cài đặt hệ thống"
+
+
+class EmailOutbox(models.Model):
+    """
+    Hàng đợi email (outbox pattern)
+    Email được ghi vào bảng này trong cùng transaction với thao tác nghiệp vụ,
+    worker (thread nền hoặc lệnh send_queued_emails) gửi theo lô qua một kết nối SMTP.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Chờ gửi'),
+        ('sending', 'Đang gửi'),
+        ('sent', 'Đã gửi'),
+        ('failed', 'Thất bại'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    template_name = models.CharField(max_length=100, help_text="Template trong emails/ (không có .html)")
+    context = models.JSONField(default=dict, blank=True, help_text="Context đã mã hóa; xóa sau khi gửi")
+    recipients = models.JSONField(default=list)
+    dedup_key = models.CharField(
+        max_length=200, null=True, blank=True, unique=True,
+        help_text="Khóa chống gửi trùng (VD: contract-expiring:12:2025-10-01)"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(auto_now_add=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Email outbox'
+        verbose_name_plural = 'Email outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.get_status_display()})"
+
+
+class BackgroundJob(models.Model):
+    """
+    Hàng đợi tác vụ nền (không cần broker)
+    View ghi job vào bảng này rồi trả về ngay; lệnh `run_jobs` nhận job và chạy
+    trong process pool, cập nhật tiến độ / heartbeat để giao diện polling.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Chờ xử lý'),
+        ('running', 'Đang chạy'),
+        ('succeeded', 'Hoàn tất'),
+        ('failed', 'Thất bại'),
+        ('cancelled', 'Đã hủy'),
+    ]
+    FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+    kind = models.CharField(max_length=50, help_text="Tên handler đã đăng ký trong app.jobs")
+    label = models.CharField(max_length=255, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Tác vụ nền'
+        verbose_name_plural = 'Tác vụ nền'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.label or self.kind} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def percent(self):
+        if self.status == 'succeeded':
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(100, round(self.progress_done * 100 / self.progress_total))
+
+
+class SearchDocument(models.Model):
+    """
+    Tài liệu tìm kiếm (đã bỏ dấu) của một đối tượng - xem app.search_index
+    Được cập nhật bằng signal; chỉ mục full-text nằm ngoài model: cột tsvector + GIN
+    trên PostgreSQL, bảng FTS5 app_searchdocument_fts trên SQLite (migration 0013).
+    """
+    ENTITY_CHOICES = [
+        ('employee', 'Nhân viên'),
+        ('application', 'Ứng tuyển'),
+        ('job', 'Tin tuyển dụng'),
+        ('document', 'Tài liệu'),
+        ('announcement', 'Thông báo'),
+        ('leave', 'Đơn nghỉ phép'),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255, help_text="Tiêu đề hiển thị")
+    subtitle = models.CharField(max_length=255, blank=True)
+    keywords = models.TextField(blank=True, help_text="Tiêu đề đã bỏ dấu (trọng số cao)")
+    content = models.TextField(blank=True, help_text="Nội dung đã bỏ dấu")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Search document'
+        verbose_name_plural = 'Search documents'
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'object_id'], name='search_document_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type}#{self.object_id} {self.title}"
+
+
+class ContentAudience(models.Model):
+    """
+    Chỉ mục đối tượng xem của tài liệu / thông báo - xem app.content_audience
+    Mỗi dòng là một "khóa đối tượng" (all, manager, department:<id>, employee:<id>)
+    được phép xem đối tượng; được đồng bộ bằng signal khi visibility / target thay đổi.
+    """
+    ENTITY_CHOICES = [
+        ('document', 'Tài liệu'),
+        ('announcement', 'Thông báo'),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.PositiveIntegerField()
+    audience_key = models.CharField(max_length=40)
+
+    class Meta:
+        verbose_name = 'Content audience'
+        verbose_name_plural = 'Content audiences'
+        constraints = [
+            # Phục vụ truy vấn "đối tượng nào khóa này được xem" (entity_type, audience_key)
+            models.UniqueConstraint(
+                fields=['entity_type', 'audience_key', 'object_id'], name='content_audience_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['entity_type', 'object_id'], name='content_audience_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type}#{self.object_id} -> {self.audience_key}"
+
+
+class MonthlyStatsFields(models.Model):
+    """Các chỉ số tháng dùng chung cho bảng tổng hợp theo nhân viên / phòng ban"""
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+
+    # Chấm công (theo work_date)
+    attendance_records = models.IntegerField(default=0)
+    working_hours = models.FloatField(default=0)
+    late_count = models.IntegerField(default=0)
+    early_leave_count = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0, help_text="Số ngày nghỉ không phép")
+
+    # Nghỉ phép (theo ngày bắt đầu nghỉ)
+    leave_requests = models.IntegerField(default=0)
+    leave_pending = models.IntegerField(default=0)
+    leave_approved = models.IntegerField(default=0)
+    leave_rejected = models.IntegerField(default=0)
+    leave_days = models.FloatField(default=0, help_text="Số ngày nghỉ đã duyệt")
+
+    # Chi phí (theo ngày phát sinh)
+    expense_count = models.IntegerField(default=0)
+    expense_pending = models.IntegerField(default=0)
+    expense_approved = models.IntegerField(default=0, help_text="Đã duyệt hoặc đã thanh toán")
+    expense_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Bảng lương của tháng
+    payroll_count = models.IntegerField(default=0)
+    payroll_total = models.FloatField(default=0)
+
+    # Đánh giá (kỳ kết thúc trong tháng)
+    appraisal_count = models.IntegerField(default=0)
+    appraisal_completed = models.IntegerField(default=0)
+    appraisal_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True,
+                                          help_text="Điểm cuối cùng (trung bình các đánh giá hoàn thành)")
+
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def avg_working_hours(self):
+        return self.working_hours / self.attendance_records if self.attendance_records else 0
+
+
+class EmployeeMonthlyStats(MonthlyStatsFields):
+    """
+    Số liệu tháng của một nhân viên - xem app.monthly_stats
+    department: phòng ban của nhân viên tại thời điểm tổng hợp
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='monthly_stats')
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='employee_monthly_stats')
+
+    class Meta:
+        verbose_name = 'Employee monthly stats'
+        verbose_name_plural = 'Employee monthly stats'
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'year', 'month'], name='employee_monthly_stats_unique'),
+        ]
+        indexes = [
+            # Top nhân viên của phòng ban trong tháng
+            models.Index(fields=['department', 'year', 'month'], name='employee_stats_dept_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.name} - {self.month}/{self.year}"
+
+
+class DepartmentMonthlyStats(MonthlyStatsFields):
+    """
+    Số liệu tháng của một phòng ban (tổng các EmployeeMonthlyStats) - xem app.monthly_stats
+    source_version: tổng MonthlyStatsVersion.version của tháng (toàn công ty + phòng ban)
+    lúc tổng hợp (khác = đã cũ)
+    """
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='monthly_stats')
+    headcount = models.IntegerField(default=0)
+    source_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Department monthly stats'
+        verbose_name_plural = 'Department monthly stats'
+        constraints = [
+            # Cũng phục vụ xu hướng nhiều năm của một phòng ban (department, year, month)
+            models.UniqueConstraint(fields=['department', 'year', 'month'], name='department_monthly_stats_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.department.name} - {self.month}/{self.year}"
+
+
+class MonthlyStatsVersion(models.Model):
+    """
+    Số lần dữ liệu nguồn của một tháng thay đổi - xem app.monthly_stats
+    scope: id phòng ban bị ảnh hưởng, 0 = mọi phòng ban (không phải FK để upsert theo
+    khóa (year, month, scope) trên mọi database)
+    """
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    scope = models.PositiveIntegerField(default=0, help_text="ID phòng ban, 0 = mọi phòng ban")
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month', 'scope'], name='monthly_stats_version_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.month}/{self.year} ({self.scope or 'all'}) - v{self.version}"
+
+
+class AttendanceArchive(models.Model):
+    """
+    Chấm công của một nhân viên trong một tháng đã đóng, nén theo cột - xem app.attendance_archive
+    Các cột tổng hợp cho phép tính lương / thống kê tháng bằng SQL mà không cần giải nén.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_archives')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+
+    row_count = models.IntegerField(default=0)
+    working_days = models.IntegerField(default=0, help_text="Số ngày có làm việc")
+    working_hours = models.FloatField(default=0, help_text="Tổng giờ của mọi bản ghi")
+    present_hours = models.FloatField(default=0, help_text="Tổng giờ của các ngày có làm việc (tính lương)")
+    late_count = models.IntegerField(default=0)
+    early_leave_count = models.IntegerField(default=0)
+    leave_days = models.IntegerField(default=0, help_text="Số ngày nghỉ phép")
+    absent_days = models.IntegerField(default=0, help_text="Số ngày nghỉ không phép")
+
+    # JSON các cột (day, date, status, working_hours, ...) nén zlib
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'year', 'month'], name='attendance_archive_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month'], name='attendance_archive_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.name} - {self.month}/{self.year} ({self.row_count} ngày)"
@@ -0,0 +1,449 @@
+"""
+Monthly statistics rollup
+Bảng tổng hợp số liệu tháng theo nhân viên (EmployeeMonthlyStats) và phòng ban
+(DepartmentMonthlyStats) cho báo cáo team của quản lý và xu hướng nhiều năm của HR:
+
+- refresh_month() tính lại một tháng bằng các truy vấn GROUP BY employee trên
+  Attendance, LeaveRequest, Expense, Payroll, Appraisal (số truy vấn cố định, không
+  phụ thuộc số nhân viên), cộng dồn thành dòng phòng ban rồi ghi đè các dòng của
+  phạm vi (tháng, phòng ban) trong một transaction.
+- Chấm công gồm cả các tháng đã lưu trữ (app.attendance_archive, đọc từ các cột tổng hợp).
+- Lệnh `python manage.py rollup_monthly_stats` chạy hằng đêm (mặc định tháng này và
+  tháng trước, --all để dựng lại toàn bộ lịch sử).
+- Cập nhật tăng dần: signal (và các đường ghi bulk) chỉ tăng phiên bản của tháng và
+  phòng ban bị ảnh hưởng (MonthlyStatsVersion, upsert sau khi transaction commit; thay
+  đổi không rõ phòng ban tăng phiên bản chung của tháng). Dòng phòng ban lưu tổng phiên
+  bản chung + riêng lúc tổng hợp (source_version), lần đọc kế tiếp ở bất kỳ process nào
+  thấy khác thì tính lại riêng tháng đó của phòng ban đó.
+- Các lần tính lại cùng phòng ban được tuần tự hóa bằng khóa dòng Department
+  (SELECT ... FOR UPDATE trên PostgreSQL).
+- Phòng ban của nhân viên và headcount lấy tại thời điểm tổng hợp: các tháng đã
+  đóng giữ nguyên phòng ban cũ trừ khi được dựng lại.
+- Nghỉ phép tính theo ngày bắt đầu nghỉ, chi phí theo ngày phát sinh, đánh giá theo
+  ngày kết thúc kỳ.
+
+Usage:
+    stats = department_month_stats(department_id, 2025, 10)
+    trend = department_trend(department_id, 2025, 10, months=24)
+    refresh_month(2025, 10)
+"""
+import logging
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Avg, Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .attendance_archive import attendance_month_totals
+from .date_utils import month_bounds
+from .models import (
+    Appraisal, AppraisalPeriod, Attendance, AttendanceArchive, Department, DepartmentMonthlyStats, Employee,
+    EmployeeMonthlyStats, Expense, LeaveRequest, MonthlyStatsVersion, Payroll,
+)
+
+logger = logging.getLogger(__name__)
+
+TREND_MONTHS = 24
+MAX_TREND_MONTHS = 120
+TOP_EMPLOYEES = 5
+EXPENSE_APPROVED_STATUSES = ('approved', 'paid')
+
+# Chỉ số cộng dồn từ nhân viên lên phòng ban (appraisal_score tính riêng)
+SUM_FIELDS = [
+    'attendance_records', 'working_hours', 'late_count', 'early_leave_count', 'absent_days',
+    'leave_requests', 'leave_pending', 'leave_approved', 'leave_rejected', 'leave_days',
+    'expense_count', 'expense_pending', 'expense_approved', 'expense_amount',
+    'payroll_count', 'payroll_total',
+    'appraisal_count', 'appraisal_completed',
+]
+
+
+def _month_index(year, month):
+    return year * 12 + month - 1
+
+
+def _month_of(index):
+    return index // 12, index % 12 + 1
+
+
+# ======================== ROLLUP ========================
+
+def _employee_aggregates(year, month, employee_scope):
+    """{employee_id: {chỉ số: giá trị}} - một truy vấn GROUP BY employee cho mỗi nguồn"""
+    start, end = month_bounds(year, month)
+
+    def grouped(queryset, **aggregates):
+        if employee_scope is not None:
+            queryset = queryset.filter(employee_id__in=employee_scope)
+        return queryset.values('employee_id').annotate(**aggregates).order_by()
+
+    # Chấm công: bảng chính + lưu trữ (các tháng đã đóng)
+    stats = {
+        employee_id: {
+            'attendance_records': totals['row_count'],
+            'working_hours': totals['working_hours'],
+            'late_count': totals['late_count'],
+            'early_leave_count': totals['early_leave_count'],
+            'absent_days': totals['absent_days'],
+        }
+        for employee_id, totals in attendance_month_totals(year, month, employee_scope).items()
+    }
+    sources = [
+        grouped(
+            LeaveRequest.objects.filter(start_date__gte=start, start_date__lt=end),
+            leave_requests=Count('id'),
+            leave_pending=Count('id', filter=Q(status='pending')),
+            leave_approved=Count('id', filter=Q(status='approved')),
+            leave_rejected=Count('id', filter=Q(status='rejected')),
+            leave_days=Sum('total_days', filter=Q(status='approved')),
+        ),
+        grouped(
+            Expense.objects.filter(date__gte=start, date__lt=end),
+            expense_count=Count('id'),
+            expense_pending=Count('id', filter=Q(status='pending')),
+            expense_approved=Count('id', filter=Q(status__in=EXPENSE_APPROVED_STATUSES)),
+            expense_amount=Sum('amount', filter=Q(status__in=EXPENSE_APPROVED_STATUSES)),
+        ),
+        grouped(
+            Payroll.objects.filter(year=year, month=month),
+            payroll_count=Count('id'),
+            payroll_total=Sum('total_salary'),
+        ),
+        grouped(
+            Appraisal.objects.filter(period__end_date__gte=start, period__end_date__lt=end),
+            appraisal_count=Count('id'),
+            appraisal_completed=Count('id', filter=Q(status='completed')),
+            appraisal_score=Avg('final_score', filter=Q(status='completed')),
+        ),
+    ]
+
+    for rows in sources:
+        for row in rows:
+            employee_id = row.pop('employee_id')
+            stats.setdefault(employee_id, {}).update(
+                {name: value for name, value in row.items() if value is not None}
+            )
+    return stats
+
+
+def _department_row(department_id, year, month, headcount, employee_rows, version):
+    row = DepartmentMonthlyStats(department_id=department_id, year=year, month=month, headcount=headcount,
+                                 source_version=version)
+    scored = 0
+    score_total = Decimal(0)
+    for employee_row in employee_rows:
+        for name in SUM_FIELDS:
+            setattr(row, name, getattr(row, name) + getattr(employee_row, name))
+        if employee_row.appraisal_score is not None:
+            scored += employee_row.appraisal_completed
+            score_total += employee_row.appraisal_score * employee_row.appraisal_completed
+    if scored:
+        row.appraisal_score = round(score_total / scored, 2)
+    return row
+
+
+def refresh_month(year, month, department_ids=None):
+    """
+    Tính lại số liệu của một tháng (mọi phòng ban hoặc department_ids).
+
+    Returns:
+        dict: {'employees': số dòng nhân viên, 'departments': số dòng phòng ban}
+    """
+    departments = Department.objects.all()
+    employees = Employee.objects.all()
+    if department_ids is not None:
+        department_ids = list(department_ids)
+        departments = departments.filter(id__in=department_ids)
+        employees = employees.filter(department_id__in=department_ids)
+    # Đọc phiên bản trước khi tính: thay đổi xảy ra trong lúc tính sẽ kích hoạt lần tính sau
+    version_of = _versions(year, month, department_ids)
+
+    with transaction.atomic():
+        # Khóa các phòng ban: lần tính song song (hai quản lý cùng mở báo cáo) chờ lần này
+        # commit rồi mới xóa / ghi lại, không chèn trùng khóa (department, year, month)
+        department_pks = list(departments.select_for_update().order_by('id').values_list('id', flat=True))
+        employee_departments = dict(employees.values_list('id', 'department_id'))
+        headcounts = dict(
+            employees.exclude(department__isnull=True).values_list('department_id')
+            .annotate(total=Count('id')).order_by()
+        )
+        aggregates = _employee_aggregates(
+            year, month, None if department_ids is None else list(employee_departments)
+        )
+
+        employee_rows = [
+            EmployeeMonthlyStats(
+                employee_id=employee_id, department_id=employee_departments.get(employee_id),
+                year=year, month=month, **values
+            )
+            for employee_id, values in aggregates.items()
+            if employee_id in employee_departments
+        ]
+        by_department = {}
+        for row in employee_rows:
+            by_department.setdefault(row.department_id, []).append(row)
+        department_rows = [
+            _department_row(department_id, year, month, headcounts.get(department_id, 0),
+                            by_department.get(department_id, []), version_of(department_id))
+            for department_id in department_pks
+        ]
+
+        old_employee_rows = EmployeeMonthlyStats.objects.filter(year=year, month=month)
+        old_department_rows = DepartmentMonthlyStats.objects.filter(year=year, month=month)
+        if department_ids is not None:
+            old_employee_rows = old_employee_rows.filter(
+                Q(department_id__in=department_ids) | Q(employee_id__in=list(employee_departments))
+            )
+            old_department_rows = old_department_rows.filter(department_id__in=department_ids)
+        old_employee_rows.delete()
+        old_department_rows.delete()
+        EmployeeMonthlyStats.objects.bulk_create(employee_rows, batch_size=1000)
+        DepartmentMonthlyStats.objects.bulk_create(department_rows, batch_size=1000)
+
+    return {'employees': len(employee_rows), 'departments': len(department_rows)}
+
+
+def data_months():
+    """(năm, tháng) đầu tiên và hiện tại - phạm vi dựng lại toàn bộ lịch sử"""
+    firsts = [
+        Attendance.objects.order_by('work_date').values_list('work_date', flat=True).first(),
+        LeaveRequest.objects.order_by('start_date').values_list('start_date', flat=True).first(),
+        Expense.objects.order_by('date').values_list('date', flat=True).first(),
+        AppraisalPeriod.objects.order_by('end_date').values_list('end_date', flat=True).first(),
+    ]
+    today = timezone.localdate()
+    months = [_month_index(day.year, day.month) for day in firsts if day]
+    for model in (Payroll, AttendanceArchive):
+        first_month = model.objects.order_by('year', 'month').values_list('year', 'month').first()
+        if first_month:
+            months.append(_month_index(*first_month))
+    first = min(months, default=_month_index(today.year, today.month))
+    last = _month_index(today.year, today.month)
+    return [_month_of(index) for index in range(first, max(first, last) + 1)]
+
+
+def recent_months(count, today=None):
+    """count tháng gần nhất (tháng hiện tại cuối cùng)"""
+    today = today or timezone.localdate()
+    current = _month_index(today.year, today.month)
+    return [_month_of(index) for index in range(current - count + 1, current + 1)]
+
+
+# ======================== READ ========================
+
+def _current_version(year, month):
+    """
+    Biểu thức phiên bản hiện tại của dòng phòng ban (tương quan theo department_id):
+    phiên bản chung của tháng + phiên bản riêng của phòng ban (0 nếu chưa từng đổi)
+    """
+    versions = (
+        MonthlyStatsVersion.objects.filter(year=year, month=month)
+        .filter(Q(scope=0) | Q(scope=OuterRef('department_id')))
+        .order_by().values('month').annotate(total=Sum('version')).values('total')
+    )
+    return Coalesce(Subquery(versions), Value(0))
+
+
+def _versions(year, month, department_ids=None):
+    """Hàm department_id -> phiên bản hiện tại của tháng (một truy vấn)"""
+    rows = MonthlyStatsVersion.objects.filter(year=year, month=month)
+    if department_ids is not None:
+        rows = rows.filter(scope__in=[0, *department_ids])
+    versions = dict(rows.values_list('scope', 'version'))
+    shared = versions.get(0, 0)
+    return lambda department_id: shared + versions.get(department_id, 0)
+
+
+def stale_departments(year, month, department_ids):
+    """Các phòng ban có dữ liệu nguồn của tháng đã đổi (hoặc chưa tổng hợp) - một truy vấn"""
+    department_ids = list(department_ids)
+    fresh = set(
+        DepartmentMonthlyStats.objects.filter(year=year, month=month, department_id__in=department_ids)
+        .filter(source_version=_current_version(year, month)).values_list('department_id', flat=True)
+    )
+    return [pk for pk in department_ids if pk not in fresh]
+
+
+def ensure_fresh(year, month, department_ids):
+    """Tính lại (một lần cho tất cả) các phòng ban đã cũ của tháng"""
+    stale = stale_departments(year, month, department_ids)
+    if stale:
+        refresh_month(year, month, stale)
+    return stale
+
+
+def department_month_stats(department_id, year, month):
+    """
+    Dòng DepartmentMonthlyStats của tháng, tính lại trước nếu dữ liệu nguồn đã đổi
+    (hoặc chưa từng được tổng hợp). Dòng còn mới: một truy vấn.
+    """
+    rows = DepartmentMonthlyStats.objects.filter(department_id=department_id, year=year, month=month)
+    stats = rows.annotate(current_version=_current_version(year, month)).first()
+    if stats is None or stats.source_version != stats.current_version:
+        refresh_month(year, month, [department_id])
+        stats = rows.first()
+    return stats
+
+
+def _months_range(queryset, year, month, months):
+    end = _month_index(year, month)
+    first_year, first_month = _month_of(end - months + 1)
+    return (
+        queryset.filter(Q(year__gt=first_year) | Q(year=first_year, month__gte=first_month))
+        .filter(Q(year__lt=year) | Q(year=year, month__lte=month))
+    )
+
+
+def department_trend(department_id, year, month, months=TREND_MONTHS):
+    """Các dòng tháng của phòng ban trong `months` tháng kết thúc ở (year, month) - một truy vấn"""
+    return list(
+        _months_range(DepartmentMonthlyStats.objects.filter(department_id=department_id), year, month, months)
+        .order_by('year', 'month')
+    )
+
+
+def trend_rows(year, month, months=TREND_MONTHS, department_ids=None):
+    """
+    Xu hướng nhiều tháng của các phòng ban (mặc định tất cả) cho báo cáo HR.
+    Tháng cuối được làm mới trước khi đọc; các tháng trước lấy từ lần rollup gần nhất.
+
+    Returns:
+        list: [dict] theo phòng ban, tháng
+    """
+    departments = Department.objects.all()
+    if department_ids is not None:
+        departments = departments.filter(id__in=department_ids)
+    ensure_fresh(year, month, list(departments.values_list('id', flat=True)))
+    rows = _months_range(
+        DepartmentMonthlyStats.objects.filter(department__in=departments), year, month, months
+    ).select_related('department').order_by('department__name', 'department_id', 'year', 'month')
+    return [
+        {
+            'department_id': row.department_id,
+            'department': row.department.name,
+            'year': row.year,
+            'month': row.month,
+            'headcount': row.headcount,
+            'avg_working_hours': round(row.avg_working_hours, 2),
+            **{name: getattr(row, name) for name in SUM_FIELDS},
+            'appraisal_score': row.appraisal_score,
+        }
+        for row in rows
+    ]
+
+
+def top_employees(department_id, year, month, limit=TOP_EMPLOYEES):
+    """Nhân viên nhiều giờ làm nhất của phòng ban trong tháng (đọc từ bảng tổng hợp)"""
+    return list(
+        EmployeeMonthlyStats.objects.filter(department_id=department_id, year=year, month=month,
+                                            attendance_records__gt=0)
+        .select_related('employee').order_by('-working_hours', 'employee_id')[:limit]
+    )
+
+
+# ======================== INCREMENTAL REFRESH ========================
+
+def _bump(months, scopes):
+    """Tăng phiên bản của mọi (tháng, scope) bằng một câu upsert (dòng mới bắt đầu từ 1)"""
+    rows = [(year, month, scope) for year, month in sorted(months) for scope in sorted(scopes)]
+    qn = connection.ops.quote_name
+    table = qn(MonthlyStatsVersion._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({qn('year')}, {qn('month')}, {qn('scope')}, {qn('version')}) "
+            f"VALUES {', '.join(['(%s, %s, %s, 1)'] * len(rows))} "
+            f"ON CONFLICT ({qn('year')}, {qn('month')}, {qn('scope')}) "
+            f"DO UPDATE SET {qn('version')} = {table}.{qn('version')} + 1",
+            [value for row in rows for value in row]
+        )
+
+
+def _bump_changed(months, employee_ids, department_ids):
+    if employee_ids is None and department_ids is None:
+        scopes = {0}
+    else:
+        scopes = set(department_ids or ())
+        if employee_ids:
+            scopes.update(
+                Employee.objects.filter(pk__in=employee_ids).exclude(department__isnull=True)
+                .values_list('department_id', flat=True).distinct()
+            )
+        scopes.discard(None)
+    if scopes:
+        _bump(months, scopes)
+
+
+def mark_stats_changed(months, employee_ids=None, department_ids=None):
+    """
+    Đánh dấu các tháng (year, month) có dữ liệu nguồn thay đổi. Gọi thủ công sau các
+    thao tác bulk (update(), bulk_create) vì chúng không phát signal.
+
+    Chỉ phòng ban của employee_ids / department_ids bị coi là cũ; không truyền cả hai
+    thì mọi phòng ban của tháng. Nhân viên không thuộc phòng ban nào thì bỏ qua.
+
+    Phiên bản được tăng sau khi transaction commit: lần tổng hợp nào đọc phiên bản
+    trước đó đều bị coi là cũ, và dòng phiên bản không bị khóa suốt transaction ghi
+    (giờ cao điểm check-in cùng một tháng).
+    """
+    months = {(int(year), int(month)) for year, month in months}
+    if not months:
+        return
+    employee_ids = None if employee_ids is None else set(employee_ids)
+    department_ids = None if department_ids is None else set(department_ids)
+    transaction.on_commit(lambda: _bump_changed(months, employee_ids, department_ids))
+
+
+def _months_of_dates(*days):
+    return {(day.year, day.month) for day in days if day}
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def _on_attendance_change(sender, instance, **kwargs):
+    mark_stats_changed(_months_of_dates(instance.work_date), employee_ids={instance.employee_id})
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def _on_leave_change(sender, instance, **kwargs):
+    mark_stats_changed(_months_of_dates(instance.start_date), employee_ids={instance.employee_id})
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def _on_expense_change(sender, instance, **kwargs):
+    mark_stats_changed(_months_of_dates(instance.date), employee_ids={instance.employee_id})
+
+
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+def _on_payroll_change(sender, instance, **kwargs):
+    mark_stats_changed({(instance.year, instance.month)}, employee_ids={instance.employee_id})
+
+
+@receiver(post_save, sender=Appraisal)
+@receiver(post_delete, sender=Appraisal)
+def _on_appraisal_change(sender, instance, **kwargs):
+    if type(instance).period.is_cached(instance):
+        end_date = instance.period.end_date
+    else:
+        end_date = AppraisalPeriod.objects.filter(pk=instance.period_id).values_list('end_date', flat=True).first()
+    mark_stats_changed(_months_of_dates(end_date), employee_ids={instance.employee_id})
+
+
+@receiver(post_init, sender=Employee)
+def _remember_department(sender, instance, **kwargs):
+    # Phòng ban lúc nạp (không đọc cột bị defer): chuyển phòng làm cũ cả phòng cũ
+    instance._stats_department_id = instance.__dict__.get('department_id')
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def _on_employee_change(sender, instance, **kwargs):
+    # Phòng ban / headcount của tháng hiện tại
+    department_ids = {instance.department_id, getattr(instance, '_stats_department_id', None)}
+    instance._stats_department_id = instance.department_id
+    mark_stats_changed(recent_months(1), department_ids=department_ids - {None})
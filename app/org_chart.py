@@ -0,0 +1,202 @@
+"""
+Organization chart
+Dữ liệu sơ đồ tổ chức cho trang quản trị và portal:
+
+- Nạp phòng ban và nhân viên đang làm việc bằng HAI truy vấn values() (không tạo model
+  instance), dựng cây trong một lượt O(n): Ban Giám đốc (quản lý không thuộc phòng ban)
+  -> phòng ban -> quản lý phòng -> nhân viên.
+- Kết quả được tuần tự hóa thành JSON một lần và cache theo generation; thay đổi
+  Employee / Department đổi generation nên mọi process dựng lại ở lần xem kế tiếp.
+- Trang chỉ nhận phần tóm tắt (Ban Giám đốc, các phòng ban và số lượng); thành viên
+  của từng phòng được tải khi mở rộng phòng đó (department_members_json).
+
+Usage:
+    summary = get_org_summary()                   # dict cho template
+    json_text = department_members_json(dept_id)  # JSON cho API mở rộng phòng ban
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Department, Employee
+
+logger = logging.getLogger(__name__)
+
+ORG_CHART_CACHE_TIMEOUT = getattr(settings, 'ORG_CHART_CACHE_TIMEOUT', 3600)
+# Nhân viên đang làm việc (Onboarding, Thử việc, Chính thức)
+ACTIVE_STATUSES = (0, 1, 2)
+
+_GENERATION_KEY = 'org_chart:generation'
+EMPLOYEE_FIELDS = (
+    'id', 'name', 'job_position', 'employee_code', 'email', 'phone', 'avatar', 'is_manager', 'department_id',
+)
+
+
+def _generation():
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        cache.add(_GENERATION_KEY, generation, None)
+    return generation
+
+
+def _summary_key(generation):
+    return f'org_chart:{generation}:summary'
+
+
+def _department_key(generation, department_id):
+    return f'org_chart:{generation}:department:{department_id}'
+
+
+def _employee_node(row, parent, avatar_url):
+    return {
+        'id': f"emp_{row['id']}",
+        'name': row['name'],
+        'title': row['job_position'] or ('Trưởng phòng' if row['is_manager'] else 'Nhân viên'),
+        'employee_code': row['employee_code'],
+        'email': row['email'],
+        'phone': row['phone'],
+        'avatar': avatar_url(row['avatar']) if row['avatar'] else None,
+        'is_manager': row['is_manager'],
+        'is_department': False,
+        'parent': parent,
+        'department': row['department_id'],
+    }
+
+
+def build_org_tree():
+    """
+    Dựng toàn bộ sơ đồ tổ chức từ database.
+
+    Returns:
+        tuple: (summary, {department_id: [node thành viên, ...]})
+    """
+    avatar_url = Employee._meta.get_field('avatar').storage.url
+    departments = list(Department.objects.order_by('name').values('id', 'name', 'description'))
+    employees = (
+        Employee.objects.filter(status__in=ACTIVE_STATUSES)
+        .order_by('-is_manager', 'name', 'id').values(*EMPLOYEE_FIELDS)
+    )
+
+    top_managers = []
+    members = {department['id']: [] for department in departments}
+    managers = {}  # {department_id: node quản lý đầu tiên} - nhân viên báo cáo cho người này
+    manager_count = 0
+    for row in employees:
+        department_id = row['department_id']
+        if row['is_manager']:
+            manager_count += 1
+        if department_id is None:
+            if row['is_manager']:
+                top_managers.append(_employee_node(row, None, avatar_url))
+            continue
+        if department_id not in members:
+            continue
+        if row['is_manager']:
+            node = _employee_node(row, f'dept_{department_id}', avatar_url)
+            managers.setdefault(department_id, node)
+        else:
+            # Quản lý được sắp trước nhân viên nên đã có trong managers nếu phòng có quản lý
+            manager = managers.get(department_id)
+            node = _employee_node(row, manager['id'] if manager else f'dept_{department_id}', avatar_url)
+        members[department_id].append(node)
+
+    root = top_managers[0]['id'] if top_managers else None
+    department_nodes = []
+    for department in departments:
+        department_members = members[department['id']]
+        department_nodes.append({
+            'id': f"dept_{department['id']}",
+            'department': department['id'],
+            'name': department['name'],
+            'description': department['description'] or '',
+            'title': f'{len(department_members)} nhân viên',
+            'employee_count': len(department_members),
+            'manager_count': sum(1 for node in department_members if node['is_manager']),
+            'is_department': True,
+            'is_manager': False,
+            'parent': root,
+        })
+
+    summary = {
+        'top_managers': top_managers,
+        'departments': department_nodes,
+        'total_employees': sum(len(nodes) for nodes in members.values()) + len(top_managers),
+        'total_departments': len(departments),
+        'total_managers': manager_count,
+    }
+    return summary, members
+
+
+def _store_tree(generation, summary, members):
+    """Ghi phần tóm tắt và thành viên từng phòng ban vào cache của generation; trả về JSON tóm tắt"""
+    summary_json = json.dumps(summary)
+    entries = {_summary_key(generation): summary_json}
+    for department_id, nodes in members.items():
+        entries[_department_key(generation, department_id)] = json.dumps(nodes)
+    try:
+        cache.set_many(entries, ORG_CHART_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Org chart cache write failed: {e}")
+    return summary_json
+
+
+def _cached_summary_json():
+    generation = _generation()
+    summary_json = cache.get(_summary_key(generation))
+    if summary_json is not None:
+        return summary_json, generation
+
+    summary, members = build_org_tree()
+    return _store_tree(generation, summary, members), generation
+
+
+def get_org_summary():
+    """Tóm tắt sơ đồ tổ chức (dict) kèm 'nodes_json' - các node cấp trên để vẽ sơ đồ"""
+    summary_json, _ = _cached_summary_json()
+    summary = json.loads(summary_json)
+    summary['nodes_json'] = json.dumps(summary['top_managers'] + summary['departments'])
+    return summary
+
+
+def department_members_json(department_id):
+    """JSON (chuỗi) danh sách thành viên của phòng ban; None nếu phòng ban không tồn tại"""
+    _, generation = _cached_summary_json()
+    members_json = cache.get(_department_key(generation, department_id))
+    if members_json is None:
+        # Cache bị đẩy ra / phòng ban mới hơn bản cache: dựng lại và ghi lại cho các lần mở sau
+        summary, members = build_org_tree()
+        _store_tree(generation, summary, members)
+        if department_id not in members:
+            return None
+        members_json = json.dumps(members[department_id])
+    return members_json
+
+
+def _bump_generation():
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.set(_GENERATION_KEY, 2, None)
+
+
+def invalidate_org_chart():
+    """Bỏ sơ đồ đã cache của mọi process (đổi generation)"""
+    _bump_generation()
+    # Đổi lại sau commit: request khác có thể đã dựng sơ đồ từ dữ liệu cũ trong lúc chờ commit
+    transaction.on_commit(_bump_generation)
+
+
+# ======================== CACHE INVALIDATION ========================
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def _invalidate_on_change(sender, **kwargs):
+    invalidate_org_chart()
@@ -0,0 +1,267 @@
+"""
+Payroll run engine
+Tính lương hàng loạt cho cả tháng (hoặc một phòng ban) bằng một vài truy vấn gộp
+theo nhân viên, thay vì gọi get_payroll_data cho từng người.
+
+Usage:
+    run = compute_payroll_run(month=11, year=2025, department_id=3)
+    summary = run.save(progress_callback=lambda done, total: ...)
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from .dashboard_stats import invalidate_dashboard_stats
+from .date_utils import month_filter
+from .attendance_archive import attendance_month_totals
+from .models import Employee, LeaveRequest, Reward, Discipline, Payroll
+from .monthly_stats import mark_stats_changed
+from .working_calendar import month_working_days, month_working_days_by_department
+
+logger = logging.getLogger(__name__)
+
+# Nhân viên được tính lương trong đợt chạy: Onboarding, Thử việc, Chính thức
+PAYROLL_EMPLOYEE_STATUSES = [0, 1, 2]
+HOURS_PER_DAY = 8
+DEFAULT_BATCH_SIZE = 500
+
+# Các cột được ghi đè khi bảng lương (pending) đã tồn tại
+PAYROLL_UPDATE_FIELDS = [
+    'base_salary', 'salary_coefficient', 'standard_working_days', 'hourly_rate',
+    'total_working_hours', 'bonus', 'penalty', 'total_salary', 'notes', 'updated_at',
+]
+
+
+def get_standard_working_days(year, month, department_id=None):
+    """Số ngày làm việc chuẩn trong tháng (thứ 2 - thứ 6, trừ ngày lễ của lịch làm việc)"""
+    return month_working_days(year, month, department_id)
+
+
+def _sum_by_employee(queryset, field):
+    """Gộp tổng `field` theo nhân viên trong một truy vấn: {employee_id: total}"""
+    rows = queryset.values('employee').annotate(total=Sum(field)).order_by()
+    return {row['employee']: row['total'] or 0 for row in rows}
+
+
+class PayrollRun:
+    """
+    Bảng kết quả tính lương trong bộ nhớ cho một tháng.
+
+    Attributes:
+        month, year: Kỳ lương
+        standard_working_days: Số ngày làm việc chuẩn của tháng theo lịch chung
+            (mỗi dòng có standard_working_days riêng theo lịch của phòng ban)
+        rows: dict {employee_id: dict dữ liệu lương} - cùng khóa với get_payroll_data
+        skipped: list các dict {'employee': Employee, 'reason': str}
+    """
+
+    def __init__(self, month, year):
+        self.month = month
+        self.year = year
+        self.standard_working_days = get_standard_working_days(year, month)
+        self.rows = {}
+        self.skipped = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, employee_id):
+        return self.rows.get(int(employee_id))
+
+    def skip_reason(self, employee_id):
+        for item in self.skipped:
+            if item['employee'].id == int(employee_id):
+                return item['reason']
+        return None
+
+    @property
+    def total_amount(self):
+        return sum(row['total_salary'] for row in self.rows.values())
+
+    def save(self, progress_callback=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Ghi toàn bộ kết quả vào Payroll bằng bulk upsert trên khóa (employee, month, year).
+
+        Bảng lương đã xác nhận không bao giờ bị ghi đè, kể cả khi được xác nhận
+        sau lúc tính: các dòng Payroll của tháng bị khóa (SELECT ... FOR UPDATE)
+        trước khi đọc trạng thái, nên thao tác xác nhận song song phải chờ upsert xong.
+
+        Args:
+            progress_callback: callable(done, total) - gọi sau mỗi batch
+            batch_size: int - số dòng mỗi câu INSERT
+
+        Returns:
+            dict: {'created': int, 'updated': int, 'skipped': int, 'total': int}
+        """
+        total = len(self.rows)
+        created = updated = 0
+        skipped = len(self.skipped)
+
+        with transaction.atomic():
+            # Khóa toàn bộ bảng lương của tháng rồi mới đọc trạng thái
+            locked = Payroll.objects.select_for_update().filter(
+                month=self.month, year=self.year
+            ).values_list('employee_id', 'status')
+            confirmed_ids = {emp_id for emp_id, status in locked if status == 'confirmed'}
+
+            pending = [row for emp_id, row in self.rows.items() if emp_id not in confirmed_ids]
+            skipped += total - len(pending)
+
+            done = total - len(pending)
+            if progress_callback:
+                progress_callback(done, total)
+
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                payrolls = [
+                    Payroll(
+                        employee_id=row['employee_id'],
+                        month=self.month,
+                        year=self.year,
+                        base_salary=row['base_salary'],
+                        salary_coefficient=row['salary_coefficient'],
+                        standard_working_days=row['standard_working_days'],
+                        hourly_rate=row['hourly_rate'],
+                        total_working_hours=row['total_working_hours'],
+                        bonus=row['bonus'],
+                        penalty=row['penalty'],
+                        total_salary=row['total_salary'],
+                        notes=row['notes'],
+                    )
+                    for row in chunk
+                ]
+                Payroll.objects.bulk_create(
+                    payrolls,
+                    update_conflicts=True,
+                    unique_fields=['employee', 'month', 'year'],
+                    update_fields=PAYROLL_UPDATE_FIELDS,
+                )
+                for row in chunk:
+                    if row['has_existing']:
+                        updated += 1
+                    else:
+                        created += 1
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total)
+
+        # bulk_create không phát post_save - tự xóa cache dashboard / số liệu tháng
+        invalidate_dashboard_stats()
+        mark_stats_changed({(self.year, self.month)}, employee_ids=[row['employee_id'] for row in pending])
+        logger.info(
+            f"Payroll run {self.month}/{self.year}: {created} created, "
+            f"{updated} updated, {skipped} skipped"
+        )
+        return {'created': created, 'updated': updated, 'skipped': skipped, 'total': total}
+
+
+def compute_payroll_run(month, year, department_id=None, employee_ids=None):
+    """
+    Tính lương cho cả tháng bằng các truy vấn gộp values('employee').annotate(...).
+
+    Args:
+        month: int - Tháng (1-12)
+        year: int - Năm
+        department_id: int - Chỉ tính cho một phòng ban (optional)
+        employee_ids: list - Chỉ tính cho các nhân viên này, bỏ qua lọc trạng thái (optional)
+
+    Returns:
+        PayrollRun
+    """
+    run = PayrollRun(month, year)
+
+    employees = Employee.objects.select_related('job_title')
+    if employee_ids is not None:
+        employees = employees.filter(id__in=employee_ids)
+    else:
+        employees = employees.filter(status__in=PAYROLL_EMPLOYEE_STATUSES)
+    if department_id:
+        employees = employees.filter(department_id=department_id)
+    # Subquery thay vì danh sách id để tránh IN (...) hàng nghìn tham số
+    scope = {'employee__in': employees.values('id')}
+    employees = list(employees.order_by('employee_code'))
+    if not employees:
+        return run
+
+    # Giờ làm của các ngày có làm việc (gồm cả tháng đã lưu trữ)
+    hours = {
+        employee_id: totals['present_hours']
+        for employee_id, totals in attendance_month_totals(year, month, scope['employee__in']).items()
+    }
+    leave_days = {
+        row['employee']: row
+        for row in LeaveRequest.objects.filter(
+            status='approved', **month_filter('start_date', year, month), **scope
+        ).values('employee').annotate(
+            paid=Sum('total_days', filter=Q(leave_type__is_paid=True)),
+            unpaid=Sum('total_days', filter=Q(leave_type__is_paid=False)),
+        ).order_by()
+    }
+    bonuses = _sum_by_employee(
+        Reward.objects.filter(**month_filter('date', year, month, datetime_field=True), **scope), 'amount'
+    )
+    penalties = _sum_by_employee(
+        Discipline.objects.filter(
+            **month_filter('date', year, month, datetime_field=True), **scope
+        ), 'amount'
+    )
+    existing = {
+        payroll['employee_id']: payroll
+        for payroll in Payroll.objects.filter(month=month, year=year, **scope)
+        .values('employee_id', 'status', 'notes')
+    }
+    working_days = month_working_days_by_department(
+        year, month, {employee.department_id for employee in employees}
+    )
+
+    for employee in employees:
+        existing_payroll = existing.get(employee.id)
+        if existing_payroll and existing_payroll['status'] == 'confirmed':
+            run.skipped.append({
+                'employee': employee,
+                'reason': "Bảng lương này đã được xác nhận. Không thể tính lại.",
+            })
+            continue
+        if not employee.job_title:
+            run.skipped.append({
+                'employee': employee,
+                'reason': "Nhân viên chưa được gán chức danh (hệ số lương).",
+            })
+            continue
+
+        salary_coefficient = employee.job_title.salary_coefficient
+        standard_working_days = working_days[employee.department_id]
+        standard_hours = standard_working_days * HOURS_PER_DAY
+        if standard_hours > 0:
+            hourly_rate = float(employee.salary * salary_coefficient) / float(standard_hours)
+        else:
+            hourly_rate = 0
+
+        total_hours = hours.get(employee.id, 0)
+        leaves = leave_days.get(employee.id, {})
+        paid_leave_days = leaves.get('paid') or 0
+        paid_leave_salary = paid_leave_days * HOURS_PER_DAY * hourly_rate
+        bonus = bonuses.get(employee.id, 0)
+        penalty = penalties.get(employee.id, 0)
+
+        run.rows[employee.id] = {
+            'employee_id': employee.id,
+            'employee_code': employee.employee_code,
+            'employee_name': employee.name,
+            'base_salary': employee.salary,
+            'salary_coefficient': salary_coefficient,
+            'standard_working_days': standard_working_days,
+            'hourly_rate': hourly_rate,
+            'total_working_hours': total_hours,
+            'paid_leave_days': paid_leave_days,
+            'unpaid_leave_days': leaves.get('unpaid') or 0,
+            'paid_leave_salary': paid_leave_salary,
+            'bonus': bonus,
+            'penalty': penalty,
+            'total_salary': (hourly_rate * total_hours) + paid_leave_salary + bonus - penalty,
+            'notes': existing_payroll['notes'] if existing_payroll else "",
+            'has_existing': existing_payroll is not None,
+        }
+
+    return run
@@ -0,0 +1,177 @@
+"""
+Payslip PDF rendering
+Dựng PDF phiếu lương bằng reportlab từ dữ liệu thuần (dict, xem app.payslips.payslip_data),
+không truy cập database nên chạy được trong process pool khi xuất hàng loạt.
+
+- Font (DejaVu Sans - có đủ dấu tiếng Việt, nếu có trên máy) và toàn bộ ParagraphStyle /
+  TableStyle được tạo MỘT lần mỗi process (shared_styles()) thay vì mỗi lần tải.
+- render_payslip() trả về bytes của một phiếu; render_payslip_bundle() ghép nhiều phiếu
+  thành một file PDF (mỗi phiếu một trang).
+"""
+import os
+from functools import lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+FONT_CANDIDATES = (
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+)
+
+
+def _register_fonts(font_paths=None):
+    """(font thường, font đậm) - font TrueType nếu tìm thấy, ngược lại Helvetica"""
+    for regular, bold in ([font_paths] if font_paths else []) + list(FONT_CANDIDATES):
+        if os.path.exists(regular) and os.path.exists(bold):
+            pdfmetrics.registerFont(TTFont('Payslip', regular))
+            pdfmetrics.registerFont(TTFont('Payslip-Bold', bold))
+            return 'Payslip', 'Payslip-Bold'
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+@lru_cache(maxsize=None)
+def shared_styles(font_paths=None):
+    """Font, style đoạn văn và style bảng dùng chung cho mọi phiếu lương trong process"""
+    font, bold = _register_fonts(font_paths)
+    base = getSampleStyleSheet()
+    cell_padding = [
+        ('LEFTPADDING', (0, 0), (-1, -1), 8),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+    ]
+    return {
+        'title': ParagraphStyle(
+            'PayslipTitle', parent=base['Heading1'], fontName=bold, fontSize=20,
+            textColor=colors.HexColor('#1a237e'), spaceAfter=12, alignment=1
+        ),
+        'heading': ParagraphStyle(
+            'PayslipHeading', parent=base['Heading2'], fontName=bold, fontSize=14,
+            textColor=colors.HexColor('#283593'), spaceAfter=8
+        ),
+        'normal': ParagraphStyle('PayslipNormal', parent=base['Normal'], fontName=font),
+        'footer': ParagraphStyle(
+            'PayslipFooter', parent=base['Normal'], fontName=font, fontSize=9,
+            textColor=colors.grey, alignment=1
+        ),
+        'employee_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e3f2fd')),
+            ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#e3f2fd')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTNAME', (0, 0), (0, -1), bold),
+            ('FONTNAME', (2, 0), (2, -1), bold),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            *cell_padding,
+        ]),
+        'salary_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTNAME', (0, 0), (-1, 0), bold),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            *cell_padding,
+        ]),
+        'total_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#4caf50')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, -1), bold),
+            ('FONTSIZE', (0, 0), (-1, -1), 14),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            *cell_padding,
+        ]),
+    }
+
+
+def payslip_flowables(data, styles):
+    """Các flowable của một phiếu lương"""
+    elements = [
+        Paragraph('PHIẾU LƯƠNG', styles['title']),
+        Spacer(1, 0.5 * cm),
+        Paragraph('Thông tin nhân viên', styles['heading']),
+    ]
+    employee_table = Table([
+        ['Mã NV:', data['employee_code'] or 'N/A', 'Tháng:', f"{data['month']}/{data['year']}"],
+        ['Họ tên:', data['employee_name'], 'Phòng ban:', data['department'] or 'N/A'],
+        ['Chức vụ:', data['position'] or 'N/A', 'Hệ số lương:', f"{data['salary_coefficient']:.2f}"],
+    ], colWidths=[3 * cm, 6 * cm, 3 * cm, 6 * cm])
+    employee_table.setStyle(styles['employee_table'])
+    elements += [employee_table, Spacer(1, 0.7 * cm), Paragraph('Chi tiết lương', styles['heading'])]
+
+    hours_amount = data['total_working_hours'] * data['hourly_rate']
+    salary_table = Table([
+        ['Khoản mục', 'Số lượng', 'Đơn giá', 'Thành tiền'],
+        ['Lương cơ bản', f"{data['standard_working_days']} ngày",
+         f"{data['base_salary']:,.0f} đ", f"{data['base_salary']:,.0f} đ"],
+        ['Tổng giờ làm việc', f"{data['total_working_hours']:.1f}h",
+         f"{data['hourly_rate']:,.0f} đ/h", f"{hours_amount:,.0f} đ"],
+        ['Thưởng', '', '', f"{data['bonus']:,.0f} đ"],
+        ['Phạt', '', '', f"-{data['penalty']:,.0f} đ"],
+    ], colWidths=[6 * cm, 3 * cm, 4 * cm, 5 * cm])
+    salary_table.setStyle(styles['salary_table'])
+    elements += [salary_table, Spacer(1, 0.5 * cm)]
+
+    total_table = Table([['TỔNG LƯƠNG', f"{data['total_salary']:,.0f} đ"]], colWidths=[12 * cm, 6 * cm])
+    total_table.setStyle(styles['total_table'])
+    elements += [total_table, Spacer(1, 1 * cm)]
+
+    if data['notes']:
+        elements += [
+            Paragraph('Ghi chú', styles['heading']),
+            Paragraph(escape(data['notes']).replace('\n', '<br/>'), styles['normal']),
+            Spacer(1, 0.5 * cm),
+        ]
+    elements += [
+        Spacer(1, 1 * cm),
+        Paragraph(
+            f"Phiếu lương được tạo tự động vào {data['generated_at']}<br/>Trạng thái: {data['status']}",
+            styles['footer']
+        ),
+    ]
+    return elements
+
+
+def _build(elements):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1.5 * cm, bottomMargin=1.5 * cm)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_payslip(data, font_paths=None):
+    """PDF (bytes) của một phiếu lương"""
+    return _build(payslip_flowables(data, shared_styles(font_paths)))
+
+
+def render_payslip_bundle(items, font_paths=None):
+    """Một file PDF gồm nhiều phiếu lương, mỗi phiếu bắt đầu ở trang mới"""
+    styles = shared_styles(font_paths)
+    elements = []
+    for data in items:
+        if elements:
+            elements.append(PageBreak())
+        elements += payslip_flowables(data, styles)
+    return _build(elements)
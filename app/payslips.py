@@ -0,0 +1,237 @@
+"""
+Payslips
+Phiếu lương PDF cho portal và HR:
+
+- Phiếu của bảng lương ĐÃ XÁC NHẬN (không sửa được nữa) được dựng một lần và lưu vào
+  storage theo địa chỉ nội dung payslips/<năm>/<tháng>/<payroll_id>_<updated_at>.pdf;
+  các lần tải sau (ngày trả lương mọi người tải cùng lúc) chỉ mở file. Bảng lương chưa
+  xác nhận được dựng mỗi lần tải và không lưu. Sửa / xóa bảng lương xóa luôn các phiếu
+  đã lưu của phiên bản cũ.
+- render_month_payslips() dựng các phiếu còn thiếu của một tháng trong process pool: dữ
+  liệu được đọc ở process chính, worker chỉ chạy reportlab (app.payslip_pdf) với font /
+  style đã tạo sẵn.
+- write_payslip_bundle() đóng gói phiếu của tháng thành một file ZIP hoặc một PDF gộp cho HR.
+
+Usage:
+    with open_payslip(payroll) as f:
+        ...
+    result = render_month_payslips(2025, 10, workers=4)
+    write_payslip_bundle(result['payrolls'], 'zip', fileobj)
+"""
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import repeat
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Payroll
+from .payslip_pdf import render_payslip, render_payslip_bundle, shared_styles
+
+logger = logging.getLogger(__name__)
+
+PAYSLIP_DIR = 'payslips'
+# (font thường, font đậm) .ttf có dấu tiếng Việt; mặc định tìm DejaVu Sans trên máy
+PAYSLIP_FONTS = getattr(settings, 'PAYSLIP_FONTS', None)
+PAYSLIP_WORKERS = getattr(settings, 'PAYSLIP_WORKERS', min(4, os.cpu_count() or 1))
+BUNDLE_FORMATS = ('zip', 'pdf')
+# Trình duyệt giữ phiếu đã xác nhận (private) trong 1 ngày
+PAYSLIP_MAX_AGE = 24 * 3600
+# Ít phiếu hơn ngưỡng này thì dựng ngay trong process (không đáng tạo pool)
+POOL_THRESHOLD = 8
+
+
+def _fonts():
+    return tuple(PAYSLIP_FONTS) if PAYSLIP_FONTS else None
+
+
+def payslip_data(payroll):
+    """Dữ liệu thuần của một phiếu lương (cần payroll.employee và employee.department)"""
+    employee = payroll.employee
+    return {
+        'employee_code': employee.employee_code,
+        'employee_name': employee.name,
+        'department': employee.department.name if employee.department else None,
+        'position': employee.job_position,
+        'month': payroll.month,
+        'year': payroll.year,
+        'salary_coefficient': payroll.salary_coefficient,
+        'standard_working_days': payroll.standard_working_days,
+        'base_salary': payroll.base_salary,
+        'hourly_rate': payroll.hourly_rate,
+        'total_working_hours': payroll.total_working_hours,
+        'bonus': payroll.bonus,
+        'penalty': payroll.penalty,
+        'total_salary': payroll.total_salary,
+        'notes': payroll.notes,
+        'status': payroll.get_status_display(),
+        'generated_at': timezone.localtime(payroll.updated_at).strftime('%d/%m/%Y %H:%M'),
+    }
+
+
+def is_cacheable(payroll):
+    return payroll.status == 'confirmed'
+
+
+def _month_dir(year, month):
+    return f'{PAYSLIP_DIR}/{year}/{month:02d}'
+
+
+def payslip_path(payroll):
+    """Đường dẫn trong storage - đổi khi bảng lương được cập nhật (updated_at)"""
+    version = payroll.updated_at.astimezone(timezone.utc).strftime('%Y%m%d%H%M%S%f')
+    return f'{_month_dir(payroll.year, payroll.month)}/{payroll.id}_{version}.pdf'
+
+
+def payslip_filename(payroll):
+    return f"Phieu_luong_{payroll.employee.employee_code}_{payroll.month}_{payroll.year}.pdf"
+
+
+def payslip_etag(payroll):
+    return f'"payslip-{payroll.id}-{payroll.updated_at.timestamp():.6f}"'
+
+
+def _stored_names(year, month):
+    try:
+        return set(default_storage.listdir(_month_dir(year, month))[1])
+    except FileNotFoundError:
+        return set()
+
+
+def _stored_versions(year, month):
+    """{payroll_id: [tên file, ...]} của các phiếu đã lưu trong tháng (một lần listdir)"""
+    versions = {}
+    for name in _stored_names(year, month):
+        payroll_id = name.partition('_')[0]
+        if payroll_id.isdigit():
+            versions.setdefault(int(payroll_id), []).append(name)
+    return versions
+
+
+def _store(payroll, content, stale=()):
+    """Lưu phiếu đã dựng và xóa các file cũ đã biết (stale) của cùng bảng lương"""
+    path = payslip_path(payroll)
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+    keep = os.path.basename(path)
+    for name in stale:
+        if name != keep:
+            default_storage.delete(f'{_month_dir(payroll.year, payroll.month)}/{name}')
+
+
+def _remove_payslips(payroll_id, year, month, keep=None):
+    prefix = f'{payroll_id}_'
+    for name in _stored_names(year, month):
+        if name.startswith(prefix) and name != keep:
+            default_storage.delete(f'{_month_dir(year, month)}/{name}')
+
+
+def open_payslip(payroll):
+    """
+    File PDF (đã mở để đọc) của phiếu lương.
+    Phiếu đã xác nhận được lấy từ storage, dựng và lưu lại nếu chưa có.
+    """
+    if not is_cacheable(payroll):
+        return BytesIO(render_payslip(payslip_data(payroll), _fonts()))
+    path = payslip_path(payroll)
+    if default_storage.exists(path):
+        return default_storage.open(path, 'rb')
+    content = render_payslip(payslip_data(payroll), _fonts())
+    _store(payroll, content)
+    logger.info(f"Payslip {payroll.id} rendered and stored at {path}")
+    return BytesIO(content)
+
+
+def month_payrolls(year, month, department=None):
+    """Bảng lương đã xác nhận của tháng (lọc theo tên phòng ban nếu có)"""
+    payrolls = Payroll.objects.filter(year=year, month=month, status='confirmed')
+    if department:
+        payrolls = payrolls.filter(employee__department__name=department)
+    return payrolls.select_related('employee__department').order_by('employee__employee_code')
+
+
+def _executor(workers):
+    # fork: worker kế thừa font / style đã tạo sẵn ở process chính và không cần khởi tạo Django
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+    return ProcessPoolExecutor(workers)
+
+
+def render_month_payslips(year, month, department=None, workers=None, progress=None):
+    """
+    Dựng và lưu các phiếu lương còn thiếu của một tháng.
+
+    Args:
+        workers: số process dựng PDF (mặc định PAYSLIP_WORKERS; 1 = dựng tuần tự)
+        progress: hàm progress(done, total) (optional)
+
+    Returns:
+        dict: payrolls (danh sách đã xác nhận), rendered, cached
+    """
+    payrolls = list(month_payrolls(year, month, department))
+    stored = _stored_versions(year, month)
+    missing = [
+        payroll for payroll in payrolls
+        if os.path.basename(payslip_path(payroll)) not in stored.get(payroll.id, ())
+    ]
+    total = len(payrolls)
+    done = total - len(missing)
+    if progress:
+        progress(done, total)
+
+    fonts = _fonts()
+    shared_styles(fonts)
+    workers = workers or PAYSLIP_WORKERS
+    datas = (payslip_data(payroll) for payroll in missing)
+    if workers > 1 and len(missing) >= POOL_THRESHOLD:
+        executor = _executor(workers)
+        rendered = executor.map(render_payslip, datas, repeat(fonts), chunksize=16)
+    else:
+        executor = None
+        rendered = (render_payslip(data, fonts) for data in datas)
+    try:
+        for payroll, content in zip(missing, rendered):
+            _store(payroll, content, stale=stored.get(payroll.id, ()))
+            done += 1
+            if progress:
+                progress(done, total)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    logger.info(f"Payslips {month}/{year}: {len(missing)} rendered, {total - len(missing)} cached")
+    return {'payrolls': payrolls, 'rendered': len(missing), 'cached': total - len(missing)}
+
+
+def write_payslip_bundle(payrolls, fmt, fileobj):
+    """Ghi phiếu lương của các bảng lương thành một file ZIP (từ storage) hoặc một PDF gộp"""
+    if fmt == 'pdf':
+        fileobj.write(render_payslip_bundle([payslip_data(payroll) for payroll in payrolls], _fonts()))
+        return
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for payroll in payrolls:
+            with open_payslip(payroll) as f:
+                archive.writestr(payslip_filename(payroll), f.read())
+
+
+# ======================== CLEANUP ========================
+
+@receiver(post_save, sender=Payroll)
+def _delete_outdated_payslips(sender, instance, created, **kwargs):
+    # updated_at đổi nên phiếu đã lưu của phiên bản cũ không còn được dùng
+    if not created:
+        keep = os.path.basename(payslip_path(instance))
+        _remove_payslips(instance.id, instance.year, instance.month, keep=keep)
+
+
+@receiver(post_delete, sender=Payroll)
+def _delete_stored_payslips(sender, instance, **kwargs):
+    _remove_payslips(instance.id, instance.year, instance.month)
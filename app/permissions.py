@@ -15,6 +15,8 @@ from django.shortcuts import redirect
 from django.contrib import messages
 import logging
 
+from .identity import get_identity, is_hr_department_name
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,7 +36,7 @@ def log_permission_denial(user, resource_type, permission_required, reason, requ
     
     try:
         # Get user's groups
-        user_groups = list(user.groups.values_list('name', flat=True)) if user.is_authenticated else []
+        user_groups = sorted(get_identity(user).group_names)
         
         # Get IP address and user agent from request
         ip_address = None
@@ -76,7 +78,7 @@ def log_permission_granted(user, resource_type, permission_required, request=Non
     from .models import PermissionAuditLog
     
     try:
-        user_groups = list(user.groups.values_list('name', flat=True)) if user.is_authenticated else []
+        user_groups = sorted(get_identity(user).group_names)
         
         ip_address = None
         url_path = ''
@@ -102,12 +104,12 @@ def log_permission_granted(user, resource_type, permission_required, request=Non
 
 def user_in_group(user, group_name):
     """Check if user belongs to a specific group"""
-    return user.groups.filter(name=group_name).exists()
+    return get_identity(user).in_group(group_name)
 
 
 def user_in_groups(user, group_names):
     """Check if user belongs to any of the specified groups"""
-    return user.groups.filter(name__in=group_names).exists()
+    return get_identity(user).in_any_group(group_names)
 
 
 def require_group(group_name):
@@ -413,14 +415,7 @@ def get_user_employee(user):
     Returns:
         Employee object hoặc None
     """
-    if not user.is_authenticated:
-        return None
-    
-    try:
-        from app.models import Employee
-        return Employee.objects.get(email=user.email)
-    except Employee.DoesNotExist:
-        return None
+    return get_identity(user).employee
 
 
 def is_hr_department(employee):
@@ -436,8 +431,7 @@ def is_hr_department(employee):
     if not employee or not employee.department:
         return False
     
-    hr_department_names = ['hr', 'nhân sự', 'human resources', 'phòng nhân sự', 'bộ phận nhân sự']
-    return employee.department.name.lower().strip() in hr_department_names
+    return is_hr_department_name(employee.department.name)
 
 
 def is_hr_user(user):
@@ -452,23 +446,7 @@ def is_hr_user(user):
     Returns:
         bool: True nếu là HR
     """
-    if not user.is_authenticated:
-        return False
-    
-    # Superuser luôn có quyền
-    if user.is_superuser:
-        return True
-    
-    # Kiểm tra group HR
-    if user.groups.filter(name='HR').exists():
-        return True
-    
-    # Kiểm tra phòng ban HR
-    employee = get_user_employee(user)
-    if employee and is_hr_department(employee):
-        return True
-    
-    return False
+    return get_identity(user).is_hr
 
 
 def user_can_access_management(user):
@@ -485,7 +463,7 @@ def user_can_access_management(user):
         return False
     
     # Chỉ HR và superuser mới được vào management
-    return is_hr_user(user)
+    return get_identity(user).can_access_management
 
 
 def user_is_manager(user):
@@ -495,8 +473,4 @@ def user_is_manager(user):
     Returns:
         bool: True nếu user là Manager
     """
-    if not user.is_authenticated:
-        return False
-    
-    employee = get_user_employee(user)
-    return employee and employee.is_manager if employee else False
+    return get_identity(user).is_manager
@@ -6,8 +6,12 @@ import json
 from functools import wraps
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.db import models
@@ -15,17 +19,33 @@ from django.db import models
 from .models import (
     Employee, LeaveType, LeaveRequest, LeaveBalance, 
     Payroll, Attendance, Expense, ExpenseCategory,
-    Appraisal, AppraisalScore
+    Appraisal, AppraisalScore, SearchDocument, DepartmentMonthlyStats
 )
 from .forms import LeaveRequestForm, ExpenseForm, EmployeeProfileForm, PasswordChangeForm
 from .permissions import get_user_employee
+from .identity import get_identity
 from .leave_helpers import (
     calculate_working_days, check_leave_balance, 
-    update_leave_balance, approve_leave_request, 
+    approve_leave_request,
     reject_leave_request, cancel_leave_request,
     get_leave_summary
 )
+from .leave_ledger import settle_leave_requests
+from .bulk_approvals import BULK_ACTIONS, bulk_review_expenses, bulk_review_leaves, parse_ids
+from .inbox_counters import get_inbox_counters
+from .content_audience import has_access, visible_announcements, visible_documents
+from .org_chart import department_members_json, get_org_summary
+from .monthly_stats import department_month_stats, department_trend, top_employees
+from .attendance_archive import employee_attendance, employee_year_totals, summarize
+from .attendance_ingest import record_check_in, record_check_out
+from .leave_calendar import (
+    MAX_HEATMAP_DAYS, MAX_WINDOW_DAYS, absence_heatmap, calendar_etag, calendar_version,
+    leave_events, parse_window
+)
+from .payslips import PAYSLIP_MAX_AGE, is_cacheable, open_payslip, payslip_etag, payslip_filename
+from .search_index import SEARCH_RESULT_LIMIT, search, search_filter
 from .email_service import EmailService
+from .date_utils import month_filter
 
 # Decorator for manager-only views
 def require_manager_permission(view_func):
@@ -48,9 +68,8 @@ def dashboard(request):
     Employee Portal Dashboard
     Hiển thị thông tin tổng quan, thông báo, quick actions
     """
-    try:
-        employee = Employee.objects.get(email=request.user.email)
-    except Employee.DoesNotExist:
+    employee = get_user_employee(request.user)
+    if not employee:
         messages.error(request, 'Không tìm thấy thông tin nhân viên.')
         return redirect('login')
     
@@ -64,64 +83,53 @@ def dashboard(request):
         year=current_year
     ).select_related('leave_type')
     
-    # Pending leave requests
-    pending_leaves = LeaveRequest.objects.filter(
-        employee=employee,
-        status='pending'
-    ).count()
-    
     # Recent payrolls (last 3 months)
     recent_payrolls = Payroll.objects.filter(
         employee=employee
     ).order_by('-year', '-month')[:3]
     
     # This month attendance
+    local_now = timezone.localtime(timezone.now())
     attendance_count = Attendance.objects.filter(
         employee=employee,
-        date__year=timezone.now().year,
-        date__month=timezone.now().month
-    ).count()
-    
-    # Pending expenses
-    pending_expenses = Expense.objects.filter(
-        employee=employee,
-        status='pending'
+        **month_filter('work_date', local_now.year, local_now.month)
     ).count()
     
-    # Pending appraisals
-    pending_appraisals = Appraisal.objects.filter(
-        employee=employee,
-        status='pending_self'
-    ).count()
+    # Pending leaves / expenses / appraisals (cached inbox counters)
+    counters = get_inbox_counters(employee)
     
     # Manager notifications (if manager)
     manager_notifications = {}
     if employee.is_manager:
         manager_notifications = {
-            'pending_leaves': LeaveRequest.objects.filter(
-                employee__department=employee.department,
-                status='pending'
-            ).exclude(employee=employee).count(),
-            'pending_expenses': Expense.objects.filter(
-                employee__department=employee.department,
-                status='pending'
-            ).exclude(employee=employee).count(),
+            'pending_leaves': counters['team_pending_leaves'],
+            'pending_expenses': counters['team_pending_expenses'],
         }
     
     context = {
         'employee': employee,
         'leave_balances': leave_balances,
-        'pending_leaves': pending_leaves,
+        'pending_leaves': counters['pending_leaves'],
         'recent_payrolls': recent_payrolls,
         'attendance_count': attendance_count,
-        'pending_expenses': pending_expenses,
-        'pending_appraisals': pending_appraisals,
+        'pending_expenses': counters['pending_expenses'],
+        'pending_appraisals': counters['pending_appraisals'],
         'manager_notifications': manager_notifications,
     }
     
     return render(request, 'portal/dashboard.html', context)
 
 
+@login_required
+@never_cache
+def inbox_counters(request):
+    """API: bộ đếm việc cần xử lý cho badge trên thanh điều hướng (polling)"""
+    employee = get_user_employee(request.user)
+    if not employee:
+        return JsonResponse({'success': False, 'message': 'Không tìm thấy thông tin nhân viên'}, status=404)
+    return JsonResponse({'success': True, 'counters': get_inbox_counters(employee)})
+
+
 # ======================== LEAVE MANAGEMENT ========================
 
 @login_required
@@ -162,11 +170,8 @@ def leaves_list(request):
     
     search_query = request.GET.get('q')
     if search_query:
-        # Case-insensitive search
-        leave_requests = leave_requests.filter(
-            models.Q(reason__icontains=search_query) |
-            models.Q(leave_type__name__icontains=search_query)
-        )
+        # Không phân biệt hoa thường / dấu (chỉ mục tìm kiếm)
+        leave_requests = search_filter(leave_requests, 'leave', search_query)
     
     leave_requests = leave_requests.order_by('-created_at')
     
@@ -195,8 +200,7 @@ def leaves_list(request):
     leaves_this_month = LeaveRequest.objects.filter(
         employee=employee,
         status='approved',
-        start_date__year=current_year,
-        start_date__month=current_month
+        **month_filter('start_date', current_year, current_month)
     ).aggregate(models.Sum('total_days'))['total_days__sum'] or 0
     
     # Calculate total annual leave balance from all leave types
@@ -246,7 +250,8 @@ def leave_create(request):
             # Calculate total days using helper function
             total_days = calculate_working_days(
                 leave_request.start_date, 
-                leave_request.end_date
+                leave_request.end_date,
+                employee.department_id
             )
             leave_request.total_days = total_days
             
@@ -287,17 +292,9 @@ def leave_create(request):
                 }
                 return render(request, 'portal/leaves/create.html', context)
             
-            # Update leave balance using helper function
-            update_leave_balance(
-                employee=employee,
-                leave_type=leave_request.leave_type,
-                days=total_days,
-                operation='add',
-                year=current_year
-            )
-            
-            # Save leave request
+            # Save leave request and reserve its days in the leave ledger
             leave_request.save()
+            settle_leave_requests([leave_request], user=request.user)
             
             # Send notification to manager
             try:
@@ -386,6 +383,8 @@ def leave_cancel(request, leave_id):
     if leave_request.status == 'pending':
         leave_request.status = 'cancelled'
         leave_request.save()
+        # Release the days reserved on submission
+        settle_leave_requests([leave_request], user=request.user)
         
         # Return JSON for AJAX requests
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -416,54 +415,44 @@ def leave_calendar(request):
     return render(request, 'portal/leaves/calendar.html', context)
 
 
+def _leave_calendar_state(request):
+    """(employee, mode, window, version) của request lịch nghỉ - tính một lần cho ETag và view"""
+    if not hasattr(request, '_leave_calendar_state'):
+        employee = get_user_employee(request.user)
+        mode = 'heatmap' if request.GET.get('mode') == 'heatmap' else 'events'
+        window = parse_window(request.GET, MAX_HEATMAP_DAYS if mode == 'heatmap' else MAX_WINDOW_DAYS)
+        version = calendar_version(employee.department_id, *window) if employee and window else None
+        request._leave_calendar_state = (employee, mode, window, version)
+    return request._leave_calendar_state
+
+
+def _leave_calendar_etag(request):
+    employee, mode, window, version = _leave_calendar_state(request)
+    return calendar_etag(employee.id, mode, *window, version) if version else None
+
+
+def _leave_calendar_last_modified(request):
+    version = _leave_calendar_state(request)[3]
+    return version[1] if version else None
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_leave_calendar_etag, last_modified_func=_leave_calendar_last_modified)
 def leave_calendar_data(request):
-    """JSON data for FullCalendar"""
-    employee = get_user_employee(request.user)
+    """
+    JSON data for FullCalendar - các đơn giao với khung start / end
+    ?mode=heatmap: số người nghỉ theo từng ngày (tối đa MAX_HEATMAP_DAYS ngày)
+    """
+    employee, mode, window, version = _leave_calendar_state(request)
     if not employee:
         return JsonResponse({'error': 'Không tìm thấy thông tin nhân viên'}, status=403)
+    if not window:
+        return JsonResponse({'error': 'Khoảng thời gian không hợp lệ'}, status=400)
     
-    # Get all leaves from same department (team visibility)
-    leave_requests = LeaveRequest.objects.filter(
-        employee__department=employee.department
-    ).select_related('employee', 'leave_type').order_by('-created_at')
-    
-    # Format for FullCalendar
-    events = []
-    for leave in leave_requests:
-        # Color by status
-        if leave.status == 'Approved':
-            color = '#28a745'  # Green
-        elif leave.status == 'Pending':
-            color = '#ffc107'  # Yellow
-        elif leave.status == 'Rejected':
-            color = '#dc3545'  # Red
-        else:
-            color = '#6c757d'  # Grey
-        
-        # Add border for own leaves
-        border_width = '3px' if leave.employee == employee else '1px'
-        
-        events.append({
-            'id': leave.id,
-            'title': f"{leave.employee.name} - {leave.leave_type.name}",
-            'start': leave.start_date.isoformat(),
-            'end': (leave.end_date + timezone.timedelta(days=1)).isoformat(),  # FullCalendar exclusive end
-            'backgroundColor': color,
-            'borderColor': color,
-            'borderWidth': border_width,
-            'extendedProps': {
-                'employee': leave.employee.name,
-                'employee_code': leave.employee.employee_code,
-                'leave_type': leave.leave_type.name,
-                'total_days': leave.total_days,
-                'status': leave.status,
-                'reason': leave.reason,
-                'is_mine': leave.employee == employee
-            }
-        })
-    
-    return JsonResponse(events, safe=False)
+    if mode == 'heatmap':
+        return JsonResponse(absence_heatmap(employee.department_id, *window))
+    return JsonResponse(leave_events(employee, *window), safe=False)
 
 
 # ======================== PAYROLL ========================
@@ -528,151 +517,23 @@ def payroll_detail(request, payroll_id):
 
 @login_required
 def payroll_download(request, payroll_id):
-    """Download payslip PDF"""
-    from io import BytesIO
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import cm
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    from django.http import HttpResponse
-    
+    """Download payslip PDF (phiếu đã xác nhận được lấy từ storage, xem app.payslips)"""
     employee = get_user_employee(request.user)
-    payroll = get_object_or_404(Payroll, id=payroll_id, employee=employee)
-    
-    # Create PDF buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1.5*cm, bottomMargin=1.5*cm)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#1a237e'),
-        spaceAfter=12,
-        alignment=1  # Center
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#283593'),
-        spaceAfter=8
-    )
-    
-    # Title
-    elements.append(Paragraph("PHIẾU LƯƠNG", title_style))
-    elements.append(Spacer(1, 0.5*cm))
-    
-    # Employee info
-    elements.append(Paragraph("Thông tin nhân viên", heading_style))
-    emp_data = [
-        ['Mã NV:', payroll.employee.employee_code or 'N/A', 'Tháng:', f"{payroll.month}/{payroll.year}"],
-        ['Họ tên:', payroll.employee.name, 'Phòng ban:', payroll.employee.department.name if payroll.employee.department else 'N/A'],
-        ['Chức vụ:', payroll.employee.position or 'N/A', 'Hệ số lương:', f"{payroll.salary_coefficient:.2f}"],
-    ]
-    emp_table = Table(emp_data, colWidths=[3*cm, 6*cm, 3*cm, 6*cm])
-    emp_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e3f2fd')),
-        ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#e3f2fd')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(emp_table)
-    elements.append(Spacer(1, 0.7*cm))
-    
-    # Salary breakdown
-    elements.append(Paragraph("Chi tiết lương", heading_style))
-    salary_data = [
-        ['Khoản mục', 'Số lượng', 'Đơn giá', 'Thành tiền'],
-        ['Lương cơ bản', f"{payroll.standard_working_days} ngày", f"{payroll.base_salary:,.0f} đ", f"{payroll.base_salary:,.0f} đ"],
-        ['Tổng giờ làm việc', f"{payroll.total_working_hours:.1f}h", f"{payroll.hourly_rate:,.0f} đ/h", f"{payroll.total_working_hours * payroll.hourly_rate:,.0f} đ"],
-        ['Thưởng', '', '', f"{payroll.bonus:,.0f} đ"],
-        ['Phạt', '', '', f"-{payroll.penalty:,.0f} đ"],
-    ]
-    salary_table = Table(salary_data, colWidths=[6*cm, 3*cm, 4*cm, 5*cm])
-    salary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-    ]))
-    elements.append(salary_table)
-    elements.append(Spacer(1, 0.5*cm))
-    
-    # Total salary
-    total_data = [
-        ['TỔNG LƯƠNG', f"{payroll.total_salary:,.0f} đ"]
-    ]
-    total_table = Table(total_data, colWidths=[12*cm, 6*cm])
-    total_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#4caf50')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    elements.append(total_table)
-    elements.append(Spacer(1, 1*cm))
-    
-    # Notes
-    if payroll.notes:
-        elements.append(Paragraph("Ghi chú", heading_style))
-        elements.append(Paragraph(payroll.notes, styles['Normal']))
-        elements.append(Spacer(1, 0.5*cm))
-    
-    # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.grey,
-        alignment=1
-    )
-    elements.append(Spacer(1, 1*cm))
-    elements.append(Paragraph(
-        f"Phiếu lương được tạo tự động vào {timezone.now().strftime('%d/%m/%Y %H:%M')}<br/>Trạng thái: {payroll.get_status_display()}",
-        footer_style
-    ))
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    
-    # Return response
-    response = HttpResponse(buffer, content_type='application/pdf')
-    filename = f"Phieu_luong_{payroll.employee.employee_code}_{payroll.month}_{payroll.year}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    payroll = get_object_or_404(Payroll.objects.select_related('employee__department'), id=payroll_id, employee=employee)
+
+    etag = payslip_etag(payroll)
+    response = get_conditional_response(request, etag=etag, last_modified=payroll.updated_at.timestamp())
+    if response is None:
+        response = FileResponse(
+            open_payslip(payroll), as_attachment=True, filename=payslip_filename(payroll),
+            content_type='application/pdf'
+        )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(payroll.updated_at.timestamp())
+    if is_cacheable(payroll):
+        patch_cache_control(response, private=True, max_age=PAYSLIP_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
     return response
 
 
@@ -693,46 +554,39 @@ def attendance_list(request):
     year = int(request.GET.get('year', current_year))
     month = int(request.GET.get('month', current_month))
     
-    attendances = Attendance.objects.filter(
-        employee=employee,
-        date__year=year,
-        date__month=month
-    ).order_by('-date')
+    # Bảng chính + lưu trữ (tháng đã đóng)
+    attendances = employee_attendance(employee, year, month)
     
     # Process attendances for template
     attendance_data = []
     for att in attendances:
-        is_late = 'muộn' in att.notes.lower() if att.notes else False
-        is_early = 'sớm' in att.notes.lower() if att.notes else False
-        
         # Convert to local time for display
         local_date = timezone.localtime(att.date)
+        if att.check_out_at:
+            check_out_time = timezone.localtime(att.check_out_at).strftime('%H:%M')
+        else:
+            check_out_time = 'Đã checkout' if att.has_checked_out else None
         
         attendance_data.append({
             'date': local_date,
-            'check_in_time': local_date.strftime('%H:%M') if att.date else None,
-            'check_out_time': 'Đã checkout' if att.working_hours > 0 else None,
+            'check_in_time': timezone.localtime(att.check_in_time).strftime('%H:%M') if att.date else None,
+            'check_out_time': check_out_time,
             'working_hours': round(att.working_hours, 2) if att.working_hours else 0,
             'status': att.status,
             'notes': att.notes,
-            'is_late': is_late,
-            'is_early_leave': is_early,
+            'is_late': att.is_late,
+            'is_early_leave': att.is_early_leave,
         })
     
-    # Statistics
-    total_days = attendances.count()
-    working_days = attendances.filter(status='Có làm việc').count()
-    total_hours = sum([a.working_hours or 0 for a in attendances])
-    
-    # Count late and early leave
-    late_count = 0
-    early_leave_count = 0
-    for att in attendances:
-        if att.notes:
-            if 'muộn' in att.notes.lower():
-                late_count += 1
-            if 'sớm' in att.notes.lower():
-                early_leave_count += 1
+    # Statistics - tính trên các bản ghi đã nạp (không thêm truy vấn)
+    totals = summarize(attendances)
+    stats = {
+        'total_days': totals['row_count'],
+        'working_days': totals['working_days'],
+        'late_count': totals['late_count'],
+        'early_leave_count': totals['early_leave_count'],
+        'total_hours': totals['working_hours'],
+    }
     
     # Generate months and years for filter
     months = [
@@ -750,11 +604,8 @@ def attendance_list(request):
         'months': months,
         'years': years,
         'stats': {
-            'total_days': total_days,
-            'working_days': working_days,
-            'late_count': late_count,
-            'early_leave_count': early_leave_count,
-            'total_hours': round(total_hours, 2),
+            **stats,
+            'total_hours': round(stats['total_hours'], 2),
         }
     }
     
@@ -780,54 +631,26 @@ def check_in(request):
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
     
-    employee = get_user_employee(request.user)
-    if not employee:
+    # Chỉ cần employee_id (identity đã cache) - không nạp Employee trong giờ cao điểm
+    employee_id = get_identity(request.user).employee_id
+    if not employee_id:
         return JsonResponse({'status': 'error', 'message': 'Không tìm thấy thông tin nhân viên'}, status=403)
     
-    now = timezone.now()
-    local_now = timezone.localtime(now)
-    today_date = local_now.date()
-    
-    # Check if already checked in today
-    existing = Attendance.objects.filter(employee=employee, date__date=today_date).first()
-    if existing:
-        local_checkin = timezone.localtime(existing.date)
-        return JsonResponse({
-            'status': 'error',
-            'message': 'Bạn đã check-in rồi!',
-            'check_in_time': local_checkin.strftime('%H:%M')
-        })
-    
     try:
-        # Check if late (after 8:30 AM) - use local time
-        from datetime import time
-        current_time = local_now.time()
-        standard_time = time(8, 30)  # 8:30 AM
-        is_late = current_time > standard_time
-        
-        # Determine status
-        status = 'Có làm việc'
-        notes = ''
-        if is_late:
-            notes = f'Đi muộn {(local_now.hour * 60 + local_now.minute) - (8 * 60 + 30)} phút'
-        
-        # Create attendance record
-        attendance = Attendance.objects.create(
-            employee=employee,
-            date=now,  # Store in UTC
-            status=status,
-            working_hours=0,  # Will be updated on check-out
-            notes=notes
-        )
-        
-        return JsonResponse({
-            'status': 'success',
-            'message': 'Check-in thành công!' + (' (Đi muộn)' if is_late else ''),
-            'check_in_time': local_now.strftime('%H:%M:%S'),
-            'is_late': is_late
-        })
+        success, message, data = record_check_in(employee_id)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    response = {
+        'status': 'success' if success else 'error',
+        'message': message,
+    }
+    if 'check_in_at' in data:
+        check_in_time = timezone.localtime(data['check_in_at'])
+        response['check_in_time'] = check_in_time.strftime('%H:%M:%S' if success else '%H:%M')
+    if success:
+        response['is_late'] = data['is_late']
+    return JsonResponse(response)
 
 
 @login_required
@@ -836,58 +659,24 @@ def check_out(request):
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
     
-    employee = get_user_employee(request.user)
-    if not employee:
+    employee_id = get_identity(request.user).employee_id
+    if not employee_id:
         return JsonResponse({'status': 'error', 'message': 'Không tìm thấy thông tin nhân viên'}, status=403)
     
-    now = timezone.now()
-    local_now = timezone.localtime(now)
-    today_date = local_now.date()
-    
-    # Find today's attendance
-    attendance = Attendance.objects.filter(employee=employee, date__date=today_date).first()
-    if not attendance:
-        return JsonResponse({
-            'status': 'error',
-            'message': 'Bạn chưa check-in!'
-        })
-    
-    # Check if already recorded working hours (check-out done)
-    if attendance.working_hours > 0:
-        return JsonResponse({
-            'status': 'error',
-            'message': 'Bạn đã check-out rồi!'
-        })
-    
     try:
-        # Calculate working hours from check-in time to now
-        check_in_time = attendance.date
-        check_out_time = now
-        delta = check_out_time - check_in_time
-        hours = delta.total_seconds() / 3600
-        attendance.working_hours = round(hours, 2)
-        
-        # Check if early leave (before 5:30 PM) - use local time
-        from datetime import time
-        current_time = local_now.time()
-        standard_time = time(17, 30)  # 5:30 PM
-        is_early = current_time < standard_time
-        
-        if is_early:
-            early_minutes = (17 * 60 + 30) - (local_now.hour * 60 + local_now.minute)
-            attendance.notes += f' | Về sớm {early_minutes} phút'
-        
-        attendance.save()
-        
-        return JsonResponse({
-            'status': 'success',
-            'message': 'Check-out thành công!' + (' (Về sớm)' if is_early else ''),
-            'check_out_time': local_now.strftime('%H:%M:%S'),
-            'working_hours': attendance.working_hours,
-            'is_early': is_early
-        })
+        success, message, data = record_check_out(employee_id)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    if not success:
+        return JsonResponse({'status': 'error', 'message': message})
+    return JsonResponse({
+        'status': 'success',
+        'message': message,
+        'check_out_time': timezone.localtime(data['check_out_at']).strftime('%H:%M:%S'),
+        'working_hours': data['working_hours'],
+        'is_early': data['is_early']
+    })
 
 
 @login_required
@@ -898,7 +687,7 @@ def today_attendance(request):
         return JsonResponse({'status': 'error', 'message': 'Không tìm thấy thông tin nhân viên'}, status=403)
     
     today_date = timezone.localtime(timezone.now()).date()
-    attendance = Attendance.objects.filter(employee=employee, date__date=today_date).first()
+    attendance = Attendance.objects.filter(employee=employee, work_date=today_date).first()
     
     if not attendance:
         return JsonResponse({
@@ -907,14 +696,16 @@ def today_attendance(request):
             'has_checked_out': False
         })
     
-    has_checked_out = attendance.working_hours > 0
+    has_checked_out = attendance.has_checked_out
     
     # Convert to local time for display
-    local_check_in = timezone.localtime(attendance.date)
+    local_check_in = timezone.localtime(attendance.check_in_time)
     
-    # Calculate estimated check-out time based on check-in + working hours
     check_out_time_display = None
-    if has_checked_out:
+    if attendance.check_out_at:
+        check_out_time_display = timezone.localtime(attendance.check_out_at).strftime('%H:%M:%S')
+    elif has_checked_out:
+        # Bản ghi nhập tay: ước tính từ giờ check-in + số giờ làm
         from datetime import timedelta
         check_out_dt = local_check_in + timedelta(hours=attendance.working_hours)
         check_out_time_display = check_out_dt.strftime('%H:%M:%S')
@@ -926,8 +717,8 @@ def today_attendance(request):
         'check_in_time': local_check_in.strftime('%H:%M:%S'),
         'check_out_time': check_out_time_display,
         'working_hours': round(attendance.working_hours, 2) if attendance.working_hours else 0,
-        'is_late': 'muộn' in attendance.notes.lower() if attendance.notes else False,
-        'is_early_leave': 'sớm' in attendance.notes.lower() if attendance.notes else False
+        'is_late': attendance.is_late,
+        'is_early_leave': attendance.is_early_leave
     })
 
 
@@ -1168,7 +959,8 @@ def profile_view(request):
         year=current_year
     ).aggregate(models.Sum('total_days'))['total_days__sum'] or 0
     
-    # Calculate statistics for current year
+    # Calculate statistics for current year (chấm công gồm cả các tháng đã lưu trữ)
+    attendance_totals = employee_year_totals(employee, current_year)
     stats = {
         'leaves_taken': LeaveRequest.objects.filter(
             employee=employee,
@@ -1176,16 +968,9 @@ def profile_view(request):
             start_date__year=current_year
         ).aggregate(models.Sum('total_days'))['total_days__sum'] or 0,
         
-        'attendance_days': Attendance.objects.filter(
-            employee=employee,
-            date__year=current_year,
-            status='present'
-        ).count(),
+        'attendance_days': attendance_totals['working_days'],
         
-        'late_count': Attendance.objects.filter(
-            employee=employee,
-            date__year=current_year
-        ).exclude(status='present').count(),
+        'late_count': attendance_totals['late_count'],
         
         'expenses_count': Expense.objects.filter(
             employee=employee,
@@ -1320,7 +1105,7 @@ def password_change(request):
 @login_required
 def documents_list(request):
     """Danh sách tài liệu công ty"""
-    from .models import Document, DocumentCategory
+    from .models import DocumentCategory
     
     employee = get_user_employee(request.user)
     if not employee:
@@ -1331,37 +1116,17 @@ def documents_list(request):
     category_id = request.GET.get('category')
     search_query = request.GET.get('q', '')
     
-    # Base queryset - filter by visibility
-    documents = Document.objects.filter(is_active=True)
-    
-    # Apply visibility filters
-    visible_docs = documents.filter(visibility='all')
-    
-    # Department visibility
-    if employee.department:
-        dept_docs = documents.filter(visibility='department', departments=employee.department)
-        visible_docs = visible_docs | dept_docs
-    
-    # Manager visibility
-    if employee.is_manager:
-        manager_docs = documents.filter(visibility='manager')
-        visible_docs = visible_docs | manager_docs
-    
-    # Specific employee visibility
-    specific_docs = documents.filter(visibility='specific', specific_employees=employee)
-    visible_docs = visible_docs | specific_docs
+    # Visibility: một lookup trên chỉ mục đối tượng xem (app.content_audience)
+    visible_docs = visible_documents(employee)
     
     # Apply filters
     if category_id:
         visible_docs = visible_docs.filter(category_id=category_id)
     
     if search_query:
-        visible_docs = visible_docs.filter(
-            models.Q(title__icontains=search_query) | 
-            models.Q(description__icontains=search_query)
-        )
+        visible_docs = search_filter(visible_docs, 'document', search_query)
     
-    visible_docs = visible_docs.distinct().select_related('category', 'uploaded_by').order_by('-created_at')
+    visible_docs = visible_docs.select_related('category', 'uploaded_by').order_by('-created_at')
     
     # Get categories
     categories = DocumentCategory.objects.filter(is_active=True)
@@ -1390,17 +1155,7 @@ def document_download(request, document_id):
     document = get_object_or_404(Document, id=document_id, is_active=True)
     
     # Verify access
-    has_access = False
-    if document.visibility == 'all':
-        has_access = True
-    elif document.visibility == 'department' and employee.department in document.departments.all():
-        has_access = True
-    elif document.visibility == 'manager' and employee.is_manager:
-        has_access = True
-    elif document.visibility == 'specific' and employee in document.specific_employees.all():
-        has_access = True
-    
-    if not has_access:
+    if not has_access(employee, document):
         messages.error(request, 'Bạn không có quyền tải tài liệu này.')
         return redirect('portal_documents')
     
@@ -1431,7 +1186,7 @@ def document_download(request, document_id):
 @login_required
 def announcements_list(request):
     """Danh sách thông báo"""
-    from .models import Announcement, AnnouncementRead
+    from .models import AnnouncementRead
     from django.db.models import Exists, OuterRef
     
     employee = get_user_employee(request.user)
@@ -1439,46 +1194,35 @@ def announcements_list(request):
         messages.error(request, 'Không tìm thấy thông tin nhân viên.')
         return redirect('login')
     
-    # Get announcements visible to this employee
-    now = timezone.now()
-    announcements = Announcement.objects.filter(
-        is_active=True,
-        publish_at__lte=now
-    ).filter(
-        models.Q(expire_at__isnull=True) | models.Q(expire_at__gte=now)
-    )
-    
-    # Filter by target
-    visible_announcements = announcements.filter(target_all=True)
-    
-    if employee.department:
-        dept_announcements = announcements.filter(target_departments=employee.department)
-        visible_announcements = visible_announcements | dept_announcements
-    
-    specific_announcements = announcements.filter(target_employees=employee)
-    visible_announcements = visible_announcements | specific_announcements
+    # Get announcements visible to this employee (chỉ mục đối tượng xem)
+    visible = visible_announcements(employee)
     
     # Annotate with read status
-    visible_announcements = visible_announcements.annotate(
+    visible = visible.annotate(
         is_read=Exists(AnnouncementRead.objects.filter(
             announcement=OuterRef('pk'),
             employee=employee
         ))
-    ).distinct().select_related('created_by').order_by('-is_pinned', '-publish_at')
+    ).select_related('created_by').order_by('-is_pinned', '-publish_at')
     
     # Filter by category
     category = request.GET.get('category')
     if category:
-        visible_announcements = visible_announcements.filter(category=category)
+        visible = visible.filter(category=category)
+    
+    search_query = request.GET.get('q', '')
+    if search_query:
+        visible = search_filter(visible, 'announcement', search_query)
     
-    # Unread count
-    unread_count = visible_announcements.filter(is_read=False).count()
+    # Unread count: bộ đếm inbox được duy trì sẵn (cache)
+    unread_count = get_inbox_counters(employee)['unread_announcements']
     
     context = {
         'employee': employee,
-        'announcements': visible_announcements,
+        'announcements': visible,
         'unread_count': unread_count,
         'selected_category': category,
+        'search_query': search_query,
     }
     
     return render(request, 'portal/announcements/list.html', context)
@@ -1493,13 +1237,7 @@ def announcement_detail(request, announcement_id):
     announcement = get_object_or_404(Announcement, id=announcement_id, is_active=True)
     
     # Verify access
-    has_access = announcement.target_all
-    if not has_access and employee.department:
-        has_access = announcement.target_departments.filter(id=employee.department.id).exists()
-    if not has_access:
-        has_access = announcement.target_employees.filter(id=employee.id).exists()
-    
-    if not has_access:
+    if not has_access(employee, announcement):
         messages.error(request, 'Bạn không có quyền xem thông báo này.')
         return redirect('portal_announcements')
     
@@ -1577,13 +1315,11 @@ def team_leaves(request):
     pending_count = leave_requests.filter(status='pending').count()
     approved_count = leave_requests.filter(
         status='approved', 
-        created_at__year=today.year,
-        created_at__month=today.month
+        **month_filter('created_at', today.year, today.month, datetime_field=True)
     ).count()
     rejected_count = leave_requests.filter(
         status='rejected',
-        created_at__year=today.year,
-        created_at__month=today.month
+        **month_filter('created_at', today.year, today.month, datetime_field=True)
     ).count()
     team_size = Employee.objects.filter(department=employee.department).count()
     
@@ -1712,102 +1448,52 @@ def team_leaves_bulk_action(request):
     try:
         data = json.loads(request.body)
         action = data.get('action')
-        leave_ids = data.get('leave_ids', [])
+        leave_ids = parse_ids(data.get('leave_ids') or [])
         reason = data.get('reason', '')
-        
-        if not action or not leave_ids:
-            return JsonResponse({'success': False, 'message': 'Missing action or leave_ids'}, status=400)
-        
-        if action not in ['approve', 'reject']:
-            return JsonResponse({'success': False, 'message': 'Invalid action'}, status=400)
-        
-        employee = get_user_employee(request.user)
-        if not employee or not employee.is_manager:
-            return JsonResponse({'success': False, 'message': 'Không có quyền thực hiện'}, status=403)
-        
-        # Get leave requests
-        leave_requests = LeaveRequest.objects.filter(
-            id__in=leave_ids,
-            employee__department=employee.department,
-            status='pending'
-        )
-        
-        if not leave_requests.exists():
-            return JsonResponse({'success': False, 'message': 'Không tìm thấy đơn hợp lệ'}, status=404)
-        
-        # Perform bulk action
-        success_count = 0
-        failed_items = []
-        
-        for leave in leave_requests:
-            try:
-                if action == 'approve':
-                    # Check leave balance
-                    has_balance, balance_msg, leave_balance = check_leave_balance(
-                        employee=leave.employee,
-                        leave_type=leave.leave_type,
-                        requested_days=leave.total_days,
-                        year=leave.start_date.year
-                    )
-                    
-                    if has_balance:
-                        leave.status = 'approved'
-                        leave.approved_by = employee
-                        leave.approved_date = timezone.now()
-                        leave.save()
-                        
-                        # Update leave balance
-                        if leave_balance:
-                            leave_balance.used_days += leave.total_days
-                            leave_balance.remaining_days -= leave.total_days
-                            leave_balance.save()
-                        
-                        # Send email notification
-                        try:
-                            EmailService.send_leave_approved(leave)
-                        except Exception as e:
-                            print(f"Error sending leave approval email: {e}")
-                        
-                        success_count += 1
-                    else:
-                        failed_items.append(f"{leave.employee.name}: {balance_msg}")
-                
-                elif action == 'reject':
-                    if not reason:
-                        failed_items.append(f"{leave.employee.name}: Cần lý do từ chối")
-                        continue
-                    
-                    leave.status = 'rejected'
-                    leave.approved_by = employee
-                    leave.approved_date = timezone.now()
-                    leave.rejection_reason = reason
-                    leave.save()
-                    
-                    # Send email notification
-                    try:
-                        EmailService.send_leave_rejected(leave, reason)
-                    except Exception as e:
-                        print(f"Error sending leave rejection email: {e}")
-                    
-                    success_count += 1
-                    
-            except Exception as e:
-                failed_items.append(f"{leave.employee.name}: {str(e)}")
-        
-        # Prepare response message
-        if success_count > 0:
-            action_text = 'duyệt' if action == 'approve' else 'từ chối'
-            message = f'Đã {action_text} thành công {success_count} đơn'
-            if failed_items:
-                message += f'. Thất bại: {len(failed_items)} đơn'
-            return JsonResponse({'success': True, 'message': message, 'failed_items': failed_items})
-        else:
-            return JsonResponse({'success': False, 'message': 'Không thể xử lý đơn nào', 'failed_items': failed_items}, status=400)
-            
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
         return JsonResponse({'success': False, 'message': 'Invalid JSON data'}, status=400)
+    
+    if not action or not leave_ids:
+        return JsonResponse({'success': False, 'message': 'Missing action or leave_ids'}, status=400)
+    
+    if action not in BULK_ACTIONS:
+        return JsonResponse({'success': False, 'message': 'Invalid action'}, status=400)
+    
+    if action == 'reject' and not reason:
+        return JsonResponse({'success': False, 'message': 'Cần lý do từ chối'}, status=400)
+    
+    employee = get_user_employee(request.user)
+    if not employee or not employee.is_manager:
+        return JsonResponse({'success': False, 'message': 'Không có quyền thực hiện'}, status=403)
+    
+    try:
+        # Validate all, then one UPDATE + grouped balance changes + one email batch
+        outcome = bulk_review_leaves(employee, leave_ids, action, reason=reason, user=request.user)
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Lỗi: {str(e)}'}, status=500)
+    
+    return _bulk_action_response(action, outcome)
+
+
+def _bulk_action_response(action, outcome):
+    """JSON response of a bulk approve/reject: message + per-item results"""
+    results = outcome['results']
+    failed_items = [
+        f"{item['employee_name'] or '#' + str(item['id'])}: {item['message']}"
+        for item in results if item['status'] == 'failed'
+    ]
+    success_count = len(outcome['processed'])
+    if success_count > 0:
+        action_text = 'duyệt' if action == 'approve' else 'từ chối'
+        message = f'Đã {action_text} thành công {success_count} đơn'
+        if failed_items:
+            message += f'. Thất bại: {len(failed_items)} đơn'
+        return JsonResponse({'success': True, 'message': message, 'failed_items': failed_items, 'results': results})
+    if not any(item['employee_name'] for item in results):
+        return JsonResponse({'success': False, 'message': 'Không tìm thấy đơn hợp lệ', 'results': results}, status=404)
+    return JsonResponse({
+        'success': False, 'message': 'Không thể xử lý đơn nào', 'failed_items': failed_items, 'results': results
+    }, status=400)
 
 
 @login_required
@@ -1833,16 +1519,14 @@ def team_expenses(request):
     # Approved this month
     approved_this_month = expense_requests.filter(
         status='approved',
-        approved_at__year=today.year,
-        approved_at__month=today.month
+        **month_filter('approved_at', today.year, today.month, datetime_field=True)
     )
     approved_amount_this_month = approved_this_month.aggregate(Sum('amount'))['amount__sum'] or 0
     
     # Rejected this month
     rejected_this_month = expense_requests.filter(
         status='rejected',
-        approved_at__year=today.year,
-        approved_at__month=today.month
+        **month_filter('approved_at', today.year, today.month, datetime_field=True)
     )
     rejected_count = rejected_this_month.count()
     
@@ -1869,85 +1553,30 @@ def team_expenses_bulk_action(request):
     try:
         data = json.loads(request.body)
         action = data.get('action')
-        expense_ids = data.get('expense_ids', [])
+        expense_ids = parse_ids(data.get('expense_ids') or [])
         reason = data.get('reason', '')
-        
-        if not action or not expense_ids:
-            return JsonResponse({'success': False, 'message': 'Missing action or expense_ids'}, status=400)
-        
-        if action not in ['approve', 'reject']:
-            return JsonResponse({'success': False, 'message': 'Invalid action'}, status=400)
-        
-        employee = get_user_employee(request.user)
-        if not employee or not employee.is_manager:
-            return JsonResponse({'success': False, 'message': 'Không có quyền thực hiện'}, status=403)
-        
-        # Get expense requests (handle both 'pending' and 'Pending' statuses)
-        from django.db.models import Q
-        expense_requests = Expense.objects.filter(
-            id__in=expense_ids,
-            employee__department=employee.department
-        ).filter(Q(status='pending') | Q(status='Pending'))
-        
-        if not expense_requests.exists():
-            return JsonResponse({'success': False, 'message': 'Không tìm thấy đơn hợp lệ'}, status=404)
-        
-        # Perform bulk action
-        success_count = 0
-        failed_items = []
-        
-        for expense in expense_requests:
-            try:
-                if action == 'approve':
-                    expense.status = 'approved'
-                    expense.approved_by = employee
-                    expense.approved_at = timezone.now()
-                    expense.save()
-                    
-                    # Send email notification
-                    try:
-                        EmailService.send_expense_approved(expense)
-                    except Exception as e:
-                        print(f"Error sending expense approval email: {e}")
-                    
-                    success_count += 1
-                
-                elif action == 'reject':
-                    if not reason:
-                        failed_items.append(f"{expense.employee.name}: Cần lý do từ chối")
-                        continue
-                    
-                    expense.status = 'rejected'
-                    expense.approved_by = employee
-                    expense.approved_at = timezone.now()
-                    expense.rejection_reason = reason
-                    expense.save()
-                    
-                    # Send email notification
-                    try:
-                        EmailService.send_expense_rejected(expense, reason)
-                    except Exception as e:
-                        print(f"Error sending expense rejection email: {e}")
-                    
-                    success_count += 1
-                    
-            except Exception as e:
-                failed_items.append(f"{expense.employee.name}: {str(e)}")
-        
-        # Prepare response message
-        if success_count > 0:
-            action_text = 'duyệt' if action == 'approve' else 'từ chối'
-            message = f'Đã {action_text} thành công {success_count} đơn'
-            if failed_items:
-                message += f'. Thất bại: {len(failed_items)} đơn'
-            return JsonResponse({'success': True, 'message': message, 'failed_items': failed_items})
-        else:
-            return JsonResponse({'success': False, 'message': 'Không thể xử lý đơn nào', 'failed_items': failed_items}, status=400)
-            
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
         return JsonResponse({'success': False, 'message': 'Invalid JSON data'}, status=400)
+    
+    if not action or not expense_ids:
+        return JsonResponse({'success': False, 'message': 'Missing action or expense_ids'}, status=400)
+    
+    if action not in BULK_ACTIONS:
+        return JsonResponse({'success': False, 'message': 'Invalid action'}, status=400)
+    
+    if action == 'reject' and not reason:
+        return JsonResponse({'success': False, 'message': 'Cần lý do từ chối'}, status=400)
+    
+    employee = get_user_employee(request.user)
+    if not employee or not employee.is_manager:
+        return JsonResponse({'success': False, 'message': 'Không có quyền thực hiện'}, status=403)
+    
+    try:
+        outcome = bulk_review_expenses(employee, expense_ids, action, reason=reason)
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Lỗi: {str(e)}'}, status=500)
+    
+    return _bulk_action_response(action, outcome)
 
 
 @login_required
@@ -2118,10 +1747,7 @@ def team_expense_detail(request, expense_id):
 @login_required
 @require_manager_permission
 def team_reports(request):
-    """Báo cáo team cho Manager"""
-    from django.db.models import Count, Sum, Avg, Q
-    from datetime import date, timedelta
-    
+    """Báo cáo team cho Manager (đọc từ bảng số liệu tháng - xem app.monthly_stats)"""
     employee = get_user_employee(request.user)
     if not employee or not employee.is_manager:
         messages.error(request, 'Bạn không có quyền truy cập.')
@@ -2130,62 +1756,50 @@ def team_reports(request):
     # Get date range filter
     year = int(request.GET.get('year', timezone.now().year))
     month = int(request.GET.get('month', timezone.now().month))
-    
-    # Team members
-    team_members = Employee.objects.filter(department=employee.department)
-    team_size = team_members.count()
-    
-    # Attendance Statistics
-    attendance_stats = Attendance.objects.filter(
-        employee__department=employee.department,
-        date__year=year,
-        date__month=month
-    ).aggregate(
-        total_late=Count('id', filter=Q(is_late=True)),
-        total_early_leave=Count('id', filter=Q(is_early_leave=True)),
-        total_absent=Count('id', filter=Q(status='absent')),
-        avg_working_hours=Avg('working_hours')
-    )
-    
-    # Leave Statistics
-    leave_stats = LeaveRequest.objects.filter(
-        employee__department=employee.department,
-        created_at__year=year,
-        created_at__month=month
-    ).aggregate(
-        total_requests=Count('id'),
-        pending_requests=Count('id', filter=Q(status='Pending')),
-        approved_requests=Count('id', filter=Q(status='Approved')),
-        rejected_requests=Count('id', filter=Q(status='Rejected')),
-        total_leave_days=Sum('total_days', filter=Q(status='Approved'))
-    )
-    
-    # Expense Statistics  
-    expense_stats = Expense.objects.filter(
-        employee__department=employee.department,
-        created_at__year=year,
-        created_at__month=month
-    ).aggregate(
-        total_expenses=Count('id'),
-        pending_expenses=Count('id', filter=Q(status='pending')),
-        approved_expenses=Count('id', filter=Q(status='approved')),
-        total_amount=Sum('amount', filter=Q(status='approved'))
-    )
+    department_id = employee.department_id
+    
+    stats = None
+    if department_id:
+        stats = department_month_stats(department_id, year, month)
+    stats = stats or DepartmentMonthlyStats(year=year, month=month)
+    
+    attendance_stats = {
+        'total_late': stats.late_count,
+        'total_early_leave': stats.early_leave_count,
+        'total_absent': stats.absent_days,
+        'avg_working_hours': stats.avg_working_hours,
+    }
+    leave_stats = {
+        'total_requests': stats.leave_requests,
+        'pending_requests': stats.leave_pending,
+        'approved_requests': stats.leave_approved,
+        'rejected_requests': stats.leave_rejected,
+        'total_leave_days': stats.leave_days,
+    }
+    expense_stats = {
+        'total_expenses': stats.expense_count,
+        'pending_expenses': stats.expense_pending,
+        'approved_expenses': stats.expense_approved,
+        'total_amount': stats.expense_amount,
+    }
     
     # Top performers (by attendance)
-    top_attendance = Attendance.objects.filter(
-        employee__department=employee.department,
-        date__year=year,
-        date__month=month
-    ).values('employee__name', 'employee__employee_code').annotate(
-        total_hours=Sum('working_hours'),
-        late_count=Count('id', filter=Q(is_late=True))
-    ).order_by('-total_hours')[:5]
+    top_attendance = [
+        {
+            'employee__name': row.employee.name,
+            'employee__employee_code': row.employee.employee_code,
+            'total_hours': row.working_hours,
+            'late_count': row.late_count,
+        }
+        for row in (top_employees(department_id, year, month) if department_id else [])
+    ]
+    # Xu hướng các tháng trước (các tháng đã tổng hợp bởi rollup_monthly_stats)
+    trend = department_trend(department_id, year, month) if department_id else []
     
     # Recent activities
     recent_leaves = LeaveRequest.objects.filter(
         employee__department=employee.department,
-        status='Pending'
+        status='pending'
     ).select_related('employee', 'leave_type').order_by('-created_at')[:5]
     
     recent_expenses = Expense.objects.filter(
@@ -2193,24 +1807,19 @@ def team_reports(request):
         status='pending'
     ).select_related('employee', 'category').order_by('-created_at')[:5]
     
-    # Appraisal progress (if any)
-    appraisal_progress = Appraisal.objects.filter(
-        employee__department=employee.department,
-        period__end_date__gte=date.today()
-    ).values('status').annotate(count=Count('id'))
-    
     context = {
         'employee': employee,
         'year': year,
         'month': month,
-        'team_size': team_size,
+        'years': list(range(timezone.localdate().year - 3, timezone.localdate().year + 1)),
+        'team_size': stats.headcount,
         'attendance_stats': attendance_stats,
         'leave_stats': leave_stats,
         'expense_stats': expense_stats,
         'top_attendance': top_attendance,
+        'trend': trend,
         'recent_leaves': recent_leaves,
         'recent_expenses': recent_expenses,
-        'appraisal_progress': appraisal_progress,
     }
     
     return render(request, 'portal/manager/team_reports.html', context)
@@ -2601,110 +2210,61 @@ def manager_appraisal_detail(request, appraisal_id):
 def organization_chart(request):
     """
     Employee Portal - Organization Chart
-    Hiển thị biểu đồ tổ chức công ty
+    Hiển thị biểu đồ tổ chức công ty (thành viên phòng ban được tải khi mở rộng)
     """
-    from .models import Department
-    
-    try:
-        employee = Employee.objects.get(email=request.user.email)
-    except Employee.DoesNotExist:
+    employee = get_user_employee(request.user)
+    if not employee:
         messages.error(request, 'Không tìm thấy thông tin nhân viên.')
         return redirect('login')
     
-    # Get all departments
-    departments = Department.objects.all().order_by('name')
-    
-    # Build org chart data
-    org_data = []
-    
-    # Top level managers (no department)
-    top_managers = Employee.objects.filter(
-        department__isnull=True,
-        is_manager=True
-    ).select_related('department')
-    
-    for manager in top_managers:
-        org_data.append({
-            'id': f'emp_{manager.id}',
-            'name': manager.name,
-            'title': manager.job_position or 'Manager',
-            'employee_code': manager.employee_code,
-            'avatar': manager.avatar.url if manager.avatar else None,
-            'is_manager': True,
-            'is_department': False,
-            'parent': None,
-            'department': None
-        })
-    
-    # Departments and their employees
-    for dept in departments:
-        # Department node
-        dept_id = f'dept_{dept.id}'
-        org_data.append({
-            'id': dept_id,
-            'name': dept.name,
-            'title': dept.description or 'Phòng ban',
-            'is_department': True,
-            'is_manager': False,
-            'parent': None,
-            'department': dept.id
-        })
-        
-        # Department managers
-        dept_managers = Employee.objects.filter(
-            department=dept,
-            is_manager=True
-        )
-        
-        for manager in dept_managers:
-            org_data.append({
-                'id': f'emp_{manager.id}',
-                'name': manager.name,
-                'title': manager.job_position or 'Manager',
-                'employee_code': manager.employee_code,
-                'avatar': manager.avatar.url if manager.avatar else None,
-                'is_manager': True,
-                'is_department': False,
-                'parent': dept_id,
-                'department': dept.id
-            })
-        
-        # Department staff
-        dept_staff = Employee.objects.filter(
-            department=dept,
-            is_manager=False
-        )
-        
-        for staff in dept_staff:
-            # Staff reports to department manager if exists, otherwise to department
-            parent_id = dept_id
-            if dept_managers.exists():
-                parent_id = f'emp_{dept_managers.first().id}'
-            
-            org_data.append({
-                'id': f'emp_{staff.id}',
-                'name': staff.name,
-                'title': staff.job_position or 'Nhân viên',
-                'employee_code': staff.employee_code,
-                'avatar': staff.avatar.url if staff.avatar else None,
-                'is_manager': False,
-                'is_department': False,
-                'parent': parent_id,
-                'department': dept.id
-            })
-    
-    # Statistics
-    total_employees = Employee.objects.count()
-    total_departments = departments.count()
-    total_managers = Employee.objects.filter(is_manager=True).count()
-    
+    org = get_org_summary()
     context = {
         'employee': employee,
-        'departments': departments,
-        'org_data_json': json.dumps(org_data),
-        'total_employees': total_employees,
-        'total_departments': total_departments,
-        'total_managers': total_managers,
+        'org': org,
+        'org_data_json': org['nodes_json'],
+        'total_employees': org['total_employees'],
+        'total_departments': org['total_departments'],
+        'total_managers': org['total_managers'],
     }
     
     return render(request, 'portal/organization/chart.html', context)
+
+
+@login_required
+def organization_chart_department(request, department_id):
+    """API: thành viên của một phòng ban trên sơ đồ tổ chức (JSON đã cache)"""
+    members_json = department_members_json(department_id)
+    if members_json is None:
+        return JsonResponse({'success': False, 'message': 'Không tìm thấy phòng ban'}, status=404)
+    return HttpResponse(members_json, content_type='application/json')
+
+
+# ======================== SEARCH ========================
+
+@login_required
+def global_search(request):
+    """
+    API: tìm kiếm toàn hệ thống (không phân biệt dấu, có xếp hạng)
+    ?q=từ khóa&type=employee|application|job|document|announcement|leave&limit=20
+    Trả về kết quả của loại được chọn + số kết quả theo từng loại (facets).
+    """
+    query = request.GET.get('q', '').strip()
+    entity_type = request.GET.get('type') or None
+    if entity_type and entity_type not in dict(SearchDocument.ENTITY_CHOICES):
+        return JsonResponse({'success': False, 'message': 'Loại tìm kiếm không hợp lệ'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_RESULT_LIMIT)), 1), 50)
+    except ValueError:
+        limit = SEARCH_RESULT_LIMIT
+
+    found = search(query, get_identity(request.user), entity_type=entity_type, limit=limit)
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'type': entity_type,
+        'results': found['results'],
+        'facets': [
+            {'type': code, 'label': label, 'count': found['facets'].get(code, 0)}
+            for code, label in SearchDocument.ENTITY_CHOICES
+        ],
+    })
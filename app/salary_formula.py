@@ -0,0 +1,211 @@
+"""
+Salary formula engine
+Parse công thức lương một lần thành AST đã kiểm duyệt (chỉ cho phép phép toán
+và tên biến an toàn), compile thành code object và cache lại theo
+(component id, hash công thức). Thay cho eval() chuỗi thô ở mỗi lần tính.
+
+Usage:
+    amount = evaluate_formula("base_salary * 0.1 + days * 50000",
+                              {'base_salary': 10000000, 'days': 22},
+                              component_id=component.pk)
+"""
+import ast
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Hàm được phép gọi trong công thức
+SAFE_FUNCTIONS = {
+    'min': min,
+    'max': max,
+    'abs': abs,
+    'round': round,
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# Giới hạn số mũ để tránh công thức kiểu 9 ** 9 ** 9 treo tiến trình; lũy thừa lồng nhau
+# ((9 ** 10) ** 10) ** 10 ... cũng bị cấm vì số mũ thực tế nhân lên theo mỗi tầng
+MAX_EXPONENT = 10
+
+_compiled_cache = {}
+_cache_lock = threading.Lock()
+
+
+class FormulaError(ValueError):
+    """Công thức lương không hợp lệ hoặc chứa cú pháp không được phép"""
+
+
+def _check_node(node):
+    if not isinstance(node, ALLOWED_NODES):
+        raise FormulaError(f"Cú pháp không được phép trong công thức: {type(node).__name__}")
+
+    if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+        raise FormulaError("Công thức chỉ được chứa hằng số dạng số")
+
+    if isinstance(node, ast.Name) and node.id.startswith('_'):
+        raise FormulaError(f"Tên biến không hợp lệ: {node.id}")
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in SAFE_FUNCTIONS:
+            raise FormulaError("Chỉ được gọi các hàm: " + ", ".join(SAFE_FUNCTIONS))
+        if node.keywords:
+            raise FormulaError("Không hỗ trợ tham số dạng keyword trong công thức")
+
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+        exponent = node.right
+        if isinstance(exponent, ast.UnaryOp) and isinstance(exponent.op, (ast.UAdd, ast.USub)):
+            exponent = exponent.operand
+        if not isinstance(exponent, ast.Constant) or abs(exponent.value) > MAX_EXPONENT:
+            raise FormulaError(f"Số mũ phải là hằng số không vượt quá {MAX_EXPONENT}")
+        if any(isinstance(child, ast.BinOp) and isinstance(child.op, ast.Pow) for child in ast.walk(node.left)):
+            raise FormulaError("Không được lũy thừa một biểu thức chứa lũy thừa khác")
+
+
+def compile_formula(formula):
+    """
+    Parse và kiểm duyệt công thức, trả về code object đã compile.
+
+    Raises:
+        FormulaError: nếu công thức sai cú pháp hoặc dùng cú pháp không được phép
+    """
+    try:
+        tree = ast.parse(formula.strip(), mode='eval')
+    except SyntaxError as e:
+        raise FormulaError(f"Công thức sai cú pháp: {e.msg}") from e
+
+    for node in ast.walk(tree):
+        _check_node(node)
+
+    return compile(tree, '<salary-formula>', 'eval')
+
+
+def validate_formula(formula):
+    """Kiểm tra công thức trước khi lưu, raise FormulaError nếu không hợp lệ"""
+    if formula and formula.strip():
+        compile_formula(formula)
+
+
+def _formula_hash(formula):
+    return hashlib.sha1(formula.encode('utf-8')).hexdigest()
+
+
+def get_compiled_formula(formula, component_id=None):
+    """
+    Lấy code object từ cache, compile nếu chưa có.
+    Key cache là (component_id, hash công thức) nên công thức đã sửa luôn
+    được compile lại kể cả khi chưa kịp invalidate.
+    """
+    key = (component_id, _formula_hash(formula))
+    code = _compiled_cache.get(key)
+    if code is None:
+        code = compile_formula(formula)
+        with _cache_lock:
+            _compiled_cache[key] = code
+    return code
+
+
+def invalidate_component(component_id):
+    """Xóa các công thức đã compile của một component (gọi khi component/rule được lưu)"""
+    with _cache_lock:
+        for key in [key for key in _compiled_cache if key[0] == component_id]:
+            del _compiled_cache[key]
+
+
+def clear_formula_cache():
+    with _cache_lock:
+        _compiled_cache.clear()
+
+
+def _run(code, context):
+    return eval(code, {'__builtins__': {}, **SAFE_FUNCTIONS}, context)
+
+
+def evaluate_formula(formula, context, component_id=None, default=0):
+    """
+    Tính giá trị công thức với context cho trước.
+    Trả về `default` nếu công thức rỗng, không hợp lệ hoặc lỗi khi tính
+    (giữ nguyên hành vi cũ của SalaryComponent.calculate).
+    """
+    if not formula:
+        return default
+    try:
+        return _run(get_compiled_formula(formula, component_id), context)
+    except Exception as e:
+        logger.warning(f"Salary formula error (component={component_id}): {e}")
+        return default
+
+
+def evaluate_many(formula, contexts, component_id=None, default=0):
+    """
+    Tính một công thức cho nhiều context (nhiều nhân viên) với một lần compile.
+
+    Returns:
+        list: giá trị theo đúng thứ tự contexts
+    """
+    if not formula:
+        return [default for _ in contexts]
+    try:
+        code = get_compiled_formula(formula, component_id)
+    except FormulaError as e:
+        logger.warning(f"Salary formula error (component={component_id}): {e}")
+        return [default for _ in contexts]
+
+    results = []
+    for context in contexts:
+        try:
+            results.append(_run(code, context))
+        except Exception:
+            results.append(default)
+    return results
+
+
+def calculate_employee_components(employees, **kwargs):
+    """
+    Tính toàn bộ thành phần lương đang áp dụng cho nhiều nhân viên (VD: cả phòng ban)
+    trong một truy vấn và một lần compile cho mỗi công thức.
+
+    Args:
+        employees: iterable Employee (hoặc queryset)
+        **kwargs: biến bổ sung cho công thức (hours, days, ...)
+
+    Returns:
+        dict: {employee_id: [(EmployeeSalaryRule, amount), ...]}
+    """
+    from .models import EmployeeSalaryRule
+
+    employees = list(employees)
+    base_salaries = {employee.id: employee.salary or 0 for employee in employees}
+    results = {employee_id: [] for employee_id in base_salaries}
+
+    rules = EmployeeSalaryRule.objects.filter(
+        employee_id__in=list(base_salaries), is_active=True
+    ).select_related('component')
+
+    # Gom các rule dùng cùng công thức để tính một lượt
+    formula_groups = {}
+    for rule in rules:
+        component = rule.component
+        if component.calculation_method == 'formula':
+            formula = rule.custom_formula or component.formula
+            formula_groups.setdefault((component.pk, formula), []).append(rule)
+        else:
+            amount = rule.calculate(base_salary=base_salaries[rule.employee_id], **kwargs)
+            results[rule.employee_id].append((rule, amount))
+
+    for (component_id, formula), group in formula_groups.items():
+        contexts = [
+            {'base_salary': base_salaries[rule.employee_id], **kwargs} for rule in group
+        ]
+        for rule, amount in zip(group, evaluate_many(formula, contexts, component_id)):
+            results[rule.employee_id].append((rule, amount))
+
+    return results
@@ -0,0 +1,424 @@
+"""
+Search index
+Tìm kiếm toàn văn thống nhất cho nhân viên, ứng tuyển, tin tuyển dụng, tài liệu,
+thông báo và đơn nghỉ phép:
+
+- Mỗi đối tượng có một SearchDocument đã bỏ dấu tiếng Việt (fold_text: "Nguyễn" ->
+  "nguyen", "Đặng" -> "dang"), được cập nhật bằng signal khi đối tượng (hoặc tên phòng
+  ban / tin tuyển dụng / loại nghỉ phép liên quan) thay đổi.
+- Chỉ mục: PostgreSQL dùng cột tsvector (tiêu đề trọng số A, nội dung B) + GIN;
+  SQLite dùng bảng FTS5 app_searchdocument_fts (bm25); nếu không có hai loại trên thì
+  so khớp LIKE trên cột đã bỏ dấu. Mỗi từ khóa được so khớp theo tiền tố ("ngu" khớp
+  "nguyen"), mọi từ khóa đều phải có mặt.
+- search_filter() thay icontains trong các trang danh sách; search() trả kết quả đã
+  xếp hạng + số lượng theo loại (facet) cho endpoint /search/, chỉ gồm những gì user
+  được xem.
+
+Usage:
+    employees = search_filter(Employee.objects.all(), 'employee', 'nguyen van')
+    results = search('nguyễn', identity, entity_type='employee')
+"""
+import logging
+import re
+import unicodedata
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .content_audience import visible_announcements, visible_documents
+from .models import (
+    Announcement, Application, Department, Document, Employee, JobPosting, LeaveRequest, LeaveType,
+    SearchDocument,
+)
+
+logger = logging.getLogger(__name__)
+
+SEARCH_RESULT_LIMIT = 20
+# Số từ khóa tối đa của một truy vấn (bỏ phần còn lại)
+MAX_QUERY_TERMS = 8
+FTS_TABLE = 'app_searchdocument_fts'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def fold_text(value):
+    """Chữ thường, bỏ dấu tiếng Việt (kể cả đ/Đ) để so khớp không phân biệt dấu"""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFD', str(value).replace('đ', 'd').replace('Đ', 'D'))
+    return ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+
+
+def _fold_join(*values):
+    return ' '.join(fold_text(value) for value in values if value)
+
+
+def query_terms(query):
+    return _TOKEN_RE.findall(fold_text(query))[:MAX_QUERY_TERMS]
+
+
+# ======================== DOCUMENT BUILDERS ========================
+# Mỗi builder trả về (title, subtitle, keywords, content) của một đối tượng
+
+def _employee_document(employee):
+    department = employee.department.name if employee.department else ''
+    return (
+        employee.name,
+        ' · '.join(part for part in (employee.employee_code, employee.job_position, department) if part),
+        _fold_join(employee.name, employee.employee_code),
+        _fold_join(employee.email, employee.phone, employee.job_position, department),
+    )
+
+
+def _application_document(application):
+    return (
+        application.full_name,
+        f'{application.application_code} · {application.job.title}',
+        _fold_join(application.full_name, application.application_code),
+        _fold_join(application.email, application.phone, application.job.title, application.current_position,
+                   application.current_company),
+    )
+
+
+def _job_document(job):
+    return (
+        job.title,
+        ' · '.join(part for part in (job.code, job.location) if part),
+        _fold_join(job.title, job.code),
+        _fold_join(job.description, job.requirements, job.responsibilities, job.location),
+    )
+
+
+def _document_document(document):
+    return (
+        document.title,
+        document.category.name if document.category else '',
+        _fold_join(document.title),
+        _fold_join(document.description, document.category.name if document.category else ''),
+    )
+
+
+def _announcement_document(announcement):
+    return (
+        announcement.title,
+        announcement.get_category_display(),
+        _fold_join(announcement.title),
+        _fold_join(strip_tags(announcement.content)),
+    )
+
+
+def _leave_document(leave):
+    return (
+        f'{leave.leave_type.name} {leave.start_date:%d/%m/%Y} - {leave.end_date:%d/%m/%Y}',
+        f'{leave.employee.name} · {leave.total_days:g} ngày',
+        _fold_join(leave.leave_type.name),
+        _fold_join(leave.reason, leave.employee.name),
+    )
+
+
+# fields: các cột đưa vào tài liệu - save(update_fields=...) không chạm tới thì bỏ qua
+SearchEntity = namedtuple('SearchEntity', 'model select_related fields build url')
+
+ENTITIES = {
+    'employee': SearchEntity(
+        Employee, ('department',),
+        {'name', 'employee_code', 'email', 'phone', 'job_position', 'department'}, _employee_document,
+        lambda pk: reverse('management_employee_detail', args=[pk])
+    ),
+    'application': SearchEntity(
+        Application, ('job',),
+        {'full_name', 'application_code', 'email', 'phone', 'job', 'current_position', 'current_company'},
+        _application_document,
+        lambda pk: reverse('application_detail', args=[pk])
+    ),
+    'job': SearchEntity(
+        JobPosting, (), {'title', 'code', 'description', 'requirements', 'responsibilities', 'location'},
+        _job_document,
+        lambda pk: reverse('careers_detail', args=[pk])
+    ),
+    'document': SearchEntity(
+        Document, ('category',), {'title', 'description', 'category'}, _document_document,
+        lambda pk: reverse('portal_document_download', args=[pk])
+    ),
+    'announcement': SearchEntity(
+        Announcement, (), {'title', 'content', 'category'}, _announcement_document,
+        lambda pk: reverse('portal_announcement_detail', args=[pk])
+    ),
+    'leave': SearchEntity(
+        LeaveRequest, ('employee', 'leave_type'),
+        {'employee', 'leave_type', 'start_date', 'end_date', 'total_days', 'reason'}, _leave_document,
+        lambda pk: reverse('portal_leave_detail', args=[pk])
+    ),
+}
+_ENTITY_BY_MODEL = {entity.model: entity_type for entity_type, entity in ENTITIES.items()}
+
+
+# ======================== INDEXING ========================
+
+def _search_document(entity_type, instance):
+    title, subtitle, keywords, content = ENTITIES[entity_type].build(instance)
+    return SearchDocument(
+        entity_type=entity_type, object_id=instance.pk, title=title[:255], subtitle=subtitle[:255],
+        keywords=keywords, content=content,
+    )
+
+
+def index_instance(instance):
+    """Tạo / cập nhật SearchDocument của một đối tượng"""
+    entity_type = _ENTITY_BY_MODEL[type(instance)]
+    document = _search_document(entity_type, instance)
+    SearchDocument.objects.update_or_create(
+        entity_type=entity_type, object_id=instance.pk,
+        defaults={field: getattr(document, field) for field in ('title', 'subtitle', 'keywords', 'content')},
+    )
+
+
+def _write_documents(entity_type, documents):
+    """Ghi một lô SearchDocument: UPDATE theo lô cho tài liệu đã có, INSERT phần còn thiếu"""
+    existing = dict(
+        SearchDocument.objects.filter(entity_type=entity_type, object_id__in=[doc.object_id for doc in documents])
+        .values_list('object_id', 'id')
+    )
+    now = timezone.now()
+    for document in documents:
+        document.pk = existing.get(document.object_id)
+        document.updated_at = now
+    SearchDocument.objects.bulk_update(
+        [document for document in documents if document.pk],
+        ['title', 'subtitle', 'keywords', 'content', 'updated_at'],
+    )
+    SearchDocument.objects.bulk_create([document for document in documents if not document.pk])
+
+
+def reindex_queryset(entity_type, queryset, batch_size=500):
+    """Cập nhật lại SearchDocument của các đối tượng trong queryset (đối tượng liên quan đổi tên)"""
+    entity = ENTITIES[entity_type]
+    batch = []
+    for instance in queryset.select_related(*entity.select_related).order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(_search_document(entity_type, instance))
+        if len(batch) >= batch_size:
+            _write_documents(entity_type, batch)
+            batch = []
+    if batch:
+        _write_documents(entity_type, batch)
+
+
+def rebuild_index(entity_types=None, batch_size=500, progress=None):
+    """
+    Dựng lại toàn bộ chỉ mục của các loại (mặc định: tất cả).
+
+    Args:
+        progress: hàm progress(entity_type, count) sau mỗi loại (optional)
+
+    Returns:
+        dict: {entity_type: số tài liệu}
+    """
+    counts = {}
+    for entity_type in entity_types or ENTITIES:
+        entity = ENTITIES[entity_type]
+        SearchDocument.objects.filter(entity_type=entity_type).delete()
+        batch = []
+        count = 0
+        queryset = entity.model.objects.select_related(*entity.select_related).order_by('pk')
+        for instance in queryset.iterator(chunk_size=batch_size):
+            batch.append(_search_document(entity_type, instance))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        counts[entity_type] = count + len(batch)
+        if progress:
+            progress(entity_type, counts[entity_type])
+    return counts
+
+
+# ======================== QUERYING ========================
+
+def _backend():
+    """'postgresql', 'fts5' hoặc 'like' - kiểm tra bảng FTS5 một lần mỗi kết nối"""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        backend = getattr(connection, '_search_backend', None)
+        if backend is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                backend = 'fts5' if cursor.fetchone() else 'like'
+            connection._search_backend = backend
+        return backend
+    return 'like'
+
+
+def _match_expression(terms, backend):
+    if backend == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching_documents(query):
+    """SearchDocument khớp mọi từ khóa của query (queryset rỗng nếu query không có từ nào)"""
+    terms = query_terms(query)
+    if not terms:
+        return SearchDocument.objects.none()
+    backend = _backend()
+    table = SearchDocument._meta.db_table
+    if backend == 'postgresql':
+        return SearchDocument.objects.filter(id__in=RawSQL(
+            f"SELECT id FROM {table} WHERE search_vector @@ to_tsquery('simple', %s)",
+            [_match_expression(terms, backend)]
+        ))
+    if backend == 'fts5':
+        return SearchDocument.objects.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_match_expression(terms, backend)]
+        ))
+    documents = SearchDocument.objects.all()
+    for term in terms:
+        documents = documents.filter(Q(keywords__contains=term) | Q(content__contains=term))
+    return documents
+
+
+def search_filter(queryset, entity_type, query):
+    """Lọc queryset của một loại đối tượng theo chỉ mục tìm kiếm (thay cho icontains)"""
+    return queryset.filter(pk__in=matching_documents(query).filter(entity_type=entity_type).values('object_id'))
+
+
+def _ranked(documents, query, limit):
+    """Các SearchDocument đã xếp hạng (liên quan nhất trước)"""
+    terms = query_terms(query)
+    backend = _backend()
+    if backend == 'postgresql':
+        documents = documents.annotate(rank=RawSQL(
+            "ts_rank(search_vector, to_tsquery('simple', %s))", [_match_expression(terms, backend)]
+        )).order_by('-rank', '-updated_at')
+    elif backend == 'fts5':
+        # bm25: càng nhỏ càng liên quan; tiêu đề nặng gấp 4 lần nội dung
+        documents = documents.annotate(rank=RawSQL(
+            f"(SELECT bm25({FTS_TABLE}, 4.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {SearchDocument._meta.db_table}.id)",
+            [_match_expression(terms, backend)]
+        )).order_by('rank', '-updated_at')
+    else:
+        documents = documents.order_by('-updated_at')
+    return list(documents[:limit])
+
+
+def visible_scope(identity):
+    """Q trên SearchDocument: những đối tượng user được thấy trong kết quả tìm kiếm"""
+    employee = identity.employee
+    today = timezone.localdate()
+    now = timezone.now()
+
+    open_jobs = JobPosting.objects.filter(status='open', deadline__gte=today).values('id')
+    scope = Q(entity_type='job', object_id__in=open_jobs)
+    if identity.is_hr:
+        scope = Q(entity_type__in=('employee', 'application', 'job', 'leave'))
+    elif employee:
+        scope |= Q(entity_type='leave', object_id__in=LeaveRequest.objects.filter(employee=employee).values('id'))
+
+    if employee:
+        documents = visible_documents(employee).values('id')
+        announcements = visible_announcements(employee, now).values('id')
+        scope |= Q(entity_type='document', object_id__in=documents)
+        scope |= Q(entity_type='announcement', object_id__in=announcements)
+    return scope
+
+
+def search(query, identity, entity_type=None, limit=SEARCH_RESULT_LIMIT):
+    """
+    Tìm kiếm có xếp hạng trên mọi loại đối tượng user được xem.
+
+    Returns:
+        dict: results ([{type, id, title, subtitle, url}]), facets ({entity_type: số kết quả})
+    """
+    documents = matching_documents(query).filter(visible_scope(identity))
+    facets = dict(documents.order_by().values_list('entity_type').annotate(total=Count('id')))
+    if entity_type:
+        documents = documents.filter(entity_type=entity_type)
+    results = [
+        {
+            'type': document.entity_type,
+            'id': document.object_id,
+            'title': document.title,
+            'subtitle': document.subtitle,
+            'url': _result_url(document, identity),
+        }
+        for document in _ranked(documents, query, limit)
+    ]
+    return {'results': results, 'facets': facets}
+
+
+def _result_url(document, identity):
+    if document.entity_type == 'job' and identity.is_hr:
+        return reverse('job_detail_admin', args=[document.object_id])
+    return ENTITIES[document.entity_type].url(document.object_id)
+
+
+# ======================== SIGNALS ========================
+
+def _touches_index(sender, update_fields):
+    return update_fields is None or not ENTITIES[_ENTITY_BY_MODEL[sender]].fields.isdisjoint(update_fields)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Application)
+@receiver(post_save, sender=JobPosting)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=LeaveRequest)
+def _index_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches_index(sender, update_fields):
+        return
+    index_instance(instance)
+
+
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Application)
+@receiver(post_delete, sender=JobPosting)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=LeaveRequest)
+def _remove_on_delete(sender, instance, **kwargs):
+    SearchDocument.objects.filter(entity_type=_ENTITY_BY_MODEL[sender], object_id=instance.pk).delete()
+
+
+# Tên phòng ban / loại nghỉ phép, tiêu đề tin tuyển dụng nằm trong tài liệu của các đối tượng
+# liên quan - chỉ ghi lại các tài liệu đó khi giá trị này thực sự đổi
+_DENORMALIZED_FIELDS = {Department: 'name', LeaveType: 'name', JobPosting: 'title'}
+
+
+@receiver(pre_save, sender=Department)
+@receiver(pre_save, sender=LeaveType)
+@receiver(pre_save, sender=JobPosting)
+def _remember_indexed_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    field = _DENORMALIZED_FIELDS[sender]
+    instance._search_name_changed = False
+    if raw or instance.pk is None or (update_fields is not None and field not in update_fields):
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance._search_name_changed = stored is not None and stored != getattr(instance, field)
+
+
+@receiver(post_save, sender=Department)
+def _reindex_department_employees(sender, instance, created=False, **kwargs):
+    if not created and getattr(instance, '_search_name_changed', False):
+        reindex_queryset('employee', instance.employee_set.all())
+
+
+@receiver(post_save, sender=JobPosting)
+def _reindex_job_applications(sender, instance, created=False, **kwargs):
+    if not created and getattr(instance, '_search_name_changed', False):
+        reindex_queryset('application', instance.applications.all())
+
+
+@receiver(post_save, sender=LeaveType)
+def _reindex_leave_type_requests(sender, instance, created=False, **kwargs):
+    if not created and getattr(instance, '_search_name_changed', False):
+        reindex_queryset('leave', instance.leaverequest_set.all())
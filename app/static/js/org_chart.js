@@ -0,0 +1,117 @@
+/**
+ * Organization Chart (simple tree)
+ * Thành viên của phòng ban được tải khi mở rộng phòng ban đó (data-members-url),
+ * tìm kiếm / "Mở rộng" tải các phòng ban còn lại khi cần.
+ */
+
+function escapeHtml(value) {
+    return $('<div>').text(value == null ? '' : value).html();
+}
+
+function renderMemberNode(node) {
+    const icon = node.is_manager ? '<i class="fas fa-crown"></i>' : '<i class="fas fa-user"></i>';
+    return `
+        <div class="tree-node ${node.is_manager ? 'manager' : ''}">
+            <h4>${icon} ${escapeHtml(node.name)}</h4>
+            <p><strong>${escapeHtml(node.employee_code)}</strong></p>
+            <p>${escapeHtml(node.title)}</p>
+            <p><i class="fas fa-envelope"></i> ${escapeHtml(node.email)}</p>
+            <p><i class="fas fa-phone"></i> ${escapeHtml(node.phone)}</p>
+        </div>`;
+}
+
+/**
+ * Tải thành viên của một phòng ban (một lần) vào khối .tree-children
+ * @param {jQuery} $children - khối .tree-children có data-members-url
+ * @returns {Promise}
+ */
+function loadDepartmentMembers($children) {
+    if ($children.data('loaded')) {
+        return $children.data('loaded');
+    }
+    $children.html('<p class="text-muted ml-3"><i class="fas fa-spinner fa-spin"></i> Đang tải...</p>');
+    const request = $.getJSON($children.data('members-url')).then(function(members) {
+        $children.html(members.length
+            ? members.map(renderMemberNode).join('')
+            : '<p class="text-muted ml-3">Chưa có nhân viên</p>');
+    }, function() {
+        $children.removeData('loaded');
+        $children.html('<p class="text-danger ml-3">Không thể tải danh sách nhân viên</p>');
+    });
+    $children.data('loaded', request);
+    return request;
+}
+
+function loadAllDepartments() {
+    return $.when.apply($, $('.tree-children[data-members-url]').map(function() {
+        return loadDepartmentMembers($(this));
+    }).get());
+}
+
+$(document).ready(function() {
+    // Mở rộng / thu gọn một phòng ban
+    $('.simple-tree').on('click', '.tree-node.department', function() {
+        const $children = $(this).next('.tree-children');
+        if ($children.is(':visible')) {
+            $children.slideUp();
+        } else {
+            loadDepartmentMembers($children);
+            $children.slideDown();
+        }
+    });
+
+    // Search functionality
+    let searchTimer = null;
+    $('#searchEmployee').on('keyup', function() {
+        const searchTerm = $(this).val().toLowerCase();
+        clearTimeout(searchTimer);
+
+        if (searchTerm === '') {
+            $('.tree-node').show();
+            $('.tree-children').hide();
+            return;
+        }
+
+        searchTimer = setTimeout(function() {
+            loadAllDepartments().always(function() {
+                $('.tree-node').hide();
+                $('.tree-children').hide();
+
+                // Show matching nodes + their parent department
+                $('.tree-node').each(function() {
+                    if ($(this).text().toLowerCase().includes(searchTerm)) {
+                        $(this).show();
+                        $(this).closest('.tree-children').show().prev('.tree-node.department').show();
+                    }
+                });
+            });
+        }, 300);
+    });
+
+    // Department filter
+    $('#filterDepartment').on('change', function() {
+        const deptId = $(this).val();
+
+        if (deptId === '') {
+            $('.tree-node').show();
+            $('.tree-children').hide();
+            return;
+        }
+        $('.tree-node, .tree-children').hide();
+        const $department = $('.tree-node.department[data-department="' + deptId + '"]').show();
+        const $children = $department.next('.tree-children');
+        loadDepartmentMembers($children).always(function() {
+            $children.show().find('.tree-node').show();
+        });
+    });
+
+    // Expand/Collapse
+    $('#expandAll').on('click', function() {
+        loadAllDepartments();
+        $('.tree-children').slideDown();
+    });
+
+    $('#collapseAll').on('click', function() {
+        $('.tree-children').slideUp();
+    });
+});
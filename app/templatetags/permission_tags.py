@@ -12,7 +12,7 @@ Usage:
     {% endif %}
 """
 from django import template
-from django.contrib.auth.models import Group
+from app.identity import get_identity
 
 register = template.Library()
 
@@ -42,7 +42,7 @@ def has_group(user, group_name):
         return True
     
     try:
-        return user.groups.filter(name=group_name).exists()
+        return get_identity(user).in_group(group_name)
     except Exception:
         return False
 
@@ -111,7 +111,7 @@ def has_any_group(user, group_names):
     
     try:
         group_list = [g.strip() for g in group_names.split(',')]
-        return user.groups.filter(name__in=group_list).exists()
+        return get_identity(user).in_any_group(group_list)
     except Exception:
         return False
 
@@ -149,8 +149,7 @@ def has_all_groups(user, group_names):
     
     try:
         group_list = [g.strip() for g in group_names.split(',')]
-        user_groups = user.groups.values_list('name', flat=True)
-        return all(group in user_groups for group in group_list)
+        return get_identity(user).in_all_groups(group_list)
     except Exception:
         return False
 
@@ -175,7 +174,7 @@ def user_groups(user):
         return []
     
     try:
-        return list(user.groups.values_list('name', flat=True))
+        return sorted(get_identity(user).group_names)
     except Exception:
         return []
 
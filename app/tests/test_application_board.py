@@ -0,0 +1,102 @@
+"""
+Test cases for the application board (list + Kanban)
+Tests the grouped column counts, keyset pagination per column and the
+page endpoint used for infinite scroll
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from app.application_board import board_queryset, column_counts, column_page, decode_cursor
+from app.models import Application, JobPosting
+
+
+def create_job(code, status='open'):
+    return JobPosting.objects.create(
+        title=f'Job {code}', code=code, description='-', requirements='-', responsibilities='-',
+        benefits='-', location='HN', deadline=date(2030, 1, 1), status=status
+    )
+
+
+class ApplicationBoardTestCase(TestCase):
+    """Test app.application_board and the applications_kanban views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.job = create_job('DEV01')
+        cls.other_job = create_job('QA01')
+        applications = []
+        for index in range(25):
+            applications.append(Application(
+                job=cls.job, application_code=f'APP{index:03d}', full_name=f'Candidate {index:03d}',
+                email=f'c{index}@test.com', phone='0900000000', resume='resumes/cv.pdf',
+                status='new' if index < 23 else 'interview'
+            ))
+        Application.objects.bulk_create(applications)
+        # Tạo qua save() để được đưa vào chỉ mục tìm kiếm
+        Application.objects.create(
+            job=cls.other_job, application_code='APP999', full_name='Tester', email='qa@test.com',
+            phone='0900000000', resume='resumes/cv.pdf', status='new'
+        )
+        # Một số đơn cùng created_at để kiểm tra con trỏ (created_at, id)
+        created = Application.objects.order_by('id').first().created_at
+        for index, application in enumerate(Application.objects.order_by('id')):
+            Application.objects.filter(pk=application.pk).update(created_at=created - timedelta(hours=index // 3))
+
+    def test_column_counts_single_query(self):
+        with self.assertNumQueries(1):
+            counts = column_counts(board_queryset(self.job.id))
+        self.assertEqual((counts['new'], counts['interview'], counts['offer']), (23, 2, 0))
+        self.assertEqual(len(counts), len(Application.STATUS_CHOICES))
+
+    def test_keyset_pages_cover_column_once(self):
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            cards, cursor = column_page(board_queryset(), 'new', cursor=cursor, limit=10)
+            seen += [card.application_code for card in cards]
+            pages += 1
+            if not cursor:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 24)
+        self.assertEqual(len(set(seen)), 24)
+        expected = Application.objects.filter(status='new').order_by('-created_at', '-id')
+        self.assertEqual(seen, [application.application_code for application in expected])
+
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor')
+
+    def test_board_views(self):
+        admin = User.objects.create_superuser('admin', 'admin@test.com', 'Str0ng!Passw0rd')
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse('applications_kanban'), {'view': 'kanban', 'job': self.job.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_applications'], 26)
+        columns = {column['status']: column for column in response.context['kanban_columns']}
+        self.assertEqual(columns['new']['count'], 23)
+        self.assertEqual(len(columns['new']['applications']), 20)
+        self.assertIsNotNone(columns['new']['next_cursor'])
+        self.assertIsNone(columns['interview']['next_cursor'])
+
+        response = self.client.get(reverse('management_applications_board_page'), {
+            'status': 'new', 'job': self.job.id, 'cursor': columns['new']['next_cursor'],
+        })
+        data = response.json()
+        self.assertEqual(data['status'], 'success')
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['html'].count('class="kanban-card"'), 3)
+        self.assertNotIn('APP999', data['html'])
+
+        response = self.client.get(reverse('management_applications_board_page'), {'status': 'new', 'cursor': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+        # Chế độ danh sách: trang đầu + tìm kiếm
+        response = self.client.get(reverse('applications_kanban'), {'search': 'Tester'})
+        self.assertEqual([application.application_code for application in response.context['applications']],
+                         ['APP999'])
+        self.assertIsNone(response.context['list_cursor'])
@@ -0,0 +1,81 @@
+"""
+Test cases for the bulk appraisal generation engine
+Tests scope filters, manager map, skipped employees and constant query count
+"""
+from datetime import date
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from app.appraisal_engine import generate_appraisals
+from app.inbox_counters import get_inbox_counters
+from app.models import (
+    Appraisal, AppraisalCriteria, AppraisalPeriod, AppraisalScore, Department, JobTitle
+)
+from app.tests.utils import create_employee
+
+
+class AppraisalEngineTestCase(TestCase):
+    """Test generate_appraisals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.sales = Department.objects.create(name='Sales', date_establishment=date(2020, 1, 1))
+        cls.job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.head = create_employee('M001', cls.it, cls.job_title)
+        cls.deputy = create_employee('M002', cls.it, cls.job_title)
+        for manager in (cls.head, cls.deputy):
+            manager.is_manager = True
+            manager.save()
+        cls.dev = create_employee('E001', cls.it, cls.job_title)
+        cls.seller = create_employee('E002', cls.sales, cls.job_title)
+        cls.resigned = create_employee('E003', cls.it, cls.job_title, status=3)
+        cls.period = AppraisalPeriod.objects.create(
+            name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+            self_assessment_deadline=date(2025, 12, 15), manager_review_deadline=date(2025, 12, 20)
+        )
+        for name in ('Chất lượng', 'Teamwork', 'Kỹ năng'):
+            AppraisalCriteria.objects.create(period=cls.period, name=name, description='-', category='skill')
+
+    def test_generates_appraisals_and_scores(self):
+        progress = []
+        summary = generate_appraisals(self.period, batch_size=2, progress_callback=lambda d, t: progress.append(d))
+        self.assertEqual(summary, {'created': 4, 'skipped': 0, 'total': 4, 'scores': 12})
+        self.assertEqual(progress, [0, 2, 4])
+        self.assertFalse(Appraisal.objects.filter(employee=self.resigned).exists())
+        self.assertEqual(AppraisalScore.objects.filter(appraisal__employee=self.dev).count(), 3)
+
+        managers = dict(Appraisal.objects.values_list('employee_id', 'manager_id'))
+        self.assertEqual(managers[self.dev.id], self.head.id)
+        # Trưởng phòng được đánh giá bởi quản lý khác cùng phòng
+        self.assertEqual(managers[self.head.id], self.deputy.id)
+        self.assertEqual(managers[self.deputy.id], self.head.id)
+        self.assertIsNone(managers[self.seller.id])
+
+    def test_inbox_counters_are_refreshed(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.assertEqual(get_inbox_counters(self.dev)['pending_appraisals'], 0)
+        generate_appraisals(self.period)
+        self.assertEqual(get_inbox_counters(self.dev)['pending_appraisals'], 1)
+
+    def test_existing_appraisals_are_skipped(self):
+        Appraisal.objects.create(period=self.period, employee=self.dev, status='completed')
+        summary = generate_appraisals(self.period)
+        self.assertEqual((summary['created'], summary['skipped']), (3, 1))
+        self.assertEqual(Appraisal.objects.get(employee=self.dev).status, 'completed')
+        self.assertEqual(generate_appraisals(self.period)['created'], 0)
+
+    def test_scope_filters(self):
+        self.period.applicable_departments.add(self.sales)
+        self.assertEqual(generate_appraisals(self.period)['created'], 1)
+
+    def test_query_count_does_not_grow_with_employees(self):
+        for i in range(20):
+            create_employee(f'X{i:03d}', self.sales, self.job_title)
+        # scope (2) + nhân viên + đã có + tiêu chí + quản lý + savepoint (2)
+        # + mỗi lô: INSERT appraisal + INSERT score
+        with self.assertNumQueries(10):
+            summary = generate_appraisals(self.period)
+        self.assertEqual(summary['created'], 24)
@@ -0,0 +1,175 @@
+"""
+Test cases for the compact attendance archive of closed months
+Tests the columnar round trip, the union of hot and archived rows (hot rows win),
+the summary columns used by payroll / monthly stats / the profile, the portal and
+management views, the export and the archive command
+"""
+import io
+from datetime import date, datetime, time
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.attendance_archive import (
+    archivable_months, archive_month, attendance_month_totals, attendance_years, employee_attendance,
+    employee_year_totals, restore_month
+)
+from app.exports import attendance_export
+from app.models import Attendance, AttendanceArchive, Department, JobTitle
+from app.monthly_stats import refresh_month
+from app.payroll_engine import compute_payroll_run
+from app.tests.utils import create_employee
+
+
+def local(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class AttendanceArchiveTestCase(TestCase):
+    """Test app.attendance_archive and the readers that union it with the hot table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.dev = create_employee('E001', cls.it, job_title)
+        cls.tester = create_employee('E002', cls.it, job_title)
+
+        Attendance.objects.create(
+            employee=cls.dev, date=local(date(2021, 3, 1), 8, 20), check_in_at=local(date(2021, 3, 1), 8, 20),
+            check_out_at=local(date(2021, 3, 1), 17, 30), status='Có làm việc', working_hours=8.5,
+            late_minutes=20, notes='Đi muộn 20 phút'
+        )
+        Attendance.objects.create(employee=cls.dev, date=local(date(2021, 3, 2), 0), status='Có làm việc',
+                                  working_hours=8, early_minutes=15)
+        Attendance.objects.create(employee=cls.dev, date=local(date(2021, 3, 3), 0), status='Nghỉ phép')
+        Attendance.objects.create(employee=cls.tester, date=local(date(2021, 3, 1), 0), status='Có làm việc',
+                                  working_hours=7)
+        # Tháng gần đây: vẫn ở bảng chính
+        cls.recent = Attendance.objects.create(
+            employee=cls.dev, date=timezone.now(), status='Có làm việc', working_hours=4
+        )
+
+    def test_archive_round_trip(self):
+        before = employee_attendance(self.dev, 2021, 3)
+        self.assertEqual(archivable_months(), [(2021, 3)])
+        self.assertEqual(archive_month(2021, 3), {'employees': 2, 'rows': 4})
+
+        self.assertFalse(Attendance.objects.filter(work_date__year=2021).exists())
+        self.assertTrue(Attendance.objects.filter(pk=self.recent.pk).exists())
+        archive = AttendanceArchive.objects.get(employee=self.dev, year=2021, month=3)
+        self.assertEqual((archive.row_count, archive.working_days, archive.present_hours, archive.leave_days),
+                         (3, 2, 16.5, 1))
+
+        after = employee_attendance(self.dev, 2021, 3)
+        fields = ['work_date', 'date', 'status', 'working_hours', 'late_minutes', 'early_minutes',
+                  'check_in_at', 'check_out_at', 'notes']
+        self.assertEqual(
+            [[getattr(a, name) for name in fields] for a in after],
+            [[getattr(a, name) for name in fields] for a in before]
+        )
+        self.assertEqual([a.is_late for a in after], [False, False, True])
+        self.assertEqual(archive_month(2021, 3), {'employees': 0, 'rows': 0})
+
+        with self.assertRaises(ValueError):
+            today = timezone.localdate()
+            archive_month(today.year, today.month)
+
+    def test_hot_rows_win_and_totals(self):
+        archive_month(2021, 3)
+        # HR sửa lại một ngày đã lưu trữ: bản ghi mới nằm ở bảng chính
+        Attendance.objects.create(employee=self.dev, date=local(date(2021, 3, 3), 0), status='Có làm việc',
+                                  working_hours=6)
+        self.assertEqual([a.status for a in employee_attendance(self.dev, 2021, 3)], ['Có làm việc'] * 3)
+
+        # Chỉ nhân viên có bản ghi ở cả hai nơi mới phải giải nén (2 truy vấn thêm)
+        with self.assertNumQueries(2):
+            attendance_month_totals(2021, 3, [self.tester.id])
+        with self.assertNumQueries(4):
+            totals = attendance_month_totals(2021, 3)
+        self.assertEqual((totals[self.dev.id]['row_count'], totals[self.dev.id]['present_hours']), (3, 22.5))
+        self.assertEqual(totals[self.tester.id]['present_hours'], 7)
+
+        run = compute_payroll_run(3, 2021)
+        self.assertEqual(run.rows[self.dev.id]['total_working_hours'], 22.5)
+        refresh_month(2021, 3)
+        self.assertEqual(self.dev.monthly_stats.get(year=2021, month=3).attendance_records, 3)
+
+        # Cả năm: tháng có bản ghi ở hai nơi được hợp, bảng chính thắng
+        self.assertEqual(
+            {name: employee_year_totals(self.dev, 2021)[name] for name in ('working_days', 'late_count', 'leave_days')},
+            {'working_days': 3, 'late_count': 1, 'leave_days': 0}
+        )
+
+        # Lưu trữ lại: gộp bản ghi sửa vào lưu trữ
+        self.assertEqual(archive_month(2021, 3)['rows'], 1)
+        archive = AttendanceArchive.objects.get(employee=self.dev, year=2021, month=3)
+        self.assertEqual((archive.row_count, archive.leave_days, archive.present_hours), (3, 0, 22.5))
+
+    def test_views_and_export(self):
+        archive_month(2021, 3)
+        user = User.objects.create_user('e001', self.dev.email, 'Str0ng!Passw0rd')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('portal_attendance'), {'year': 2021, 'month': 3})
+        stats = response.context['stats']
+        self.assertEqual((stats['total_days'], stats['late_count'], stats['total_hours']), (3, 1, 16.5))
+
+        self.assertEqual(len(employee_attendance(self.dev, year=2021)), 3)
+        self.assertEqual(len(employee_attendance(self.dev, month=3)), 3 + (timezone.localdate().month == 3))
+        self.assertEqual(attendance_years(self.dev), [timezone.localdate().year, 2021])
+
+        year_totals = employee_year_totals(self.dev, 2021)
+        self.assertEqual((year_totals['working_days'], year_totals['late_count'], year_totals['row_count']), (2, 1, 3))
+        response = self.client.get(reverse('portal_profile'))
+        self.assertEqual(response.context['stats']['attendance_days'],
+                         employee_year_totals(self.dev, timezone.localdate().year)['working_days'])
+        self.assertEqual(response.context['stats']['attendance_days'], 1)
+
+        admin = User.objects.create_superuser('admin', 'admin@test.com', 'Str0ng!Passw0rd')
+        admin.groups.add(Group.objects.create(name='HR'))
+        self.client.force_login(admin)
+        # Trang quản lý: mặc định 30 ngày gần nhất, không giải nén các tháng đã lưu trữ
+        content = self.client.get(reverse('manage_attendance')).content.decode()
+        self.assertIn(reverse('edit_attendance', args=[self.recent.pk]), content)
+        self.assertNotIn('Đã lưu trữ</span>', content)
+
+        # Khoảng ngày chạm tới tháng đã lưu trữ: bản ghi bảng chính sửa được, bản ghi lưu trữ chỉ xem
+        url = reverse('manage_attendance')
+        params = {'from_date': '2021-03-01', 'to_date': timezone.localdate().isoformat(), 'department': self.it.id}
+        content = self.client.get(url, params).content.decode()
+        self.assertIn(reverse('edit_attendance', args=[self.recent.pk]), content)
+        self.assertEqual(content.count('Đã lưu trữ</span>'), 4)
+        self.assertLess(content.index('03/03/2021'), content.index('01/03/2021'))
+
+        # Phân trang trên luồng đã hợp (mới nhất trước)
+        with mock.patch('app.management_views.MANAGE_ATTENDANCE_PAGE_SIZE', 2):
+            response = self.client.get(url, {**params, 'page': 2})
+        self.assertTrue(response.context['has_next'])
+        days = [timezone.localtime(attendance.date).day for attendance in response.context['attendances']]
+        self.assertEqual(days, [2, 1])
+        self.assertContains(response, 'page=3')
+
+        columns, source, iter_rows = attendance_export(date_from='2021-03-02')
+        self.assertEqual(source.count(), 5)
+        rows = list(iter_rows(source))
+        self.assertEqual([row[1] for row in rows][1:], ['03/03/2021', '02/03/2021'])
+        self.assertEqual(rows[-1][:6], [3, '02/03/2021', 'E001', 'Employee E001', 'IT', 'Có làm việc'])
+
+    def test_command_and_restore(self):
+        out = io.StringIO()
+        call_command('archive_attendance', stdout=out)
+        self.assertIn('03/2021: 4 bản ghi, 2 nhân viên', out.getvalue())
+
+        # Ngày HR đã nhập lại trong bảng chính được giữ nguyên và không được tính
+        Attendance.objects.create(employee=self.dev, date=local(date(2021, 3, 3), 0), status='Có làm việc',
+                                  working_hours=6)
+        self.assertEqual(restore_month(2021, 3), 3)
+        self.assertFalse(AttendanceArchive.objects.exists())
+        self.assertEqual(Attendance.objects.get(employee=self.dev, work_date=date(2021, 3, 1)).late_minutes, 20)
+        self.assertEqual(Attendance.objects.get(employee=self.dev, work_date=date(2021, 3, 3)).status, 'Có làm việc')
+        self.assertEqual(Attendance.objects.filter(work_date__year=2021).count(), 4)
@@ -0,0 +1,98 @@
+"""
+Test cases for structured late / early attendance flags
+Tests the notes parser, the backfill migration and the SQL aggregates of the
+personal attendance list and the manager team report
+"""
+import importlib
+from datetime import date, datetime, time
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.attendance_ingest import minutes_from_notes
+from app.models import Attendance, Department, JobTitle
+from app.tests.utils import create_employee
+
+backfill = importlib.import_module('app.migrations.0010_attendance_late_early_minutes')
+
+
+def local(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class AttendanceFlagsTestCase(TestCase):
+    """Test late_minutes / early_minutes and the views that aggregate them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Kho', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Thủ kho', salary_coefficient=1.0)
+        cls.employee = create_employee('K001', department, job_title)
+        cls.employee.is_manager = True
+        cls.employee.save()
+        cls.other = create_employee('K002', department, job_title)
+
+    def test_minutes_from_notes(self):
+        self.assertEqual(minutes_from_notes('Đi muộn 15 phút | Về sớm 30 phút'), (15, 30))
+        self.assertEqual(minutes_from_notes('đi MUỘN do tắc đường'), (1, 0))
+        self.assertEqual(minutes_from_notes(' | Về sớm 5 phút'), (0, 5))
+        self.assertEqual(minutes_from_notes(None), (0, 0))
+
+    def test_backfill_parses_notes(self):
+        day = date(2030, 3, 4)
+        portal = Attendance.objects.create(
+            employee=self.employee, date=local(day, 8, 40), status='Có làm việc', working_hours=8.5,
+            notes='Đi muộn 10 phút | Về sớm 20 phút'
+        )
+        manual = Attendance.objects.create(
+            employee=self.other, date=local(day, 0), status='Có làm việc', working_hours=8,
+            notes='Đi muộn'
+        )
+        backfill.backfill_flags(apps, None)
+
+        portal.refresh_from_db()
+        self.assertEqual((portal.late_minutes, portal.early_minutes), (10, 20))
+        self.assertEqual((portal.check_in_at, portal.check_out_at), (local(day, 8, 40), local(day, 17, 10)))
+        manual.refresh_from_db()
+        self.assertEqual((manual.late_minutes, manual.early_minutes), (1, 0))
+        # Bản ghi nhập tay (00:00) không có giờ check-in thực tế
+        self.assertIsNone(manual.check_in_at)
+
+    def test_attendance_list_stats(self):
+        first = timezone.localdate().replace(day=1)
+        for day, late, early in [(1, 12, 0), (2, 0, 30), (3, 5, 5), (4, 0, 0)]:
+            Attendance.objects.create(
+                employee=self.employee, date=local(first.replace(day=day), 8), working_hours=8,
+                late_minutes=late, early_minutes=early,
+            )
+        user = User.objects.create_user('k001', self.employee.email, 'Str0ng!Passw0rd')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('portal_attendance'))
+        stats = response.context['stats']
+        self.assertEqual(
+            (stats['total_days'], stats['late_count'], stats['early_leave_count'], stats['total_hours']),
+            (4, 2, 2, 32)
+        )
+        flags = {att['date'].day: (att['is_late'], att['is_early_leave']) for att in response.context['attendances']}
+        self.assertEqual(flags[3], (True, True))
+
+    def test_team_reports_counts_flags(self):
+        today = timezone.localdate()
+        Attendance.objects.create(
+            employee=self.employee, date=local(today, 8), working_hours=8, late_minutes=3
+        )
+        Attendance.objects.create(
+            employee=self.other, date=local(today, 8), working_hours=6, late_minutes=7, early_minutes=90
+        )
+        user = User.objects.create_user('k001', self.employee.email, 'Str0ng!Passw0rd')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('portal_team_reports'))
+        self.assertEqual(response.status_code, 200)
+        stats = response.context['attendance_stats']
+        self.assertEqual((stats['total_late'], stats['total_early_leave']), (2, 1))
+        self.assertEqual([row['late_count'] for row in response.context['top_attendance']], [1, 1])
@@ -0,0 +1,128 @@
+"""
+Test cases for the time-clock punch log import
+Tests punch pairing, late/early flags, skip/replace of existing attendance,
+streaming day flushes, the management command and the background upload
+"""
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.attendance_import import import_punch_log, summarize_punches
+from app.models import Attendance, BackgroundJob, Department, JobTitle
+from app.tests.utils import create_employee
+
+
+def local(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class AttendanceImportTestCase(TestCase):
+    """Test app.attendance_import and its command / upload view"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Xưởng', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Công nhân', salary_coefficient=1.0)
+        cls.emp1 = create_employee('NV001', department, job_title)
+        cls.emp2 = create_employee('NV002', department, job_title)
+        cls.day = date(2030, 3, 4)
+
+    def test_summarize_punches(self):
+        punches = [datetime(2030, 3, 4, *hm) for hm in ((13, 0), (8, 0), (8, 0), (17, 30), (12, 0))]
+        check_in, check_out, hours, duplicates = summarize_punches(punches)
+        # 8:00-12:00 và 13:00-17:30, bỏ một lần quẹt trùng
+        self.assertEqual((check_in.hour, check_out.hour, hours, duplicates), (8, 17, 8.5, 1))
+        # Một lần quẹt: chưa có giờ ra
+        self.assertEqual(summarize_punches([datetime(2030, 3, 4, 8)])[1:3], (None, 0))
+
+    def test_import_pairs_punches_and_flags(self):
+        result = import_punch_log(io.StringIO(
+            'employee_code,timestamp,device\n'
+            'NV001,2030-03-04 08:45:00,Cổng A\n'
+            'NV002,04/03/2030 08:00,Cổng B\n'
+            'NV001,2030-03-04 17:00:00,Cổng A\n'
+            'NV002,2030-03-04 17:45:00,Cổng B\n'
+            'NV999,2030-03-04 08:00:00,Cổng A\n'
+            'NV001,not-a-date,Cổng A\n'
+        ))
+        self.assertEqual((result.punches, result.created), (4, 2))
+        self.assertEqual(result.unknown_codes, {'NV999': 1})
+        self.assertEqual(result.error_count, 1)
+        self.assertEqual(len(result.devices), 2)
+
+        late = Attendance.objects.get(employee=self.emp1)
+        self.assertEqual((late.work_date, late.working_hours), (self.day, 8.25))
+        self.assertEqual((late.check_in_at, late.check_out_at), (local(self.day, 8, 45), local(self.day, 17)))
+        self.assertEqual(late.notes, 'Đi muộn 15 phút | Về sớm 30 phút')
+        self.assertEqual((late.late_minutes, late.early_minutes), (15, 30))
+        on_time = Attendance.objects.get(employee=self.emp2)
+        self.assertEqual((on_time.notes, on_time.is_late, on_time.is_early_leave), ('', False, False))
+
+    def test_existing_attendance_skipped_or_replaced(self):
+        Attendance.objects.create(employee=self.emp1, date=local(self.day, 8), status='Nghỉ phép')
+        log = 'NV001\t2030-03-04 08:00:00\tA\nNV001\t2030-03-04 17:30:00\tA\nNV002\t2030-03-04 08:00:00\tA\n'
+
+        result = import_punch_log(io.StringIO(log))
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertEqual(Attendance.objects.get(employee=self.emp1).status, 'Nghỉ phép')
+
+        result = import_punch_log(io.StringIO(log), replace=True)
+        self.assertEqual((result.created, result.updated), (0, 2))
+        attendance = Attendance.objects.get(employee=self.emp1)
+        self.assertEqual((attendance.status, attendance.working_hours), ('Có làm việc', 9.5))
+        self.assertEqual(Attendance.objects.count(), 2)
+
+    def test_days_are_flushed_while_streaming(self):
+        lines = [f'NV001,2030-03-{day:02d} 08:00:00,A\n' for day in range(1, 11)]
+        # Quẹt của ngày đã ghi xuống đến quá muộn
+        lines.append('NV001,2030-03-01 17:30:00,A\n')
+        result = import_punch_log(iter(lines), chunk_size=1)
+        self.assertEqual(result.created, 10)
+        self.assertEqual(result.error_count, 1)
+        self.assertIsNone(Attendance.objects.get(work_date=date(2030, 3, 1)).check_out_at)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8-sig') as f:
+            f.write('NV001,2030-03-04 08:00:00,A\nNV001,2030-03-04 17:30:00,A\n')
+        self.addCleanup(os.unlink, f.name)
+        out = io.StringIO()
+        call_command('import_attendance', f.name, stdout=out)
+        self.assertIn('tạo 1', out.getvalue())
+        self.assertEqual(Attendance.objects.get().working_hours, 9.5)
+
+    def test_upload_runs_in_background(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        admin = User.objects.create_superuser('hr', 'hr@test.com', 'Str0ng!Passw0rd')
+        self.client.force_login(admin)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            upload = SimpleUploadedFile('punches.csv', b'NV002,2030-03-04 08:00,A\nNV002,2030-03-04 17:30,A\n')
+            response = self.client.post(reverse('management_import_attendance'), {'punch_file': upload})
+            job = BackgroundJob.objects.get(kind='import_attendance')
+            self.assertRedirects(
+                response, f"{reverse('management_job_detail', args=[job.id])}?next={reverse('manage_attendance')}",
+                fetch_redirect_response=False
+            )
+            call_command('run_jobs', inline=True, stdout=io.StringIO())
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'succeeded')
+            self.assertEqual(job.result['created'], 1)
+            self.assertFalse(os.listdir(os.path.join(media_root, 'imports', 'attendance')))
+        self.assertEqual(Attendance.objects.get(employee=self.emp2).working_hours, 9.5)
+
+        response = self.client.post(
+            reverse('management_import_attendance'),
+            {'punch_file': SimpleUploadedFile('punches.xlsx', b'x')}
+        )
+        self.assertRedirects(response, reverse('management_import_attendance'), fetch_redirect_response=False)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
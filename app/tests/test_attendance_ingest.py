@@ -0,0 +1,97 @@
+"""
+Test cases for portal attendance ingestion
+Tests idempotent check-in, conditional check-out, HR edits seen by the next
+check-in and the check-in/check-out views
+"""
+from datetime import date, datetime, time
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.attendance_ingest import record_check_in, record_check_out
+from app.models import Attendance, Department, JobTitle
+from app.tests.utils import create_employee
+
+
+def local(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class AttendanceIngestTestCase(TestCase):
+    """Test app.attendance_ingest and the portal check-in endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.employee = create_employee('E001', department, job_title)
+        cls.day = date(2030, 3, 4)
+
+    def test_check_in_is_idempotent(self):
+        success, message, data = record_check_in(self.employee.id, local(self.day, 8, 45))
+        self.assertTrue(success)
+        self.assertTrue(data['is_late'])
+
+        # Lần bấm lặp lại: INSERT bị bỏ qua + đọc lại bản ghi, không ghi gì thêm
+        with self.assertNumQueries(2):
+            success, message, data = record_check_in(self.employee.id, local(self.day, 8, 46))
+        self.assertFalse(success)
+        self.assertEqual(data['check_in_at'], local(self.day, 8, 45))
+
+        attendance = Attendance.objects.get()
+        self.assertEqual(attendance.work_date, self.day)
+        self.assertEqual(attendance.check_in_at, local(self.day, 8, 45))
+        self.assertEqual(attendance.notes, 'Đi muộn 15 phút')
+        self.assertEqual((attendance.late_minutes, attendance.early_minutes), (15, 0))
+
+    def test_concurrent_insert_does_not_duplicate(self):
+        record_check_in(self.employee.id, local(self.day, 8, 0))
+        # INSERT đồng thời bị bỏ qua nhờ ON CONFLICT DO NOTHING
+        success, message, data = record_check_in(self.employee.id, local(self.day, 8, 1))
+        self.assertFalse(success)
+        self.assertEqual(message, 'Bạn đã check-in rồi!')
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_check_out(self):
+        self.assertEqual(record_check_out(self.employee.id, local(self.day, 17, 0))[1], 'Bạn chưa check-in!')
+        record_check_in(self.employee.id, local(self.day, 8, 0))
+
+        success, message, data = record_check_out(self.employee.id, local(self.day, 17, 0))
+        self.assertTrue(success)
+        self.assertEqual((data['working_hours'], data['is_early']), (9, True))
+        with self.assertNumQueries(1):
+            self.assertFalse(record_check_out(self.employee.id, local(self.day, 17, 5))[0])
+
+        attendance = Attendance.objects.get()
+        self.assertEqual(attendance.check_out_at, local(self.day, 17, 0))
+        self.assertEqual(attendance.notes, ' | Về sớm 30 phút')
+        self.assertEqual((attendance.late_minutes, attendance.early_minutes), (0, 30))
+        self.assertTrue(attendance.has_checked_out)
+
+    def test_hr_changes_are_seen_immediately(self):
+        record_check_in(self.employee.id, local(self.day, 8, 0))
+        record_check_out(self.employee.id, local(self.day, 17, 30))
+        # HR sửa ở process khác (update() không phát signal): lần check-out sau thấy ngay
+        Attendance.objects.update(check_out_at=None, working_hours=0)
+        self.assertTrue(record_check_out(self.employee.id, local(self.day, 18, 0))[0])
+
+        Attendance.objects.all().delete()
+        self.assertTrue(record_check_in(self.employee.id, local(self.day, 8, 10))[0])
+
+    def test_check_in_views(self):
+        user = User.objects.create_user('e001', self.employee.email, 'Str0ng!Passw0rd')
+        self.client.force_login(user)
+
+        response = self.client.post(reverse('portal_check_in'))
+        self.assertEqual(response.json()['status'], 'success')
+        response = self.client.post(reverse('portal_check_in'))
+        self.assertEqual(response.json()['message'], 'Bạn đã check-in rồi!')
+        self.assertIn('check_in_time', response.json())
+
+        response = self.client.post(reverse('portal_check_out'))
+        self.assertEqual(response.json()['status'], 'success')
+        data = self.client.get(reverse('portal_today_attendance')).json()
+        self.assertTrue(data['has_checked_in'] and data['has_checked_out'])
+        self.assertEqual(Attendance.objects.filter(employee=self.employee).count(), 1)
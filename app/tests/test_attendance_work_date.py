@@ -0,0 +1,72 @@
+"""
+Test cases for the denormalized Attendance.work_date column
+Tests work_date sync, per-day uniqueness, range helpers and the benchmark command
+"""
+from datetime import date, datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, SimpleTestCase
+from django.utils import timezone
+
+from app.models import Attendance, Department, JobTitle
+from app.date_utils import month_bounds, month_filter, year_filter
+from app.tests.utils import create_employee
+
+
+class DateUtilsTestCase(SimpleTestCase):
+    """Test range helpers"""
+
+    def test_month_bounds(self):
+        self.assertEqual(month_bounds(2025, 12), (date(2025, 12, 1), date(2026, 1, 1)))
+        self.assertEqual(month_bounds('2025', '2'), (date(2025, 2, 1), date(2025, 3, 1)))
+
+    def test_datetime_filters_are_aware(self):
+        bounds = month_filter('date', 2025, 10, datetime_field=True)
+        self.assertTrue(timezone.is_aware(bounds['date__gte']))
+        self.assertEqual(year_filter('start_date', 2025), {
+            'start_date__gte': date(2025, 1, 1), 'start_date__lt': date(2026, 1, 1)
+        })
+
+
+class AttendanceWorkDateTestCase(TestCase):
+    """Test work_date is derived from date and unique per employee"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.employee = create_employee('E001', department, job_title)
+
+    def test_work_date_uses_local_day(self):
+        # 23:30 UTC ngày 31/10 là 06:30 ngày 1/11 giờ Việt Nam
+        utc_late = datetime(2025, 10, 31, 23, 30, tzinfo=timezone.utc)
+        attendance = Attendance.objects.create(
+            employee=self.employee, date=utc_late, status='Có làm việc', working_hours=8
+        )
+        self.assertEqual(attendance.work_date, date(2025, 11, 1))
+
+    def test_work_date_from_form_string(self):
+        attendance = Attendance(
+            employee=self.employee, date='2025-10-15', status='Có làm việc', working_hours=8
+        )
+        attendance.save()
+        self.assertEqual(attendance.work_date, date(2025, 10, 15))
+
+    def test_one_attendance_per_employee_per_day(self):
+        Attendance.objects.create(
+            employee=self.employee, date=timezone.make_aware(datetime(2025, 10, 15, 8)),
+            status='Có làm việc', working_hours=8
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attendance.objects.create(
+                employee=self.employee, date=timezone.make_aware(datetime(2025, 10, 15, 17)),
+                status='Có làm việc', working_hours=8
+            )
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_attendance_queries', rows=50, employees=5, repeat=1, stdout=out)
+        self.assertIn('work_date', out.getvalue())
+        self.assertFalse(Attendance.objects.exists())
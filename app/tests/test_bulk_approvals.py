@@ -0,0 +1,147 @@
+"""
+Test cases for bulk approval of team leave requests and expenses
+Tests up-front validation with per-item results, the single status UPDATE,
+grouped balance checks, batched notifications and the portal endpoints
+"""
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.bulk_approvals import bulk_review_expenses, bulk_review_leaves
+from app.inbox_counters import get_inbox_counters
+from app.leave_ledger import settle_leave_requests
+from app.models import (
+    Department, EmailOutbox, Expense, ExpenseCategory, JobTitle, LeaveBalance, LeaveRequest, LeaveType
+)
+from app.tests.utils import create_employee
+from app.working_calendar import invalidate_working_calendar
+
+
+def statements(queries, prefix, table):
+    return [q['sql'] for q in queries.captured_queries if q['sql'].startswith(prefix) and table in q['sql']]
+
+
+class BulkApprovalsTestCase(TestCase):
+    """Test app.bulk_approvals and the portal bulk action views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.hr = Department.objects.create(name='HR', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.manager = create_employee('M001', cls.it, job_title)
+        cls.manager.is_manager = True
+        cls.manager.save()
+        cls.emp1 = create_employee('E001', cls.it, job_title)
+        cls.emp2 = create_employee('E002', cls.it, job_title)
+        cls.outsider = create_employee('E003', cls.hr, job_title)
+        cls.annual = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=5)
+        cls.category = ExpenseCategory.objects.create(name='Đi lại', code='TRAVEL')
+        cls.user = User.objects.create_user('manager', cls.manager.email, 'Str0ng!Passw0rd')
+
+    def setUp(self):
+        invalidate_working_calendar()
+        self.addCleanup(invalidate_working_calendar)
+
+    def create_leave(self, employee, start, end, total_days=None):
+        leave = LeaveRequest.objects.create(
+            employee=employee, leave_type=self.annual, start_date=start, end_date=end,
+            total_days=total_days, reason='Việc riêng'
+        )
+        settle_leave_requests([leave])
+        return leave
+
+    def create_expense(self, employee, amount=100000):
+        return Expense.objects.create(
+            employee=employee, category=self.category, amount=Decimal(amount), date=date(2030, 3, 1),
+            description='Taxi'
+        )
+
+    def test_leaves_validated_up_front(self):
+        exact = self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 5))
+        # Nhập thiếu ngày: khi duyệt được đếm lại thành 2 ngày (+1)
+        short1 = self.create_leave(self.emp1, date(2030, 3, 11), date(2030, 3, 12), total_days=1)
+        short2 = self.create_leave(self.emp1, date(2030, 3, 18), date(2030, 3, 19), total_days=1)
+        done = self.create_leave(self.emp2, date(2030, 3, 4), date(2030, 3, 4))
+        LeaveRequest.objects.filter(pk=done.pk).update(status='rejected')
+        other = self.create_leave(self.outsider, date(2030, 3, 4), date(2030, 3, 4))
+        ids = [exact.id, short1.id, short2.id, done.id, other.id]
+
+        with CaptureQueriesContext(connection) as queries:
+            outcome = bulk_review_leaves(self.manager, ids, 'approve', user=self.user)
+
+        self.assertEqual(
+            [item['status'] for item in outcome['results']], ['approved', 'approved', 'failed', 'failed', 'failed']
+        )
+        self.assertIn('không đủ', outcome['results'][2]['message'])
+        self.assertEqual(outcome['results'][4]['message'], 'Không tìm thấy đơn')
+        self.assertEqual(len(statements(queries, 'UPDATE', '"app_leaverequest"')), 1)
+        self.assertEqual(len(statements(queries, 'INSERT', '"app_emailoutbox"')), 1)
+        self.assertEqual(EmailOutbox.objects.filter(template_name='leave_approved').count(), 2)
+
+        short1.refresh_from_db()
+        short2.refresh_from_db()
+        self.assertEqual((short1.status, short1.total_days, short1.approved_by), ('approved', 2, self.manager))
+        self.assertEqual((short2.status, short2.total_days), ('pending', 1))
+        # Số dư 5 ngày: 2 + 2 (đếm lại) + 1 (đơn còn chờ)
+        balance = LeaveBalance.objects.get(employee=self.emp1, leave_type=self.annual, year=2030)
+        self.assertEqual((balance.used_days, balance.remaining_days), (5, 0))
+
+    def test_reject_releases_balances(self):
+        leave1 = self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 5))
+        leave2 = self.create_leave(self.emp2, date(2030, 3, 4), date(2030, 3, 6))
+        outcome = bulk_review_leaves(self.manager, [leave1.id, leave2.id], 'reject', reason='Thiếu người')
+        self.assertEqual(len(outcome['processed']), 2)
+        self.assertFalse(LeaveBalance.objects.exclude(used_days=0).exists())
+        leave2.refresh_from_db()
+        self.assertEqual((leave2.status, leave2.rejection_reason), ('rejected', 'Thiếu người'))
+
+    def test_expenses_and_counters(self):
+        expenses = [self.create_expense(self.emp1), self.create_expense(self.emp2, 250000)]
+        self.assertEqual(get_inbox_counters(self.manager)['team_pending_expenses'], 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            outcome = bulk_review_expenses(self.manager, [expense.id for expense in expenses], 'approve')
+        self.assertEqual([item['status'] for item in outcome['results']], ['approved', 'approved'])
+        self.assertEqual(len(statements(queries, 'UPDATE', '"app_expense"')), 1)
+        self.assertEqual(EmailOutbox.objects.filter(template_name='expense_approved').count(), 2)
+        self.assertEqual(get_inbox_counters(self.manager)['team_pending_expenses'], 0)
+        self.assertEqual(get_inbox_counters(self.emp1)['pending_expenses'], 0)
+
+        outcome = bulk_review_expenses(self.manager, [expenses[0].id], 'reject', reason='Trùng')
+        self.assertEqual(outcome['results'][0]['status'], 'failed')
+        self.assertEqual(Expense.objects.get(pk=expenses[0].pk).status, 'approved')
+
+    def test_bulk_action_views(self):
+        self.client.force_login(self.user)
+        leave = self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 5))
+        other = self.create_leave(self.outsider, date(2030, 3, 4), date(2030, 3, 4))
+        url = reverse('portal_team_leaves_bulk_action')
+
+        def post(url, payload):
+            return self.client.post(url, json.dumps(payload), content_type='application/json')
+
+        response = post(url, {'action': 'approve', 'leave_ids': [str(leave.id), str(other.id)]})
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['message'], 'Đã duyệt thành công 1 đơn. Thất bại: 1 đơn')
+        self.assertEqual([item['status'] for item in data['results']], ['approved', 'failed'])
+
+        self.assertEqual(post(url, {'action': 'approve', 'leave_ids': [other.id]}).status_code, 404)
+        self.assertEqual(post(url, {'action': 'approve', 'leave_ids': [leave.id]}).status_code, 400)
+        self.assertEqual(post(url, {'action': 'reject', 'leave_ids': [leave.id]}).status_code, 400)
+        self.assertEqual(post(url, {'action': 'approve', 'leave_ids': ['abc']}).status_code, 400)
+
+        expense = self.create_expense(self.emp2)
+        response = post(reverse('portal_team_expenses_bulk_action'), {
+            'action': 'reject', 'expense_ids': [expense.id], 'reason': 'Thiếu hóa đơn'
+        })
+        self.assertTrue(response.json()['success'])
+        expense.refresh_from_db()
+        self.assertEqual((expense.status, expense.rejection_reason), ('rejected', 'Thiếu hóa đơn'))
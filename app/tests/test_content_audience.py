@@ -0,0 +1,120 @@
+"""
+Test cases for the document / announcement audience index
+Tests the signal-maintained audience keys, the visible lists, the access checks of
+the portal views and the rebuild command
+"""
+import io
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.content_audience import has_access, visible_announcements, visible_documents
+from app.models import Announcement, AnnouncementRead, ContentAudience, Department, Document, JobTitle
+from app.tests.utils import create_employee
+
+
+class ContentAudienceTestCase(TestCase):
+    """Test app.content_audience and the portal document / announcement views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.hr = Department.objects.create(name='HR', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.dev = create_employee('E001', cls.it, job_title)
+        cls.manager = create_employee('E002', cls.hr, job_title)
+        cls.manager.is_manager = True
+        cls.manager.save()
+
+        cls.public_doc = Document.objects.create(title='Nội quy', file='documents/a.pdf')
+        cls.it_doc = Document.objects.create(title='Quy trình deploy', file='documents/b.pdf', visibility='department')
+        cls.it_doc.departments.add(cls.it)
+        cls.manager_doc = Document.objects.create(title='Ngân sách', file='documents/c.pdf', visibility='manager')
+        cls.private_doc = Document.objects.create(title='Hợp đồng', file='documents/d.pdf', visibility='specific')
+        cls.private_doc.specific_employees.add(cls.manager)
+
+        yesterday = timezone.now() - timedelta(days=1)
+        cls.all_news = Announcement.objects.create(title='Tất niên', content='-', publish_at=yesterday)
+        cls.hr_news = Announcement.objects.create(
+            title='Họp phòng HR', content='-', publish_at=yesterday, target_all=False
+        )
+        cls.hr_news.target_departments.add(cls.hr)
+
+        cls.user = User.objects.create_user('e001', cls.dev.email, 'Str0ng!Passw0rd')
+
+    def test_visible_lists(self):
+        self.assertEqual(set(visible_documents(self.dev)), {self.public_doc, self.it_doc})
+        self.assertEqual(set(visible_documents(self.manager)), {self.public_doc, self.manager_doc, self.private_doc})
+        self.assertEqual(list(visible_announcements(self.dev)), [self.all_news])
+        self.assertEqual(set(visible_announcements(self.manager)), {self.all_news, self.hr_news})
+        # Nhân viên đổi phòng ban: không cần cập nhật chỉ mục
+        self.dev.department = self.hr
+        self.assertEqual(set(visible_documents(self.dev)), {self.public_doc})
+        self.assertIn(self.hr_news, visible_announcements(self.dev))
+
+    def test_index_follows_target_changes(self):
+        self.assertFalse(has_access(self.dev, self.private_doc))
+        self.private_doc.specific_employees.add(self.dev)
+        self.assertTrue(has_access(self.dev, self.private_doc))
+        # Thay đổi từ phía nhân viên (reverse M2M)
+        self.dev.accessible_documents.clear()
+        self.assertFalse(has_access(self.dev, self.private_doc))
+        self.assertTrue(has_access(self.manager, self.private_doc))
+
+        self.it_doc.visibility = 'all'
+        self.it_doc.save(update_fields=['visibility'])
+        self.assertTrue(has_access(self.manager, self.it_doc))
+        self.assertEqual(
+            set(ContentAudience.objects.filter(entity_type='document', object_id=self.it_doc.id)
+                .values_list('audience_key', flat=True)),
+            {'all'}
+        )
+
+        self.hr_news.target_departments.clear()
+        self.hr_news.target_employees.add(self.dev)
+        self.assertTrue(has_access(self.dev, self.hr_news))
+        self.assertFalse(has_access(self.manager, self.hr_news))
+
+        self.hr_news.delete()
+        self.assertFalse(ContentAudience.objects.filter(entity_type='announcement', object_id=self.hr_news.id).exists())
+
+    def test_access_check_is_one_indexed_query(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(has_access(self.dev, self.it_doc))
+        with self.assertNumQueries(1):
+            self.assertFalse(has_access(self.dev, self.manager_doc))
+
+        # Thu hồi ghi thẳng vào index (process khác, không qua cache): có hiệu lực ngay
+        ContentAudience.objects.filter(entity_type='document', object_id=self.it_doc.id).delete()
+        self.assertFalse(has_access(self.dev, self.it_doc))
+
+    def test_portal_views(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('portal_documents'))
+        self.assertEqual(set(response.context['documents']), {self.public_doc, self.it_doc})
+
+        response = self.client.get(reverse('portal_announcements'))
+        self.assertEqual(list(response.context['announcements']), [self.all_news])
+        self.assertEqual(response.context['unread_count'], 1)
+
+        response = self.client.get(reverse('portal_announcement_detail', args=[self.hr_news.id]))
+        self.assertRedirects(response, reverse('portal_announcements'), fetch_redirect_response=False)
+        self.client.get(reverse('portal_announcement_detail', args=[self.all_news.id]))
+        self.assertTrue(AnnouncementRead.objects.filter(announcement=self.all_news, employee=self.dev).exists())
+        response = self.client.get(reverse('portal_announcements'))
+        self.assertEqual(response.context['unread_count'], 0)
+
+        response = self.client.get(reverse('portal_document_download', args=[self.manager_doc.id]))
+        self.assertRedirects(response, reverse('portal_documents'), fetch_redirect_response=False)
+
+    def test_rebuild_command(self):
+        Document.objects.bulk_create([Document(title='Biểu mẫu', file='documents/e.pdf')])
+        ContentAudience.objects.filter(object_id=self.it_doc.id, entity_type='document').delete()
+        out = io.StringIO()
+        call_command('rebuild_content_audience', stdout=out)
+        self.assertIn('document: 5', out.getvalue())
+        self.assertEqual(visible_documents(self.dev).count(), 3)
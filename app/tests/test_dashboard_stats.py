@@ -0,0 +1,112 @@
+"""
+Test cases for the management dashboard statistics service
+Tests grouped aggregation, fixed query count and cache invalidation
+"""
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from django.contrib.auth.models import User, Group
+from app.models import Department, JobTitle, LeaveType, LeaveRequest, Payroll
+from app.dashboard_stats import DASHBOARD_CACHE_KEY, compute_dashboard_stats, get_dashboard_stats
+from app.tests.utils import create_employee
+from datetime import date
+
+
+class DashboardStatsTestCase(TestCase):
+    """Test compute_dashboard_stats / get_dashboard_stats"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date(2025, 3, 15)
+        cls.job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.sales = Department.objects.create(name='Sales', date_establishment=date(2020, 1, 1))
+        Department.objects.create(name='Empty', date_establishment=date(2020, 1, 1))
+
+        cls.emp1 = create_employee('E001', cls.it, cls.job_title, salary=10000000)
+        create_employee('E002', cls.it, cls.job_title, status=1, salary=20000000)
+        create_employee('E003', cls.sales, cls.job_title, salary=30000000)
+        create_employee('E004', cls.sales, cls.job_title, status=3)
+        # Tuyển dụng trong 6 tháng gần nhất (10/2024 - 3/2025)
+        for code, start in (('E005', date(2024, 10, 1)), ('E006', date(2025, 3, 2)),
+                            ('E007', date(2025, 3, 10)), ('E008', date(2024, 9, 30))):
+            employee = create_employee(code, cls.sales, cls.job_title, status=0)
+            employee.contract_start_date = start
+            employee.save()
+
+        leave_type = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=12)
+        LeaveRequest.objects.create(
+            employee=cls.emp1, leave_type=leave_type, start_date=date(2025, 3, 20),
+            end_date=date(2025, 3, 21), total_days=2, reason='Nghỉ', status='pending'
+        )
+        Payroll.objects.create(
+            employee=cls.emp1, month=3, year=2025, base_salary=1, salary_coefficient=1,
+            standard_working_days=21, hourly_rate=1, total_working_hours=1, total_salary=5000000
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_statistics(self):
+        stats = compute_dashboard_stats(self.today)
+        self.assertEqual(stats['total_employees'], 8)
+        self.assertEqual(stats['active_employees'], 3)
+        self.assertEqual(stats['total_departments'], 3)
+        self.assertEqual(stats['total_salary'], 5000000)
+        self.assertEqual(stats['pending_leaves'], 1)
+        self.assertEqual(stats['dept_employee_data'], {'labels': ['IT', 'Sales'], 'values': [2, 1]})
+        self.assertEqual(
+            stats['dept_salary_data'], {'labels': ['IT', 'Sales'], 'values': [15000000, 30000000]}
+        )
+        self.assertEqual(
+            stats['status_data'],
+            {'labels': ['Onboarding', 'Thử việc', 'Chính thức', 'Đã nghỉ việc'], 'values': [4, 1, 2, 1]}
+        )
+        self.assertEqual(stats['hiring_trend'], {
+            'labels': ['T10', 'T11', 'T12', 'T1', 'T2', 'T3'],
+            'values': [1, 0, 0, 0, 0, 2],
+        })
+
+    def test_query_count_independent_of_departments(self):
+        with self.assertNumQueries(11):
+            compute_dashboard_stats(self.today)
+        for i in range(5):
+            department = Department.objects.create(name=f'D{i}', date_establishment=date(2020, 1, 1))
+            create_employee(f'X00{i}', department, self.job_title)
+        with self.assertNumQueries(11):
+            stats = compute_dashboard_stats(self.today)
+        self.assertEqual(len(stats['dept_employee_data']['labels']), 7)
+
+    def test_cached_until_data_changes(self):
+        get_dashboard_stats(self.today)
+        with self.assertNumQueries(0):
+            stats = get_dashboard_stats(self.today)
+        self.assertEqual(stats['pending_leaves'], 1)
+
+        LeaveRequest.objects.filter(employee=self.emp1).first().delete()
+        self.assertEqual(get_dashboard_stats(self.today)['pending_leaves'], 0)
+
+        create_employee('E100', self.it, self.job_title)
+        self.assertEqual(get_dashboard_stats(self.today)['active_employees'], 4)
+
+    def test_invalidated_again_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_employee('E101', self.it, self.job_title)
+            # Request khác đọc số liệu trước khi transaction commit
+            get_dashboard_stats(self.today)
+            self.assertIsNotNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+
+    def test_recomputed_on_new_day(self):
+        get_dashboard_stats(self.today)
+        stats = get_dashboard_stats(date(2025, 4, 1))
+        self.assertEqual(stats['date'], '2025-04-01')
+        self.assertEqual(stats['total_salary'], 0)
+
+    def test_admin_home_renders(self):
+        user = User.objects.create_user('hr', 'e001@test.com', 'Str0ng!Passw0rd')
+        user.groups.add(Group.objects.create(name='HR'))
+        self.client.force_login(user)
+        response = self.client.get(reverse('admin_home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_employees'], 8)
@@ -0,0 +1,102 @@
+"""
+Test cases for the email outbox
+Tests queuing, batched delivery, retry/backoff and deduplication
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase
+from django.utils import timezone
+
+from app import email_outbox
+from app.email_outbox import decode_context, drain_outbox, encode_context, enqueue_email
+from app.email_service import EmailService
+from app.models import EmailOutbox
+
+
+class ContextEncodingTestCase(TestCase):
+    """Test template context survives the JSON round trip"""
+
+    def test_round_trip(self):
+        context = {
+            'start_date': date(2025, 10, 1),
+            'created': timezone.now(),
+            'amount': Decimal('1500000.50'),
+            'names': ['A', 'B'],
+            'days': 2.5,
+            'missing': None,
+        }
+        self.assertEqual(decode_context(encode_context(context)), context)
+
+
+class EmailOutboxTestCase(TestCase):
+    """Test enqueue + drain with the locmem backend"""
+
+    def queue(self, n=1, **kwargs):
+        for i in range(n):
+            EmailService._send_email(
+                subject=f'Test {i}', template_name='reward_notification',
+                context={'employee_name': f'NV {i}', 'amount': Decimal('500000'), 'date': date(2025, 10, 1)},
+                recipient_list=[f'nv{i}@test.com'], **kwargs
+            )
+
+    def test_queued_inside_transaction_and_sent_after_drain(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.queue()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.get().status, 'pending')
+        self.assertEqual(callbacks, [email_outbox.schedule_drain])
+
+        result = drain_outbox()
+        self.assertEqual(result['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('500000 VNĐ', mail.outbox[0].alternatives[0][0])
+        self.assertIn('01/10/2025', mail.outbox[0].alternatives[0][0])
+
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.status, 'sent')
+        self.assertEqual(email.context, {})
+
+    def test_one_connection_per_batch(self):
+        self.queue(5)
+        with mock.patch('app.email_outbox.get_connection', wraps=email_outbox.get_connection) as get_connection:
+            result = drain_outbox(batch_size=10)
+        self.assertEqual(result, {'sent': 5, 'retry': 0, 'failed': 0, 'batches': 1})
+        self.assertEqual(get_connection.call_count, 1)
+
+    def test_retry_with_backoff_then_fail(self):
+        self.queue()
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=SMTPException('down')):
+            self.assertEqual(drain_outbox()['retry'], 1)
+            email = EmailOutbox.objects.get()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+            # Chưa đến hạn thử lại
+            self.assertEqual(drain_outbox()['batches'], 0)
+
+            for _ in range(email_outbox.EMAIL_OUTBOX_MAX_ATTEMPTS - 1):
+                EmailOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+                drain_outbox()
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(email.attempts, email_outbox.EMAIL_OUTBOX_MAX_ATTEMPTS)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_template_error_is_not_retried(self):
+        enqueue_email('Broken', 'does_not_exist', {}, ['a@test.com'])
+        self.assertEqual(drain_outbox()['failed'], 1)
+        self.assertEqual(EmailOutbox.objects.get().status, 'failed')
+
+    def test_dedup_key(self):
+        self.queue(dedup_key='reward:1')
+        self.queue(dedup_key='reward:1')
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_no_recipients(self):
+        self.assertFalse(EmailService._send_email('x', 'welcome', {}, ['']))
+        self.assertFalse(EmailOutbox.objects.exists())
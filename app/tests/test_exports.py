@@ -0,0 +1,130 @@
+"""
+Test cases for the streaming attendance/payroll export pipeline
+Tests CSV/XLSX output, filters and background export jobs
+"""
+import io
+import shutil
+import tempfile
+from datetime import date, datetime
+from unittest import mock
+from urllib.parse import quote
+
+from django.contrib.auth.models import User, Group
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from app.models import Attendance, BackgroundJob, Department, JobTitle, Payroll
+from app.exports import start_background_export
+from app.email_outbox import drain_outbox
+from app.tests.utils import create_employee
+
+
+class ExportTestCase(TestCase):
+    """Test export_attendance / export_payroll"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.sales = Department.objects.create(name='Sales', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.emp1 = create_employee('E001', cls.it, job_title)
+        cls.emp2 = create_employee('E002', cls.sales, job_title)
+        for day in (1, 2, 3):
+            for employee in (cls.emp1, cls.emp2):
+                Attendance.objects.create(
+                    employee=employee, date=timezone.make_aware(datetime(2025, 10, day, 8)),
+                    status='Có làm việc', working_hours=8, notes='Đúng giờ'
+                )
+        Payroll.objects.create(
+            employee=cls.emp1, month=10, year=2025, base_salary=22000000, salary_coefficient=1,
+            standard_working_days=23, hourly_rate=1, total_working_hours=24, total_salary=3000000,
+            status='confirmed'
+        )
+        cls.user = User.objects.create_user('hr', 'hr@test.com', 'Str0ng!Passw0rd')
+        cls.user.groups.add(Group.objects.create(name='HR'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def csv_lines(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return content.strip().splitlines()
+
+    def test_attendance_csv_streams_with_filters(self):
+        response = self.client.get(reverse('export_attendance'), {
+            'format': 'csv', 'from_date': '2025-10-02', 'to_date': '2025-10-03',
+            'department': self.it.id,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = self.csv_lines(response)
+        self.assertEqual(lines[0], 'STT,Ngày,Mã NV,Tên NV,Phòng Ban,Trạng Thái,Số Giờ,Ghi Chú')
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[1], '1,03/10/2025,E001,Employee E001,IT,Có làm việc,8.0,Đúng giờ')
+
+    def test_attendance_xlsx(self):
+        response = self.client.get(reverse('export_attendance'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attendance_report.xlsx', response['Content-Disposition'])
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0][0], 'STT')
+
+    def test_payroll_export_filters(self):
+        response = self.client.get(reverse('export_payroll'), {
+            'format': 'csv', 'month': 10, 'year': 2025, 'department': 'IT',
+        })
+        self.assertIn('BangLuong_Thang10_Nam2025_IT.csv', response['Content-Disposition'])
+        lines = self.csv_lines(response)
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith('Đã xác nhận'))
+
+        response = self.client.get(reverse('export_payroll'), {'format': 'csv', 'department': 'Sales'})
+        self.assertEqual(len(self.csv_lines(response)), 1)
+
+    def test_large_export_goes_to_background(self):
+        with mock.patch('app.management_views.should_run_in_background', return_value=True):
+            response = self.client.get(reverse('export_attendance'), {'format': 'csv'})
+        job = BackgroundJob.objects.get()
+        self.assertRedirects(
+            response, f"{reverse('management_job_detail', args=[job.id])}?next={quote(reverse('manage_attendance'))}",
+            fetch_redirect_response=False
+        )
+        self.assertEqual((job.kind, job.status), ('export', 'queued'))
+        self.assertEqual(job.params['kind'], 'attendance')
+        self.assertTrue(job.params['download_url'].endswith(f'/exports/{job.id}/download/'))
+
+    def test_background_job_writes_file_and_notifies(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            job = start_background_export(self.user, 'payroll', {'year': '2025'}, 'xlsx', 'BangLuong', 'Bảng Lương')
+            call_command('run_jobs', inline=True, stdout=io.StringIO())
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'succeeded')
+            self.assertEqual((job.progress_done, job.progress_total), (1, 1))
+            drain_outbox()
+            self.assertEqual(len(mail.outbox), 1)
+
+            status = self.client.get(reverse('management_export_status', args=[job.id])).json()
+            self.assertEqual(status['job_status'], 'succeeded')
+            self.assertEqual(status['filename'], 'BangLuong.xlsx')
+
+            response = self.client.get(reverse('management_export_download', args=[job.id]))
+            workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+            self.assertEqual(len(list(workbook.active.values)), 2)
+
+    def test_background_job_owner_only(self):
+        other = User.objects.create_user('other', 'other@test.com', 'Str0ng!Passw0rd')
+        job = BackgroundJob.objects.create(
+            kind='export', status='succeeded', created_by=other, result={'path': 'x', 'filename': 'x.csv'}
+        )
+        response = self.client.get(reverse('management_export_download', args=[job.id]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,114 @@
+"""
+Test cases for the request-scoped identity context
+Tests memoization, cross-request cache and invalidation
+"""
+from django.test import TestCase
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from app.models import Employee, Department, JobTitle
+from app.identity import get_identity
+from app.permissions import (
+    get_user_employee, is_hr_user, user_is_manager, user_can_access_management, user_in_group
+)
+from app.templatetags.permission_tags import has_group, user_groups
+from datetime import date
+
+
+class IdentityTestCase(TestCase):
+    """Test UserIdentity resolution"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.hr = Department.objects.create(name='Nhân sự', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.employee = Employee.objects.create(
+            employee_code='EMP001', name='Test Employee', gender=0,
+            birthday=date(1990, 1, 1), place_of_birth='HN', place_of_origin='HN',
+            place_of_residence='HN', identification='123456789', date_of_issue=date(2010, 1, 1),
+            place_of_issue='HN', nationality='VN', nation='Kinh', religion='None',
+            email='emp@test.com', phone='0901234567', address='HN', marital_status=0,
+            job_title=job_title, job_position='Dev', department=cls.it, is_manager=True,
+            salary=10000000, contract_start_date=date(2020, 1, 1), contract_duration=12,
+            status=2, education_level=3, major='CS', school='Uni'
+        )
+        cls.manager_group = Group.objects.create(name='Manager')
+        cls.hr_group = Group.objects.create(name='HR')
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('emp', 'emp@test.com', 'Str0ng!Passw0rd')
+        self.user.groups.add(self.manager_group)
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_helpers_share_one_resolution_per_request(self):
+        user = self.fresh_user()
+        # groups + employee lookup, once
+        with self.assertNumQueries(2):
+            self.assertEqual(get_user_employee(user), self.employee)
+            self.assertTrue(user_is_manager(user))
+            self.assertFalse(is_hr_user(user))
+            self.assertFalse(user_can_access_management(user))
+            self.assertTrue(user_in_group(user, 'Manager'))
+            self.assertTrue(has_group(user, 'Manager'))
+            self.assertEqual(user_groups(user), ['Manager'])
+
+    def test_cross_request_cache(self):
+        get_identity(self.fresh_user())
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user_is_manager(user))
+            self.assertTrue(user_in_group(user, 'Manager'))
+        # Employee object itself is loaded by primary key, never served from cache
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user_employee(user), self.employee)
+
+    def test_group_membership_change_invalidates(self):
+        self.assertFalse(is_hr_user(self.fresh_user()))
+        self.user.groups.add(self.hr_group)
+        self.assertTrue(is_hr_user(self.fresh_user()))
+        self.user.groups.remove(self.hr_group)
+        self.assertFalse(is_hr_user(self.fresh_user()))
+
+    def test_group_rename_invalidates(self):
+        self.user.groups.add(self.hr_group)
+        self.assertTrue(is_hr_user(self.fresh_user()))
+        self.hr_group.name = 'HR (cũ)'
+        self.hr_group.save()
+        self.assertFalse(is_hr_user(self.fresh_user()))
+        self.assertEqual(sorted(user_groups(self.fresh_user())), ['HR (cũ)', 'Manager'])
+
+    def test_employee_change_invalidates(self):
+        self.assertFalse(is_hr_user(self.fresh_user()))
+        self.employee.department = self.hr
+        self.employee.save()
+        self.assertTrue(is_hr_user(self.fresh_user()))
+
+        self.employee.is_manager = False
+        self.employee.save()
+        self.assertFalse(user_is_manager(self.fresh_user()))
+
+    def test_anonymous_user(self):
+        from django.contrib.auth.models import AnonymousUser
+        user = AnonymousUser()
+        self.assertIsNone(get_user_employee(user))
+        self.assertFalse(is_hr_user(user))
+        self.assertFalse(has_group(user, 'HR'))
+
+    def test_middleware_attaches_identity(self):
+        from django.test import RequestFactory
+        from app.middleware.identity import IdentityMiddleware
+
+        request = RequestFactory().get('/')
+        request.user = self.fresh_user()
+        captured = {}
+
+        def get_response(req):
+            captured['identity'] = req.identity
+            return None
+
+        IdentityMiddleware(get_response)(request)
+        self.assertEqual(captured['identity'].employee_id, self.employee.id)
+        self.assertTrue(captured['identity'].is_manager)
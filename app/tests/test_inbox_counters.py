@@ -0,0 +1,152 @@
+"""
+Test cases for the per-employee inbox counters
+Tests single-query computation, cache hits, signal invalidation, manager team
+counts, the polling endpoint and the database fallback
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.inbox_counters import get_inbox_counters
+from app.models import (
+    Announcement, AnnouncementRead, Appraisal, AppraisalPeriod, Department, Expense,
+    ExpenseCategory, JobTitle, LeaveRequest, LeaveType
+)
+from app.tests.utils import create_employee
+
+
+class InboxCountersTestCase(TestCase):
+    """Test app.inbox_counters and the portal inbox counters API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.hr = Department.objects.create(name='HR', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.manager = create_employee('M001', cls.it, job_title)
+        cls.manager.is_manager = True
+        cls.manager.save()
+        cls.emp1 = create_employee('E001', cls.it, job_title)
+        cls.emp2 = create_employee('E002', cls.it, job_title)
+        cls.other = create_employee('H001', cls.hr, job_title)
+        cls.leave_type = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=12)
+        cls.category = ExpenseCategory.objects.create(name='Đi lại', code='TRAVEL')
+        cls.period = AppraisalPeriod.objects.create(
+            name='Đánh giá 2030', start_date=date(2030, 1, 1), end_date=date(2030, 12, 31),
+            self_assessment_deadline=date(2030, 12, 15), manager_review_deadline=date(2030, 12, 31)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def create_leave(self, employee, status='pending'):
+        return LeaveRequest.objects.create(
+            employee=employee, leave_type=self.leave_type, start_date=date(2030, 3, 4),
+            end_date=date(2030, 3, 4), reason='Việc riêng', status=status
+        )
+
+    def create_expense(self, employee):
+        return Expense.objects.create(
+            employee=employee, category=self.category, amount=Decimal('100000'),
+            date=date(2030, 3, 4), description='Taxi'
+        )
+
+    def test_counters_computed_in_one_query_and_cached(self):
+        self.create_leave(self.emp1)
+        self.create_leave(self.emp1, status='approved')
+        self.create_expense(self.emp1)
+        Appraisal.objects.create(period=self.period, employee=self.emp1, manager=self.manager)
+        Announcement.objects.create(title='Nghỉ lễ', content='...', publish_at=timezone.now())
+
+        with self.assertNumQueries(1):
+            counters = get_inbox_counters(self.emp1)
+        self.assertEqual(counters, {
+            'pending_leaves': 1, 'pending_expenses': 1,
+            'pending_appraisals': 1, 'unread_announcements': 1,
+        })
+        with self.assertNumQueries(0):
+            self.assertEqual(get_inbox_counters(self.emp1), counters)
+
+    def test_signals_invalidate_affected_employees(self):
+        get_inbox_counters(self.emp1)
+        get_inbox_counters(self.emp2)
+
+        leave = self.create_leave(self.emp1)
+        self.assertEqual(get_inbox_counters(self.emp1)['pending_leaves'], 1)
+        with self.assertNumQueries(0):
+            get_inbox_counters(self.emp2)
+
+        leave.status = 'approved'
+        leave.save()
+        self.assertEqual(get_inbox_counters(self.emp1)['pending_leaves'], 0)
+
+    def test_unread_announcements(self):
+        announcement = Announcement.objects.create(
+            title='Họp phòng IT', content='...', target_all=False, publish_at=timezone.now()
+        )
+        announcement.target_departments.add(self.it)
+        Announcement.objects.create(
+            title='Đã hết hạn', content='...', publish_at=timezone.now() - timedelta(days=10),
+            expire_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(get_inbox_counters(self.emp1)['unread_announcements'], 1)
+        self.assertEqual(get_inbox_counters(self.other)['unread_announcements'], 0)
+
+        AnnouncementRead.objects.create(announcement=announcement, employee=self.emp1)
+        self.assertEqual(get_inbox_counters(self.emp1)['unread_announcements'], 0)
+
+    def test_manager_team_counters(self):
+        self.create_leave(self.emp1)
+        self.create_leave(self.emp2)
+        self.create_leave(self.manager)
+        self.create_leave(self.other)
+        self.create_expense(self.emp2)
+        appraisal = Appraisal.objects.create(period=self.period, employee=self.emp1, manager=self.manager)
+
+        counters = get_inbox_counters(self.manager)
+        self.assertEqual(counters['pending_leaves'], 1)
+        self.assertEqual(counters['team_pending_leaves'], 2)
+        self.assertEqual(counters['team_pending_expenses'], 1)
+        self.assertEqual(counters['team_pending_appraisals'], 0)
+
+        appraisal.status = 'pending_manager'
+        appraisal.save()
+        self.create_leave(self.emp2)
+        counters = get_inbox_counters(self.manager)
+        self.assertEqual(counters['team_pending_leaves'], 3)
+        self.assertEqual(counters['team_pending_appraisals'], 1)
+        self.assertNotIn('team_pending_leaves', get_inbox_counters(self.emp1))
+
+    def test_department_change_invalidates_team_counters(self):
+        self.create_leave(self.other)
+        self.assertEqual(get_inbox_counters(self.manager)['team_pending_leaves'], 0)
+        self.other.department = self.it
+        self.other.save()
+        self.assertEqual(get_inbox_counters(self.manager)['team_pending_leaves'], 1)
+
+    def test_falls_back_to_database_when_cache_fails(self):
+        self.create_leave(self.emp1)
+        with mock.patch('app.inbox_counters.cache.get', side_effect=ConnectionError('down')):
+            self.assertEqual(get_inbox_counters(self.emp1)['pending_leaves'], 1)
+
+    def test_inbox_counters_api(self):
+        user = User.objects.create_user('e001', self.emp1.email, 'Str0ng!Passw0rd')
+        self.create_expense(self.emp1)
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('portal_inbox_counters'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['counters']['pending_expenses'], 1)
+
+        response = self.client.get(reverse('portal_dashboard'))
+        self.assertEqual(response.context['pending_expenses'], 1)
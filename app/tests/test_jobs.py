@@ -0,0 +1,175 @@
+"""
+Test cases for the DB-backed background job queue
+Tests enqueue/claim/run, progress API, cancellation, stale job recovery and job handlers
+"""
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User, Group
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app import jobs
+from app.jobs import (
+    cancel_job, claim_next_job, enqueue_job, register_job, requeue_stale_jobs, run_job
+)
+from app.models import (
+    Appraisal, AppraisalCriteria, AppraisalPeriod, AppraisalScore, BackgroundJob, Department,
+    EmployeeSalaryRule, JobTitle, SalaryComponent
+)
+from app.tests.utils import create_employee
+
+
+@register_job('test_count')
+def count_job(job, total, fail=False, cancel_at=None):
+    job.progress(0, total)
+    for i in range(total):
+        if cancel_at == i:
+            BackgroundJob.objects.filter(pk=job.id).update(cancel_requested=True)
+            job.progress(force=True)
+        job.advance()
+    if fail:
+        raise ValueError('boom')
+    return {'counted': total}
+
+
+class JobQueueTestCase(TestCase):
+    """Test job lifecycle"""
+
+    def test_run_succeeds_with_progress_and_result(self):
+        job = enqueue_job('test_count', {'total': 3}, label='Đếm')
+        claimed = claim_next_job('test')
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (job.id, 'running', 1))
+        self.assertIsNone(claim_next_job('test'))
+
+        run_job(job.id, heartbeat=False)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual((job.progress_done, job.progress_total, job.percent), (3, 3, 100))
+        self.assertEqual(job.result, {'counted': 3})
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            enqueue_job('nope')
+
+    def test_handler_error_marks_failed(self):
+        job = enqueue_job('test_count', {'total': 1, 'fail': True})
+        claim_next_job()
+        run_job(job.id, heartbeat=False)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.message), ('failed', 'boom'))
+        self.assertIn('ValueError', job.error)
+
+    def test_cancel_queued_job(self):
+        job = enqueue_job('test_count', {'total': 1})
+        self.assertTrue(cancel_job(job))
+        self.assertEqual(BackgroundJob.objects.get().status, 'cancelled')
+        self.assertIsNone(claim_next_job())
+        self.assertFalse(cancel_job(job))
+
+    def test_cancel_running_job(self):
+        job = enqueue_job('test_count', {'total': 5, 'cancel_at': 2})
+        claim_next_job()
+        run_job(job.id, heartbeat=False)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress_done), ('cancelled', 2))
+
+    def test_stale_job_is_requeued_then_failed(self):
+        job = enqueue_job('test_count', {'total': 1})
+        stale = timezone.now() - timedelta(seconds=jobs.JOB_STALE_SECONDS + 1)
+        for attempt in range(jobs.JOB_MAX_ATTEMPTS):
+            self.assertIsNotNone(claim_next_job())
+            BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+            requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', jobs.JOB_MAX_ATTEMPTS))
+
+    def test_run_jobs_command_inline(self):
+        enqueue_job('test_count', {'total': 2})
+        enqueue_job('test_count', {'total': 1, 'fail': True})
+        out = StringIO()
+        call_command('run_jobs', inline=True, stdout=out)
+        self.assertIn('Đã xử lý 2 job', out.getvalue())
+        self.assertEqual(
+            list(BackgroundJob.objects.order_by('id').values_list('status', flat=True)),
+            ['succeeded', 'failed']
+        )
+
+
+class JobViewsTestCase(TestCase):
+    """Test views that enqueue jobs and the progress API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.manager = create_employee('M001', cls.department, job_title)
+        cls.manager.is_manager = True
+        cls.manager.save()
+        cls.employees = [create_employee(f'E00{i}', cls.department, job_title) for i in range(3)]
+        cls.user = User.objects.create_user('hr', 'hr@test.com', 'Str0ng!Passw0rd')
+        cls.user.groups.add(Group.objects.create(name='HR'))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_generate_appraisals_runs_in_background(self):
+        period = AppraisalPeriod.objects.create(
+            name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+            self_assessment_deadline=date(2025, 12, 15), manager_review_deadline=date(2025, 12, 20)
+        )
+        for name in ('Chất lượng', 'Teamwork'):
+            AppraisalCriteria.objects.create(period=period, name=name, description='-', category='performance')
+
+        response = self.client.post(reverse('generate_appraisals', args=[period.id]))
+        job = BackgroundJob.objects.get()
+        self.assertTrue(response.url.startswith(reverse('management_job_detail', args=[job.id])))
+        self.assertFalse(Appraisal.objects.exists())
+
+        call_command('run_jobs', inline=True, stdout=StringIO())
+        self.assertEqual(Appraisal.objects.filter(period=period).count(), 4)
+        self.assertEqual(AppraisalScore.objects.count(), 8)
+        self.assertEqual(
+            Appraisal.objects.get(employee=self.employees[0]).manager, self.manager
+        )
+
+        data = self.client.get(reverse('management_job_status', args=[job.id])).json()
+        self.assertEqual(data['job_status'], 'succeeded')
+        self.assertEqual(data['result']['created'], 4)
+        self.assertEqual(self.client.get(response.url).status_code, 200)
+
+    def test_bulk_assign_salary_rules_runs_in_background(self):
+        component = SalaryComponent.objects.create(
+            code='PC', name='Phụ cấp', component_type='allowance', calculation_method='fixed', default_amount=1000
+        )
+        EmployeeSalaryRule.objects.create(
+            employee=self.employees[0], component=component, effective_from=date(2025, 1, 1)
+        )
+        self.client.post(reverse('bulk_assign_salary_rules'), {
+            'employee_ids[]': [e.id for e in self.employees],
+            'component_id': component.id,
+            'custom_amount': '500000',
+            'effective_from': '2025-10-01',
+        })
+        call_command('run_jobs', inline=True, stdout=StringIO())
+        job = BackgroundJob.objects.get()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual((job.result['created'], job.result['skipped']), (2, 1))
+        self.assertEqual(EmployeeSalaryRule.objects.filter(custom_amount=500000).count(), 2)
+
+    def test_job_status_hidden_from_other_users(self):
+        job = enqueue_job('test_count', {'total': 1}, user=self.user)
+        other = User.objects.create_user('other', 'other@test.com', 'Str0ng!Passw0rd')
+        other.groups.add(Group.objects.get(name='HR'))
+        self.client.force_login(other)
+        response = self.client.get(reverse('management_job_status', args=[job.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cancel_view(self):
+        job = enqueue_job('test_count', {'total': 1}, user=self.user)
+        response = self.client.post(reverse('management_job_cancel', args=[job.id]))
+        self.assertEqual(response.json()['status'], 'success')
+        response = self.client.post(reverse('management_job_cancel', args=[job.id]))
+        self.assertEqual(response.json()['status'], 'error')
@@ -0,0 +1,103 @@
+"""
+Test cases for the portal leave calendar feed
+Tests the start/end window filter, status colours, ETag / 304 handling and
+the per-day absence heatmap
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from app.leave_calendar import parse_window
+from app.models import Department, JobTitle, LeaveRequest, LeaveType
+from app.tests.utils import create_employee
+
+
+class LeaveCalendarTestCase(TestCase):
+    """Test app.leave_calendar and portal_views.leave_calendar_data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        other_department = Department.objects.create(name='Kế toán', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.employee = create_employee('E001', department, job_title)
+        cls.colleague = create_employee('E002', department, job_title)
+        cls.outsider = create_employee('E003', other_department, job_title)
+        cls.leave_type = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=12)
+        cls.user = User.objects.create_user('e001', cls.employee.email, 'Str0ng!Passw0rd')
+        cls.url = reverse('portal_leave_calendar_data')
+        cls.window = {'start': '2030-03-01T00:00:00+07:00', 'end': '2030-04-01T00:00:00+07:00'}
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def leave(self, employee, start, end, status='approved'):
+        return LeaveRequest.objects.create(
+            employee=employee, leave_type=self.leave_type, start_date=start, end_date=end,
+            total_days=(end - start).days + 1, reason='Việc riêng', status=status
+        )
+
+    def test_parse_window(self):
+        self.assertEqual(
+            parse_window({'start': '2030-03-01T00:00:00 07:00', 'end': '2030-04-01'}),
+            (date(2030, 3, 1), date(2030, 4, 1))
+        )
+        self.assertIsNone(parse_window({'start': '2030-04-01', 'end': '2030-03-01'}))
+        self.assertIsNone(parse_window({'start': 'x', 'end': '2030-03-01'}))
+        self.assertIsNone(parse_window({'start': '2020-01-01', 'end': '2030-01-01'}))
+
+    def test_events_are_limited_to_window(self):
+        mine = self.leave(self.employee, date(2030, 2, 27), date(2030, 3, 2), status='pending')
+        self.leave(self.colleague, date(2030, 3, 10), date(2030, 3, 11))
+        self.leave(self.colleague, date(2029, 3, 10), date(2029, 3, 11))
+        self.leave(self.outsider, date(2030, 3, 10), date(2030, 3, 11))
+
+        events = self.client.get(self.url, self.window).json()
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]['id'], mine.id)
+        self.assertEqual((events[0]['start'], events[0]['end']), ('2030-02-27', '2030-03-03'))
+        self.assertEqual((events[0]['backgroundColor'], events[0]['extendedProps']['is_mine']), ('#ffc107', True))
+        self.assertEqual(events[1]['backgroundColor'], '#28a745')
+
+        response = self.client.get(self.url, {'start': 'bad', 'end': '2030-04-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unchanged_window_returns_304(self):
+        leave = self.leave(self.colleague, date(2030, 3, 10), date(2030, 3, 11))
+        response = self.client.get(self.url, self.window)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(self.url, self.window, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Sửa / xóa đơn trong khung đổi ETag
+        leave.status = 'cancelled'
+        leave.save()
+        response = self.client.get(self.url, self.window, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        leave.delete()
+        response = self.client.get(self.url, self.window, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json(), [])
+
+    def test_heatmap_counts_absences_per_day(self):
+        self.leave(self.employee, date(2030, 3, 2), date(2030, 3, 4))
+        self.leave(self.colleague, date(2030, 3, 4), date(2030, 3, 5), status='pending')
+        self.leave(self.colleague, date(2030, 3, 3), date(2030, 3, 3), status='rejected')
+        self.leave(self.outsider, date(2030, 3, 4), date(2030, 3, 4))
+
+        data = self.client.get(self.url, {'mode': 'heatmap', 'start': '2030-03-01', 'end': '2030-03-08'}).json()
+        self.assertEqual(data['team_size'], 2)
+        days = {day['date']: (day['absent'], day['pending']) for day in data['days']}
+        self.assertEqual(len(days), 7)
+        self.assertEqual(days['2030-03-01'], (0, 0))
+        self.assertEqual(days['2030-03-03'], (1, 0))
+        self.assertEqual(days['2030-03-04'], (1, 1))
+        self.assertEqual(days['2030-03-05'], (0, 1))
+
+        response = self.client.get(self.url, {'mode': 'heatmap', 'start': '2030-01-01', 'end': '2030-06-01'})
+        self.assertEqual(response.status_code, 400)
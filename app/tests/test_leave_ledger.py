@@ -0,0 +1,155 @@
+"""
+Test cases for the leave balance ledger
+Tests reservation/release through the ledger, grouped F() updates, portal bulk
+approval, management approval and the reconciliation command
+"""
+import json
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.leave_helpers import cancel_leave_request, reject_leave_request, update_leave_balance
+from app.leave_ledger import post_entries, rebuild_balances, settle_leave_requests
+from app.models import (
+    Department, JobTitle, LeaveBalance, LeaveBalanceTransaction, LeaveRequest, LeaveType
+)
+from app.tests.utils import create_employee
+from app.working_calendar import invalidate_working_calendar
+
+
+class LeaveLedgerTestCase(TestCase):
+    """Test app.leave_ledger and the leave views that use it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.manager = create_employee('M001', cls.it, job_title)
+        cls.manager.is_manager = True
+        cls.manager.save()
+        cls.emp1 = create_employee('E001', cls.it, job_title)
+        cls.emp2 = create_employee('E002', cls.it, job_title)
+        cls.annual = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=12)
+        cls.user = User.objects.create_user('manager', cls.manager.email, 'Str0ng!Passw0rd')
+
+    def setUp(self):
+        invalidate_working_calendar()
+        self.addCleanup(invalidate_working_calendar)
+
+    def create_leave(self, employee, start, end, **kwargs):
+        leave = LeaveRequest.objects.create(
+            employee=employee, leave_type=self.annual, start_date=start, end_date=end,
+            reason='Việc riêng', **kwargs
+        )
+        settle_leave_requests([leave])
+        return leave
+
+    def balance(self, employee):
+        return LeaveBalance.objects.get(employee=employee, leave_type=self.annual, year=2030)
+
+    def test_reserve_release_is_idempotent(self):
+        leave = self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 6))
+        balance = self.balance(self.emp1)
+        self.assertEqual((balance.total_days, balance.used_days, balance.remaining_days), (12, 3, 9))
+
+        self.assertEqual(settle_leave_requests([leave]), [])
+        success, _ = cancel_leave_request(leave)
+        self.assertTrue(success)
+        settle_leave_requests([leave])
+
+        balance.refresh_from_db()
+        self.assertEqual((balance.used_days, balance.remaining_days), (0, 12))
+        self.assertEqual(
+            list(leave.balance_transactions.order_by('id').values_list('kind', 'days')),
+            [('reserve', 3), ('release', -3)]
+        )
+
+    def test_deltas_applied_in_one_update(self):
+        entries = [
+            {'employee_id': employee.id, 'leave_type_id': self.annual.id, 'year': 2030,
+             'days': days, 'kind': 'adjust'}
+            for employee, days in ((self.emp1, 1), (self.emp2, 2), (self.emp1, 0.5))
+        ]
+        post_entries(entries)
+        with CaptureQueriesContext(connection) as queries:
+            post_entries(entries)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.balance(self.emp1).used_days, 3)
+        self.assertEqual(self.balance(self.emp2).remaining_days, 8)
+
+    def test_stale_balance_object_does_not_lose_updates(self):
+        update_leave_balance(self.emp1, self.annual, 2, year=2030)
+        stale = self.balance(self.emp1)
+        update_leave_balance(self.emp1, self.annual, 1, year=2030)
+        update_leave_balance(self.emp1, self.annual, 0.5, operation='subtract', year=2030)
+        self.assertEqual(stale.used_days, 2)
+        self.assertEqual(self.balance(self.emp1).used_days, 2.5)
+
+    def test_bulk_approve_and_reject(self):
+        self.client.force_login(self.user)
+        leave1 = self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 5))
+        leave2 = self.create_leave(self.emp1, date(2030, 3, 11), date(2030, 3, 11))
+        leave3 = self.create_leave(self.emp2, date(2030, 3, 4), date(2030, 3, 8))
+
+        response = self.client.post(
+            reverse('portal_team_leaves_bulk_action'),
+            json.dumps({'action': 'approve', 'leave_ids': [leave1.id, leave2.id]}),
+            content_type='application/json'
+        )
+        self.assertTrue(response.json()['success'])
+        # Đã giữ phép khi gửi đơn - duyệt không trừ thêm
+        self.assertEqual(self.balance(self.emp1).used_days, 3)
+
+        response = self.client.post(
+            reverse('portal_team_leaves_bulk_action'),
+            json.dumps({'action': 'reject', 'leave_ids': [leave3.id], 'reason': 'Thiếu người'}),
+            content_type='application/json'
+        )
+        self.assertTrue(response.json()['success'])
+        leave3.refresh_from_db()
+        self.assertEqual((leave3.status, leave3.approved_by), ('rejected', self.manager))
+        self.assertEqual(self.balance(self.emp2).used_days, 0)
+
+    def test_management_approval_does_not_deduct_twice(self):
+        hr = User.objects.create_superuser('hr', 'hr@test.com', 'Str0ng!Passw0rd')
+        hr_employee = create_employee('H001', self.it, self.manager.job_title)
+        hr_employee.email = hr.email
+        hr_employee.save()
+        leave = self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 6))
+
+        self.client.force_login(hr)
+        self.client.post(reverse('management_approve_leave_request', args=[leave.id]))
+        leave.refresh_from_db()
+        self.assertEqual(leave.status, 'approved')
+        self.assertEqual(self.balance(self.emp1).used_days, 3)
+
+        other = self.create_leave(self.emp1, date(2030, 4, 1), date(2030, 4, 2))
+        success, _ = reject_leave_request(other, hr_employee, 'Trùng lịch')
+        self.assertTrue(success)
+        self.assertEqual(self.balance(self.emp1).used_days, 3)
+
+    def test_reconcile_command(self):
+        self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 6))
+        LeaveBalance.objects.filter(employee=self.emp1).update(used_days=7, remaining_days=5)
+
+        self.assertEqual(len(rebuild_balances(dry_run=True)), 1)
+        out = StringIO()
+        call_command('reconcile_leave_balances', year=2030, stdout=out)
+        self.assertIn('đã dùng 7 ➜ sổ cái 3', out.getvalue())
+        balance = self.balance(self.emp1)
+        self.assertEqual((balance.used_days, balance.remaining_days), (3, 9))
+        self.assertEqual(rebuild_balances(), [])
+
+    def test_transactions_are_append_only(self):
+        self.create_leave(self.emp1, date(2030, 3, 4), date(2030, 3, 4))
+        transaction = LeaveBalanceTransaction.objects.get()
+        transaction.days = 5
+        with self.assertRaises(ValueError):
+            transaction.save()
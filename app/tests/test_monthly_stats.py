@@ -0,0 +1,191 @@
+"""
+Test cases for the materialized monthly statistics rollup
+Tests the set-based month refresh, the database-versioned incremental refresh, the
+manager team report, the HR trend endpoint and the nightly command
+"""
+import io
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import (
+    Appraisal, AppraisalPeriod, Attendance, Department, DepartmentMonthlyStats, EmployeeMonthlyStats,
+    Expense, ExpenseCategory, JobTitle, LeaveRequest, LeaveType, MonthlyStatsVersion, Payroll,
+)
+from app.monthly_stats import department_month_stats, mark_stats_changed, refresh_month
+from app.tests.utils import create_employee
+
+
+def local(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class MonthlyStatsTestCase(TestCase):
+    """Test app.monthly_stats and the reports that read it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.hr = Department.objects.create(name='HR', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.manager = create_employee('M001', cls.it, job_title)
+        cls.manager.is_manager = True
+        cls.manager.save()
+        cls.dev = create_employee('E001', cls.it, job_title)
+        cls.clerk = create_employee('E002', cls.hr, job_title)
+
+        day = date(2030, 3, 4)
+        Attendance.objects.create(employee=cls.manager, date=local(day, 8), status='Có làm việc', working_hours=8)
+        Attendance.objects.create(employee=cls.dev, date=local(day, 8), status='Có làm việc', working_hours=6,
+                                  late_minutes=15, early_minutes=30)
+        Attendance.objects.create(employee=cls.dev, date=local(date(2030, 3, 5), 8), status='Nghỉ không phép')
+        Attendance.objects.create(employee=cls.clerk, date=local(day, 8), status='Có làm việc', working_hours=9)
+        # Tháng khác: không được tính
+        Attendance.objects.create(employee=cls.dev, date=local(date(2030, 4, 1), 8), status='Có làm việc',
+                                  working_hours=8)
+
+        leave_type = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=12)
+        for status, days in [('approved', 2), ('pending', 1), ('rejected', 3)]:
+            LeaveRequest.objects.create(
+                employee=cls.dev, leave_type=leave_type, start_date=date(2030, 3, 10),
+                end_date=date(2030, 3, 11), total_days=days, reason='-', status=status
+            )
+
+        category = ExpenseCategory.objects.create(name='Đi lại', code='TRAVEL')
+        for status, amount in [('approved', 100000), ('paid', 50000), ('pending', 30000)]:
+            Expense.objects.create(employee=cls.manager, category=category, amount=Decimal(amount),
+                                   date=date(2030, 3, 2), description='Taxi', status=status)
+
+        Payroll.objects.create(
+            employee=cls.dev, month=3, year=2030, base_salary=1, salary_coefficient=1,
+            standard_working_days=21, hourly_rate=1, total_working_hours=1, total_salary=5000000
+        )
+        period = AppraisalPeriod.objects.create(
+            name='Q1/2030', start_date=date(2030, 1, 1), end_date=date(2030, 3, 31),
+            self_assessment_deadline=date(2030, 3, 15), manager_review_deadline=date(2030, 3, 20)
+        )
+        Appraisal.objects.create(period=period, employee=cls.dev, status='completed', final_score=Decimal('4.5'))
+        Appraisal.objects.create(period=period, employee=cls.manager, status='completed', final_score=Decimal('3.5'))
+
+    def test_refresh_month(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(refresh_month(2030, 3), {'employees': 3, 'departments': 2})
+
+        dev = EmployeeMonthlyStats.objects.get(employee=self.dev, year=2030, month=3)
+        self.assertEqual(
+            (dev.attendance_records, dev.working_hours, dev.late_count, dev.early_leave_count, dev.absent_days),
+            (2, 6, 1, 1, 1)
+        )
+        self.assertEqual(
+            (dev.leave_requests, dev.leave_pending, dev.leave_approved, dev.leave_rejected, dev.leave_days),
+            (3, 1, 1, 1, 2)
+        )
+        self.assertEqual((dev.payroll_count, dev.payroll_total, dev.appraisal_score), (1, 5000000, Decimal('4.5')))
+
+        it = DepartmentMonthlyStats.objects.get(department=self.it, year=2030, month=3)
+        self.assertEqual((it.headcount, it.attendance_records, it.working_hours), (2, 3, 14))
+        self.assertEqual((it.expense_count, it.expense_approved, it.expense_pending), (3, 2, 1))
+        self.assertEqual(it.expense_amount, Decimal('150000'))
+        self.assertEqual((it.appraisal_completed, it.appraisal_score), (2, Decimal('4.00')))
+        self.assertEqual(DepartmentMonthlyStats.objects.get(department=self.hr, year=2030, month=3).working_hours, 9)
+        # Tổng hợp toàn bộ: không lọc theo danh sách id nhân viên
+        self.assertFalse(any('"employee_id" IN (' in query['sql'] for query in queries.captured_queries))
+
+        # Số truy vấn không phụ thuộc số nhân viên; chạy lại ghi đè thay vì nhân đôi
+        create_employee('E003', self.it, self.dev.job_title)
+        Attendance.objects.create(employee=self.dev, date=local(date(2030, 3, 6), 8), status='Có làm việc')
+        with CaptureQueriesContext(connection) as again:
+            refresh_month(2030, 3)
+        self.assertEqual(len(again.captured_queries), len(queries.captured_queries))
+        self.assertEqual(EmployeeMonthlyStats.objects.filter(year=2030, month=3).count(), 3)
+        self.assertEqual(DepartmentMonthlyStats.objects.get(department=self.it, year=2030, month=3).headcount, 3)
+
+    def test_incremental_refresh(self):
+        self.assertEqual(department_month_stats(self.it.id, 2030, 3).attendance_records, 3)
+        with self.assertNumQueries(1):
+            department_month_stats(self.it.id, 2030, 3)
+
+        # Chỉ phòng ban của nhân viên bị làm cũ; phiên bản tăng sau commit (upsert, bắt đầu từ 1)
+        self.assertEqual(department_month_stats(self.hr.id, 2030, 3).attendance_records, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=self.dev, date=local(date(2030, 3, 6), 8), status='Có làm việc')
+            Attendance.objects.create(employee=self.dev, date=local(date(2030, 3, 7), 8), status='Có làm việc')
+        self.assertEqual(MonthlyStatsVersion.objects.get(year=2030, month=3, scope=self.it.id).version, 2)
+        self.assertFalse(MonthlyStatsVersion.objects.filter(year=2030, month=3, scope=self.hr.id).exists())
+        with self.assertNumQueries(1):
+            department_month_stats(self.hr.id, 2030, 3)
+        self.assertEqual(department_month_stats(self.it.id, 2030, 3).attendance_records, 5)
+
+        # update() không phát signal: số liệu giữ nguyên đến khi tháng được đánh dấu thay đổi
+        Attendance.objects.filter(employee=self.dev, work_date=date(2030, 3, 6)).update(working_hours=4)
+        self.assertEqual(department_month_stats(self.it.id, 2030, 3).working_hours, 14)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_stats_changed({(2030, 3)}, employee_ids=[self.dev.id])
+        self.assertEqual(department_month_stats(self.it.id, 2030, 3).working_hours, 18)
+
+        # Không rõ phòng ban: phiên bản chung của tháng làm cũ mọi phòng ban
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_stats_changed({(2030, 3)})
+        self.assertEqual(MonthlyStatsVersion.objects.get(year=2030, month=3, scope=0).version, 1)
+        self.assertEqual(department_month_stats(self.hr.id, 2030, 3).source_version, 1)
+        self.assertEqual(department_month_stats(self.it.id, 2030, 3).source_version, 4)
+
+        # Chuyển phòng ban: cả phòng cũ và phòng mới của tháng hiện tại bị làm cũ
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clerk.department = self.it
+            self.clerk.save()
+        year, month = timezone.localdate().year, timezone.localdate().month
+        self.assertEqual(
+            set(MonthlyStatsVersion.objects.filter(year=year, month=month).values_list('scope', flat=True)),
+            {self.it.id, self.hr.id}
+        )
+
+        # Phiên bản nằm trong database: process khác (run_jobs, worker khác) tăng cũng thấy
+        MonthlyStatsVersion.objects.filter(year=2030, month=3, scope=0).update(version=10)
+        self.assertEqual(refresh_month(2030, 3, [self.hr.id])['departments'], 1)
+        self.assertEqual(
+            DepartmentMonthlyStats.objects.get(department=self.it, year=2030, month=3).source_version, 4
+        )
+        self.assertEqual(department_month_stats(self.it.id, 2030, 3).source_version, 13)
+
+    def test_team_reports_view(self):
+        for month in (1, 2, 3):
+            refresh_month(2030, month)
+        user = User.objects.create_user('m001', self.manager.email, 'Str0ng!Passw0rd')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('portal_team_reports'), {'year': 2030, 'month': 3})
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        self.assertEqual(context['team_size'], 2)
+        self.assertEqual(context['attendance_stats']['total_absent'], 1)
+        self.assertEqual(context['attendance_stats']['avg_working_hours'], 14 / 3)
+        self.assertEqual(
+            (context['leave_stats']['pending_requests'], context['leave_stats']['total_leave_days']), (1, 2)
+        )
+        self.assertEqual([row['employee__employee_code'] for row in context['top_attendance']], ['M001', 'E001'])
+        self.assertEqual([(row.year, row.month) for row in context['trend']], [(2030, 1), (2030, 2), (2030, 3)])
+        self.assertEqual([leave.status for leave in context['recent_leaves']], ['pending'])
+
+    def test_hr_endpoint_and_command(self):
+        out = io.StringIO()
+        call_command('rollup_monthly_stats', year=2030, month=2, stdout=out)
+        call_command('rollup_monthly_stats', year=2030, month=3, stdout=out)
+        self.assertIn('03/2030: 3 nhân viên, 2 phòng ban', out.getvalue())
+
+        user = User.objects.create_user('hr', 'hr@test.com', 'Str0ng!Passw0rd')
+        user.groups.add(Group.objects.create(name='HR'))
+        self.client.force_login(user)
+        url = reverse('management_monthly_stats')
+        data = self.client.get(url, {'year': 2030, 'month': 3, 'months': 2, 'department': self.it.id}).json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual([(row['year'], row['month']) for row in data['rows']], [(2030, 2), (2030, 3)])
+        self.assertEqual((data['rows'][1]['headcount'], data['rows'][1]['working_hours']), (2, 14))
+        self.assertEqual(self.client.get(url, {'month': 13}).status_code, 400)
@@ -0,0 +1,110 @@
+"""
+Test cases for the organization chart service
+Tests the single-pass tree build, cache invalidation on Employee / Department
+changes and the lazy department member endpoints
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from app.models import Department, JobTitle
+from app.org_chart import _department_key, _generation, build_org_tree, department_members_json, get_org_summary
+from app.tests.utils import create_employee
+
+
+class OrgChartTestCase(TestCase):
+    """Test app.org_chart and the management / portal chart views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.sales = Department.objects.create(name='Kinh doanh', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.ceo = create_employee('CEO', None, job_title)
+        cls.ceo.is_manager = True
+        cls.ceo.save()
+        cls.manager = create_employee('M001', cls.it, job_title)
+        cls.manager.is_manager = True
+        cls.manager.save()
+        cls.dev = create_employee('D001', cls.it, job_title)
+        cls.seller = create_employee('S001', cls.sales, job_title)
+        create_employee('X001', cls.it, job_title, status=3)  # Đã nghỉ việc
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_build_tree(self):
+        with self.assertNumQueries(2):
+            summary, members = build_org_tree()
+
+        self.assertEqual([node['employee_code'] for node in summary['top_managers']], ['CEO'])
+        departments = {node['name']: node for node in summary['departments']}
+        self.assertEqual(departments['IT']['employee_count'], 2)
+        self.assertEqual(departments['IT']['parent'], f'emp_{self.ceo.id}')
+        self.assertEqual((summary['total_employees'], summary['total_managers']), (4, 2))
+
+        it_members = {node['employee_code']: node for node in members[self.it.id]}
+        self.assertEqual(set(it_members), {'M001', 'D001'})
+        self.assertEqual(it_members['M001']['parent'], f'dept_{self.it.id}')
+        self.assertEqual(it_members['D001']['parent'], f'emp_{self.manager.id}')
+        # Phòng không có quản lý: nhân viên nằm trực tiếp dưới phòng ban
+        self.assertEqual(members[self.sales.id][0]['parent'], f'dept_{self.sales.id}')
+
+    def test_cached_until_employee_or_department_changes(self):
+        get_org_summary()
+        with self.assertNumQueries(0):
+            summary = get_org_summary()
+            department_members_json(self.it.id)
+        self.assertEqual(summary['total_employees'], 4)
+
+        self.dev.status = 3
+        self.dev.save()
+        self.assertEqual(get_org_summary()['total_employees'], 3)
+
+        Department.objects.create(name='Kho', date_establishment=date(2020, 1, 1))
+        self.assertEqual(get_org_summary()['total_departments'], 3)
+        self.assertIsNone(department_members_json(999999))
+
+    def test_department_members_miss_is_written_back(self):
+        get_org_summary()
+        generation = _generation()
+        cache.delete_many([_department_key(generation, self.it.id), _department_key(generation, self.sales.id)])
+        with self.assertNumQueries(2):
+            department_members_json(self.it.id)
+        with self.assertNumQueries(0):
+            department_members_json(self.it.id)
+            department_members_json(self.sales.id)
+
+    def test_regenerated_again_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dev.status = 3
+            self.dev.save()
+            # Request khác dựng sơ đồ trước khi transaction commit
+            get_org_summary()
+        with self.assertNumQueries(2):
+            self.assertEqual(get_org_summary()['total_employees'], 3)
+
+    def test_views_load_department_members_lazily(self):
+        admin = User.objects.create_superuser('admin', 'admin@test.com', 'Str0ng!Passw0rd')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('management_org_chart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('management_org_chart_department', args=[self.it.id]))
+        self.assertNotContains(response, self.dev.email)
+
+        response = self.client.get(reverse('management_org_chart_department', args=[self.it.id]))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual([node['employee_code'] for node in response.json()], ['M001', 'D001'])
+        response = self.client.get(reverse('management_org_chart_department', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+        user = User.objects.create_user('d001', self.dev.email, 'Str0ng!Passw0rd')
+        self.client.force_login(user)
+        response = self.client.get(reverse('portal_organization_chart'))
+        self.assertEqual(response.context['total_departments'], 2)
+        response = self.client.get(reverse('portal_organization_chart_department', args=[self.sales.id]))
+        self.assertEqual(response.json()[0]['employee_code'], 'S001')
@@ -0,0 +1,182 @@
+"""
+Test cases for the batch payroll run engine
+Tests grouped aggregation, bulk upsert and confirmed payroll protection
+"""
+from django.test import TestCase
+from django.urls import reverse
+from django.core.management import call_command
+from app.models import (
+    Department, JobTitle, Attendance, Payroll, Reward, Discipline,
+    LeaveType, LeaveRequest
+)
+from app.payroll_engine import compute_payroll_run, get_standard_working_days
+from datetime import date, datetime
+from django.utils import timezone
+from io import StringIO
+
+from app.tests.utils import create_employee
+
+
+class PayrollRunTestCase(TestCase):
+    """Test compute_payroll_run and PayrollRun.save"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.sales = Department.objects.create(name='Sales', date_establishment=date(2020, 1, 1))
+        cls.job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.emp1 = create_employee('E001', cls.it, cls.job_title)
+        cls.emp2 = create_employee('E002', cls.it, cls.job_title)
+        cls.emp3 = create_employee('E003', cls.sales, cls.job_title)
+        cls.resigned = create_employee('E004', cls.it, cls.job_title, status=3)
+
+        # Tháng 10/2025 có 23 ngày làm việc chuẩn
+        cls.month, cls.year = 10, 2025
+        tz = timezone.get_current_timezone()
+        for day in (1, 2, 3):
+            Attendance.objects.create(
+                employee=cls.emp1, date=datetime(2025, 10, day, 9, tzinfo=tz),
+                status='Có làm việc', working_hours=8
+            )
+        Attendance.objects.create(
+            employee=cls.emp1, date=datetime(2025, 11, 3, 9, tzinfo=tz),
+            status='Có làm việc', working_hours=8
+        )
+        Reward.objects.create(
+            number=1, description='Bonus', date=datetime(2025, 10, 15, tzinfo=tz),
+            amount=500000, cash_payment=True, employee=cls.emp1
+        )
+        Discipline.objects.create(
+            number=1, description='Late', date=datetime(2025, 10, 16, tzinfo=tz),
+            amount=100000, employee=cls.emp1
+        )
+        paid = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=12, is_paid=True)
+        unpaid = LeaveType.objects.create(name='Không lương', code='UL', max_days_per_year=30, is_paid=False)
+        LeaveRequest.objects.create(
+            employee=cls.emp1, leave_type=paid, start_date=date(2025, 10, 20),
+            end_date=date(2025, 10, 21), total_days=2, reason='Nghỉ', status='approved'
+        )
+        LeaveRequest.objects.create(
+            employee=cls.emp1, leave_type=unpaid, start_date=date(2025, 10, 22),
+            end_date=date(2025, 10, 22), total_days=1, reason='Nghỉ', status='approved'
+        )
+
+    def test_standard_working_days(self):
+        self.assertEqual(get_standard_working_days(2025, 10), 23)
+
+    def test_compute_matches_single_employee_formula(self):
+        run = compute_payroll_run(self.month, self.year)
+        row = run.get(self.emp1.id)
+
+        hourly_rate = 22000000 / (23 * 8)
+        self.assertAlmostEqual(row['hourly_rate'], hourly_rate)
+        self.assertEqual(row['total_working_hours'], 24)
+        self.assertEqual(row['paid_leave_days'], 2)
+        self.assertEqual(row['unpaid_leave_days'], 1)
+        self.assertEqual(row['bonus'], 500000)
+        self.assertEqual(row['penalty'], 100000)
+        self.assertAlmostEqual(
+            row['total_salary'],
+            hourly_rate * 24 + 2 * 8 * hourly_rate + 500000 - 100000
+        )
+
+    def test_compute_excludes_inactive_and_filters_department(self):
+        run = compute_payroll_run(self.month, self.year)
+        self.assertEqual(set(run.rows), {self.emp1.id, self.emp2.id, self.emp3.id})
+
+        run = compute_payroll_run(self.month, self.year, department_id=self.sales.id)
+        self.assertEqual(set(run.rows), {self.emp3.id})
+
+    def test_compute_uses_constant_number_of_queries(self):
+        for i in range(5, 25):
+            create_employee(f'E{i:03d}', self.it, self.job_title)
+        compute_payroll_run(self.month, self.year)
+        # Nhân viên, chấm công (bảng chính + lưu trữ), nghỉ phép, thưởng, phạt, bảng lương cũ,
+        # phiên bản lịch làm việc (một lần cho lịch chung, một lần cho các phòng ban)
+        with self.assertNumQueries(9):
+            compute_payroll_run(self.month, self.year)
+
+    def test_save_creates_then_updates(self):
+        summary = compute_payroll_run(self.month, self.year).save()
+        self.assertEqual(summary['created'], 3)
+        self.assertEqual(Payroll.objects.filter(month=self.month, year=self.year).count(), 3)
+
+        Payroll.objects.filter(employee=self.emp2).update(notes='Giữ ghi chú', total_salary=0)
+        summary = compute_payroll_run(self.month, self.year).save()
+        self.assertEqual(summary['updated'], 3)
+        payroll = Payroll.objects.get(employee=self.emp2, month=self.month, year=self.year)
+        self.assertEqual(payroll.notes, 'Giữ ghi chú')
+        self.assertEqual(Payroll.objects.filter(month=self.month, year=self.year).count(), 3)
+
+    def test_confirmed_payroll_is_never_overwritten(self):
+        Payroll.objects.create(
+            employee=self.emp1, month=self.month, year=self.year, base_salary=1,
+            salary_coefficient=1, standard_working_days=23, hourly_rate=1,
+            total_working_hours=1, total_salary=1, status='confirmed'
+        )
+        run = compute_payroll_run(self.month, self.year)
+        self.assertIsNone(run.get(self.emp1.id))
+        self.assertIsNotNone(run.skip_reason(self.emp1.id))
+
+        # Confirmed after compute but before save
+        stale_run = compute_payroll_run(self.month, self.year)
+        Payroll.objects.create(
+            employee=self.emp2, month=self.month, year=self.year, base_salary=1,
+            salary_coefficient=1, standard_working_days=23, hourly_rate=1,
+            total_working_hours=1, total_salary=1, status='confirmed'
+        )
+        summary = stale_run.save()
+        self.assertEqual(summary['skipped'], 2)
+        self.assertEqual(Payroll.objects.get(employee=self.emp2).total_salary, 1)
+
+    def test_progress_callback(self):
+        calls = []
+        compute_payroll_run(self.month, self.year).save(
+            progress_callback=lambda done, total: calls.append((done, total)), batch_size=2
+        )
+        self.assertEqual(calls[-1], (3, 3))
+        self.assertEqual(len(calls), 3)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('run_payroll', month=self.month, year=self.year, stdout=out)
+        self.assertEqual(Payroll.objects.filter(month=self.month, year=self.year).count(), 3)
+
+        call_command('run_payroll', month=self.month, year=self.year - 1, dry_run=True, stdout=out)
+        self.assertFalse(Payroll.objects.filter(year=self.year - 1).exists())
+
+
+class PayrollRunViewTestCase(TestCase):
+    """Test payroll run HR views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User, Group
+        department = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.employee = create_employee('E001', department, job_title)
+        cls.hr_user = User.objects.create_user('hr', 'hr@test.com', 'Str0ng!Passw0rd')
+        cls.hr_user.groups.add(Group.objects.create(name='HR'))
+
+    def setUp(self):
+        self.client.force_login(self.hr_user)
+
+    def test_payroll_run_saves_and_reports_progress(self):
+        response = self.client.post(reverse('management_payroll_run'), {'month': 10, 'year': 2025})
+        data = response.json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(data['summary']['created'], 1)
+        self.assertTrue(Payroll.objects.filter(employee=self.employee, month=10, year=2025).exists())
+
+        progress = self.client.get(reverse('management_payroll_run_progress')).json()
+        self.assertTrue(progress['finished'])
+        self.assertEqual(progress['done'], 1)
+
+    def test_get_payroll_data_uses_engine(self):
+        response = self.client.post(
+            reverse('get_payroll_data'),
+            {'employee_id': self.employee.id, 'month': 10, 'year': 2025}
+        )
+        data = response.json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(data['data']['base_salary'], 22000000)
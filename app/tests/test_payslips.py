@@ -0,0 +1,148 @@
+"""
+Test cases for payslip PDF rendering
+Tests the stored (content-addressed) confirmed payslips, conditional downloads,
+the batch renderer / background job and the render_payslips command
+"""
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app.models import BackgroundJob, Department, JobTitle, Payroll
+from app import payslips
+from app.payslips import payslip_path, render_month_payslips
+from app.tests.utils import create_employee
+
+
+class PayslipTestCase(TestCase):
+    """Test app.payslips, portal payroll_download and the payslip job / command"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.payrolls = []
+        for index in range(10):
+            employee = create_employee(f'E{index:03d}', cls.it, job_title)
+            cls.payrolls.append(Payroll.objects.create(
+                employee=employee, month=10, year=2025, base_salary=22000000, salary_coefficient=1,
+                standard_working_days=23, hourly_rate=119565, total_working_hours=176,
+                total_salary=21043440, notes='Thưởng dự án\n<b>Q4</b>', status='confirmed'
+            ))
+        cls.employee = cls.payrolls[0].employee
+        cls.pending = Payroll.objects.create(
+            employee=cls.employee, month=11, year=2025, base_salary=22000000, salary_coefficient=1,
+            standard_working_days=20, hourly_rate=137500, total_working_hours=80, total_salary=11000000,
+            status='pending'
+        )
+        cls.user = User.objects.create_user('e000', cls.employee.email, 'Str0ng!Passw0rd')
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def download(self, payroll, **headers):
+        return self.client.get(reverse('portal_payroll_download', args=[payroll.id]), **headers)
+
+    def test_confirmed_payslip_rendered_once(self):
+        self.client.force_login(self.user)
+        payroll = self.payrolls[0]
+        response = self.download(payroll)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertIn('Phieu_luong_E000_10_2025.pdf', response['Content-Disposition'])
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        self.assertTrue(default_storage.exists(payslip_path(payroll)))
+
+        with mock.patch('app.payslips.render_payslip') as render:
+            response = self.download(payroll)
+            self.assertEqual(b''.join(response.streaming_content), content)
+            render.assert_not_called()
+
+            response = self.download(payroll, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+        # Chỉ chủ phiếu lương được tải
+        other = User.objects.create_user('e001', self.payrolls[1].employee.email, 'Str0ng!Passw0rd')
+        self.client.force_login(other)
+        self.assertEqual(self.download(payroll).status_code, 404)
+
+    def test_pending_payslip_not_stored(self):
+        self.client.force_login(self.user)
+        response = self.download(self.pending)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertFalse(default_storage.exists(os.path.dirname(payslip_path(self.pending))))
+
+    def test_updated_payroll_replaces_stored_file(self):
+        payroll = self.payrolls[0]
+        render_month_payslips(2025, 10, workers=1)
+        old_path = payslip_path(payroll)
+        payroll.refresh_from_db()
+        payroll.bonus = 500000
+        payroll.save()
+        self.assertNotEqual(payslip_path(payroll), old_path)
+        self.assertFalse(default_storage.exists(old_path))
+
+        # Thư mục của tháng chỉ được liệt kê một lần cho cả lô
+        with mock.patch('app.payslips._stored_names', wraps=payslips._stored_names) as stored_names:
+            result = render_month_payslips(2025, 10, workers=1)
+        self.assertEqual(stored_names.call_count, 1)
+        self.assertEqual((result['rendered'], result['cached']), (1, 9))
+        self.assertTrue(default_storage.exists(payslip_path(payroll)))
+
+        path = payslip_path(payroll)
+        payroll.delete()
+        self.assertFalse(default_storage.exists(path))
+
+    def test_batch_job_writes_zip_bundle(self):
+        admin = User.objects.create_superuser('admin', 'admin@test.com', 'Str0ng!Passw0rd')
+        admin.groups.add(Group.objects.create(name='HR'))
+        self.client.force_login(admin)
+        response = self.client.post(reverse('management_render_payslips'), {
+            'month': 10, 'year': 2025, 'bundle': 'zip',
+        })
+        job = BackgroundJob.objects.get(kind='render_payslips')
+        self.assertTrue(response.url.startswith(reverse('management_job_detail', args=[job.id])))
+
+        with mock.patch('app.payslips.PAYSLIP_WORKERS', 2):
+            call_command('run_jobs', inline=True, stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded', job.error)
+        self.assertIn('dựng mới 10', job.result['summary'])
+        for payroll in self.payrolls:
+            self.assertTrue(default_storage.exists(payslip_path(payroll)))
+
+        response = self.client.get(reverse('management_export_download', args=[job.id]))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 10)
+        self.assertIn('Phieu_luong_E009_10_2025.pdf', archive.namelist())
+
+    def test_command_writes_merged_pdf(self):
+        output = os.path.join(tempfile.mkdtemp(), 'payslips.pdf')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output), ignore_errors=True)
+        out = io.StringIO()
+        call_command('render_payslips', month=10, year=2025, workers=1, bundle='pdf', output=output, stdout=out)
+        self.assertIn('dựng mới 10', out.getvalue())
+        with open(output, 'rb') as f:
+            self.assertTrue(f.read().startswith(b'%PDF'))
+
+        out = io.StringIO()
+        call_command('render_payslips', month=10, year=2025, stdout=out)
+        self.assertIn('đã có sẵn 10', out.getvalue())
@@ -0,0 +1,122 @@
+"""
+Test cases for the compiled salary formula engine
+Tests AST whitelisting, caching/invalidation and batch evaluation
+"""
+from django.test import TestCase, SimpleTestCase
+from app.models import Employee, Department, JobTitle, SalaryComponent, EmployeeSalaryRule
+from app import salary_formula
+from app.salary_formula import (
+    FormulaError, compile_formula, evaluate_formula, evaluate_many,
+    calculate_employee_components
+)
+from datetime import date
+
+
+class FormulaCompileTestCase(SimpleTestCase):
+    """Test formula validation"""
+
+    def setUp(self):
+        salary_formula.clear_formula_cache()
+
+    def test_arithmetic_and_safe_functions(self):
+        context = {'base_salary': 10000000, 'days': 20}
+        self.assertEqual(evaluate_formula('base_salary * 0.1 + days * 1000', context), 1020000)
+        self.assertEqual(evaluate_formula('max(base_salary / 2, 6000000)', context), 6000000)
+        self.assertEqual(evaluate_formula('500 if days > 15 else 0', context), 500)
+        self.assertEqual(evaluate_formula('(days / 10) ** 2 * 1000 + 2 ** -1', context), 4000.5)
+
+    def test_rejects_unsafe_syntax(self):
+        for formula in (
+            '__import__("os").system("ls")',
+            'base_salary.__class__',
+            '().__class__.__bases__',
+            'open("x")',
+            '[1, 2, 3]',
+            '"abc"',
+            'lambda: 1',
+            '9 ** 9 ** 9',
+            'base_salary ** days',
+            '((((((((9 ** 10) ** 10) ** 10) ** 10) ** 10) ** 10) ** 10) ** 10)',
+            'max(base_salary ** 2, 1) ** 10',
+        ):
+            with self.assertRaises(FormulaError, msg=formula):
+                compile_formula(formula)
+
+    def test_invalid_formula_evaluates_to_default(self):
+        self.assertEqual(evaluate_formula('base_salary +', {'base_salary': 1}), 0)
+        self.assertEqual(evaluate_formula('unknown * 2', {'base_salary': 1}), 0)
+        self.assertEqual(evaluate_formula('', {'base_salary': 1}), 0)
+
+    def test_compiled_once_per_formula(self):
+        evaluate_formula('base_salary * 2', {'base_salary': 1}, component_id=7)
+        code = salary_formula.get_compiled_formula('base_salary * 2', 7)
+        self.assertIs(code, salary_formula.get_compiled_formula('base_salary * 2', 7))
+        salary_formula.invalidate_component(7)
+        self.assertIsNot(code, salary_formula.get_compiled_formula('base_salary * 2', 7))
+
+    def test_evaluate_many(self):
+        contexts = [{'base_salary': value} for value in (100, 200, 300)]
+        self.assertEqual(evaluate_many('base_salary * 0.5', contexts), [50, 100, 150])
+        self.assertEqual(evaluate_many('open()', contexts), [0, 0, 0])
+
+
+class SalaryComponentFormulaTestCase(TestCase):
+    """Test SalaryComponent / EmployeeSalaryRule use the compiled engine"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.employees = []
+        for i in range(3):
+            cls.employees.append(Employee.objects.create(
+                employee_code=f'EMP{i}', name=f'Employee {i}', gender=0,
+                birthday=date(1990, 1, 1), place_of_birth='HN', place_of_origin='HN',
+                place_of_residence='HN', identification=f'ID{i}', date_of_issue=date(2010, 1, 1),
+                place_of_issue='HN', nationality='VN', nation='Kinh', religion='None',
+                email=f'emp{i}@test.com', phone=f'090000000{i}', address='HN', marital_status=0,
+                job_title=job_title, job_position='Dev', department=department,
+                salary=10000000 * (i + 1), contract_start_date=date(2020, 1, 1),
+                contract_duration=12, status=2, education_level=3, major='CS', school='Uni'
+            ))
+        cls.component = SalaryComponent.objects.create(
+            code='PC_FORMULA', name='Phụ cấp công thức', component_type='allowance',
+            calculation_method='formula', formula='base_salary * 0.1'
+        )
+        cls.fixed = SalaryComponent.objects.create(
+            code='PC_FIXED', name='Phụ cấp cố định', component_type='allowance',
+            calculation_method='fixed', default_amount=500000
+        )
+
+    def test_component_calculate(self):
+        self.assertEqual(self.component.calculate(base_salary=1000), 100)
+
+    def test_save_invalidates_cached_formula(self):
+        self.assertEqual(self.component.calculate(base_salary=1000), 100)
+        self.component.formula = 'base_salary * 0.2'
+        self.component.save()
+        self.assertFalse(any(key[0] == self.component.pk for key in salary_formula._compiled_cache))
+        self.assertEqual(self.component.calculate(base_salary=1000), 200)
+
+    def test_rule_custom_formula(self):
+        rule = EmployeeSalaryRule.objects.create(
+            employee=self.employees[0], component=self.component,
+            custom_formula='base_salary * 0.3 + days', effective_from=date(2025, 1, 1)
+        )
+        self.assertEqual(rule.calculate(base_salary=1000, days=5), 305)
+
+    def test_calculate_employee_components_for_department(self):
+        for employee in self.employees:
+            EmployeeSalaryRule.objects.create(
+                employee=employee, component=self.component, effective_from=date(2025, 1, 1)
+            )
+            EmployeeSalaryRule.objects.create(
+                employee=employee, component=self.fixed, effective_from=date(2025, 1, 1)
+            )
+
+        with self.assertNumQueries(1):
+            results = calculate_employee_components(self.employees, days=22)
+
+        for i, employee in enumerate(self.employees):
+            amounts = {rule.component.code: amount for rule, amount in results[employee.id]}
+            self.assertEqual(amounts, {'PC_FORMULA': 1000000 * (i + 1), 'PC_FIXED': 500000})
@@ -0,0 +1,159 @@
+"""
+Test cases for the full-text search index
+Tests accent folding, signal-maintained search documents, the list-page filters,
+ranking / facets / visibility of the /search/ endpoint and the rebuild command
+"""
+import io
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import (
+    Announcement, Department, Document, Employee, JobPosting, JobTitle, LeaveRequest, LeaveType, SearchDocument,
+)
+from app.search_index import fold_text, search_filter
+from app.tests.test_application_board import create_job
+from app.tests.utils import create_employee
+
+
+class SearchIndexTestCase(TestCase):
+    """Test app.search_index and the pages using it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='Công nghệ', date_establishment=date(2020, 1, 1))
+        job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+        cls.nguyen = create_employee('E001', cls.it, job_title)
+        cls.nguyen.name = 'Nguyễn Văn Đức'
+        cls.nguyen.save()
+        cls.tran = create_employee('E002', None, job_title)
+        cls.tran.name = 'Trần Thị Hoa'
+        cls.tran.job_position = 'Nguyên tắc viên'  # "nguyen" chỉ có trong nội dung
+        cls.tran.save()
+
+        leave_type = LeaveType.objects.create(name='Nghỉ ốm', code='SL', max_days_per_year=30)
+        cls.leave = LeaveRequest.objects.create(
+            employee=cls.nguyen, leave_type=leave_type, start_date=date(2025, 10, 6),
+            end_date=date(2025, 10, 7), total_days=2, reason='Khám sức khỏe định kỳ'
+        )
+        LeaveRequest.objects.create(
+            employee=cls.tran, leave_type=leave_type, start_date=date(2025, 10, 6),
+            end_date=date(2025, 10, 6), total_days=1, reason='Khám răng'
+        )
+        cls.public_doc = Document.objects.create(title='Quy định khám sức khỏe', file='documents/a.pdf')
+        cls.private_doc = Document.objects.create(
+            title='Lương thưởng khám sức khỏe', file='documents/b.pdf', visibility='specific'
+        )
+        cls.private_doc.specific_employees.add(cls.tran)
+        Announcement.objects.create(
+            title='Lịch khám sức khỏe', content='<p>Toàn công ty</p>', publish_at=timezone.now() - timedelta(days=1)
+        )
+        cls.job = create_job('PY01')
+        cls.job.title = 'Kỹ sư Python'
+        cls.job.save()
+
+        cls.user = User.objects.create_user('e001', cls.nguyen.email, 'Str0ng!Passw0rd')
+        cls.admin = User.objects.create_superuser('admin', 'admin@test.com', 'Str0ng!Passw0rd')
+
+    def test_fold_text(self):
+        self.assertEqual(fold_text('Nguyễn Văn ĐỨC'), 'nguyen van duc')
+        self.assertEqual(fold_text(None), '')
+
+    def test_accent_insensitive_prefix_filter(self):
+        employees = Employee.objects.all()
+        for query in ('nguyen duc', 'NGUYỄN', 'ngu', 'Đức', 'cong nghe'):
+            self.assertIn(self.nguyen, search_filter(employees, 'employee', query), query)
+        self.assertNotIn(self.nguyen, search_filter(employees, 'employee', 'hoa'))
+        self.assertFalse(search_filter(employees, 'employee', '!!!').exists())
+
+    def test_documents_follow_changes(self):
+        employees = Employee.objects.all()
+        self.nguyen.name = 'Lê Minh'
+        self.nguyen.save()
+        self.assertFalse(search_filter(employees, 'employee', 'nguyen duc').exists())
+        self.assertIn(self.nguyen, search_filter(employees, 'employee', 'le minh'))
+
+        # Đổi tên phòng ban: tài liệu của nhân viên trong phòng được cập nhật
+        self.it.name = 'Kỹ thuật'
+        self.it.save()
+        self.assertIn(self.nguyen, search_filter(employees, 'employee', 'ky thuat'))
+
+        # Lưu lại mà không đổi tên: chỉ đọc tên cũ + UPDATE phòng ban, không ghi lại tài liệu
+        self.it.description = 'Phòng kỹ thuật'
+        with self.assertNumQueries(2):
+            self.it.save()
+
+        # Đổi tên loại nghỉ phép: mọi đơn được ghi lại theo lô, số truy vấn không tăng theo số đơn
+        leave_type = self.leave.leave_type
+        leave_type.name = 'Nghỉ bệnh'
+        with self.assertNumQueries(5):
+            leave_type.save()
+        leaves = LeaveRequest.objects.all()
+        self.assertEqual(search_filter(leaves, 'leave', 'nghi benh').count(), 2)
+        self.assertFalse(search_filter(leaves, 'leave', 'nghi om').exists())
+
+        # Lưu cột không được lập chỉ mục thì không ghi lại tài liệu
+        document = SearchDocument.objects.get(entity_type='job', object_id=self.job.id)
+        with self.assertNumQueries(1):
+            self.job.increment_views()
+        self.assertEqual(SearchDocument.objects.get(pk=document.pk).updated_at, document.updated_at)
+
+        self.tran.delete()
+        self.assertFalse(SearchDocument.objects.filter(entity_type='employee', object_id=self.tran.id).exists())
+
+    def test_list_pages_use_index(self):
+        response = self.client.get(reverse('careers_list'), {'search': 'ky su'})
+        self.assertEqual(list(response.context['jobs']), [self.job])
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('portal_leaves'), {'q': 'kham suc khoe'})
+        self.assertEqual(list(response.context['page_obj']), [self.leave])
+        response = self.client.get(reverse('portal_documents'), {'q': 'kham'})
+        self.assertEqual(list(response.context['documents']), [self.public_doc])
+        response = self.client.get(reverse('portal_announcements'), {'q': 'lich kham'})
+        self.assertEqual(len(response.context['announcements']), 1)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('employee_list'), {'search': 'nguyen'})
+        self.assertEqual(list(response.context['employees']), [self.nguyen, self.tran])
+
+    def test_search_endpoint_ranks_and_limits_visibility(self):
+        self.client.force_login(self.admin)
+        data = self.client.get(reverse('search'), {'q': 'nguyen', 'type': 'employee'}).json()
+        self.assertTrue(data['success'])
+        # Khớp tiêu đề (tên) xếp trước khớp nội dung (chức vụ)
+        self.assertEqual([result['id'] for result in data['results']], [self.nguyen.id, self.tran.id])
+        self.assertEqual(data['results'][0]['url'], reverse('management_employee_detail', args=[self.nguyen.id]))
+        facets = {facet['type']: facet['count'] for facet in data['facets']}
+        self.assertEqual(facets['employee'], 2)
+
+        # Nhân viên thường: không thấy hồ sơ nhân viên, chỉ thấy đơn của mình và tài liệu được phép
+        self.client.force_login(self.user)
+        data = self.client.get(reverse('search'), {'q': 'kham'}).json()
+        facets = {facet['type']: facet['count'] for facet in data['facets']}
+        self.assertEqual((facets['leave'], facets['document'], facets['announcement']), (1, 1, 1))
+        self.assertEqual(facets['employee'], 0)
+        self.assertNotIn(self.private_doc.title, [result['title'] for result in data['results']])
+
+        response = self.client.get(reverse('search'), {'q': 'kham', 'type': 'payroll'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_like_fallback(self):
+        with mock.patch('app.search_index._backend', return_value='like'):
+            self.assertIn(self.nguyen, search_filter(Employee.objects.all(), 'employee', 'nguyen duc'))
+
+    def test_rebuild_command(self):
+        JobPosting.objects.bulk_create([JobPosting(
+            title='Chuyên viên Nhân sự', code='HR01', description='-', requirements='-', responsibilities='-',
+            benefits='-', location='HN', deadline=date(2030, 1, 1), status='open'
+        )])
+        self.assertFalse(search_filter(JobPosting.objects.all(), 'job', 'nhan su').exists())
+        out = io.StringIO()
+        call_command('rebuild_search_index', types=['job'], stdout=out)
+        self.assertIn('job: 2', out.getvalue())
+        self.assertEqual(search_filter(JobPosting.objects.all(), 'job', 'nhan su').get().code, 'HR01')
@@ -6,7 +6,7 @@ from django.test import TestCase
 from django.urls import reverse
 from django.db.models import Count
 from app.models import Employee, Department, JobTitle, Attendance
-from datetime import date
+from datetime import date, timedelta
 from django.utils import timezone
 
 
@@ -179,7 +179,7 @@ class ChartDataTestCase(TestCase):
         for i in range(5):
             Attendance.objects.create(
                 employee=cls.employee,
-                date=timezone.now(),
+                date=timezone.now() - timedelta(days=i),
                 status='Có làm việc',
                 working_hours=8
             )
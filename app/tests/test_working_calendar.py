@@ -0,0 +1,135 @@
+"""
+Test cases for the holiday-aware working calendar
+Tests prefix-sum range queries, department overrides, cache invalidation,
+holiday seeding and its use by leave requests and payroll
+"""
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from app.leave_helpers import approve_leave_request, calculate_working_days
+from app.leave_ledger import settle_leave_requests
+from app.models import Department, Holiday, JobTitle, LeaveBalance, LeaveRequest, LeaveType
+from app.payroll_engine import compute_payroll_run
+from app.tests.utils import create_employee
+from app.working_calendar import (
+    get_year_calendar, invalidate_working_calendar, is_working_day, month_working_days,
+    vietnam_public_holidays, working_days_between
+)
+
+
+class WorkingCalendarTestCase(TestCase):
+    """Test working_days_between / month_working_days"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.it = Department.objects.create(name='IT', date_establishment=date(2020, 1, 1))
+        cls.ops = Department.objects.create(name='Ops', date_establishment=date(2020, 1, 1))
+        cls.job_title = JobTitle.objects.create(name='Developer', salary_coefficient=1.0)
+
+    def setUp(self):
+        # Lịch được giữ trong bộ nhớ process - không để rơi rớt giữa các test
+        invalidate_working_calendar()
+        self.addCleanup(invalidate_working_calendar)
+
+    def test_weekdays_without_holidays(self):
+        self.assertEqual(month_working_days(2025, 10), 23)
+        self.assertEqual(working_days_between(date(2025, 10, 3), date(2025, 10, 6)), 2)
+        self.assertEqual(working_days_between(date(2025, 10, 4), date(2025, 10, 5)), 0)
+        self.assertEqual(working_days_between(date(2025, 10, 6), date(2025, 10, 3)), 0)
+
+    def test_range_across_years(self):
+        Holiday.objects.create(date=date(2026, 1, 1), name='Tết Dương lịch')
+        # 29/12/2025 (thứ 2) - 2/1/2026 (thứ 6): 5 ngày thường, trừ 1/1
+        self.assertEqual(working_days_between(date(2025, 12, 29), date(2026, 1, 2)), 4)
+
+    def test_holidays_and_makeup_days(self):
+        Holiday.objects.create(date=date(2025, 9, 1), name='Quốc khánh (ngày liền kề)')
+        Holiday.objects.create(date=date(2025, 9, 2), name='Quốc khánh')
+        Holiday.objects.create(date=date(2025, 9, 6), name='Làm bù', kind='working')
+
+        self.assertEqual(working_days_between(date(2025, 9, 1), date(2025, 9, 7)), 4)
+        self.assertEqual(month_working_days(2025, 9), 21)
+        self.assertFalse(is_working_day(date(2025, 9, 2)))
+        self.assertTrue(is_working_day(date(2025, 9, 6)))
+
+    def test_department_override(self):
+        Holiday.objects.create(date=date(2025, 10, 10), name='Công ty nghỉ', kind='company')
+        Holiday.objects.create(date=date(2025, 10, 10), name='Trực vận hành', kind='working', department=self.ops)
+        Holiday.objects.create(date=date(2025, 10, 13), name='Team building', kind='company', department=self.it)
+
+        self.assertEqual(month_working_days(2025, 10), 22)
+        self.assertEqual(month_working_days(2025, 10, self.ops.id), 23)
+        self.assertEqual(month_working_days(2025, 10, self.it.id), 21)
+
+    def test_calendar_built_once_and_invalidated(self):
+        with self.assertNumQueries(2):
+            month_working_days(2025, 5)
+        # Lần sau chỉ còn truy vấn phiên bản Holiday
+        with self.assertNumQueries(3):
+            working_days_between(date(2025, 1, 1), date(2025, 12, 31))
+            self.assertIs(get_year_calendar(2025), get_year_calendar(2025))
+
+        Holiday.objects.create(date=date(2025, 5, 1), name='Quốc tế lao động')
+        self.assertEqual(month_working_days(2025, 5), 21)
+        holiday = Holiday.objects.get(date=date(2025, 5, 1))
+        holiday.kind = 'working'
+        holiday.save()
+        self.assertEqual(month_working_days(2025, 5), 22)
+        Holiday.objects.all().delete()
+        self.assertEqual(month_working_days(2025, 5), 22)
+
+        # Không dựa vào signal / cache cục bộ: process khác ghi bằng bulk_create vẫn thấy
+        Holiday.objects.bulk_create([Holiday(date=date(2025, 5, 2), name='Công ty nghỉ', kind='company')])
+        self.assertEqual(month_working_days(2025, 5), 21)
+
+    def test_vietnam_public_holidays(self):
+        holidays = dict(vietnam_public_holidays(2026))
+        # Tết Nguyên đán 2026: 16/2 - 20/2
+        self.assertEqual(
+            [day for day, name in holidays.items() if name == 'Tết Nguyên đán'],
+            [date(2026, 2, day) for day in range(16, 21)]
+        )
+        # 30/4/2022 là thứ 7, 1/5 là CN: nghỉ bù thứ 2 và thứ 3
+        holidays = dict(vietnam_public_holidays(2022))
+        self.assertEqual(holidays[date(2022, 5, 2)], 'Nghỉ bù Ngày Chiến thắng')
+        self.assertEqual(holidays[date(2022, 5, 3)], 'Nghỉ bù Ngày Quốc tế lao động')
+
+    def test_init_holidays_command(self):
+        out = StringIO()
+        call_command('init_holidays', year=[2026], stdout=out)
+        call_command('init_holidays', year=[2026], stdout=out)
+        self.assertEqual(Holiday.objects.count(), len(vietnam_public_holidays(2026)))
+        self.assertEqual(month_working_days(2026, 2), 15)
+
+    def test_leave_and_payroll_use_calendar(self):
+        employee = create_employee('E001', self.it, self.job_title)
+        Holiday.objects.create(date=date(2025, 10, 13), name='Team building', kind='company', department=self.it)
+
+        self.assertEqual(calculate_working_days(date(2025, 10, 13), date(2025, 10, 17)), 5)
+        self.assertEqual(calculate_working_days(date(2025, 10, 13), date(2025, 10, 17), self.it.id), 4)
+
+        run = compute_payroll_run(10, 2025)
+        self.assertEqual(run.get(employee.id)['standard_working_days'], 22)
+        run.save()
+        self.assertEqual(employee.payroll_set.get().standard_working_days, 22)
+
+    def test_approval_recounts_days(self):
+        employee = create_employee('E001', self.it, self.job_title)
+        leave_type = LeaveType.objects.create(name='Phép năm', code='AL', max_days_per_year=12)
+        leave_request = LeaveRequest.objects.create(
+            employee=employee, leave_type=leave_type, start_date=date(2025, 10, 13),
+            end_date=date(2025, 10, 17), total_days=5, reason='Du lịch'
+        )
+        settle_leave_requests([leave_request])
+        self.assertEqual(LeaveBalance.objects.get(employee=employee).used_days, 5)
+        # Ngày nghỉ được thêm sau khi gửi đơn
+        Holiday.objects.create(date=date(2025, 10, 13), name='Công ty nghỉ', kind='company')
+
+        success, _ = approve_leave_request(leave_request, employee)
+        self.assertTrue(success)
+        leave_request.refresh_from_db()
+        self.assertEqual(leave_request.total_days, 4)
+        self.assertEqual(LeaveBalance.objects.get(employee=employee).used_days, 4)
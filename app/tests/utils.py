@@ -0,0 +1,38 @@
+"""
+Shared helpers for the app test suite
+"""
+from datetime import date
+
+from app.models import Employee
+
+
+def create_employee(code, department, job_title, status=2, salary=22000000):
+    return Employee.objects.create(
+        employee_code=code,
+        name=f'Employee {code}',
+        gender=0,
+        birthday=date(1990, 1, 1),
+        place_of_birth='HN',
+        place_of_origin='HN',
+        place_of_residence='HN',
+        identification=f'ID{code}',
+        date_of_issue=date(2010, 1, 1),
+        place_of_issue='HN',
+        nationality='VN',
+        nation='Kinh',
+        religion='None',
+        email=f'{code.lower()}@test.com',
+        phone=f'09{code}',
+        address='HN',
+        marital_status=0,
+        job_title=job_title,
+        job_position='Staff',
+        department=department,
+        salary=salary,
+        contract_start_date=date(2020, 1, 1),
+        contract_duration=12,
+        status=status,
+        education_level=3,
+        major='CS',
+        school='University'
+    )
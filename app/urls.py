@@ -3,6 +3,8 @@ from django.contrib.auth import views as auth_views
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
+from . import portal_views
+
 @login_required
 def test_login_view(request):
     return render(request, 'test_login.html')
@@ -11,4 +13,5 @@ urlpatterns = [
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='/login/'), name='logout'),
     path('test-login/', test_login_view, name='test_login'),
+    path('search/', portal_views.global_search, name='search'),
 ]
@@ -31,6 +31,10 @@ urlpatterns = [
     
     # Org Chart
     path('org-chart/', management_views.org_chart, name='management_org_chart'),
+    path('org-chart/departments/<int:department_id>/', management_views.org_chart_department, name='management_org_chart_department'),
+    
+    # Reports
+    path('reports/monthly-stats/', management_views.monthly_stats_report, name='management_monthly_stats'),
     
     # Attendance Management
     path('attendance/add/', management_views.add_attendance, name='management_add_attendance'),
@@ -40,6 +44,14 @@ urlpatterns = [
     path('attendance/get-data/', management_views.get_attendance_data, name='management_get_attendance_data'),
     path('attendance/<int:attendance_id>/edit/', management_views.edit_attendance, name='management_edit_attendance'),
     path('attendance/export/', management_views.export_attendance, name='management_export_attendance'),
+    path('attendance/import/', management_views.import_attendance, name='management_import_attendance'),
+    path('exports/<int:job_id>/status/', management_views.export_job_status, name='management_export_status'),
+    path('exports/<int:job_id>/download/', management_views.export_job_download, name='management_export_download'),
+    
+    # Background Jobs
+    path('jobs/<int:job_id>/', management_views.job_detail, name='management_job_detail'),
+    path('jobs/<int:job_id>/status/', management_views.job_status, name='management_job_status'),
+    path('jobs/<int:job_id>/cancel/', management_views.cancel_background_job, name='management_job_cancel'),
     
     # Payroll Management
     path('payroll/calculate/', management_views.calculate_payroll, name='management_calculate_payroll'),
@@ -51,6 +63,9 @@ urlpatterns = [
     path('payroll/confirm/', management_views.confirm_payroll, name='management_confirm_payroll'),
     path('payroll/<int:payroll_id>/', management_views.view_payroll, name='management_view_payroll'),
     path('payroll/export/', management_views.export_payroll, name='management_export_payroll'),
+    path('payroll/payslips/', management_views.render_payslips, name='management_render_payslips'),
+    path('payroll/run/', management_views.payroll_run, name='management_payroll_run'),
+    path('payroll/run/progress/', management_views.payroll_run_progress, name='management_payroll_run_progress'),
     
     # Leave Management
     path('leave/types/', management_views.manage_leave_types, name='management_manage_leave_types'),
@@ -89,6 +104,7 @@ urlpatterns = [
     path('recruitment/jobs/<int:job_id>/edit/', management_views.edit_job, name='management_edit_job'),
     path('recruitment/jobs/<int:job_id>/delete/', management_views.delete_job, name='management_delete_job'),
     path('recruitment/applications/', management_views.applications_kanban, name='management_applications_kanban'),
+    path('recruitment/applications/page/', management_views.applications_board_page, name='management_applications_board_page'),
     path('recruitment/applications/<int:application_id>/', management_views.application_detail, name='management_application_detail'),
     path('recruitment/applications/<int:application_id>/update/', management_views.update_application, name='management_update_application'),
     path('recruitment/applications/<int:application_id>/status/', management_views.update_application_status, name='management_update_application_status'),
@@ -9,6 +9,7 @@ urlpatterns = [
     # Dashboard
     path('', portal_views.dashboard, name='portal_dashboard'),
     path('dashboard/', portal_views.dashboard, name='portal_dashboard_alt'),
+    path('api/inbox-counters/', portal_views.inbox_counters, name='portal_inbox_counters'),
     
     # Leave Management
     path('leaves/', portal_views.leaves_list, name='portal_leaves'),
@@ -73,6 +74,7 @@ urlpatterns = [
     
     # Organization Chart
     path('organization-chart/', portal_views.organization_chart, name='portal_organization_chart'),
+    path('organization-chart/departments/<int:department_id>/', portal_views.organization_chart_department, name='portal_organization_chart_department'),
     
     # ========================================
     # BACKWARD COMPATIBILITY ALIASES
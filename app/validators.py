@@ -8,8 +8,10 @@ import os
 # Constants
 ALLOWED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif']
 ALLOWED_DOCUMENT_EXTENSIONS = ['pdf', 'doc', 'docx']
+ALLOWED_PUNCH_LOG_EXTENSIONS = ['csv', 'tsv', 'txt']
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
 MAX_DOCUMENT_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_PUNCH_LOG_SIZE = 200 * 1024 * 1024  # 200MB (~5 triệu lần quẹt)
 
 
 def validate_image_file(file):
@@ -68,6 +70,32 @@ def validate_document_file(file):
     return True
 
 
+def validate_punch_log_file(file):
+    """
+    Validate uploaded time-clock punch log files (CSV / TSV).
+    
+    Args:
+        file: UploadedFile object
+        
+    Raises:
+        ValidationError: If file is invalid
+    """
+    if file.size > MAX_PUNCH_LOG_SIZE:
+        raise ValidationError(
+            _(f'Kích thước file không được vượt quá {MAX_PUNCH_LOG_SIZE / (1024*1024):.0f}MB. '
+              f'File của bạn: {file.size / (1024*1024):.2f}MB')
+        )
+    
+    ext = os.path.splitext(file.name)[1][1:].lower()
+    if ext not in ALLOWED_PUNCH_LOG_EXTENSIONS:
+        raise ValidationError(
+            _(f'Định dạng file không được hỗ trợ. '
+              f'Chỉ chấp nhận: {", ".join(ALLOWED_PUNCH_LOG_EXTENSIONS)}')
+        )
+    
+    return True
+
+
 def validate_salary(value):
     """
     Validate salary value.
@@ -1,10 +1,10 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q
 from django.core.paginator import Paginator
 from .models import JobPosting, Application
 from .forms import ApplicationForm
+from .search_index import search_filter
 import uuid
 
 # Create your views here.
@@ -24,11 +24,7 @@ def careers_list(request):
     # Search
     search_query = request.GET.get('search')
     if search_query:
-        jobs = jobs.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(requirements__icontains=search_query)
-        )
+        jobs = search_filter(jobs, 'job', search_query)
     
     # Filter by department
     department_filter = request.GET.get('department')
@@ -0,0 +1,205 @@
+"""
+Working calendar
+Lịch ngày làm việc dùng chung cho nghỉ phép và tính lương: thứ 2 - thứ 6, trừ các
+ngày nghỉ trong bảng Holiday (lễ/Tết, công ty nghỉ), cộng các ngày làm bù; phòng ban
+có thể ghi đè lịch chung bằng Holiday gắn department.
+
+- Mỗi (năm, phòng ban) được dựng một lần thành mảng cộng dồn số ngày làm việc
+  (prefix sum), nên "số ngày làm việc từ A đến B" chỉ là một phép trừ.
+- Tổng theo tháng được memo trên lịch năm.
+- Lịch được giữ trong bộ nhớ process, gắn với phiên bản của bảng Holiday đọc từ
+  database (số dòng, MAX(updated_at)) ở mỗi lần dùng: thêm/sửa/xóa Holiday ở bất kỳ
+  process nào (kể cả bulk_create, xóa theo phòng ban) đều làm lịch được dựng lại.
+
+Usage:
+    working_days_between(date(2025, 9, 1), date(2025, 9, 5), department_id=3)  # 3
+    month_working_days(2025, 10)  # 23
+"""
+import calendar
+import threading
+from datetime import date, timedelta
+
+from django.db.models import Count, Max, Q
+
+from .models import Holiday
+
+# Mùng 1 Tết Nguyên đán và Giỗ Tổ Hùng Vương (10/3 âm lịch) theo dương lịch.
+# Năm ngoài bảng chỉ được nạp các ngày lễ dương lịch; HR thêm ngày âm lịch trong admin.
+LUNAR_HOLIDAYS = {
+    2024: (date(2024, 2, 10), date(2024, 4, 18)),
+    2025: (date(2025, 1, 29), date(2025, 4, 7)),
+    2026: (date(2026, 2, 17), date(2026, 4, 26)),
+    2027: (date(2027, 2, 6), date(2027, 4, 16)),
+}
+
+_lock = threading.Lock()
+_calendars = {}
+_calendars_version = None
+
+
+class YearCalendar:
+    """
+    Lịch làm việc của một năm cho một phòng ban (None = lịch chung toàn công ty).
+
+    Attributes:
+        year: int
+        department_id: int hoặc None
+        prefix: list - prefix[i] = số ngày làm việc trong i ngày đầu năm
+    """
+
+    def __init__(self, year, department_id=None, holidays=()):
+        self.year = year
+        self.department_id = department_id
+        self.first_day = date(year, 1, 1)
+        days_in_year = 366 if calendar.isleap(year) else 365
+
+        working = [
+            (self.first_day + timedelta(days=offset)).weekday() < 5
+            for offset in range(days_in_year)
+        ]
+        # Lịch chung trước, ghi đè của phòng ban sau
+        for holiday in sorted(holidays, key=lambda h: h.department_id is not None):
+            working[(holiday.date - self.first_day).days] = not holiday.is_day_off
+
+        self.prefix = [0] * (days_in_year + 1)
+        for offset, is_working in enumerate(working):
+            self.prefix[offset + 1] = self.prefix[offset] + is_working
+        self._months = {}
+
+    @classmethod
+    def build(cls, year, department_id=None):
+        scope = Q(department__isnull=True)
+        if department_id is not None:
+            scope |= Q(department_id=department_id)
+        holidays = Holiday.objects.filter(
+            scope, date__gte=date(year, 1, 1), date__lte=date(year, 12, 31)
+        ).only('date', 'kind', 'department_id')
+        return cls(year, department_id, list(holidays))
+
+    def _offset(self, day):
+        return (day - self.first_day).days
+
+    def count(self, start, end):
+        """Số ngày làm việc trong [start, end] (cả hai đầu, cùng năm với lịch)"""
+        return self.prefix[self._offset(end) + 1] - self.prefix[self._offset(start)]
+
+    def is_working_day(self, day):
+        offset = self._offset(day)
+        return self.prefix[offset + 1] > self.prefix[offset]
+
+    def month_total(self, month):
+        total = self._months.get(month)
+        if total is None:
+            last_day = calendar.monthrange(self.year, month)[1]
+            total = self.count(date(self.year, month, 1), date(self.year, month, last_day))
+            self._months[month] = total
+        return total
+
+
+def _holidays_version():
+    """Phiên bản hiện tại của bảng Holiday (một truy vấn gộp, dùng chung mọi process)"""
+    state = Holiday.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return state['count'], state['updated']
+
+
+def _year_calendar(year, department_id, version):
+    global _calendars_version
+    key = (year, department_id)
+    with _lock:
+        if _calendars_version != version:
+            _calendars.clear()
+            _calendars_version = version
+        year_calendar = _calendars.get(key)
+    if year_calendar is None:
+        year_calendar = YearCalendar.build(year, department_id)
+        with _lock:
+            if _calendars_version == version:
+                _calendars[key] = year_calendar
+    return year_calendar
+
+
+def get_year_calendar(year, department_id=None):
+    """YearCalendar của (năm, phòng ban), dựng từ database nếu Holiday đã đổi"""
+    return _year_calendar(year, department_id, _holidays_version())
+
+
+def working_days_between(start_date, end_date, department_id=None):
+    """
+    Số ngày làm việc từ start_date đến end_date (tính cả hai đầu).
+
+    Args:
+        start_date, end_date: datetime.date
+        department_id: int - dùng lịch riêng của phòng ban nếu có (optional)
+
+    Returns:
+        int: 0 nếu start_date > end_date
+    """
+    if start_date > end_date:
+        return 0
+    total = 0
+    version = _holidays_version()
+    for year in range(start_date.year, end_date.year + 1):
+        year_calendar = _year_calendar(year, department_id, version)
+        total += year_calendar.count(
+            max(start_date, date(year, 1, 1)), min(end_date, date(year, 12, 31))
+        )
+    return total
+
+
+def month_working_days(year, month, department_id=None):
+    """Số ngày làm việc chuẩn của tháng"""
+    return get_year_calendar(year, department_id).month_total(month)
+
+
+def month_working_days_by_department(year, month, department_ids):
+    """Số ngày làm việc chuẩn của tháng cho nhiều phòng ban, chỉ đọc phiên bản Holiday một lần"""
+    version = _holidays_version()
+    return {
+        department_id: _year_calendar(year, department_id, version).month_total(month)
+        for department_id in set(department_ids)
+    }
+
+
+def is_working_day(day, department_id=None):
+    return get_year_calendar(day.year, department_id).is_working_day(day)
+
+
+def invalidate_working_calendar():
+    """Bỏ toàn bộ lịch đã dựng trong process hiện tại"""
+    global _calendars_version
+    with _lock:
+        _calendars.clear()
+        _calendars_version = None
+
+
+def vietnam_public_holidays(year):
+    """
+    Ngày nghỉ lễ, Tết theo Bộ luật Lao động 2019 (Điều 112) cho một năm, kèm ngày nghỉ bù
+    khi ngày lễ trùng thứ 7/CN (nghỉ bù vào ngày làm việc kế tiếp).
+
+    Returns:
+        list: [(date, tên), ...] sắp theo ngày
+    """
+    holidays = {
+        date(year, 1, 1): 'Tết Dương lịch',
+        date(year, 4, 30): 'Ngày Chiến thắng',
+        date(year, 5, 1): 'Ngày Quốc tế lao động',
+        date(year, 9, 1): 'Quốc khánh (ngày liền kề)',
+        date(year, 9, 2): 'Quốc khánh',
+    }
+    if year in LUNAR_HOLIDAYS:
+        tet, hung_kings = LUNAR_HOLIDAYS[year]
+        # 5 ngày Tết: ngày cuối năm âm lịch và mùng 1 - mùng 4
+        for offset in range(-1, 4):
+            holidays[tet + timedelta(days=offset)] = 'Tết Nguyên đán'
+        holidays[hung_kings] = 'Giỗ Tổ Hùng Vương'
+
+    for day, name in sorted(holidays.items()):
+        if day.weekday() < 5:
+            continue
+        substitute = day + timedelta(days=1)
+        while substitute.weekday() >= 5 or substitute in holidays:
+            substitute += timedelta(days=1)
+        if substitute.year == year:
+            holidays[substitute] = f'Nghỉ bù {name}'
+    return sorted(holidays.items())
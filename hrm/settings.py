@@ -63,6 +63,8 @@ MIDDLEWARE = [
     # 'app.middleware.SecurityHeadersMiddleware',
     # 'app.middleware.UserGroupMiddleware',
     # 'app.middleware.LoginAttemptMiddleware',
+    # Request-scoped identity (Employee, groups, role flags) used by permission helpers
+    'app.middleware.identity.IdentityMiddleware',
     # Portal system middleware (from app.middleware.portal_redirect module)
     'app.middleware.portal_redirect.PortalRedirectMiddleware',
     'app.middleware.portal_redirect.ManagementAccessMiddleware',